@@ -0,0 +1,10 @@
+"""
+Benchmarks reprodutíveis do By-CRR AI.
+
+Os cenários rodam contra um servidor Ollama simulado (``mock_ollama``), com
+respostas roteirizadas e latência determinística, para que os números possam
+ser comparados entre commits sem depender de um modelo real.
+
+Uso:
+    python -m benchmarks.run --out bench_results.json
+"""
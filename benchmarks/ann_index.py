@@ -0,0 +1,111 @@
+"""
+Recall e latência do índice IVF (``warpclone_ann``) contra a busca exata por força bruta.
+
+Gera vetores normalizados agrupados (mistura de gaussianas, parecida com embeddings de
+trechos de poucos temas) e consultas próximas de vetores da base. Para cada `nprobe`,
+informa ``recall@k`` (fração dos `k` vizinhos exatos encontrados) e a latência média.
+Também mede a construção, uma inserção incremental (cauda + merge) e a abertura do índice
+gravado (memmap).
+
+Exemplos:
+    python -m benchmarks.ann_index --rows 200000
+    python -m benchmarks.ann_index --rows 500000 --dim 768 --nprobe 4,8,16,32,64
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from warpclone_ann import IvfIndex  # noqa: E402
+
+
+def _make_vectors(rows: int, dim: int, topics: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    matrix = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        n = min(65536, rows - start)
+        block = centers[rng.integers(0, topics, n)] + rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+        matrix[start:start + n] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return matrix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do índice IVF do By-CRR AI")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=500, help="centros da mistura de gaussianas")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="valores de nprobe separados por vírgula")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    matrix = _make_vectors(args.rows, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    queries = matrix[rng.integers(0, args.rows, args.queries)] + rng.normal(
+        scale=0.3, size=(args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    t = time.perf_counter()
+    exact = []
+    for q in queries:
+        scores = matrix @ q
+        top = np.argpartition(-scores, args.k - 1)[:args.k]
+        exact.append(set(top.tolist()))
+    exact_ms = (time.perf_counter() - t) / args.queries * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 90% das linhas no treino; o restante chega depois, como trechos novos
+        initial = int(args.rows * 0.9)
+        index = IvfIndex(Path(tmp) / "ivf", min_tail_merge=0)
+        t = time.perf_counter()
+        index.update(matrix[:initial])
+        build_sec = time.perf_counter() - t
+        t = time.perf_counter()
+        merged = index.update(matrix)
+        insert_sec = time.perf_counter() - t
+
+        t = time.perf_counter()
+        reopened = IvfIndex(Path(tmp) / "ivf")
+        reopened.load()
+        load_ms = (time.perf_counter() - t) * 1000
+
+        results = {}
+        for nprobe in [int(n) for n in args.nprobe.split(",") if n.strip()]:
+            found = 0
+            t = time.perf_counter()
+            for q, truth in zip(queries, exact):
+                rows, _ = reopened.search(q, matrix, args.k, nprobe=nprobe)
+                found += len(truth & set(rows.tolist()))
+            elapsed = (time.perf_counter() - t) / args.queries * 1000
+            results[str(nprobe)] = {
+                f"recall@{args.k}": round(found / (args.k * args.queries), 4),
+                "avg_ms": round(elapsed, 3),
+                "speedup": round(exact_ms / elapsed, 1) if elapsed else None,
+            }
+        summary = {
+            "rows": args.rows, "dim": args.dim, "nlist": reopened.meta["nlist"],
+            "build_sec": round(build_sec, 2),
+            "incremental_insert": {"rows": args.rows - initial, "action": merged, "sec": round(insert_sec, 2)},
+            "load_ms": round(load_ms, 2),
+            "exact_avg_ms": round(exact_ms, 3),
+            "nprobe": results,
+        }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Cache de respostas por tarefa (``answer_cache`` no ``warpclone_config.json``) com tarefas
+repetidas, como as de um operador no dia a dia.
+
+Cada tarefa abre uma conversa nova (o cache só reaproveita a tarefa que abre a conversa, ou
+a mesma tarefa na mesma conversa e com o mesmo contexto) e roda em três rodadas contra o
+Ollama simulado:
+- ``cold``: cache vazio, loop completo;
+- ``warm``: a mesma tarefa com outra caixa e pontuação, logo em seguida;
+- ``stale``: depois de esperar a validade da lista de processos (`--process-ttl`) e de
+  alterar o arquivo lido.
+
+Para cada rodada o resumo traz chamadas ao modelo e latência, e, por tarefa, se a resposta
+veio do cache. A tarefa que grava arquivo nunca é guardada, e a que lê o arquivo alterado
+volta a rodar o loop.
+
+Exemplos:
+    python -m benchmarks.answer_cache --latency-ms 300
+    python -m benchmarks.answer_cache --process-ttl 2 --latency-ms 800
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from warpclone import WarpClone, WarpCloneEngine  # noqa: E402
+
+_HARDWARE_CMD = "Get-CimInstance Win32_Processor" if os.name == "nt" else "lscpu"
+
+
+def _act(action: str, **params) -> dict:
+    return {"thought": f"Executando {action}.", "action": action, "parameters": params}
+
+
+def _done(answer: str) -> dict:
+    return _act("answer", answer=answer)
+
+
+_TASKS = {
+    "analise o sistema": [_act("analyze_system"), _done("Sistema analisado.")],
+    "quais as características da máquina": [
+        _act("execute_batch", commands=[{"command": _HARDWARE_CMD, "label": "cpu"}]),
+        _done("Inventário de hardware."),
+    ],
+    "resuma o relatório": [_act("read_file", path="relatorio.txt"), _done("Resumo do relatório.")],
+    "grave o resumo em saida.txt": [_act("write_file", path="saida.txt", content="resumo"), _done("Gravado.")],
+    # Por último: na rodada seguinte a lista ainda está dentro da validade
+    "liste os processos": [_act("list_processes", top_n=5), _done("Processos listados.")],
+}
+
+
+def _round(warp: WarpClone, server: MockOllamaServer, variant) -> dict:
+    server.reset_stats()
+    per_task = {}
+    total = 0.0
+    for n, task in enumerate(_TASKS):
+        before = server.stats["chat_requests"]
+        warp.start_new_session("bench-answers", session_id=f"bench-answers-{n}")
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            warp.execute_task(variant(task))
+        total += time.perf_counter() - t
+        per_task[task] = "cache" if server.stats["chat_requests"] == before else "loop"
+    return {"llm_calls": server.stats["chat_requests"], "total_ms": round(total * 1000, 1), "tasks": per_task}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do cache de respostas do By-CRR AI")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="latência simulada por chamada de chat")
+    parser.add_argument("--process-ttl", type=float, default=1.0, help="validade de list_processes (s)")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, MockOllamaServer(scripts=_TASKS, latency_ms=args.latency_ms) as server:
+        os.chdir(tmp)
+        try:
+            Path("relatorio.txt").write_text("Relatório mensal.\n", encoding="utf-8")
+            cfg = {"answer_cache": {"freshness_sec": {"list_processes": args.process_ttl}}}
+            engine = WarpCloneEngine(model="mock-bench", ollama_url=server.chat_url, cfg=cfg)
+            warp = WarpClone(engine=engine)
+            warp.set_confirmation_handler(lambda *_: True)
+
+            # Variante da tarefa com as chaves do roteiro: a resposta do modelo não muda
+            server.scripts.update({f"{t.upper()}!": s for t, s in _TASKS.items()})
+            cold = _round(warp, server, lambda t: t)
+            warm = _round(warp, server, lambda t: f"{t.upper()}!")
+            time.sleep(args.process_ttl + 0.1)
+            Path("relatorio.txt").write_text("Relatório mensal, revisado.\n", encoding="utf-8")
+            stale = _round(warp, server, lambda t: t)
+        finally:
+            os.chdir(cwd)
+
+        summary = {
+            "llm_latency_ms": args.latency_ms,
+            "cold": cold,
+            "warm": warm,
+            "stale": stale,
+            "cache_stats": engine.answer_cache.stats,
+        }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
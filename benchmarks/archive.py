@@ -0,0 +1,87 @@
+"""
+Tempo de criação de ZIP: ``zipfile`` serial (``zip_create`` original) versus
+``create_zip`` com pool de processos.
+
+Exemplos:
+    python -m benchmarks.archive --files 64 --size-kb 2048
+    python -m benchmarks.archive --path C:\\dados --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_archive import create_zip  # noqa: E402
+
+
+def _make_tree(root: Path, files: int, size_kb: int):
+    """Texto repetitivo (comprimível) com um pouco de ruído, mais alguns .jpg aleatórios."""
+    root.mkdir(parents=True, exist_ok=True)
+    line = b"2024-01-01 12:00:00 INFO requisicao atendida em 12ms rota=/api/v1/itens status=200\n"
+    for i in range(files):
+        if i % 8 == 7:
+            (root / f"foto{i}.jpg").write_bytes(os.urandom(size_kb * 1024))
+            continue
+        block = line * (size_kb * 1024 // len(line)) + os.urandom(size_kb * 16)
+        (root / f"log{i}.txt").write_bytes(block)
+
+
+def _serial(source: Path, zip_path: Path):
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for p in source.rglob("*"):
+            if p.is_file():
+                zf.write(p, p.relative_to(source))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do zip_create do By-CRR AI")
+    parser.add_argument("--path", default="", help="pasta existente (padrão: gera uma temporária)")
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = Path(args.path) if args.path else tmp / "src"
+        if not args.path:
+            _make_tree(source, args.files, args.size_kb)
+
+        t = time.perf_counter()
+        _serial(source, tmp / "serial.zip")
+        serial = time.perf_counter() - t
+        serial_size = (tmp / "serial.zip").stat().st_size
+
+        t = time.perf_counter()
+        stats = create_zip(source, tmp / "parallel.zip", workers=args.workers)
+        parallel = time.perf_counter() - t
+        with zipfile.ZipFile(tmp / "parallel.zip") as zf:
+            bad = zf.testzip()
+
+    summary = {
+        "members": stats["members"],
+        "bytes": stats["bytes"],
+        "workers": stats["workers"],
+        "serial": {"sec": round(serial, 3), "zip_bytes": serial_size},
+        "parallel": {"sec": round(parallel, 3), "compressed_bytes": stats["compressed_bytes"],
+                     "stored": stats["stored"], "integrity": "ok" if bad is None else f"falha em {bad}"},
+        "speedup": round(serial / parallel, 2) if parallel else None,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if bad is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
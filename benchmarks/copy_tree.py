@@ -0,0 +1,90 @@
+"""
+Vazão da cópia de árvores: ``shutil.copytree`` serial (o que uma sequência de ``copy_file``
+fazia) versus ``copy_tree`` em paralelo (frio) e repetido sobre o destino pronto (quente,
+todos os arquivos pulados por tamanho/data).
+
+Exemplos:
+    python -m benchmarks.copy_tree --small 2000 --large 4 --large-mb 64
+    python -m benchmarks.copy_tree --path C:\\projeto --dest D:\\bench_copia --workers 16
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_copy import copy_tree  # noqa: E402
+
+
+def _make_tree(root: Path, small: int, large: int, large_mb: int):
+    for i in range(small):
+        sub = root / f"d{i % 20}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"s{i}.txt").write_bytes(os.urandom(512 + (i * 37) % 8192))
+    block = os.urandom(1024 * 1024)
+    for i in range(large):
+        with open(root / f"large{i}.bin", "wb") as f:
+            for _ in range(large_mb):
+                f.write(block)
+
+
+def _rate(nbytes: int, elapsed: float) -> dict:
+    return {"sec": round(elapsed, 4), "mb_per_sec": round(nbytes / 1e6 / elapsed, 1) if elapsed > 0 else None}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do copy_tree do By-CRR AI")
+    parser.add_argument("--path", default="", help="árvore existente (padrão: gera uma temporária)")
+    parser.add_argument("--dest", default="", help="pasta de destino (ex.: outro disco); padrão: temporária")
+    parser.add_argument("--small", type=int, default=2000, help="arquivos pequenos (0,5-8 KiB)")
+    parser.add_argument("--large", type=int, default=4)
+    parser.add_argument("--large-mb", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.path) if args.path else Path(tmp) / "src"
+        if not args.path:
+            _make_tree(root, args.small, args.large, args.large_mb)
+        dest = Path(args.dest or tmp)
+        legacy_dst, fast_dst = dest / "copia_shutil", dest / "copia_copy_tree"
+        for d in (legacy_dst, fast_dst):
+            shutil.rmtree(d, ignore_errors=True)
+
+        t = time.perf_counter()
+        shutil.copytree(root, legacy_dst)
+        legacy = time.perf_counter() - t
+
+        cold = copy_tree(root, fast_dst, workers=args.workers)
+        warm = copy_tree(root, fast_dst, workers=args.workers)
+        nbytes = cold["bytes"]
+        summary = {
+            "files": cold["files"],
+            "bytes": nbytes,
+            "workers": args.workers,
+            "shutil_copytree": _rate(nbytes, legacy),
+            "copy_tree_cold": dict(_rate(nbytes, cold["elapsed_sec"]), methods=cold["methods"]),
+            "copy_tree_warm": dict(_rate(nbytes, warm["elapsed_sec"]), skipped=warm["skipped"]),
+            "speedup_cold": round(legacy / cold["elapsed_sec"], 2) if cold["elapsed_sec"] else None,
+            "speedup_warm": round(legacy / warm["elapsed_sec"], 2) if warm["elapsed_sec"] else None,
+        }
+        if args.dest:
+            for d in (legacy_dst, fast_dst):
+                shutil.rmtree(d, ignore_errors=True)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
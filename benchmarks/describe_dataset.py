@@ -0,0 +1,120 @@
+"""
+Custo do ``describe_dataset`` num CSV no formato dos dados públicos, comparado ao caminho
+antigo (o modelo grava um script e o executa num interpretador novo):
+- ``adhoc_script``: ``python -c`` que lê o CSV inteiro para listas e calcula as estatísticas;
+- ``stream``: motor sem NumPy (amostra reservatório);
+- ``columnar_cold``: conversão para colunas + estatísticas em blocos;
+- ``columnar_warm``: estatísticas sobre as colunas já convertidas;
+- ``cached``: resultado vindo do ``StatsCache``.
+
+Exemplos:
+    python -m benchmarks.describe_dataset --rows 500000
+    python -m benchmarks.describe_dataset --rows 100000 --trace-memory
+    python -m benchmarks.describe_dataset --path dados/snis_2022.csv --skip-adhoc
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_stats import StatsCache, describe, format_summary  # noqa: E402
+from warpclone_table import TableCache  # noqa: E402
+
+_UFS = ["SP", "RJ", "MG", "BA", "PR", "RS", "PE", "CE", "PA", "SC", "GO", "MA"]
+
+# O que o modelo costumava escrever: tudo em memória, estatísticas com a stdlib
+_ADHOC = r"""
+import csv, statistics, sys
+rows = list(csv.reader(open(sys.argv[1], encoding="cp1252"), delimiter=";"))
+header, body = rows[0], rows[1:]
+for i, name in enumerate(header):
+    values = []
+    for r in body:
+        try:
+            values.append(float(r[i].replace(",", ".")))
+        except ValueError:
+            pass
+    if values:
+        q = statistics.quantiles(values, n=20)
+        print(name, len(values), min(values), max(values), statistics.mean(values), statistics.stdev(values), q[0], q[9], q[18])
+    else:
+        print(name, len(set(r[i] for r in body)))
+"""
+
+
+def _make_csv(path: Path, rows: int):
+    rng = random.Random(5)
+    with open(path, "w", encoding="cp1252", newline="") as f:
+        f.write("ANO;UF;COD_IBGE;POP_ATENDIDA;INDICE_ESGOTO;INTERNACOES;OBS\n")
+        for i in range(rows):
+            esgoto = "" if i % 40 == 0 else f"{min(100.0, rng.betavariate(5, 2) * 100):.1f}".replace(".", ",")
+            f.write(f"{2015 + i % 8};{rng.choice(_UFS)};{rng.randint(1000000, 5300000):07d};"
+                    f"{int(rng.lognormvariate(9, 1.2))};{esgoto};{rng.randint(0, 300)};"
+                    f"{'revisado' if i % 7 == 0 else ''}\n")
+
+
+def _timed(fn, trace: bool) -> tuple:
+    # tracemalloc deixa o código Python bem mais lento: só liga com --trace-memory
+    if trace:
+        tracemalloc.start()
+    t = time.perf_counter()
+    result = fn()
+    stats = {"ms": round((time.perf_counter() - t) * 1000, 1)}
+    if trace:
+        stats["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result, stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do describe_dataset do By-CRR AI")
+    parser.add_argument("--path", default="", help="CSV existente (padrão: gera um sintético)")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--chunk-rows", type=int, default=1000000)
+    parser.add_argument("--skip-adhoc", action="store_true", help="não roda o script ad hoc")
+    parser.add_argument("--trace-memory", action="store_true", help="mede o pico de memória (mais lento)")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.path) if args.path else Path(tmp) / "saneamento.csv"
+        if not args.path:
+            _make_csv(path, args.rows)
+        tables = TableCache(Path(tmp) / "table_cache", min_bytes=0)
+        stats = StatsCache(Path(tmp) / "describe_cache.json")
+        summary = {"bytes": path.stat().st_size}
+
+        if not args.skip_adhoc:
+            # Tempo de parede inclui subir o interpretador, como no execute_command
+            t = time.perf_counter()
+            subprocess.run([sys.executable, "-c", _ADHOC, str(path)], capture_output=True, check=False)
+            summary["adhoc_script"] = {"ms": round((time.perf_counter() - t) * 1000, 1)}
+        trace = args.trace_memory
+        _, summary["stream"] = _timed(lambda: describe(path, use_cache=False), trace)
+        _, summary["columnar_cold"] = _timed(
+            lambda: describe(path, table_cache=tables, chunk_rows=args.chunk_rows), trace)
+        result, summary["columnar_warm"] = _timed(
+            lambda: describe(path, table_cache=tables, chunk_rows=args.chunk_rows, stats_cache=stats), trace)
+        _, summary["cached"] = _timed(
+            lambda: describe(path, table_cache=tables, chunk_rows=args.chunk_rows, stats_cache=stats), trace)
+        text = format_summary(result)
+        summary["rows"] = result["rows"]
+        summary["summary_chars"] = len(text)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Tempo de download: fluxo único com blocos de 8 KiB (``download_file`` original) versus
+``warpclone_download.download`` em segmentos, contra o servidor local com Range.
+
+O servidor limita a banda por conexão (como muitos espelhos públicos), então os segmentos
+paralelos somam banda. Também mede a retomada após uma queda no meio do arquivo.
+
+Exemplos:
+    python -m benchmarks.download --size-mb 32 --rate-mb 8 --segments 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+if __package__ in (None, ""):
+    from benchmarks.range_server import RangeServer
+else:
+    from .range_server import RangeServer
+
+from warpclone_download import DownloadError, download  # noqa: E402
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _legacy(url: str, dest: Path):
+    r = requests.get(url, stream=True, timeout=30)
+    r.raise_for_status()
+    with open(dest, "wb") as f:
+        for chunk in r.iter_content(chunk_size=8192):
+            if chunk:
+                f.write(chunk)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do download_file do By-CRR AI")
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--rate-mb", type=float, default=8.0, help="banda por conexão no servidor (MiB/s)")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "srv").mkdir()
+        src = tmp / "srv" / "dados.bin"
+        src.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+        expected = _sha256(src)
+        min_segment = max(1, src.stat().st_size // (args.segments * 2))
+
+        with RangeServer(tmp / "srv", rate_per_conn=args.rate_mb * 1024 * 1024) as srv:
+            url = srv.url("dados.bin")
+            t = time.perf_counter()
+            _legacy(url, tmp / "legacy.bin")
+            legacy = time.perf_counter() - t
+
+            t = time.perf_counter()
+            stats = download(url, tmp / "seg.bin", segments=args.segments, min_segment_bytes=min_segment)
+            segmented = time.perf_counter() - t
+            ok = _sha256(tmp / "seg.bin") == expected
+
+            # Queda no meio: a primeira tentativa falha (retries=0); a segunda retoma
+            srv.fail_after, srv.failures = src.stat().st_size // (args.segments * 2), args.segments
+            try:
+                download(url, tmp / "resume.bin", segments=args.segments, min_segment_bytes=min_segment, retries=0)
+            except (DownloadError, requests.RequestException):
+                pass
+            t = time.perf_counter()
+            resumed = download(url, tmp / "resume.bin", segments=args.segments, min_segment_bytes=min_segment)
+            resume_sec = time.perf_counter() - t
+            ok = ok and _sha256(tmp / "resume.bin") == expected
+
+            # ETag fraco não serve para If-Range: segmentos e retomada usam o Last-Modified
+            srv.weak_etag = True
+            srv.fail_after, srv.failures = src.stat().st_size // (args.segments * 2), args.segments
+            try:
+                download(url, tmp / "weak.bin", segments=args.segments, min_segment_bytes=min_segment, retries=0)
+            except (DownloadError, requests.RequestException):
+                pass
+            weak = download(url, tmp / "weak.bin", segments=args.segments, min_segment_bytes=min_segment)
+            ok = ok and weak["resumed_bytes"] > 0 and _sha256(tmp / "weak.bin") == expected
+
+    summary = {
+        "size_bytes": stats["size"],
+        "rate_per_conn_mb": args.rate_mb,
+        "legacy_8k": {"sec": round(legacy, 3)},
+        "segmented": {"sec": round(segmented, 3), "segments": stats["segments"]},
+        "speedup": round(legacy / segmented, 2) if segmented else None,
+        "resume": {"sec": round(resume_sec, 3), "resumed_bytes": resumed["resumed_bytes"]},
+        "weak_etag": {"segments": weak["segments"], "resumed_bytes": weak["resumed_bytes"]},
+        "integrity": "ok" if ok else "falha",
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+MB/s do hash de uma árvore: leitura serial com 8 KiB (``file_hash`` original) versus
+``hash_tree`` em paralelo (frio) e com cache persistente (quente).
+
+Exemplos:
+    python -m benchmarks.hash_tree --files 200 --size-kb 512
+    python -m benchmarks.hash_tree --path C:\\deploy --algorithms sha256,md5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_hashing import HashCache, hash_tree, iter_files, normalize_algorithms  # noqa: E402
+
+
+def _make_tree(root: Path, files: int, size_kb: int):
+    for i in range(files):
+        sub = root / f"d{i % 10}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"f{i}.bin").write_bytes(os.urandom(size_kb * 1024))
+
+
+def _serial_8k(root: Path, algorithms) -> int:
+    total = 0
+    for path, _ in iter_files(root):
+        # Uma passada por algoritmo, como chamadas repetidas de file_hash
+        for algo in algorithms:
+            h = hashlib.new(algo)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(8192), b""):
+                    h.update(chunk)
+                    total += len(chunk)
+    return total
+
+
+def _rate(nbytes: int, elapsed: float) -> dict:
+    return {"sec": round(elapsed, 4), "mb_per_sec": round(nbytes / 1e6 / elapsed, 1) if elapsed > 0 else None}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do hash_tree do By-CRR AI")
+    parser.add_argument("--path", default="", help="árvore existente (padrão: gera uma temporária)")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--algorithms", default="sha256")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+    algorithms = normalize_algorithms(args.algorithms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.path) if args.path else Path(tmp) / "tree"
+        if not args.path:
+            _make_tree(root, args.files, args.size_kb)
+        cache = HashCache(Path(tmp) / "hash_cache.json")
+
+        t = time.perf_counter()
+        _serial_8k(root, algorithms)
+        serial = time.perf_counter() - t
+
+        t = time.perf_counter()
+        cold = hash_tree(root, algorithms, workers=args.workers, cache=cache)
+        cold_sec = time.perf_counter() - t
+
+        # Cache relido do disco, como numa nova execução do processo
+        cache = HashCache(Path(tmp) / "hash_cache.json")
+        t = time.perf_counter()
+        warm = hash_tree(root, algorithms, workers=args.workers, cache=cache)
+        warm_sec = time.perf_counter() - t
+
+    nbytes = cold["stats"]["bytes"]
+    summary = {
+        "files": cold["stats"]["files"],
+        "bytes": nbytes,
+        "algorithms": algorithms,
+        "workers": args.workers,
+        "serial_8k": _rate(nbytes, serial),
+        "hash_tree_cold": _rate(nbytes, cold_sec),
+        "hash_tree_warm": dict(_rate(nbytes, warm_sec), cached=warm["stats"]["cached"]),
+        "speedup_cold": round(serial / cold_sec, 2) if cold_sec else None,
+        "speedup_warm": round(serial / warm_sec, 2) if warm_sec else None,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
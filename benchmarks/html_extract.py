@@ -0,0 +1,122 @@
+"""
+Vazão da extração de texto do ``fetch_url`` sobre páginas grandes salvas.
+
+Para cada página mede:
+- ``legacy``: decodificar a página inteira e cortar ``[:2000]`` de HTML cru, como antes;
+- ``full_parse``: MB/s do ``TextExtractor`` percorrendo a página inteira;
+- ``budgeted``: bytes que o ``fetch_url`` precisa ler até preencher o orçamento de tokens.
+
+Antes das medições confere os casos de extração (``CASES``: título e texto esperados,
+inclusive com ``</head>`` omitido) e retorna código 1 se algum divergir.
+
+Exemplos:
+    python -m benchmarks.html_extract                          # página sintética de ~8 MB
+    python -m benchmarks.html_extract --pages paginas_salvas/ --max-tokens 1000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_html import TextExtractor  # noqa: E402
+
+_CHUNK = 64 * 1024
+
+# (html, título esperado, texto esperado)
+CASES = [
+    ("<html><head><title>T</title></head><body><p>Hello world</p></body></html>", "T", "Hello world"),
+    # </head> é opcional: o corpo começa em <body>, na primeira tag de conteúdo ou em texto solto
+    ("<html><head><title>T</title><body><p>Hello world</p>", "T", "Hello world"),
+    ("<head><meta charset='utf-8'><title>T</title><p>Hello world", "T", "Hello world"),
+    ("<html><head><title>T</title><style>p{}</style><script>x()</script>Hello world", "T", "Hello world"),
+    ("<title>T</title><script>var a=1;</script><div>Hello</div><div>world</div>", "T", "Hello\nworld"),
+    ("<body><nav>Menu</nav><main><p>" + "Artigo " * 60 + "</p></main></body>", "", ("Artigo " * 60).strip()),
+]
+
+
+def synthetic_page(paragraphs: int = 100000) -> bytes:
+    """Página com head/script pesados, navegação longa e artigo em <main>."""
+    head = "<head><meta charset='utf-8'><title>Página sintética</title><script>" + "var a=1;" * 20000 + "</script></head>"
+    nav = "<nav>" + "".join(f"<a href='/x{i}'>Menu {i}</a>" for i in range(300)) + "</nav>"
+    body = "".join(f"<p>Parágrafo {i} com texto útil, acentuação e &amp; entidades.</p>\n" for i in range(paragraphs))
+    return f"<!doctype html><html>{head}<body>{nav}<main><h1>Artigo</h1>{body}</main></body></html>".encode("utf-8")
+
+
+def _extract(data: bytes, max_tokens: int, stop: bool):
+    extractor = TextExtractor("text/html", None, max_tokens)
+    consumed = 0
+    for i in range(0, len(data), _CHUNK):
+        chunk = data[i:i + _CHUNK]
+        consumed += len(chunk)
+        if extractor.feed(chunk) and stop:
+            break
+    extractor.close()
+    return extractor.text(), consumed
+
+
+def _check_cases() -> list:
+    failures = []
+    for html, title, text in CASES:
+        extractor = TextExtractor("text/html", "utf-8", 1000)
+        extractor.feed(html.encode("utf-8"))
+        extractor.close()
+        if (extractor.title, extractor.text()) != (title, text):
+            failures.append({"html": html[:120], "title": extractor.title, "text": extractor.text()[:120]})
+    return failures
+
+
+def _measure(name: str, data: bytes, max_tokens: int, repeat: int) -> dict:
+    t = time.perf_counter()
+    for _ in range(repeat):
+        data.decode("utf-8", errors="replace")[:2000]
+    legacy = (time.perf_counter() - t) / repeat
+
+    t = time.perf_counter()
+    _extract(data, 10 ** 9, stop=False)
+    full = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for _ in range(repeat):
+        text, consumed = _extract(data, max_tokens, stop=True)
+    budgeted = (time.perf_counter() - t) / repeat
+    mb = len(data) / 1e6
+    return {
+        "page": name,
+        "bytes": len(data),
+        "legacy_decode_ms": round(legacy * 1000, 2),
+        "full_parse": {"sec": round(full, 3), "mb_per_sec": round(mb / full, 1) if full else None},
+        "budgeted": {"ms": round(budgeted * 1000, 2), "bytes_read": consumed,
+                     "read_fraction": round(consumed / len(data), 4) if data else 0,
+                     "text_chars": len(text)},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark da extração HTML -> texto do By-CRR AI")
+    parser.add_argument("--pages", default="", help="pasta com páginas .html salvas")
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    if args.pages:
+        pages = [(p.name, p.read_bytes()) for p in sorted(Path(args.pages).glob("*.htm*"))]
+    else:
+        pages = [("sintetica.html", synthetic_page())]
+    failures = _check_cases()
+    summary = {"max_tokens": args.max_tokens, "cases": len(CASES), "case_failures": failures,
+               "pages": [_measure(name, data, args.max_tokens, args.repeat) for name, data in pages]}
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Qualidade e custo do ``knowledge_search``: busca por substring (versão original) versus
+BM25 e busca híbrida (BM25 + embeddings, RRF) de ``warpclone_knowledge``. Os embeddings
+vêm do Ollama simulado.
+
+A base tem documentos-alvo com uma resposta cada, misturados a documentos de enchimento.
+As consultas usam outras palavras, sem acento ou no plural. ``hit@k`` é a fração de
+consultas cujo documento-alvo aparece entre os `k` primeiros.
+
+Exemplos:
+    python -m benchmarks.knowledge_search --filler 2000
+    python -m benchmarks.knowledge_search --filler 20000 --embed-latency-ms 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+import requests  # noqa: E402
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from warpclone_knowledge import KnowledgeBase, OllamaEmbedder  # noqa: E402
+
+# (texto do documento-alvo, consulta com outras palavras)
+_TARGETS = [
+    ("Para descobrir o endereço IP da máquina, execute ipconfig /all no prompt.", "qual o endereco ip do computador"),
+    ("Configurações de proxy ficam em netsh winhttp show proxy.", "ver configuracao do proxy"),
+    ("Processos travados podem ser encerrados com taskkill /PID <pid> /F.", "como encerrar processo travado"),
+    ("O espaço livre em disco aparece em wmic logicaldisk get size,freespace.", "espaco livre nos discos"),
+    ("Serviços do Windows: sc query lista o estado de cada serviço.", "estado dos servicos windows"),
+    ("Índice de coleta de esgoto: razão entre população atendida e população total.", "indice coleta esgoto populacao"),
+    ("Internações por doenças de veiculação hídrica estão no SIH/SUS.", "internacao doenca hidrica sus"),
+    ("Tarefas agendadas podem ser listadas com schtasks /query /fo LIST.", "listar tarefa agendada"),
+    ("Portas em escuta aparecem em netstat -ano com o estado LISTENING.", "quais portas estao escutando"),
+    ("A política de execução do PowerShell é alterada com Set-ExecutionPolicy.", "mudar politica execucao powershell"),
+    ("Variáveis de ambiente permanentes são gravadas com setx NOME valor.", "gravar variavel ambiente permanente"),
+    ("Cobertura de abastecimento de água: domicílios ligados à rede geral.", "abastecimento agua domicilios rede"),
+]
+_FILLER_WORDS = ("relatório dados sistema arquivo usuário pasta rede indicador município ano valor tabela "
+                 "registro consulta servidor cliente módulo versão atualização log backup").split()
+
+
+def _make_corpus(kdir: Path, filler: int):
+    rng = random.Random(3)
+    for i, (text, _) in enumerate(_TARGETS):
+        (kdir / f"alvo_{i:02d}.md").write_text(f"# Nota {i}\n\n{text}\n", encoding="utf-8")
+    for i in range(filler):
+        sub = kdir / f"lote{i % 50:02d}"
+        sub.mkdir(exist_ok=True)
+        paragraphs = [" ".join(rng.choice(_FILLER_WORDS) for _ in range(40)) for _ in range(3)]
+        (sub / f"doc_{i:05d}.md").write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+def _legacy_search(kdir: Path, query: str, top_k: int) -> list:
+    """A busca original: contagem da consulta inteira como substring."""
+    results = []
+    for p in kdir.rglob("*.md"):
+        text = p.read_text(encoding="utf-8", errors="ignore")
+        score = text.lower().count(query.lower())
+        if score > 0:
+            results.append((score, str(p)))
+    results.sort(reverse=True)
+    return [p for _, p in results[:top_k]]
+
+
+def _evaluate(search, top_k: int) -> dict:
+    hits, elapsed = 0, 0.0
+    for i, (_, query) in enumerate(_TARGETS):
+        t = time.perf_counter()
+        files = search(query, top_k)
+        elapsed += time.perf_counter() - t
+        hits += any(Path(f).name == f"alvo_{i:02d}.md" for f in files)
+    return {f"hit@{top_k}": round(hits / len(_TARGETS), 3), "avg_ms": round(elapsed / len(_TARGETS) * 1000, 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do knowledge_search do By-CRR AI")
+    parser.add_argument("--filler", type=int, default=2000, help="documentos de enchimento")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="latência por lote de embeddings")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp, MockOllamaServer(embed_latency_ms=args.embed_latency_ms) as server:
+        kdir = Path(tmp) / "warpclone_knowledge"
+        kdir.mkdir()
+        _make_corpus(kdir, args.filler)
+        session = requests.Session()
+
+        def new_kb(index: str, semantic: bool = True) -> KnowledgeBase:
+            embedder = OllamaEmbedder(server.base_url, "mock-embed", lambda: session) if semantic else None
+            return KnowledgeBase(kdir, Path(tmp) / index, embedder, refresh_sec=3600,
+                                 max_embed_per_refresh=10 ** 9)
+
+        t = time.perf_counter()
+        hybrid = new_kb("idx")
+        build = hybrid.refresh(force=True)
+        build_sec = time.perf_counter() - t
+        lexical = new_kb("idx_lex", semantic=False)
+        lexical.refresh(force=True)
+
+        # Nova instância sobre o mesmo índice: só relê textos, nada vai ao modelo
+        requests_before = server.stats["embed_requests"]
+        t = time.perf_counter()
+        reopened = new_kb("idx")
+        reopened.refresh(force=True)
+        reopen_sec = time.perf_counter() - t
+        reopen_requests = server.stats["embed_requests"] - requests_before
+        (kdir / "alvo_00.md").write_text("# Nota 0\n\nTexto revisado: ipconfig /all mostra o IP.\n", encoding="utf-8")
+        t = time.perf_counter()
+        incremental = reopened.refresh(force=True)
+        incremental_sec = time.perf_counter() - t
+
+        summary = {
+            "docs": len(_TARGETS) + args.filler,
+            "chunks": build["chunks"],
+            "index_build_sec": round(build_sec, 2),
+            "embed_requests": requests_before,
+            "reopen_sec": round(reopen_sec, 2),
+            "reopen_embed_requests": reopen_requests,
+            "incremental_refresh": {"sec": round(incremental_sec, 3), "embedded": incremental["embedded"]},
+            "legacy_substring": _evaluate(lambda q, k: _legacy_search(kdir, q, k), args.top_k),
+            "bm25": _evaluate(lambda q, k: [r["file"] for r in lexical.search(q, k)], args.top_k),
+            "hybrid_rrf": _evaluate(lambda q, k: [r["file"] for r in hybrid.search(q, k)], args.top_k),
+        }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Custo do ``list_dir`` recursivo: ``rglob`` materializado (versão original) versus a
+primeira página e a listagem completa, página a página, com ``warpclone_listing``.
+
+Exemplos:
+    python -m benchmarks.list_dir --dirs 200 --files-per-dir 100
+    python -m benchmarks.list_dir --path \\\\servidor\\compartilhamento --page-size 200
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_listing import format_items, list_page  # noqa: E402
+
+
+def _make_tree(root: Path, dirs: int, files_per_dir: int):
+    for d in range(dirs):
+        sub = root / f"g{d % 10}" / f"d{d}"
+        sub.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            (sub / f"f{f}.txt").write_bytes(b"x" * (f % 64))
+
+
+def _timed(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    chars = fn()
+    elapsed = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 1), "peak_kb": round(peak / 1024, 1), "output_chars": chars}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do list_dir do By-CRR AI")
+    parser.add_argument("--path", default="", help="árvore existente (padrão: gera uma temporária)")
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files-per-dir", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.path) if args.path else Path(tmp) / "tree"
+        if not args.path:
+            _make_tree(root, args.dirs, args.files_per_dir)
+
+        def legacy():
+            return len("Itens do diretório:\n" + "\n".join(str(p) for p in root.rglob("*")))
+
+        def first_page():
+            return len(format_items(list_page(root, args.page_size, max_depth=None)["items"]))
+
+        pages = {"count": 0, "items": 0}
+
+        def all_pages():
+            cursor, chars = "", 0
+            while True:
+                page = list_page(root, args.page_size, cursor, max_depth=None)
+                pages["count"] += 1
+                pages["items"] += len(page["items"])
+                chars += len(format_items(page["items"]))
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return chars
+
+        summary = {
+            "page_size": args.page_size,
+            "legacy_rglob": _timed(legacy),
+            "first_page": _timed(first_page),
+            "all_pages": _timed(all_pages),
+        }
+        summary["all_pages"].update(pages=pages["count"], items=pages["items"])
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Teste de carga do modo servidor (warpclone_server).
+
+Sem ``--url``, sobe localmente o Ollama simulado e o servidor com N workers; com ``--url``,
+dispara contra um servidor já em execução. Cada cliente submete tarefas e acompanha o
+resultado por polling, registrando latência ponta a ponta e respostas 429 (backpressure).
+
+Exemplos:
+    python -m benchmarks.load_test --clients 16 --tasks-per-client 5 --workers 4 --latency-ms 200
+    python -m benchmarks.load_test --url http://127.0.0.1:8765 --clients 32
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from benchmarks.mock_ollama import MockOllamaServer
+    from benchmarks.run import percentile
+else:
+    from .mock_ollama import MockOllamaServer
+    from .run import percentile
+
+_TASK = "carga: listar diretório"
+_SCRIPT = [
+    {"thought": "Listando.", "action": "list_dir", "parameters": {"path": "."}},
+    {"thought": "Fim.", "action": "answer", "parameters": {"answer": "ok"}},
+]
+
+
+def _request(method: str, url: str, payload=None, timeout: float = 30.0):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read().decode("utf-8") or "{}")
+    except urllib.error.HTTPError as e:
+        return e.code, {}
+
+
+def _client(base: str, n_tasks: int, stats: dict, lock: threading.Lock, poll_interval: float):
+    session_id = None
+    for _ in range(n_tasks):
+        t0 = time.perf_counter()
+        while True:
+            payload = {"task": _TASK, "no_cache": True}
+            if session_id:
+                payload["session_id"] = session_id
+            status, body = _request("POST", f"{base}/tasks", payload)
+            if status == 429:
+                with lock:
+                    stats["rejected"] += 1
+                time.sleep(poll_interval * 4)
+                continue
+            break
+        if status != 202:
+            with lock:
+                stats["errors"] += 1
+            continue
+        session_id = body["session_id"]
+        task_id = body["task_id"]
+        while True:
+            status, job = _request("GET", f"{base}/tasks/{task_id}")
+            if status != 200 or job.get("status") in ("done", "error"):
+                break
+            time.sleep(poll_interval)
+        with lock:
+            if job.get("status") == "done":
+                stats["latencies"].append((time.perf_counter() - t0) * 1000.0)
+            else:
+                stats["errors"] += 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor By-CRR AI")
+    parser.add_argument("--url", default="", help="servidor existente (padrão: sobe um local)")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--tasks-per-client", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="workers do servidor local")
+    parser.add_argument("--max-queue", type=int, default=16, help="fila do servidor local")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="latência do Ollama simulado")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    tmp = mock = httpd = pool = None
+    base = args.url.rstrip("/")
+    if not base:
+        repo_root = str(Path(__file__).resolve().parent.parent)
+        if repo_root not in sys.path:
+            sys.path.insert(0, repo_root)
+        from warpclone import WarpClone
+        from warpclone_server import create_server
+
+        tmp = tempfile.TemporaryDirectory(prefix="bench_load_")
+        os.chdir(tmp.name)
+        mock = MockOllamaServer(scripts={_TASK: _SCRIPT}, latency_ms=args.latency_ms).start()
+        httpd, pool = create_server("127.0.0.1", 0, workers=args.workers, max_queue=args.max_queue,
+                                    warp_factory=lambda: WarpClone(model="mock-bench", ollama_url=mock.chat_url))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    stats = {"latencies": [], "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=_client, args=(base, args.tasks_per_client, stats, lock, args.poll_interval))
+                       for _ in range(args.clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+    finally:
+        elapsed = time.perf_counter() - t0
+        if httpd:
+            httpd.shutdown()
+            httpd.server_close()
+            pool.shutdown()
+        if mock:
+            mock.stop()
+        os.chdir(cwd)
+        if tmp:
+            tmp.cleanup()
+
+    lat = stats["latencies"]
+    summary = {
+        "clients": args.clients,
+        "tasks_completed": len(lat),
+        "errors": stats["errors"],
+        "rejected_429": stats["rejected"],
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_tasks_per_sec": round(len(lat) / elapsed, 3) if elapsed > 0 else 0,
+        "latency_ms": {
+            "p50": round(percentile(lat, 50), 3),
+            "p95": round(percentile(lat, 95), 3),
+            "p99": round(percentile(lat, 99), 3),
+        },
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if stats["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
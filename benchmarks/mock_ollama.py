@@ -0,0 +1,206 @@
+"""
+Servidor Ollama simulado para benchmarks.
+
+Implementa ``/api/chat`` e ``/api/tags`` com respostas roteirizadas por tarefa e
+latência configurável (latência fixa + taxa de tokens), sem dependências externas.
+``/api/embed`` (em lote) e ``/api/embeddings`` devolvem embeddings determinísticos: hashing
+de palavras sem acento e de trigramas de caracteres. Textos com vocabulário parecido ficam
+próximos, o que basta para exercitar a busca semântica.
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_FOLLOWUP_MARKER = "A ação anterior retornou o seguinte resultado:"
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimativa simples (~4 caracteres por token), suficiente para simular geração."""
+    return max(1, len(text or "") // 4)
+
+
+def mock_embedding(text: str, dim: int = 256) -> list:
+    """Vetor determinístico de `dim` posições (não normalizado, como alguns modelos reais)."""
+    folded = "".join(c for c in unicodedata.normalize("NFKD", (text or "").lower()) if not unicodedata.combining(c))
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", folded):
+        features = [word] + [word[i:i + 3] for i in range(max(1, len(word) - 2))]
+        for n, feature in enumerate(features):
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            sign = 1.0 if digest[1] & 1 else -1.0
+            vector[int.from_bytes(digest[2:6], "little") % dim] += sign * (2.0 if n == 0 else 1.0)
+    if not any(vector):
+        vector[0] = 1.0
+    scale = 3.0 / math.sqrt(sum(v * v for v in vector))
+    return [v * scale for v in vector]
+
+
+class MockOllamaServer:
+    """Servidor HTTP local que imita a API do Ollama.
+
+    - ``scripts``: dict {tarefa: [resposta, ...]}; cada resposta é um dict de ação
+      (thought/action/parameters) ou uma string já serializada.
+    - ``responder``: callable opcional ``(messages) -> dict|str|None`` consultado antes
+      do roteiro; permite respostas condicionais ao contexto.
+    - ``latency_ms``: latência fixa por requisição de chat.
+    - ``tokens_per_sec``: taxa de geração simulada (0 desativa).
+    - ``embed_dim``: dimensão dos embeddings; ``embed_latency_ms``: latência por requisição.
+    """
+
+    def __init__(self, scripts=None, responder=None, latency_ms: float = 0.0,
+                 tokens_per_sec: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 models=None, embed_dim: int = 256, embed_latency_ms: float = 0.0):
+        self.scripts = dict(scripts or {})
+        self.responder = responder
+        self.latency_ms = float(latency_ms)
+        self.tokens_per_sec = float(tokens_per_sec)
+        self.models = list(models or ["mock-bench:latest"])
+        self.embed_dim = int(embed_dim)
+        self.embed_latency_ms = float(embed_latency_ms)
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self.stats = {"chat_requests": 0, "tags_requests": 0, "embed_requests": 0, "embedded_texts": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    # --- ciclo de vida ---
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/api/chat"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"chat_requests": 0, "tags_requests": 0, "embed_requests": 0, "embedded_texts": 0}
+            self._cursors = {}
+
+    # --- roteiro ---
+    def _original_task(self, messages) -> str:
+        """Recupera a tarefa original a partir do contexto enviado pelo WarpClone."""
+        users = [m.get("content", "") for m in messages if m.get("role") == "user"]
+        if not users:
+            return ""
+        last = users[-1]
+        if last.startswith(_FOLLOWUP_MARKER):
+            marker = "completar a tarefa original: '"
+            idx = last.rfind(marker)
+            if idx != -1:
+                return last[idx + len(marker):].rstrip("?").rstrip("'")
+        return last
+
+    def _next_response(self, messages):
+        if self.responder:
+            resp = self.responder(messages)
+            if resp is not None:
+                return resp
+        task = self._original_task(messages)
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        with self._lock:
+            if not last_user.startswith(_FOLLOWUP_MARKER):
+                # Primeira iteração de uma tarefa: reinicia o cursor do roteiro
+                self._cursors[task] = 0
+            idx = self._cursors.get(task, 0)
+            self._cursors[task] = idx + 1
+        script = self.scripts.get(task) or []
+        if idx < len(script):
+            return script[idx]
+        return {"thought": "Roteiro encerrado.", "action": "answer", "parameters": {"answer": "ok"}}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sem Nagle: respostas pequenas em conexões keep-alive não esperam o ACK atrasado
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    with server._lock:
+                        server.stats["tags_requests"] += 1
+                    self._send_json({"models": [{"name": m} for m in server.models]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    data = json.loads(raw.decode("utf-8") or "{}")
+                except Exception:
+                    self._send_json({"error": "invalid json"}, status=400)
+                    return
+                if self.path.startswith("/api/chat"):
+                    with server._lock:
+                        server.stats["chat_requests"] += 1
+                    resp = server._next_response(data.get("messages") or [])
+                    content = resp if isinstance(resp, str) else json.dumps(resp, ensure_ascii=False)
+                    delay = server.latency_ms / 1000.0
+                    if server.tokens_per_sec > 0:
+                        delay += _estimate_tokens(content) / server.tokens_per_sec
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._send_json({
+                        "model": data.get("model"),
+                        "message": {"role": "assistant", "content": content},
+                        "done": True,
+                    })
+                elif self.path.startswith("/api/embed"):
+                    # /api/embed: "input" (texto ou lista); /api/embeddings (legado): "prompt"
+                    legacy = self.path.startswith("/api/embeddings")
+                    texts = [data.get("prompt", "")] if legacy else data.get("input", "")
+                    texts = [texts] if isinstance(texts, str) else list(texts)
+                    with server._lock:
+                        server.stats["embed_requests"] += 1
+                        server.stats["embedded_texts"] += len(texts)
+                    if server.embed_latency_ms > 0:
+                        time.sleep(server.embed_latency_ms / 1000.0)
+                    vectors = [mock_embedding(t, server.embed_dim) for t in texts]
+                    if legacy:
+                        self._send_json({"embedding": vectors[0]})
+                    else:
+                        self._send_json({"model": data.get("model"), "embeddings": vectors})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+        return Handler
@@ -0,0 +1,129 @@
+"""
+Latência do ``query_table`` num CSV no formato dos dados públicos (``;``, decimal com
+vírgula, cp1252). Compara três situações:
+- ``stream``: cada consulta relê o CSV;
+- ``build``: conversão única para o cache colunar;
+- ``columnar``: consultas repetidas sobre as colunas em memmap.
+
+Também confere se os dois motores devolvem o mesmo resultado (linhas, ``matched`` e
+``total``; somas com tolerância de arredondamento). O CSV sintético traz ``N/A`` em
+``VALOR`` depois da amostra usada para detectar os tipos. Retorna código 1 se algum
+resultado divergir.
+
+Exemplos:
+    python -m benchmarks.query_table --rows 500000
+    python -m benchmarks.query_table --path dados/sih_2023.csv --group-by UF --sum VALOR
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_table import TableCache, query_table, sniff_format  # noqa: E402
+
+_UFS = ["SP", "RJ", "MG", "BA", "PR", "RS", "PE", "CE", "PA", "SC", "GO", "MA"]
+_PROCS = ["Consulta", "Exame", "Cirurgia", "Internação", "Vacinação", "Ligação de água", "Ligação de esgoto"]
+
+
+def _make_csv(path: Path, rows: int):
+    rng = random.Random(11)
+    with open(path, "w", encoding="cp1252", newline="") as f:
+        f.write("ANO;UF;MUNICIPIO;COD_IBGE;PROCEDIMENTO;VALOR;QTD\n")
+        for i in range(rows):
+            value = f"{rng.random() * 5000:.2f}".replace(".", ",")
+            if i > 5000 and i % 641 == 0:
+                value = "N/A"  # lixo depois da amostra de tipos: vazio nos dois motores
+            f.write(f"{2019 + i % 5};{rng.choice(_UFS)};Município {i % 5570};{rng.randint(1000000, 5300000):07d};"
+                    f"{rng.choice(_PROCS)};{value};{rng.randint(1, 20)}\n")
+
+
+def _queries(args, fmt) -> dict:
+    if args.path:
+        group = args.group_by or fmt["columns"][0]
+        aggs = [f"sum({args.sum})"] if args.sum else ["count(*)"]
+        return {"group_by": {"group_by": [group], "aggregates": aggs},
+                "top_n": {"group_by": [group], "aggregates": aggs, "limit": 5}}
+    return {
+        "group_by": {"group_by": ["UF"], "aggregates": ["count(*)", "sum(VALOR)", "avg(VALOR)"]},
+        "filter_group": {"where": ["ANO == 2023", "PROCEDIMENTO in (Exame, Cirurgia)"],
+                         "group_by": ["UF", "PROCEDIMENTO"], "aggregates": ["sum(VALOR)"], "limit": 10},
+        "top_n_rows": {"where": ["UF == SP"], "columns": ["MUNICIPIO", "VALOR"], "order_by": "VALOR desc",
+                       "limit": 10},
+        "distinct": {"group_by": ["UF"], "aggregates": ["count_distinct(MUNICIPIO)"]},
+        "numeric_filter_top": {"where": ["VALOR > 100"], "columns": ["UF", "VALOR"], "order_by": "VALOR desc",
+                               "limit": 10},
+        "nulls": {"where": ["VALOR is_null"], "aggregates": ["count(*)", "count(VALOR)"]},
+        "counts": {"group_by": ["UF"], "aggregates": ["count(VALOR)", "count_distinct(VALOR)", "min(VALOR)"]},
+    }
+
+
+def _same(a: dict, b: dict) -> bool:
+    """Mesmo resultado nos dois motores (floats com tolerância de arredondamento)."""
+    if a["matched"] != b["matched"] or a["total"] != b["total"] or len(a["rows"]) != len(b["rows"]):
+        return False
+    for row_a, row_b in zip(a["rows"], b["rows"]):
+        for x, y in zip(row_a, row_b):
+            if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+                if not math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-6):
+                    return False
+            elif x != y:
+                return False
+    return True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do query_table do By-CRR AI")
+    parser.add_argument("--path", default="", help="CSV existente (padrão: gera um sintético)")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--group-by", default="")
+    parser.add_argument("--sum", default="")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.path) if args.path else Path(tmp) / "dados.csv"
+        if not args.path:
+            _make_csv(path, args.rows)
+        fmt = sniff_format(path)
+        cache = TableCache(Path(tmp) / "table_cache", min_bytes=0)
+
+        t = time.perf_counter()
+        cache.open(path, fmt)
+        build = time.perf_counter() - t
+
+        queries = {}
+        for name, spec in _queries(args, fmt).items():
+            t = time.perf_counter()
+            streamed = query_table(path, use_cache=False, **spec)
+            stream_sec = time.perf_counter() - t
+            t = time.perf_counter()
+            for _ in range(args.repeat):
+                columnar = query_table(path, cache=cache, **spec)
+            columnar_sec = (time.perf_counter() - t) / args.repeat
+            queries[name] = {
+                "stream_ms": round(stream_sec * 1000, 1),
+                "columnar_ms": round(columnar_sec * 1000, 2),
+                "speedup": round(stream_sec / columnar_sec, 1) if columnar_sec else None,
+                "same_result": _same(streamed, columnar) if streamed["total"] is not None
+                else streamed["rows"] == columnar["rows"],
+            }
+        summary = {"bytes": path.stat().st_size, "rows": cache.open(path, fmt).rows,
+                   "build_sec": round(build, 2), "queries": queries}
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if all(q["same_result"] for q in queries.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Iterações por tarefa com e sem a recuperação antecipada de trechos da base de conhecimento
+(``rag`` no ``warpclone_config.json``).
+
+O Ollama simulado age como um modelo que segue o prompt. Se a mensagem de sistema com
+trechos da base está no contexto, ele responde direto. Sem ela, emite ``knowledge_search``
+e responde na iteração seguinte, com o resultado da busca. Tarefas sem relação com a base
+servem para conferir que nenhum trecho é injetado nelas.
+
+O resumo traz, por modo, chamadas ao modelo por tarefa e latência. Também informa o tempo
+da recuperação (fria e com o cache por tarefa) e se o documento certo estava no contexto.
+
+Exemplos:
+    python -m benchmarks.rag_context --latency-ms 300
+    python -m benchmarks.rag_context --filler 5000 --latency-ms 800 --tokens-per-sec 30
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from benchmarks.knowledge_search import _TARGETS, _make_corpus  # noqa: E402
+from benchmarks.mock_ollama import _FOLLOWUP_MARKER, MockOllamaServer  # noqa: E402
+from warpclone import WarpClone  # noqa: E402
+
+_CONTEXT_MARKER = "Trechos da base de conhecimento local"
+_OFF_TOPIC = [
+    "quanto é 17 vezes 23",
+    "escreva um haicai sobre o outono",
+    "traduza bom dia para o inglês",
+    "qual a capital da Austrália",
+]
+
+
+def _responder(messages):
+    if any(m.get("role") == "system" and m.get("content", "").startswith(_CONTEXT_MARKER) for m in messages):
+        return {"thought": "Os trechos fornecidos respondem.", "action": "answer",
+                "parameters": {"answer": "Resposta a partir dos trechos da base."}}
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    if last.startswith(_FOLLOWUP_MARKER):
+        return {"thought": "A busca trouxe a resposta.", "action": "answer",
+                "parameters": {"answer": "Resposta a partir do resultado da busca."}}
+    return {"thought": "Preciso consultar a base.", "action": "knowledge_search",
+            "parameters": {"query": last, "top_k": 3}}
+
+
+def _run_tasks(warp: WarpClone, server: MockOllamaServer, tasks: list) -> dict:
+    server.reset_stats()
+    latencies = []
+    for task in tasks:
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            warp.execute_task(task, use_cache=False)
+        latencies.append((time.perf_counter() - t) * 1000)
+    return {
+        "iterations_per_task": round(server.stats["chat_requests"] / len(tasks), 3),
+        "latency_ms_mean": round(statistics.fmean(latencies), 1),
+        "latency_ms_total": round(sum(latencies), 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark da recuperação antecipada (RAG) do By-CRR AI")
+    parser.add_argument("--filler", type=int, default=1000, help="documentos de enchimento na base")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="latência simulada por chamada de chat")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    queries = [q for _, q in _TARGETS]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, MockOllamaServer(
+            responder=_responder, latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec) as server:
+        os.chdir(tmp)
+        try:
+            kdir = Path(tmp) / "warpclone_knowledge"
+            kdir.mkdir()
+            _make_corpus(kdir, args.filler)
+            warp = WarpClone(model="mock-bench", ollama_url=server.chat_url)
+            warp.start_new_session("bench-rag")
+            engine = warp.engine
+            engine.knowledge_base().refresh(force=True)
+
+            # Recuperação isolada: fria (busca + empacotamento) e servida do cache por tarefa
+            t = time.perf_counter()
+            contexts = [engine.knowledge_context(q) for q in queries]
+            cold_ms = (time.perf_counter() - t) / len(queries) * 1000
+            t = time.perf_counter()
+            for q in queries:
+                engine.knowledge_context(q)
+            warm_ms = (time.perf_counter() - t) / len(queries) * 1000
+            context_hit = sum(f"alvo_{i:02d}.md" in c for i, c in enumerate(contexts)) / len(queries)
+            off_topic_injected = sum(bool(engine.knowledge_context(q)) for q in _OFF_TOPIC)
+
+            engine.rag_enabled = False
+            without = _run_tasks(warp, server, queries)
+            engine.rag_enabled = True
+            with_rag = _run_tasks(warp, server, queries)
+            off_topic = _run_tasks(warp, server, _OFF_TOPIC)
+        finally:
+            os.chdir(cwd)
+
+        summary = {
+            "tasks": len(queries),
+            "llm_latency_ms": args.latency_ms,
+            "without_rag": without,
+            "with_rag": with_rag,
+            "off_topic_with_rag": off_topic,
+            "retrieval_ms": {"cold": round(cold_ms, 2), "cached": round(warm_ms, 3)},
+            "context_tokens_max": engine.rag_max_tokens,
+            "target_in_context": round(context_hit, 3),
+            "off_topic_tasks_with_context": off_topic_injected,
+        }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Servidor HTTP de arquivos com suporte a Range, para testar e medir ``download_file``.
+
+Serve os arquivos de um diretório com ``Accept-Ranges``, ``ETag``, ``Last-Modified`` e
+``If-Range`` (uma faixa por requisição). Simula links lentos e quedas:
+
+- ``rate_per_conn``: bytes/s por conexão (0 = sem limite); com limite por conexão, baixar
+  em segmentos paralelos é mais rápido, como em muitos espelhos públicos.
+- ``ranges``: False desliga o suporte a Range (responde sempre 200 com o arquivo inteiro).
+- ``fail_after``: encerra a conexão após N bytes nas próximas ``failures`` respostas.
+- ``weak_etag``: envia ETag fraco (``W/"..."``), que nunca confere em ``If-Range`` (RFC 9110).
+"""
+
+import email.utils
+import mimetypes
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CHUNK = 64 * 1024
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clientes que abandonam um segmento (download cancelado) não são erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class RangeServer:
+    def __init__(self, root, host: str = "127.0.0.1", port: int = 0, rate_per_conn: float = 0,
+                 ranges: bool = True, fail_after: int = 0, failures: int = 0, weak_etag: bool = False):
+        self.root = Path(root)
+        self.rate_per_conn = float(rate_per_conn)
+        self.ranges = ranges
+        self.fail_after = int(fail_after)
+        self.failures = int(failures)
+        self.weak_etag = weak_etag
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "range_requests": 0, "bytes_sent": 0, "dropped": 0}
+        self._httpd = _QuietHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _take_failure(self) -> bool:
+        with self._lock:
+            if self.failures > 0 and self.fail_after > 0:
+                self.failures -= 1
+                return True
+            return False
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _resolve(self):
+                rel = self.path.split("?", 1)[0].lstrip("/")
+                path = (server.root / rel).resolve()
+                if server.root.resolve() not in path.parents or not path.is_file():
+                    return None
+                return path
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head: bool):
+                path = self._resolve()
+                if path is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                st = path.stat()
+                size = st.st_size
+                etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+                if server.weak_etag:
+                    etag = "W/" + etag
+                last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+                start, end, status = 0, size - 1, 200
+                range_header = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if server.ranges and range_header and (not if_range or if_range == last_modified
+                                                        or (if_range == etag and not server.weak_etag)):
+                    m = _RANGE_RE.match(range_header.strip())
+                    if m and (m.group(1) or m.group(2)):
+                        if m.group(1):
+                            start = int(m.group(1))
+                            end = min(size - 1, int(m.group(2))) if m.group(2) else size - 1
+                        else:
+                            start = max(0, size - int(m.group(2)))
+                        if start >= size or start > end:
+                            self.send_response(416)
+                            self.send_header("Content-Range", f"bytes */{size}")
+                            self.send_header("Content-Length", "0")
+                            self.end_headers()
+                            return
+                        status = 206
+                with server._lock:
+                    server.stats["requests"] += 1
+                    server.stats["range_requests"] += status == 206
+                length = end - start + 1
+                self.send_response(status)
+                self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+                self.send_header("Content-Length", str(length))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if head:
+                    return
+                limit = server.fail_after if server._take_failure() else 0
+                sent = 0
+                t0 = time.monotonic()
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    while sent < length:
+                        data = f.read(min(_CHUNK, length - sent))
+                        if not data:
+                            break
+                        if limit and sent + len(data) > limit:
+                            self.wfile.write(data[: max(0, limit - sent)])
+                            with server._lock:
+                                server.stats["dropped"] += 1
+                            self.close_connection = True
+                            return
+                        self.wfile.write(data)
+                        sent += len(data)
+                        with server._lock:
+                            server.stats["bytes_sent"] += len(data)
+                        if server.rate_per_conn > 0:
+                            ahead = sent / server.rate_per_conn - (time.monotonic() - t0)
+                            if ahead > 0:
+                                time.sleep(ahead)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor de arquivos com Range para testes")
+    parser.add_argument("root", nargs="?", default=".")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--rate-kb", type=float, default=0, help="limite por conexão (KiB/s)")
+    args = parser.parse_args()
+    srv = RangeServer(args.root, port=args.port, rate_per_conn=args.rate_kb * 1024)
+    print(f"Servindo {os.path.abspath(args.root)} em {srv.base_url}")
+    srv.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,98 @@
+"""
+Custo do ``read_file`` em um log grande: ``read_text`` do arquivo inteiro (versão original)
+versus as leituras em trechos de ``warpclone_reader``:
+- primeira janela de linhas;
+- ``tail``;
+- linhas aleatórias com índice frio (construção do índice);
+- linhas aleatórias com índice quente (índice já gravado no disco).
+
+Exemplos:
+    python -m benchmarks.read_file --size-mb 128
+    python -m benchmarks.read_file --path C:\\logs\\app.log --lookups 50
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_reader import LineIndex, read_lines, read_tail  # noqa: E402
+
+
+def _make_log(path: Path, size_mb: int) -> int:
+    line = "2024-05-01 12:00:00 INFO worker-{:03d} requisição {} concluída em {} ms\n"
+    written, n = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size_mb * 1024 * 1024:
+            batch = "".join(line.format(i % 32, n + i, (n + i) % 997) for i in range(10000))
+            f.write(batch)
+            written += len(batch.encode("utf-8"))
+            n += 10000
+    return n
+
+
+def _timed(fn) -> dict:
+    tracemalloc.start()
+    t = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 2), "peak_kb": round(peak / 1024, 1)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do read_file do By-CRR AI")
+    parser.add_argument("--path", default="", help="arquivo existente (padrão: gera um log temporário)")
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--lookups", type=int, default=20, help="leituras em linhas aleatórias")
+    parser.add_argument("--step", type=int, default=1024, help="linhas por entrada do índice")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.path) if args.path else Path(tmp) / "app.log"
+        approx_lines = _make_log(path, args.size_mb) if not args.path else None
+        index_dir = Path(tmp) / "line_index"
+        rng = random.Random(7)
+
+        def legacy():
+            path.read_text(encoding="utf-8")
+
+        def head():
+            read_lines(path, 1, 2000, 64 * 1024)
+
+        def tail():
+            read_tail(path, 100)
+
+        def lookups(index):
+            total = approx_lines or read_lines(path, 1, 1, 1024, index=index)["total_lines"] or 1
+            for _ in range(args.lookups):
+                read_lines(path, rng.randint(1, total), 50, 64 * 1024, index=index)
+
+        summary = {
+            "bytes": path.stat().st_size,
+            "legacy_read_text": _timed(legacy),
+            "head_window": _timed(head),
+            "tail_100": _timed(tail),
+            "random_lines_cold_index": _timed(lambda: lookups(LineIndex(index_dir, args.step, min_bytes=0))),
+            # Instância nova: o índice vem do disco, como numa nova execução do agente
+            "random_lines_warm_index": _timed(lambda: lookups(LineIndex(index_dir, args.step, min_bytes=0))),
+            "lookups": args.lookups,
+        }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
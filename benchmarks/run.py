@@ -0,0 +1,222 @@
+"""
+Executa os cenários de benchmark contra o Ollama simulado e grava um JSON comparável.
+
+Exemplos:
+    python -m benchmarks.run --out bench_results.json
+    python -m benchmarks.run --scenarios file_ops,search --repeat 20 --latency-ms 50
+    python -m benchmarks.run --out novo.json --baseline antigo.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Permite rodar como script (python benchmarks/run.py) além de módulo
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from benchmarks.mock_ollama import MockOllamaServer
+    from benchmarks.scenarios import SCENARIOS
+else:
+    from .mock_ollama import MockOllamaServer
+    from .scenarios import SCENARIOS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def percentile(values, pct: float) -> float:
+    """Percentil com interpolação linear (mesma convenção do numpy 'linear')."""
+    if not values:
+        return 0.0
+    data = sorted(values)
+    if len(data) == 1:
+        return data[0]
+    k = (len(data) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def _io_written() -> int | None:
+    """Bytes escritos pelo processo (write_chars no Linux, write_bytes nos demais)."""
+    if not psutil:
+        return None
+    try:
+        io_c = psutil.Process().io_counters()
+        return int(getattr(io_c, "write_chars", None) or io_c.write_bytes)
+    except Exception:
+        return None
+
+
+def _tree_size(root: Path) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                continue
+    return total
+
+
+def run_scenario(name: str, spec: dict, server: MockOllamaServer, repeat: int, workdir: Path) -> dict:
+    from warpclone import WarpClone
+
+    spec["setup"](workdir)
+    server.scripts.update(spec["tasks"])
+    warp = WarpClone(model="mock-bench", ollama_url=server.chat_url)
+    warp.set_confirmation_handler(lambda *_: True)
+    warp.start_new_session(f"bench-{name}")
+
+    server.reset_stats()
+    latencies = []
+    failures = 0
+    size_before = _tree_size(workdir)
+    io_before = _io_written()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for task in spec["tasks"]:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                answer, _last = warp.execute_task(task, max_iterations=spec.get("max_iterations", 5),
+                                                  use_cache=False)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            if answer.startswith("Não foi possível") or answer.startswith("Tempo limite"):
+                failures += 1
+    elapsed = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    io_after = _io_written()
+
+    n_tasks = len(latencies)
+    return {
+        "description": spec.get("description", ""),
+        "tasks": n_tasks,
+        "failures": failures,
+        "llm_calls": server.stats["chat_requests"],
+        "iterations_per_task": round(server.stats["chat_requests"] / n_tasks, 3) if n_tasks else 0,
+        "throughput_tasks_per_sec": round(n_tasks / elapsed, 3) if elapsed > 0 else 0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0,
+        },
+        "memory_peak_bytes": int(peak),
+        "disk_bytes_written": (io_after - io_before) if (io_after is not None and io_before is not None) else None,
+        "workdir_bytes_delta": _tree_size(workdir) - size_before,
+    }
+
+
+# Métricas comparadas com o baseline: (caminho, maior_é_melhor)
+_COMPARED = [
+    (("throughput_tasks_per_sec",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("memory_peak_bytes",), False),
+    (("disk_bytes_written",), False),
+]
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Retorna a lista de regressões acima do limiar relativo."""
+    regressions = []
+    for name, cur in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for path, higher_is_better in _COMPARED:
+            c, b = cur, base
+            for key in path:
+                c = (c or {}).get(key)
+                b = (b or {}).get(key)
+            if not isinstance(c, (int, float)) or not isinstance(b, (int, float)) or b == 0:
+                continue
+            delta = (c - b) / abs(b)
+            if (higher_is_better and delta < -threshold) or (not higher_is_better and delta > threshold):
+                regressions.append(f"{name}.{'.'.join(path)}: {b} -> {c} ({delta:+.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do WarpClone com Ollama simulado")
+    parser.add_argument("--out", default="bench_results.json", help="arquivo JSON de saída")
+    parser.add_argument("--scenarios", default="", help="lista separada por vírgula (padrão: todos)")
+    parser.add_argument("--repeat", type=int, default=10, help="repetições por tarefa")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência fixa por chamada ao LLM")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="taxa de geração simulada")
+    parser.add_argument("--baseline", default="", help="JSON anterior para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=0.2, help="variação relativa tolerada")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()] or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(unknown)}")
+
+    out_path = Path(args.out).resolve()
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+    repo_root = str(Path(__file__).resolve().parent.parent)
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "tokens_per_sec": args.tokens_per_sec,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    cwd = os.getcwd()
+    server = MockOllamaServer(latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec).start()
+    try:
+        for name in names:
+            # Cada cenário roda em um diretório isolado (o WarpClone usa caminhos relativos)
+            with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+                os.chdir(tmp)
+                try:
+                    results["scenarios"][name] = run_scenario(name, SCENARIOS[name], server, args.repeat, Path(tmp))
+                finally:
+                    os.chdir(cwd)
+            r = results["scenarios"][name]
+            print(f"{name:<22} {r['throughput_tasks_per_sec']:>8} tarefas/s  "
+                  f"p50 {r['latency_ms']['p50']:>9} ms  p95 {r['latency_ms']['p95']:>9} ms  "
+                  f"pico {r['memory_peak_bytes'] // 1024} KiB")
+    finally:
+        server.stop()
+
+    out_path.write_text(json.dumps(results, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+    print(f"Resultados gravados em {out_path}")
+
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressões detectadas:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("Nenhuma regressão acima do limiar.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Cenários representativos para o benchmark do WarpClone.
+
+Cada cenário prepara fixtures no diretório de trabalho (``setup``) e define tarefas
+com o roteiro de ações que o servidor simulado devolverá, iteração a iteração.
+"""
+
+from pathlib import Path
+
+
+def _answer(text="Concluído."):
+    return {"thought": "Finalizando.", "action": "answer", "parameters": {"answer": text}}
+
+
+def _act(action, **parameters):
+    return {"thought": f"Executando {action}.", "action": action, "parameters": parameters}
+
+
+# --- fixtures ---
+def _setup_source_tree(workdir: Path, n_files: int = 200):
+    src = workdir / "bench_src"
+    for i in range(n_files):
+        sub = src / f"pkg{i % 10}"
+        sub.mkdir(parents=True, exist_ok=True)
+        body = "\n".join(f"# linha {j} do modulo {i}" for j in range(40))
+        marker = "def main():\n    return 0\n" if i % 7 == 0 else ""
+        (sub / f"mod{i}.py").write_text(f"{body}\n{marker}# TODO revisar {i}\n", encoding="utf-8")
+
+
+def _setup_knowledge(workdir: Path, n_docs: int = 100):
+    kdir = workdir / "warpclone_knowledge"
+    kdir.mkdir(parents=True, exist_ok=True)
+    topics = ["saneamento", "SUS", "Windows", "PowerShell", "rede"]
+    for i in range(n_docs):
+        topic = topics[i % len(topics)]
+        lines = [f"# Documento {i} sobre {topic}", ""]
+        lines += [f"Parágrafo {j}: informações sobre {topic} e indicadores de qualidade." for j in range(30)]
+        (kdir / f"doc_{i:04d}.md").write_text("\n".join(lines), encoding="utf-8")
+
+
+def _setup_data(workdir: Path):
+    data = workdir / "bench_data"
+    data.mkdir(parents=True, exist_ok=True)
+    payload = ("0123456789abcdef" * 4096).encode("ascii")  # 64 KiB
+    for i in range(20):
+        (data / f"blob_{i:02d}.bin").write_bytes(payload)
+
+
+# --- cenários ---
+SCENARIOS = {
+    "file_ops": {
+        "description": "Escrita, leitura, anexo e hash de arquivo.",
+        "setup": lambda wd: None,
+        "max_iterations": 6,
+        "tasks": {
+            "bench: operações de arquivo": [
+                _act("write_file", path="bench_out.txt", content="linha inicial\n" * 200),
+                _act("read_file", path="bench_out.txt"),
+                _act("append_file", path="bench_out.txt", content="linha extra\n"),
+                _act("file_hash", path="bench_out.txt", algorithm="sha256"),
+                _answer("Arquivo processado."),
+            ],
+        },
+    },
+    "search": {
+        "description": "Busca por padrão de nome, conteúdo e regex em uma árvore de código.",
+        "setup": _setup_source_tree,
+        "max_iterations": 5,
+        "tasks": {
+            "bench: pesquisa em arquivos": [
+                _act("search_files", pattern="*.py"),
+                _act("search_content", term="def main", extension=".py"),
+                _act("search_regex", pattern=r"TODO revisar \d+", extension=".py"),
+                _answer("Busca concluída."),
+            ],
+        },
+    },
+    "knowledge": {
+        "description": "Consulta à base de conhecimento local.",
+        "setup": _setup_knowledge,
+        "max_iterations": 3,
+        "tasks": {
+            "bench: consulta de conhecimento": [
+                _act("knowledge_search", query="saneamento", top_k=5),
+                _answer("Conhecimento consultado."),
+            ],
+        },
+    },
+    "multi_iteration_plan": {
+        "description": "Plano multi-etapas: listagem, ZIP, extração e hash.",
+        "setup": _setup_data,
+        "max_iterations": 8,
+        "tasks": {
+            "bench: plano multi-etapas": [
+                _act("list_dir", path="bench_data", recursive=True),
+                _act("zip_create", source="bench_data", zip_path="bench_tmp/backup.zip"),
+                _act("zip_extract", zip_path="bench_tmp/backup.zip", dest="bench_tmp/restore"),
+                _act("file_hash", path="bench_tmp/backup.zip", algorithm="sha256"),
+                _act("delete_dir", path="bench_tmp", recursive=True),
+                _answer("Plano concluído."),
+            ],
+        },
+    },
+}
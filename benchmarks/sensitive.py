@@ -0,0 +1,125 @@
+"""
+Casos de regressão e vazão do classificador de comandos sensíveis (``confirm_sensitive_commands``).
+
+Cada caso é classificado e comparado com o veredito esperado: comandos perigosos escondidos
+atrás de laços, blocos, script blocks, lançadores e wrappers precisam pedir confirmação, e
+comandos comuns não. O resumo traz os casos divergentes e a vazão (comandos por segundo).
+
+Funciona como teste: retorna código 1 se algum caso divergir.
+
+Exemplos:
+    python -m benchmarks.sensitive
+    python -m benchmarks.sensitive --repeat 2000 --out sensitive.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from warpclone_sensitive import SensitiveClassifier  # noqa: E402
+
+# Devem pedir confirmação
+SENSITIVE = [
+    "rm -fr /tmp/x",
+    "format C:",
+    'cmd /c "del x"',
+    "cp a /etc/hosts",
+    "sudo -u root rm -rf /var/x",
+    "timeout 5 shutdown now",
+    "bash -lc 'rm -rf x'",
+    "powershell Remove-Item x",
+    "iex 'Remove-Item x'",
+    # laços, condicionais e blocos
+    "for f in *; do rm -rf $f; done",
+    "if true; then rm -rf x; fi",
+    "if rm -rf x; then :; fi",
+    "while true; do shutdown now; done",
+    "until false; do reboot; done",
+    "{ rm -rf x; }",
+    "f() { rm -rf x; }",
+    "! rm -rf x",
+    "(rm -rf x)",
+    # find e lançadores
+    "find . -exec rm -rf {} +",
+    "find . -name '*.tmp' -execdir rm -rf {} \\;",
+    "find . -ok rm -rf {} \\;",
+    "busybox rm -rf /tmp/x",
+    "watch -n 1 shutdown now",
+    "parallel rm -rf ::: a b",
+    # script blocks do PowerShell
+    "gci | % { ri $_ }",
+    "gci | %{ri $_}",
+    "gci | ForEach-Object { Remove-Item $_ }",
+    "gci | Where-Object { ri $_ }",
+    "Invoke-Command -ScriptBlock { Remove-Item x }",
+    "if (1) { Remove-Item x } else { dir }",
+    # Start-Process
+    'Start-Process cmd -ArgumentList "/c del x"',
+    "Start-Process -FilePath cmd.exe -ArgumentList '/c','del x'",
+    "saps powershell -ArgumentList '-Command Remove-Item x'",
+    # sem leitura única
+    "echo 'sem fechamento",
+    "echo (aberto",
+    "rm -rf x; }",
+]
+
+# Não devem pedir confirmação
+SAFE = [
+    "ls -la",
+    "Format-Table",
+    "model list",
+    "echo ${HOME}/x",
+    'echo "${HOME}"',
+    "cp file{,.bak}",
+    "git log --format='%h {x}'",
+    "awk '{print $1}' f",
+    'echo "it\'s ok"',
+    "for f in *.txt; do echo $f; done",
+    "if [ -f x ]; then cat x; fi",
+    "find . -name '*.py' -exec grep -n TODO {} +",
+    "gci | % { $_.Name }",
+    "Get-ChildItem | Where-Object { $_.Length -gt 1MB }",
+    "Start-Process notepad -ArgumentList 'a.txt'",
+    "watch -n 1 df -h",
+    "xargs echo",
+]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Casos e vazão do classificador de comandos sensíveis")
+    parser.add_argument("--repeat", type=int, default=200, help="passadas sobre os casos para medir vazão")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    classifier = SensitiveClassifier()
+    cases = [(cmd, True) for cmd in SENSITIVE] + [(cmd, False) for cmd in SAFE]
+    failures = []
+    for cmd, expected in cases:
+        verdict = classifier.classify(cmd)
+        if bool(verdict) != expected:
+            failures.append({"command": cmd, "expected": expected, "matches": verdict.matches})
+
+    t = time.perf_counter()
+    for _ in range(max(1, args.repeat)):
+        for cmd, _ in cases:
+            classifier.classify(cmd)
+    elapsed = time.perf_counter() - t
+    summary = {
+        "cases": len(cases),
+        "failures": failures,
+        "commands_per_sec": round(len(cases) * max(1, args.repeat) / elapsed) if elapsed else None,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
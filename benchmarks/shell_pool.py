@@ -0,0 +1,86 @@
+"""
+Comandos/s: spawn por comando (``run_streaming``) versus pool de shells persistentes.
+
+Exemplos:
+    python -m benchmarks.shell_pool --commands 200
+    python -m benchmarks.shell_pool --powershell --command "Get-Date" --commands 50   # Windows
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+if __package__ in (None, ""):
+    from benchmarks.run import percentile
+else:
+    from .run import percentile
+
+from warpclone_exec import run_streaming  # noqa: E402
+from warpclone_shell import ShellPool  # noqa: E402
+
+
+def _measure(run_one, n: int) -> dict:
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        result = run_one()
+        lat.append((time.perf_counter() - t) * 1000.0)
+        if result.timed_out or result.returncode not in (0, None):
+            raise RuntimeError(f"comando falhou (código {result.returncode}): {result.stderr.strip()}")
+    elapsed = time.perf_counter() - t0
+    return {
+        "commands_per_sec": round(n / elapsed, 3) if elapsed > 0 else 0,
+        "latency_ms": {
+            "p50": round(percentile(lat, 50), 3),
+            "p95": round(percentile(lat, 95), 3),
+            "p99": round(percentile(lat, 99), 3),
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do pool de shells do By-CRR AI")
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--command", default="echo ok")
+    parser.add_argument("--powershell", action="store_true", help="usa PowerShell (Windows)")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    if args.powershell and os.name == "nt":
+        spawn_args, shell = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", args.command], False
+    else:
+        spawn_args, shell = args.command, True
+
+    pool = ShellPool(size=1)
+    try:
+        # Aquece o shell do pool fora da medição (o custo de partida é pago uma vez)
+        pool.run(args.command, timeout=60, powershell=args.powershell)
+        pooled = _measure(lambda: pool.run(args.command, timeout=60, powershell=args.powershell), args.commands)
+    finally:
+        pool.close()
+    spawned = _measure(lambda: run_streaming(spawn_args, shell=shell, timeout=60), args.commands)
+
+    summary = {
+        "command": args.command,
+        "commands": args.commands,
+        "shell": "powershell" if args.powershell else ("cmd" if os.name == "nt" else "/bin/sh"),
+        "spawn": spawned,
+        "pool": pooled,
+        "speedup": round(pooled["commands_per_sec"] / spawned["commands_per_sec"], 2) if spawned["commands_per_sec"] else None,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Tempo de importação a frio do núcleo (``import warpclone``), medido com ``-X importtime``.
+
+Cada rodada é um processo novo do Python, fora da pasta do projeto e com o repositório no
+``PYTHONPATH``. O bytecode vai para uma pasta temporária (``PYTHONPYCACHEPREFIX``): a
+primeira rodada compila (``first_run_ms``) e as seguintes medem a abertura com o bytecode
+pronto, como no executável. O resumo traz a mediana, os módulos que mais pesam e os
+módulos carregados que deveriam esperar a ação que os usa (requests, numpy, psutil...).
+
+Funciona como teste de orçamento: retorna código 1 se a mediana passar de `--budget-ms`
+ou se a importação carregar algum módulo adiado (descontados os que o próprio interpretador
+já carrega, via ``site``).
+
+Exemplos:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 15 --budget-ms 100 --out startup.json
+    python -m benchmarks.startup --module warpclone_gui --budget-ms 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+
+# Só devem ser importados pela ação que os usa
+_DEFERRED = ("requests", "urllib3", "numpy", "psutil", "zipfile", "cProfile", "pstats", "PIL")
+_PROBE = "import sys{imports}; sys.stdout.write(' '.join(sys.modules))"
+
+
+def _parse_importtime(stderr: str, module: str):
+    """(ms cumulativo de `module`, [(ms, nome)] dos imports diretos dele)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _self_us, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:] if name.startswith(" ") else name
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((depth, name.strip(), int(cumulative) / 1000))
+    # -X importtime registra os filhos antes do pai: os imports diretos são os de
+    # profundidade 1 logo acima da linha do módulo
+    for i, (depth, name, ms) in enumerate(rows):
+        if depth == 0 and name == module:
+            children = []
+            for child_depth, child, child_ms in reversed(rows[:i]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children.append((child_ms, child))
+            return ms, sorted(children, reverse=True)
+    return None, []
+
+
+def _run(module: str, env: dict, cwd: str):
+    probe = _PROBE.format(imports=f", {module}" if module else "")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          env=env, cwd=cwd, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "falhou")
+    ms, children = _parse_importtime(proc.stderr, module)
+    return ms, children, set(proc.stdout.split())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de importação a frio do By-CRR AI")
+    parser.add_argument("--module", default="warpclone", help="módulo a importar")
+    parser.add_argument("--runs", type=int, default=9, help="rodadas com o bytecode já compilado")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="mediana máxima aceita (0 = sem limite)")
+    parser.add_argument("--top", type=int, default=8, help="imports diretos mais pesados no resumo")
+    parser.add_argument("--out", default="", help="grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (_REPO_ROOT, env.get("PYTHONPATH")) if p)
+        env["PYTHONPYCACHEPREFIX"] = os.path.join(tmp, "pycache")
+        try:
+            first_ms, _, _ = _run(args.module, env, tmp)
+        except RuntimeError as e:
+            parser.exit(2, f"não foi possível importar {args.module}: {e}\n")
+        # O que o interpretador já carrega sozinho (site, .pth) não conta contra o módulo
+        _, _, interpreter = _run("", env, tmp)
+        times, heaviest, loaded = [], [], set()
+        for _ in range(max(1, args.runs)):
+            ms, children, modules = _run(args.module, env, tmp)
+            times.append(ms)
+            loaded |= modules
+            if not heaviest or ms == min(times):
+                heaviest = children
+
+    median = statistics.median(times)
+    loaded -= interpreter
+    deferred_loaded = sorted(m for m in _DEFERRED if m in loaded)
+    over_budget = args.budget_ms > 0 and median > args.budget_ms
+    summary = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "runs": len(times),
+        "first_run_ms": round(first_ms, 1),
+        "median_ms": round(median, 1),
+        "min_ms": round(min(times), 1),
+        "max_ms": round(max(times), 1),
+        "heaviest_imports_ms": {name: round(ms, 1) for ms, name in heaviest[: args.top]},
+        "modules_loaded": len(loaded),
+        "deferred_modules_loaded": deferred_loaded,
+        "budget_ms": args.budget_ms,
+        "within_budget": not over_budget and not deferred_loaded,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if summary["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
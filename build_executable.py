@@ -60,6 +60,13 @@ def build_main_app():
         "--add-data=warpclone_config;warpclone_config",
         "--add-data=warpclone_knowledge;warpclone_knowledge",
         "--hidden-import=PIL._tkinter_finder",
+        # Importados sob demanda via lazy_import (por nome): o PyInstaller não os encontra sozinho
+        "--hidden-import=requests",
+        "--hidden-import=psutil",
+        "--hidden-import=numpy",
+        "--hidden-import=cProfile",
+        "--hidden-import=pstats",
+        "--hidden-import=tracemalloc",
         "--collect-all=customtkinter",
     ]
     
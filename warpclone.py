@@ -1,45 +1,252 @@
-import requests
 import json
 import os
 import subprocess
 from pathlib import Path
 import shutil
 import re
-import hashlib
-import zipfile
-import base64
-try:
-    import psutil
-except ImportError:
-    psutil = None
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import quote_plus, urlparse
 import time
+from warpclone_copy import copy_tree, move_path
+from warpclone_download import download
+from warpclone_exec import run_streaming
+from warpclone_html import TextExtractor
+from warpclone_httpcache import HttpCache, fetch_limited
+from warpclone_hashing import HashCache, compare_manifest, hash_file, hash_tree, read_manifest, write_manifest
+from warpclone_answers import AnswerCache, normalize_task
+from warpclone_ann import IvfIndex
+from warpclone_intents import IntentMatcher
+from warpclone_knowledge import KnowledgeBase, OllamaEmbedder, fold, pack_passages
+from warpclone_lazy import lazy_import
+from warpclone_listing import CursorError, format_items, list_page
+from warpclone_profiling import TaskProfiler
+from warpclone_reader import LineIndex, line_oriented, read_head, read_lines, read_range, read_tail, sniff_encoding
+from warpclone_sensitive import SensitiveClassifier
+from warpclone_shell import ShellPool
+from warpclone_stats import StatsCache, describe, format_summary
+from warpclone_table import QueryError, TableCache, format_result, query_table
+
+# Carregados só quando uma ação precisa deles (abertura mais rápida do executável)
+requests = lazy_import("requests")
+psutil = lazy_import("psutil", optional=True)
+
+# Início do prompt de acompanhamento entre iterações (distingue passo seguinte de tarefa nova)
+_NEXT_STEP_PREFIX = "A ação anterior retornou o seguinte resultado:"
+
+# Intenções da heurística offline, na ordem de avaliação (= prioridade)
+_OFFLINE_INTENTS = [
+    ("hardware_audit", 0, ["caracteristicas da maquina", "características da máquina", "detalhes da maquina", "ano de fabricação", "ano de fabricacao", "especificações", "hardware"]),
+    ("create_file", 1, ["criar arquivo", "create file", "novo arquivo"]),
+    ("delete_file", 2, ["deletar arquivo", "apagar arquivo", "remover arquivo", "delete file", "remove file"]),
+    ("list_dir_path", 3, ["listar diretório", "listar diretorio", "listar pasta", "list directory"]),
+    ("create_dir", 4, ["criar diretório", "criar diretorio", "create directory", "make dir", "mkdir"]),
+    ("delete_dir", 5, ["deletar diretório", "apagar diretório", "remover diretório", "delete directory", "remove directory"]),
+    ("copy_file", 6, ["copiar arquivo", "copy file"]),
+    ("move_file", 7, ["mover arquivo", "move file"]),
+    ("rename_file", 8, ["renomear arquivo", "rename file"]),
+    ("append_file", 9, ["anexar", "append", "adicionar ao arquivo"]),
+    ("file_hash", 10, ["hash", "checksum", "sha256"]),
+    ("zip_create", 11, ["zip", "zipar", "criar zip"]),
+    ("zip_extract", 12, ["extrair zip", "unzip", "descompactar"]),
+    ("download_file", 13, ["baixar", "download"]),
+    ("list_processes", 14, ["listar processos", "processos", "process list"]),
+    ("kill_process", 15, ["encerrar processo", "matar processo", "kill process", "terminar processo"]),
+    ("list_services", 16, ["listar serviços", "servicos", "list services"]),
+    ("start_service", 17, ["iniciar serviço", "start service"]),
+    ("stop_service", 18, ["parar serviço", "stop service"]),
+    ("list_scheduled_tasks", 19, ["tarefas agendadas", "scheduled tasks", "listar tarefas"]),
+    ("list_network_connections", 20, ["conexões de rede", "network connections", "listar conexões"]),
+    ("open_ports", 21, ["portas abertas", "open ports", "escuta"]),
+    ("firewall_state", 22, ["firewall", "estado do firewall"]),
+    ("ping_host", 23, ["ping", "teste de latência"]),
+    ("traceroute_host", 24, ["traceroute", "tracert", "rota"]),
+    ("get_env", 25, ["obter variável", "get env", "ler variável de ambiente"]),
+    ("set_env", 26, ["definir variável", "set env", "exportar variável"]),
+    ("read_registry", 27, ["ler registro", "read registry", "consultar registro"]),
+    ("write_registry", 28, ["escrever registro", "write registry", "definir chave"]),
+    ("search_regex", 29, ["regex", "expressão regular", "expressao regular"]),
+    ("analyze_system", 30, ["analisar sistema", "auditoria", "telemetria", "analyze system", "system audit"]),
+    ("list_files", 31, ["listar", "arquivos", "dir", "ls", "listar arquivos"]),
+    ("knowledge_search", 32, ["comando", "windows", "conhecimento", "ajuda", "manual"]),
+    ("fetch_url", 33, ["web", "url", "http", "https"]),
+    ("describe_dataset", 34, ["estatísticas", "estatisticas", "resumo estatístico", "descrever dataset", "describe dataset"]),
+]
+
+
+def _load_config():
+    cfg_path = Path("warpclone_config.json")
+    if cfg_path.exists():
+        try:
+            with open(cfg_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
 
-class WarpClone:
-    def __init__(self, model=None, ollama_url=None, confirmation_handler=None):
-        cfg = self._load_config()
-        self.model = self._canonical_model_name(model or cfg.get("llm_model", "phi4"))
+
+def _canonical_model_name(name: str) -> str:
+    try:
+        if not name:
+            return "phi4:latest"
+        return name if ":" in name else f"{name}:latest"
+    except Exception:
+        return "phi4:latest"
+
+
+def _atomic_write_text(path: Path, text: str):
+    """Grava via arquivo temporário + replace, evitando JSON truncado se o processo cair no meio."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class WarpCloneEngine:
+    """Estado compartilhado entre sessões: configuração, transporte HTTP, índices e estatísticas.
+
+    Uma única instância pode servir vários WarpClone/SessionContext no mesmo processo.
+    `lock` protege `memory` e `learning_patterns`; `io_lock` serializa a escrita dos
+    arquivos compartilhados (memória, padrões e histórico de comandos).
+    """
+
+    def __init__(self, model=None, ollama_url=None, cfg=None):
+        cfg = _load_config() if cfg is None else cfg
+        self.config = cfg
+        self.lock = threading.RLock()
+        self.io_lock = threading.Lock()
+        self._http_local = threading.local()
+
+        self.model = _canonical_model_name(model or cfg.get("llm_model", "phi4"))
         self.ollama_url = ollama_url or cfg.get("ollama_url", "http://localhost:11434/api/chat")
-        self.conversation_history = []
+        self.memory_file = Path("warpclone_memory") / "memory.json"
         self.memory = self.load_memory()
         self.log_dir = Path("warpclone_logs")
         self.log_dir.mkdir(exist_ok=True)
         self.command_history_file = self.log_dir / "command_history.json"
+        # Profiling opcional de tarefas (seção "profiling" do config)
+        self.profiler = TaskProfiler(cfg.get("profiling") or {}, self.log_dir / "profiles")
         # Diretório de sessões de chat persistentes
         self.chat_sessions_dir = self.log_dir / "chat_sessions"
         self.chat_sessions_dir.mkdir(parents=True, exist_ok=True)
-        self.session_id = None
-        self.session_name = None
         self.learning_patterns_file = Path("warpclone_memory") / "learning_patterns.json"
         self.learning_patterns = self.load_learning_patterns()
-        self.confirmation_handler = confirmation_handler
         self.confirm_sensitive_commands = bool(cfg.get("confirm_sensitive_commands", True))
+        # Classificador de comandos sensíveis (regras extras em JSON, recarregadas ao mudar)
+        self.sensitive_rules_file = Path("warpclone_config") / "sensitive_rules.json"
+        self._sensitive_rules_stamp = None
+        self._sensitive_classifier = None
         self.command_timeout = int(cfg.get("command_timeout", 30))
-        self.use_powershell = bool(cfg.get("use_powershell", False))
+        # Captura limitada da saída de comandos (início + fim de cada fluxo)
+        output_cfg = cfg.get("command_output") or {}
+        self.output_head_bytes = int(output_cfg.get("head_bytes", 16384))
+        self.output_tail_bytes = int(output_cfg.get("tail_bytes", 16384))
+        # Shells persistentes para execute_command (evita o custo de iniciar um shell por comando)
+        shell_cfg = cfg.get("shell_pool") or {}
+        self.shell_pool = ShellPool.from_config(shell_cfg) if shell_cfg.get("enabled", False) else None
+        self.default_use_powershell = bool(cfg.get("use_powershell", False))
         self.knowledge_dir = Path("warpclone_knowledge")
-
-        # Biblioteca de comandos (carregada de JSON)
+        # Busca na base de conhecimento: BM25 + embeddings do Ollama (índice criado sob demanda)
+        self.knowledge_cfg = cfg.get("knowledge") or {}
+        self._knowledge_base = None
+        # Trechos da base recuperados antes da 1ª chamada ao modelo, guardados por tarefa
+        rag_cfg = cfg.get("rag") or {}
+        self.rag_enabled = bool(rag_cfg.get("enabled", True))
+        self.rag_top_k = int(rag_cfg.get("top_k", 4))
+        self.rag_max_tokens = int(rag_cfg.get("max_tokens", 600))
+        self.rag_min_lexical_score = float(rag_cfg.get("min_lexical_score", 3.0))
+        self.rag_min_similarity = float(rag_cfg.get("min_similarity", 0.6))
+        self.rag_cache_ttl = float(rag_cfg.get("cache_ttl_sec", 600))
+        self.rag_cache_entries = int(rag_cfg.get("cache_entries", 128))
+        self._rag_cache = OrderedDict()  # tarefa normalizada -> (geração da base, expira em, texto)
+        # Respostas finais reaproveitadas por tarefa, com validade por ação usada
+        answer_cfg = cfg.get("answer_cache") or {}
+        self.answer_cache = None
+        if answer_cfg.get("enabled", True):
+            similarity = float(answer_cfg.get("similarity", 0.0))
+            embedder = None
+            if similarity > 0 and not cfg.get("offline_mode", False):
+                u = urlparse(self.ollama_url)
+                base = f"{u.scheme}://{u.netloc}" if u.scheme and u.netloc else "http://localhost:11434"
+                embedder = OllamaEmbedder(base, answer_cfg.get("embed_model")
+                                          or self.knowledge_cfg.get("embed_model", "nomic-embed-text"), self.http)
+            self.answer_cache = AnswerCache(
+                Path("warpclone_memory") / "answer_cache.json",
+                max_entries=int(answer_cfg.get("max_entries", 200)),
+                freshness=answer_cfg.get("freshness_sec") or None,
+                command_rules=answer_cfg.get("command_rules"),
+                embedder=embedder, similarity=similarity,
+            )
+        # Hash em lote (file_hash / hash_tree) com cache persistente por (caminho, tamanho, mtime, inode)
+        hash_cfg = cfg.get("hashing") or {}
+        self.hash_workers = int(hash_cfg.get("workers", 4))
+        self.hash_buffer_bytes = int(hash_cfg.get("buffer_bytes", 1024 * 1024))
+        self.hash_cache = HashCache(Path("warpclone_memory") / "hash_cache.json",
+                                    int(hash_cfg.get("cache_max_entries", 200000)))
+        # read_file: orçamento padrão por leitura e índice de linhas para arquivos grandes
+        read_cfg = cfg.get("read_file") or {}
+        self.read_max_bytes = int(float(read_cfg.get("max_kb", 64)) * 1024)
+        self.read_max_lines = int(read_cfg.get("max_lines", 2000))
+        self.read_binary_preview = int(read_cfg.get("binary_preview_bytes", 4096))
+        self.read_full_binary_max = int(float(read_cfg.get("full_binary_max_mb", 8)) * 1024 * 1024)
+        self.line_index = LineIndex(Path("warpclone_memory") / "line_index",
+                                    step=int(read_cfg.get("index_step", 1024)),
+                                    min_bytes=int(float(read_cfg.get("index_min_mb", 16)) * 1024 * 1024))
+        # query_table: CSVs convertidos para colunas (memmap) na primeira consulta
+        table_cfg = cfg.get("query_table") or {}
+        self.table_use_cache = bool(table_cfg.get("columnar_cache", True))
+        self.table_limit = int(table_cfg.get("limit", 20))
+        self.table_cache = TableCache(Path("warpclone_memory") / "table_cache",
+                                      max_tables=int(table_cfg.get("max_tables", 20)),
+                                      min_bytes=int(float(table_cfg.get("cache_min_mb", 1)) * 1024 * 1024))
+        # describe_dataset: estatísticas por coluna em blocos, com resultados guardados por conteúdo
+        describe_cfg = cfg.get("describe_dataset") or {}
+        self.describe_bins = int(describe_cfg.get("bins", 10))
+        self.describe_max_columns = int(describe_cfg.get("max_columns", 30))
+        self.describe_max_chars = int(describe_cfg.get("max_chars", 6000))
+        self.describe_chunk_rows = int(describe_cfg.get("chunk_rows", 1000000))
+        self.stats_cache = StatsCache(Path("warpclone_memory") / "describe_cache.json",
+                                      max_entries=int(describe_cfg.get("cache_entries", 100)))
+        # ZIP: processos de compressão (0 = número de CPUs) e nível do deflate
+        archive_cfg = cfg.get("archive") or {}
+        self.archive_workers = int(archive_cfg.get("workers", 0)) or (os.cpu_count() or 1)
+        self.archive_level = int(archive_cfg.get("level", 6))
+        # Cópia de árvores (copy_tree/move_file): threads, cópia no kernel, pula arquivos iguais
+        copy_cfg = cfg.get("copy") or {}
+        self.copy_workers = int(copy_cfg.get("workers", 8))
+        self.copy_buffer_bytes = int(copy_cfg.get("buffer_kb", 1024)) * 1024
+        self.copy_mtime_window = float(copy_cfg.get("mtime_window_sec", 2))
+        # Downloads em segmentos paralelos (HTTP Range), retomáveis
+        self.download_cfg = dict(cfg.get("download") or {})
+        # Cache HTTP em disco para fetch_url e busca web
+        http_cache_cfg = cfg.get("http_cache") or {}
+        self.http_cache = None
+        if http_cache_cfg.get("enabled", True):
+            self.http_cache = HttpCache(
+                Path("warpclone_memory") / "http_cache",
+                max_bytes=int(float(http_cache_cfg.get("max_mb", 200)) * 1024 * 1024),
+                max_entry_bytes=int(float(http_cache_cfg.get("max_entry_mb", 10)) * 1024 * 1024),
+                offline=bool(http_cache_cfg.get("offline", False)),
+                serve_stale_on_error=bool(http_cache_cfg.get("serve_stale_on_error", True)),
+            )
+        self.search_cache_ttl = int(http_cache_cfg.get("search_ttl_sec", 3600))
+        # fetch_url: leitura em streaming até o orçamento de bytes, texto limitado em tokens
+        fetch_cfg = cfg.get("fetch_url") or {}
+        self.fetch_max_bytes = int(float(fetch_cfg.get("max_kb", 1024)) * 1024)
+        self.fetch_max_tokens = int(fetch_cfg.get("max_tokens", 1000))
+        # list_dir: listagem paginada (itens por página e profundidade do modo recursivo)
+        list_cfg = cfg.get("list_dir") or {}
+        self.list_page_size = int(list_cfg.get("page_size", 200))
+        self.list_max_depth = int(list_cfg.get("recursive_max_depth", 0)) or None
+
+        # Biblioteca de comandos (carregada de JSON) e matcher de intenções compilado
+        self.command_library_file = Path("warpclone_config") / "command_library.json"
+        self._command_library_stamp = self._library_stamp()
         self.command_library = self._load_command_library()
+        self._intent_matcher = None
 
         # Flags de LLM e modo offline
         self.offline_mode = bool(cfg.get("offline_mode", False))
@@ -49,6 +256,310 @@ class WarpClone:
         self._ollama_last_check = 0
         self._ollama_check_interval = int(cfg.get("ollama_check_interval_sec", 30))
 
+    def http(self):
+        """Sessão HTTP por thread (reaproveita conexões keep-alive com o Ollama)."""
+        session = getattr(self._http_local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._http_local.session = session
+        return session
+
+    def knowledge_base(self) -> KnowledgeBase:
+        """Índice da base de conhecimento, criado no primeiro uso. Sem embeddings no modo offline."""
+        with self.lock:
+            if self._knowledge_base is None:
+                kcfg = self.knowledge_cfg
+                embedder = None
+                if kcfg.get("semantic", True) and not self.offline_mode:
+                    u = urlparse(self.ollama_url or "http://localhost:11434")
+                    base = f"{u.scheme}://{u.netloc}" if u.scheme and u.netloc else "http://localhost:11434"
+                    embedder = OllamaEmbedder(base, kcfg.get("embed_model", "nomic-embed-text"), self.http,
+                                              batch_size=int(kcfg.get("batch_size", 32)))
+                index_dir = Path("warpclone_memory") / "knowledge_index"
+                ann = None
+                if kcfg.get("ann", True):
+                    ann = IvfIndex(index_dir / "ivf", nlist=int(kcfg.get("ann_nlist", 0)),
+                                   nprobe=int(kcfg.get("ann_nprobe", 16)))
+                self._knowledge_base = KnowledgeBase(
+                    self.knowledge_dir, index_dir, embedder,
+                    chunk_chars=int(kcfg.get("chunk_chars", 800)),
+                    fusion_k=int(kcfg.get("fusion_k", 60)),
+                    refresh_sec=float(kcfg.get("refresh_sec", 5)),
+                    retry_sec=float(kcfg.get("retry_sec", 300)),
+                    max_embed_per_refresh=int(kcfg.get("max_embed_per_refresh", 512)),
+                    ann=ann, ann_min_rows=int(kcfg.get("ann_min_chunks", 20000)),
+                )
+            return self._knowledge_base
+
+    def knowledge_context(self, task: str) -> str:
+        """Trechos da base relevantes para `task`, já limitados a `rag_max_tokens`.
+
+        Só entram trechos com BM25 >= `rag_min_lexical_score` ou cosseno >= `rag_min_similarity`,
+        para tarefas sem relação com a base não receberem contexto. O resultado fica guardado
+        por tarefa normalizada até expirar ou a base mudar. Roda antes de toda tarefa, então não
+        embute trechos novos: usa o BM25 e os vetores já gravados, e a indexação semântica fica
+        com ``knowledge_search``.
+        """
+        if not self.knowledge_dir.exists():
+            return ""
+        kb = self.knowledge_base()
+        kb.refresh(embed=False)
+        key = " ".join(fold(task or "").split())
+        now = time.monotonic()
+        with self.lock:
+            cached = self._rag_cache.pop(key, None)
+            if cached is not None and cached[0] == kb.generation and cached[1] > now:
+                self._rag_cache[key] = cached
+                return cached[2]
+        results = [r for r in kb.search(task, top_k=self.rag_top_k, snippet_chars=kb.chunk_chars, embed=False)
+                   if (r["lexical_score"] or 0) >= self.rag_min_lexical_score
+                   or (r["semantic_score"] or 0) >= self.rag_min_similarity]
+        text = pack_passages(results, self.rag_max_tokens)
+        with self.lock:
+            self._rag_cache[key] = (kb.generation, now + self.rag_cache_ttl, text)
+            while len(self._rag_cache) > self.rag_cache_entries:
+                self._rag_cache.popitem(last=False)
+        return text
+
+    def _load_command_library(self) -> dict:
+        """Carrega biblioteca de comandos estruturados de 'warpclone_config/command_library.json'."""
+        try:
+            lib_path = self.command_library_file
+            if lib_path.exists():
+                with open(lib_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    return data if isinstance(data, dict) else {"commands": []}
+        except Exception:
+            pass
+        return {"commands": []}
+
+    @staticmethod
+    def _file_stamp(path: Path):
+        try:
+            st = path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _library_stamp(self):
+        return self._file_stamp(self.command_library_file)
+
+    def sensitive_classifier(self) -> SensitiveClassifier:
+        """Classificador de comandos sensíveis (regras padrão + 'sensitive_rules.json').
+        Recompilado apenas quando o arquivo de regras muda."""
+        stamp = self._file_stamp(self.sensitive_rules_file)
+        with self.lock:
+            if self._sensitive_classifier is None or stamp != self._sensitive_rules_stamp:
+                self._sensitive_classifier = SensitiveClassifier.from_file(self.sensitive_rules_file)
+                self._sensitive_rules_stamp = stamp
+            return self._sensitive_classifier
+
+    def intent_matcher(self) -> IntentMatcher:
+        """Matcher das heurísticas offline + aliases da biblioteca (intenções "library:<i>",
+        avaliadas antes das embutidas). Recompilado apenas quando o arquivo da biblioteca muda."""
+        stamp = self._library_stamp()
+        with self.lock:
+            if stamp != self._command_library_stamp:
+                self.command_library = self._load_command_library()
+                self._command_library_stamp = stamp
+                self._intent_matcher = None
+            if self._intent_matcher is None:
+                intents = list(_OFFLINE_INTENTS)
+                items = (self.command_library or {}).get("commands", []) or []
+                for i, item in enumerate(items):
+                    if isinstance(item, dict):
+                        intents.append((f"library:{i}", i - len(items), item.get("aliases", []) or []))
+                self._intent_matcher = IntentMatcher(intents)
+                # Itens correspondentes a este matcher (o arquivo pode ser recarregado depois)
+                self._intent_matcher.library_items = items
+            return self._intent_matcher
+
+    def load_memory(self):
+        if self.memory_file.exists():
+            try:
+                with open(self.memory_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                return {"short_term": [], "long_term": {}}
+        return {"short_term": [], "long_term": {}}
+
+    def load_learning_patterns(self):
+        try:
+            if self.learning_patterns_file.exists():
+                with open(self.learning_patterns_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception:
+            pass
+        return {"usage_count": 0, "actions": {}, "last_success": None}
+
+    def save_memory(self):
+        # Serializa sob o lock (snapshot consistente) e grava fora dele
+        with self.lock:
+            memory_txt = json.dumps(self.memory, indent=4, ensure_ascii=False)
+            patterns_txt = json.dumps(self.learning_patterns, indent=4, ensure_ascii=False)
+        with self.io_lock:
+            self.memory_file.parent.mkdir(exist_ok=True)
+            _atomic_write_text(self.memory_file, memory_txt)
+            # Persiste padrões de aprendizado juntamente
+            _atomic_write_text(self.learning_patterns_file, patterns_txt)
+        # file_hash grava o cache de hash com intervalo mínimo; aqui descarrega o pendente
+        self.hash_cache.save(force=True)
+
+    def remember(self, text: str):
+        with self.lock:
+            self.memory.setdefault("short_term", []).append(text)
+
+    def record_action(self, action_name, success):
+        with self.lock:
+            actions = self.learning_patterns.setdefault("actions", {})
+            action_stats = actions.setdefault(action_name, {"count": 0, "success": 0, "failure": 0})
+            action_stats["count"] += 1
+            if success:
+                action_stats["success"] += 1
+            else:
+                action_stats["failure"] += 1
+
+    def record_usage(self):
+        with self.lock:
+            self.learning_patterns["usage_count"] = self.learning_patterns.get("usage_count", 0) + 1
+
+    def record_success(self, final_answer):
+        with self.lock:
+            self.learning_patterns["last_success"] = final_answer
+
+    def append_command_log(self, log_entry):
+        with self.io_lock:
+            logs = []
+            if self.command_history_file.exists():
+                try:
+                    with open(self.command_history_file, "r", encoding="utf-8") as f:
+                        logs = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    logs = []
+            logs.append(log_entry)
+            _atomic_write_text(self.command_history_file, json.dumps(logs, indent=4, ensure_ascii=False))
+
+
+class SessionContext:
+    """Estado de uma conversa: histórico, identificação da sessão e plano offline em andamento."""
+
+    def __init__(self, use_powershell: bool = False):
+        self.conversation_history = []
+        self.session_id = None
+        self.session_name = None
+        self.use_powershell = use_powershell
+        self._offline_plan = None
+        self._rag_context = None
+        # Algum comando da ação corrente terminou com código de saída diferente de zero
+        self._command_failed = False
+
+
+class _EngineAttr:
+    """Atributo do WarpClone armazenado no engine compartilhado."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj.engine, self.name)
+
+    def __set__(self, obj, value):
+        setattr(obj.engine, self.name, value)
+
+
+class _SessionAttr(_EngineAttr):
+    """Atributo do WarpClone armazenado no contexto de sessão ativo na thread."""
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj.context, self.name)
+
+    def __set__(self, obj, value):
+        setattr(obj.context, self.name, value)
+
+
+class WarpClone:
+    # Estado compartilhado (engine): seguro entre threads
+    model = _EngineAttr()
+    ollama_url = _EngineAttr()
+    memory = _EngineAttr()
+    log_dir = _EngineAttr()
+    command_history_file = _EngineAttr()
+    profiler = _EngineAttr()
+    chat_sessions_dir = _EngineAttr()
+    learning_patterns_file = _EngineAttr()
+    learning_patterns = _EngineAttr()
+    confirm_sensitive_commands = _EngineAttr()
+    command_timeout = _EngineAttr()
+    output_head_bytes = _EngineAttr()
+    output_tail_bytes = _EngineAttr()
+    shell_pool = _EngineAttr()
+    knowledge_dir = _EngineAttr()
+    knowledge_cfg = _EngineAttr()
+    rag_enabled = _EngineAttr()
+    answer_cache = _EngineAttr()
+    hash_workers = _EngineAttr()
+    hash_buffer_bytes = _EngineAttr()
+    hash_cache = _EngineAttr()
+    read_max_bytes = _EngineAttr()
+    read_max_lines = _EngineAttr()
+    read_binary_preview = _EngineAttr()
+    read_full_binary_max = _EngineAttr()
+    line_index = _EngineAttr()
+    table_use_cache = _EngineAttr()
+    table_limit = _EngineAttr()
+    table_cache = _EngineAttr()
+    describe_bins = _EngineAttr()
+    describe_max_columns = _EngineAttr()
+    describe_max_chars = _EngineAttr()
+    describe_chunk_rows = _EngineAttr()
+    stats_cache = _EngineAttr()
+    archive_workers = _EngineAttr()
+    archive_level = _EngineAttr()
+    copy_workers = _EngineAttr()
+    copy_buffer_bytes = _EngineAttr()
+    copy_mtime_window = _EngineAttr()
+    download_cfg = _EngineAttr()
+    http_cache = _EngineAttr()
+    search_cache_ttl = _EngineAttr()
+    fetch_max_bytes = _EngineAttr()
+    fetch_max_tokens = _EngineAttr()
+    list_page_size = _EngineAttr()
+    list_max_depth = _EngineAttr()
+    command_library = _EngineAttr()
+    offline_mode = _EngineAttr()
+    ollama_autostart = _EngineAttr()
+    llm_enabled = _EngineAttr()
+    ollama_available = _EngineAttr()
+    _ollama_last_check = _EngineAttr()
+    _ollama_check_interval = _EngineAttr()
+    # Estado por conversa (contexto de sessão)
+    conversation_history = _SessionAttr()
+    session_id = _SessionAttr()
+    session_name = _SessionAttr()
+    use_powershell = _SessionAttr()
+    _offline_plan = _SessionAttr()
+    _rag_context = _SessionAttr()
+    _command_failed = _SessionAttr()
+
+    def __init__(self, model=None, ollama_url=None, confirmation_handler=None, engine=None):
+        """`engine` permite compartilhar configuração, caches e estatísticas entre várias
+        instâncias; nesse caso `model`/`ollama_url` são ignorados e a inicialização do
+        Ollama (já feita pelo dono do engine) não é repetida.
+        """
+        shared = engine is not None
+        self.engine = engine or WarpCloneEngine(model=model, ollama_url=ollama_url)
+        # ContextVar (e não threading.local): isola contextos tanto por thread quanto por tarefa asyncio
+        self._context_var = contextvars.ContextVar(f"warpclone_context_{id(self)}", default=None)
+        self._default_context = self.new_context()
+        self.confirmation_handler = confirmation_handler
+        self.output_handler = None
+        if shared:
+            return
+
         # Tenta garantir servidor e modelo com retry robusto
         try:
             if not self.offline_mode:
@@ -79,77 +590,118 @@ class WarpClone:
             self.llm_enabled = False
             self.ollama_available = False
 
+    # --- Contextos de sessão ---
+    @property
+    def context(self) -> SessionContext:
+        """Contexto ativo na thread/tarefa atual (ou o contexto padrão da instância)."""
+        return self._context_var.get() or self._default_context
+
+    def new_context(self) -> SessionContext:
+        return SessionContext(use_powershell=self.engine.default_use_powershell)
+
+    @contextmanager
+    def use_context(self, context: SessionContext):
+        """Vincula `context` à thread (ou tarefa asyncio) atual; permite tarefas concorrentes na mesma instância."""
+        token = self._context_var.set(context)
+        try:
+            yield context
+        finally:
+            self._context_var.reset(token)
+
     def _load_config(self):
-        cfg_path = Path("warpclone_config.json")
-        if cfg_path.exists():
-            try:
-                with open(cfg_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+        return _load_config()
 
     def _load_command_library(self) -> dict:
-        """Carrega biblioteca de comandos estruturados de 'warpclone_config/command_library.json'."""
-        try:
-            lib_path = Path("warpclone_config") / "command_library.json"
-            if lib_path.exists():
-                with open(lib_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return data if isinstance(data, dict) else {"commands": []}
-        except Exception:
-            pass
-        return {"commands": []}
+        return self.engine._load_command_library()
 
     def _match_command_library(self, text_lower: str):
         """Tenta encontrar um comando na biblioteca pelos aliases, retornando o item."""
         try:
-            items = (self.command_library or {}).get("commands", [])
-            for item in items:
-                aliases = [a.lower() for a in item.get("aliases", [])]
-                if any(a in text_lower for a in aliases):
-                    return item
+            matcher = self.engine.intent_matcher()
+            return self._library_item_from(matcher, matcher.match(text_lower))
         except Exception:
             return None
+
+    def _library_item_from(self, matcher, matches):
+        """Primeiro item da biblioteca (na ordem do arquivo) entre as intenções casadas."""
+        for name, _ in matches:
+            if name.startswith("library:"):
+                return matcher.library_items[int(name.split(":", 1)[1])]
         return None
 
     def set_confirmation_handler(self, handler):
         self.confirmation_handler = handler
 
+    def set_output_handler(self, handler):
+        """`handler(stream, linha)` recebe a saída de `execute_command` enquanto o comando roda."""
+        self.output_handler = handler
+
+    def _emit_output(self, stream, line):
+        handler = self.output_handler
+        if handler:
+            handler(stream, line)
+
+    def _progress_reporter(self, label, interval=0.5):
+        """Callback `(feitos, total, bytes, total_bytes)` que publica o progresso no fluxo
+        "progress" do output handler, no máximo a cada `interval` segundos."""
+        if not self.output_handler:
+            return None
+        last = [0.0]
+
+        def report(done, total, done_bytes, total_bytes):
+            now = time.monotonic()
+            if (not total or done < total) and now - last[0] < interval:
+                return
+            last[0] = now
+            pct = (100 * done_bytes // total_bytes) if total_bytes else 100
+            self._emit_output("progress", f"{label}: {done}/{total} ({pct}%)")
+
+        return report
+
+    def _copy_options(self, parameters, skip_unchanged: bool = True) -> dict:
+        return {
+            "workers": int(parameters.get("workers") or self.copy_workers),
+            "include": parameters.get("include"),
+            "exclude": parameters.get("exclude"),
+            "skip_unchanged": parameters.get("skip_unchanged", skip_unchanged) is not False,
+            "mtime_window": self.copy_mtime_window,
+            "buffer_size": self.copy_buffer_bytes,
+            "on_progress": self._progress_reporter("copy"),
+        }
+
+    def _copy_tree(self, src, dst, parameters, skip_unchanged: bool = True) -> dict:
+        return copy_tree(src, dst, **self._copy_options(parameters, skip_unchanged))
+
+    @staticmethod
+    def _copy_summary(stats) -> str:
+        text = (f"{stats['copied']} copiados, {stats['skipped']} já iguais, {stats['errors']} erros; "
+                f"{stats['bytes_copied']} bytes em {stats['elapsed_sec']}s")
+        if stats["mb_per_sec"]:
+            text += f" ({stats['mb_per_sec']} MB/s)"
+        text += "."
+        for err in stats["error_list"][:10]:
+            text += f"\n- {err['path']}: {err['error']}"
+        if stats["errors"] > 10:
+            text += f"\n... e mais {stats['errors'] - 10} erros."
+        return text
+
     def load_memory(self):
-        memory_path = Path("warpclone_memory") / "memory.json"
-        if memory_path.exists():
-            try:
-                with open(memory_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return {"short_term": [], "long_term": {}}
-        return {"short_term": [], "long_term": {}}
+        return self.engine.load_memory()
 
     def save_memory(self):
-        memory_path = Path("warpclone_memory") / "memory.json"
-        memory_path.parent.mkdir(exist_ok=True)
-        with open(memory_path, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=4, ensure_ascii=False)
-        # Persiste padrões de aprendizado juntamente
-        with open(self.learning_patterns_file, "w", encoding="utf-8") as f:
-            json.dump(self.learning_patterns, f, indent=4, ensure_ascii=False)
+        self.engine.save_memory()
 
     def load_learning_patterns(self):
-        try:
-            if self.learning_patterns_file.exists():
-                with open(self.learning_patterns_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception:
-            pass
-        return {"usage_count": 0, "actions": {}, "last_success": None}
+        return self.engine.load_learning_patterns()
 
     # --- Persistência de sessões de chat ---
-    def start_new_session(self, name: str | None = None):
-        """Inicia uma nova sessão de chat e persiste um arquivo vazio."""
+    def start_new_session(self, name: str | None = None, session_id: str | None = None):
+        """Inicia uma nova sessão de chat e persiste um arquivo vazio.
+        `session_id` permite ao chamador (ex.: servidor HTTP) fixar um ID único.
+        """
         try:
             ts = time.strftime("%Y%m%d-%H%M%S")
-            self.session_id = f"session-{ts}"
+            self.session_id = session_id or f"session-{ts}"
             # Nome amigável (pode ser fornecido)
             self.session_name = name or time.strftime("Sessão %d/%m %H:%M")
             self.conversation_history = []
@@ -231,22 +783,10 @@ class WarpClone:
 
     def log_command(self, command, result):
         log_entry = {"command": command, "result": result}
-        
-        logs = []
-        if self.command_history_file.exists():
-            try:
-                with open(self.command_history_file, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                logs = []
-        
-        logs.append(log_entry)
-        
-        with open(self.command_history_file, "w", encoding="utf-8") as f:
-            json.dump(logs, f, indent=4, ensure_ascii=False)
+        self.engine.append_command_log(log_entry)
 
-    def call_ollama(self, task):
-        system_prompt = """
+    def _system_prompt(self) -> str:
+        return """
         Você é um assistente de IA autônomo chamado By-CRR AI. Sua função é analisar as solicitações do usuário e, de forma autônoma, decidir e executar as ações necessárias para completar a tarefa. Você tem acesso a um conjunto de ferramentas.
 
         O processo funciona em um loop:
@@ -258,21 +798,26 @@ class WarpClone:
 
         As ferramentas disponíveis são (com exemplos de uso):
         - `execute_command`: Executa um comando do sistema. (Ex: `{ "action": "execute_command", "parameters": { "command": "dir" } }`)
-        - `read_file`: Lê um arquivo. (Ex: `{ "action": "read_file", "parameters": { "path": "arquivo.txt" } }`)
+        - `execute_batch`: Executa em paralelo comandos independentes entre si (saídas na ordem dada). (Ex: `{ "action": "execute_batch", "parameters": { "commands": [ { "label": "disco", "command": "df -h" }, { "label": "memória", "command": "free -m" } ] } }`)
+        - `read_file`: Lê um arquivo em trechos: por padrão as primeiras linhas; `start_line`/`max_lines` para uma janela, `tail` para as últimas N linhas, `offset`/`length` para bytes (binários saem em base64). A resposta indica como pedir o próximo trecho. (Ex: `{ "action": "read_file", "parameters": { "path": "app.log", "tail": 100 } }`)
         - `write_file`: Cria/sobrescreve um arquivo. (Ex: `{ "action": "write_file", "parameters": { "path": "novo.txt", "content": "Olá" } }`)
         - `create_file`: Cria arquivo (igual a `write_file`). (Ex: `{ "action": "create_file", "parameters": { "path": "novo.txt", "content": "texto" } }`)
         - `append_file`: Anexa conteúdo ao fim do arquivo. (Ex: `{ "action": "append_file", "parameters": { "path": "log.txt", "content": "linha" } }`)
         - `delete_file`: Remove arquivo (pode pedir confirmação). (Ex: `{ "action": "delete_file", "parameters": { "path": "c:\\temp\\log.txt" } }`)
-        - `list_dir`: Lista itens de diretório (recursivo opcional). (Ex: `{ "action": "list_dir", "parameters": { "path": ".", "recursive": false } }`)
+        - `list_dir`: Lista itens de diretório com tipo, tamanho e data, em páginas (`recursive`/`max_depth`, filtros `include`/`exclude` em glob, `page_size`; para a próxima página repita a chamada com o `cursor` indicado). (Ex: `{ "action": "list_dir", "parameters": { "path": ".", "recursive": false } }`)
         - `create_dir`: Cria diretório (com pais). (Ex: `{ "action": "create_dir", "parameters": { "path": "c:\\temp\\novo" } }`)
         - `delete_dir`: Remove diretório (recursivo por padrão, pode pedir confirmação). (Ex: `{ "action": "delete_dir", "parameters": { "path": "c:\\temp\\antigo", "recursive": true } }`)
         - `copy_file`: Copia arquivo. (Ex: `{ "action": "copy_file", "parameters": { "src": "a.txt", "dst": "b.txt" } }`)
-        - `move_file`: Move arquivo. (Ex: `{ "action": "move_file", "parameters": { "src": "a.txt", "dst": "pasta\\a.txt" } }`)
+        - `copy_tree`: Copia uma pasta inteira (ou vários arquivos via `include`/`exclude` em glob), em paralelo, pulando arquivos já idênticos (tamanho e data). (Ex: `{ "action": "copy_tree", "parameters": { "src": "projeto", "dst": "D:\\backup\\projeto", "exclude": ["node_modules"] } }`)
+        - `move_file`: Move arquivo ou pasta (entre discos copia e depois apaga a origem). (Ex: `{ "action": "move_file", "parameters": { "src": "a.txt", "dst": "pasta\\a.txt" } }`)
         - `rename_file`: Renomeia arquivo. (Ex: `{ "action": "rename_file", "parameters": { "path": "a.txt", "new_path": "b.txt" } }`)
         - `file_hash`: Calcula hash de arquivo (sha256 padrão). (Ex: `{ "action": "file_hash", "parameters": { "path": "a.txt", "algorithm": "sha256" } }`)
-        - `zip_create`: Cria ZIP de arquivo/pasta. (Ex: `{ "action": "zip_create", "parameters": { "source": "pasta", "zip_path": "backup.zip" } }`)
-        - `zip_extract`: Extrai ZIP para destino. (Ex: `{ "action": "zip_extract", "parameters": { "zip_path": "backup.zip", "dest": "restaurado" } }`)
-        - `download_file`: Baixa arquivo de URL. (Ex: `{ "action": "download_file", "parameters": { "url": "https://.../file.zip", "dest": "caminho\\file.zip" } }`)
+        - `query_table`: Consulta um CSV grande sem lê-lo inteiro: `columns`, filtros `where` (ex.: `"UF == SP"`, `"VALOR > 1000"`, `"MUNICIPIO contains santos"`, ops `== != > >= < <= in contains startswith is_null`), `group_by`, `aggregates` (`count(*)`, `sum(col)`, `avg(col)`, `min(col)`, `max(col)`, `count_distinct(col)`), `order_by` (`"sum(VALOR) desc"`) e `limit`. (Ex: `{ "action": "query_table", "parameters": { "path": "dados.csv", "where": ["ANO == 2023"], "group_by": ["UF"], "aggregates": ["sum(VALOR)"], "limit": 10 } }`)
+        - `describe_dataset`: Estatísticas de cada coluna de um CSV sem escrever script: contagem, % de nulos, min/max, média, desvio, quantis (p5..p95) e histograma nas numéricas; distintos e valores mais comuns nas de texto. Opcional: `columns`, `bins`. (Ex: `{ "action": "describe_dataset", "parameters": { "path": "dados.csv", "columns": ["VALOR", "UF"] } }`)
+        - `hash_tree`: Hash de todos os arquivos de uma pasta em paralelo (vários algoritmos, cache; manifesto opcional `.json`/`.txt`; `verify` compara com um manifesto). (Ex: `{ "action": "hash_tree", "parameters": { "path": "deploy", "algorithms": ["sha256"], "include": ["*.dll"], "manifest": "deploy.sha256" } }`)
+        - `zip_create`: Cria ZIP de arquivo/pasta (compressão em paralelo; `include`/`exclude` opcionais). (Ex: `{ "action": "zip_create", "parameters": { "source": "pasta", "zip_path": "backup.zip", "exclude": ["*.tmp"] } }`)
+        - `zip_extract`: Extrai ZIP para destino (`include`/`exclude` filtram membros). (Ex: `{ "action": "zip_extract", "parameters": { "zip_path": "backup.zip", "dest": "restaurado", "include": ["docs/*"] } }`)
+        - `download_file`: Baixa arquivo de URL (segmentos paralelos e retomada automática; `max_bytes_per_sec` opcional). (Ex: `{ "action": "download_file", "parameters": { "url": "https://.../file.zip", "dest": "caminho\\file.zip" } }`)
         - `search_files`: Pesquisa arquivos por padrão. (Ex: `{ "action": "search_files", "parameters": { "pattern": "*.py" } }`)
         - `search_content`: Busca termo em arquivos. (Ex: `{ "action": "search_content", "parameters": { "term": "def main", "extension": ".py" } }`)
         - `search_regex`: Busca por regex em arquivos. (Ex: `{ "action": "search_regex", "parameters": { "pattern": "TODO", "extension": ".py" } }`)
@@ -293,8 +838,8 @@ class WarpClone:
         - `write_registry` (Windows): Escreve chave/valor no registro (pode pedir confirmação). (Ex: `{ "action": "write_registry", "parameters": { "path": "HKCU:\\Software\\MyApp", "name": "Enabled", "value": "1", "type": "String" } }`)
         - `analyze_system`: Auditoria completa do sistema e telemetria no Windows. (Ex: `{ "action": "analyze_system", "parameters": { } }`)
         - `web_search`: Busca na web. (Ex: `{ "action": "web_search", "parameters": { "query": "Python decorators" } }`)
-        - `fetch_url`: Busca conteúdo de URL. (Ex: `{ "action": "fetch_url", "parameters": { "url": "https://example.com" } }`)
-        - `knowledge_search`: Busca base local. (Ex: `{ "action": "knowledge_search", "parameters": { "query": "comandos Windows", "top_k": 5 } }`)
+        - `fetch_url`: Busca o texto principal de uma URL (sem HTML; `max_tokens` limita o tamanho; com cache HTTP; `no_cache: true` força a rede). (Ex: `{ "action": "fetch_url", "parameters": { "url": "https://example.com" } }`)
+        - `knowledge_search`: Busca base local por significado (não precisa repetir as palavras exatas do documento). (Ex: `{ "action": "knowledge_search", "parameters": { "query": "como ver o IP da máquina", "top_k": 5 } }`)
         - `answer`: Resposta final ao usuário. (Ex: `{ "action": "answer", "parameters": { "answer": "Concluído." } }`)
 
         Seu pensamento e a ação escolhida DEVEM ser retornados em um único bloco JSON. Não inclua nenhum texto fora do JSON.
@@ -309,79 +854,99 @@ class WarpClone:
         }
         """
         
+
+    def _prepare_llm_call(self, task):
+        """Registra a tarefa no histórico e decide entre resposta local e chamada ao LLM.
+        Retorna (decisão_offline, None) ou (None, payload para /api/chat).
+        """
         self.conversation_history.append({"role": "user", "content": task})
         
-        full_context = [{"role": "system", "content": system_prompt}]
+        full_context = [{"role": "system", "content": self._system_prompt()}]
         
         for msg in self.conversation_history[-5:]:
             full_context.append(msg)
 
+        # Verificação antecipada: se a consulta corresponde à biblioteca de comandos,
+        # utilize o planejador offline para acionar o plano específico.
         try:
-            # Verificação antecipada: se a consulta corresponde à biblioteca de comandos,
-            # utilize o planejador offline para acionar o plano específico.
-            try:
-                matched = self._match_command_library((task or "").lower())
-            except Exception:
-                matched = None
-            if matched:
-                offline_decision = self._offline_decide_action(task)
-                self.conversation_history.append({"role": "assistant", "content": offline_decision})
-                self.save_session()
-                return offline_decision
-            # Saúde do LLM: evita tentativas repetidas quando indisponível
-            if self.offline_mode or not self._ollama_health_check():
-                offline_decision = self._offline_decide_action(task)
-                self.conversation_history.append({"role": "assistant", "content": offline_decision})
-                self.save_session()
-                return offline_decision
-
-            response = requests.post(
-                self.ollama_url,
-                json={"model": self.model, "messages": full_context, "format": "json", "stream": False},
-                timeout=30
-            )
+            matched = self._match_command_library((task or "").lower())
+        except Exception:
+            matched = None
+        if matched:
+            return self._offline_reply(task), None
+        # Saúde do LLM: evita tentativas repetidas quando indisponível
+        if self.offline_mode or not self._ollama_health_check():
+            return self._offline_reply(task), None
+        # Tarefa nova: busca trechos da base uma vez; os passos seguintes reaproveitam o contexto
+        if not (task or "").startswith(_NEXT_STEP_PREFIX):
+            self._rag_context = self._retrieve_context(task) if self.rag_enabled else None
+        if self._rag_context:
+            full_context.insert(1, {"role": "system", "content": (
+                "Trechos da base de conhecimento local (já consultada para esta tarefa):\n\n"
+                f"{self._rag_context}\n\n"
+                "Se eles bastarem, responda direto com a ação `answer`, citando o arquivo; "
+                "não repita a busca com `knowledge_search`.")})
+        return None, {"model": self.model, "messages": full_context, "format": "json", "stream": False}
+
+    def _offline_reply(self, task):
+        offline_decision = self._offline_decide_action(task)
+        self.conversation_history.append({"role": "assistant", "content": offline_decision})
+        self.save_session()
+        return offline_decision
+
+    def _handle_llm_failure(self, task):
+        # Marca LLM como indisponível e retorna decisão offline
+        self.llm_enabled = False
+        self.ollama_available = False
+        self._ollama_last_check = time.time()
+        return self._offline_reply(task)
+
+    def _handle_llm_response(self, response_json):
+        # Ollama /api/chat retorna { message: { content } }
+        assistant_message = (
+            response_json.get('message', {}).get('content')
+            or response_json.get('response')  # fallback para /generate-style
+        )
+        
+        # Salva histórico
+        self.conversation_history.append({"role": "assistant", "content": assistant_message})
+        # Persiste sessão (se ativa)
+        self.save_session()
+        # Se o modelo não retornou conteúdo, responde de forma amigável
+        if not assistant_message:
+            return json.dumps({
+                "thought": "O modelo não retornou conteúdo.",
+                "action": "answer",
+                "parameters": {"answer": "Não recebi resposta do modelo. Tente novamente em alguns segundos."}
+            })
+
+        # Se o conteúdo não for um JSON válido, tenta extrair o primeiro objeto
+        if self._safe_json_loads(assistant_message) is None:
+            start = assistant_message.find('{')
+            end = assistant_message.rfind('}')
+            if start != -1 and end != -1 and end > start:
+                candidate = assistant_message[start:end+1]
+                if self._safe_json_loads(candidate):
+                    return candidate
+        return assistant_message
+
+    def _invalid_llm_json_reply(self):
+        return json.dumps({"thought": "A resposta do Ollama não foi um JSON válido.", "action": "answer", "parameters": {"answer": "Recebi uma resposta inesperada do modelo de linguagem. Tente novamente."}})
+
+    def call_ollama(self, task):
+        try:
+            decision, payload = self._prepare_llm_call(task)
+            if decision is not None:
+                return decision
+
+            response = self.engine.http().post(self.ollama_url, json=payload, timeout=30)
             response.raise_for_status()
-            
-            response_json = response.json()
-            # Ollama /api/chat retorna { message: { content } }
-            assistant_message = (
-                response_json.get('message', {}).get('content')
-                or response_json.get('response')  # fallback para /generate-style
-            )
-            
-            # Salva histórico
-            self.conversation_history.append({"role": "assistant", "content": assistant_message})
-            # Persiste sessão (se ativa)
-            self.save_session()
-            # Se o modelo não retornou conteúdo, responde de forma amigável
-            if not assistant_message:
-                return json.dumps({
-                    "thought": "O modelo não retornou conteúdo.",
-                    "action": "answer",
-                    "parameters": {"answer": "Não recebi resposta do modelo. Tente novamente em alguns segundos."}
-                })
-
-            # Se o conteúdo não for um JSON válido, tenta extrair o primeiro objeto
-            if self._safe_json_loads(assistant_message) is None:
-                start = assistant_message.find('{')
-                end = assistant_message.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    candidate = assistant_message[start:end+1]
-                    if self._safe_json_loads(candidate):
-                        return candidate
-            return assistant_message
+            return self._handle_llm_response(response.json())
             
         except requests.exceptions.RequestException:
-            # Marca LLM como indisponível e retorna decisão offline
-            self.llm_enabled = False
-            self.ollama_available = False
-            self._ollama_last_check = time.time()
-            offline_decision = self._offline_decide_action(task)
-            self.conversation_history.append({"role": "assistant", "content": offline_decision})
-            self.save_session()
-            return offline_decision
+            return self._handle_llm_failure(task)
         except json.JSONDecodeError:
-            return json.dumps({"thought": "A resposta do Ollama não foi um JSON válido.", "action": "answer", "parameters": {"answer": "Recebi uma resposta inesperada do modelo de linguagem. Tente novamente."}})
+            return self._invalid_llm_json_reply()
 
     def _safe_json_loads(self, text: str):
         """Tenta fazer json.loads(text). Se falhar, tenta extrair o primeiro bloco JSON.
@@ -415,21 +980,78 @@ class WarpClone:
             return None
 
     def _canonical_model_name(self, name: str) -> str:
+        return _canonical_model_name(name)
+
+    def _parse_action(self, action_json):
+        """Interpreta a ação (dict ou texto JSON). Retorna o dict ou None."""
+        # Permite receber dict diretamente ou texto JSON/string
+        if isinstance(action_json, dict):
+            return action_json
+        action_data = self._safe_json_loads(action_json)
+        return action_data if isinstance(action_data, dict) else None
+
+    def _command_refusal(self, command):
+        """Confirmação para comandos sensíveis. Retorna a mensagem de recusa ou None."""
+        if not self.confirm_sensitive_commands:
+            return None
+        verdict = self.classify_command(command)
+        if verdict:
+            sensitive_reason = verdict.reason
+            confirmed = False
+            if self.confirmation_handler:
+                try:
+                    confirmed = bool(self.confirmation_handler(command, sensitive_reason))
+                except Exception:
+                    confirmed = False
+            if not confirmed:
+                self._update_action_pattern("execute_command", False)
+                return f"Comando sensível detectado e NÃO confirmado pelo usuário. Motivo: {sensitive_reason}"
+        return None
+
+    def _run_command(self, action_data, command, label=None):
+        """Executa um comando já confirmado (pool de shells ou spawn) e formata a observação."""
         try:
-            if not name:
-                return "phi4:latest"
-            return name if ":" in name else f"{name}:latest"
-        except Exception:
-            return "phi4:latest"
+            on_output = None
+            if self.output_handler:
+                on_output = self._emit_output
+                if label:
+                    on_output = lambda stream, line: self._emit_output(stream, f"[{label}] {line}")
+            if self.shell_pool is not None:
+                result = self.shell_pool.run(command, timeout=self.command_timeout, on_output=on_output,
+                                             powershell=self.use_powershell, session_key=self.session_id,
+                                             head_bytes=self.output_head_bytes, tail_bytes=self.output_tail_bytes)
+            else:
+                if self.use_powershell and os.name == "nt":
+                    args, shell = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command], False
+                else:
+                    args, shell = command, True
+                result = run_streaming(args, shell=shell, timeout=self.command_timeout, on_output=on_output,
+                                       head_bytes=self.output_head_bytes, tail_bytes=self.output_tail_bytes)
+            if result.timed_out:
+                return self._command_timeout_reply(command, result.stdout, result.stderr)
+            return self._command_reply(action_data, result.stdout, result.stderr, result.returncode)
+        except Exception as e:
+            self._update_action_pattern("execute_command", False)
+            return f"Erro ao executar comando: {e}"
+
+    def _command_reply(self, action_data, stdout, stderr, returncode=0):
+        output = f"Stdout:\n{stdout}\nStderr:\n{stderr}"
+        self.log_command(action_data, output)
+        self._update_action_pattern("execute_command", not returncode)
+        if returncode:
+            self._command_failed = True
+            return f"Comando terminou com código de saída {returncode}.\n{output}"
+        return f"Comando executado com sucesso.\n{output}"
+
+    def _command_timeout_reply(self, command, stdout, stderr):
+        self._update_action_pattern("execute_command", False)
+        return (f"Erro ao executar comando: tempo limite de {self.command_timeout}s excedido em '{command}'; "
+                f"processo encerrado.\nSaída parcial:\nStdout:\n{stdout}\nStderr:\n{stderr}")
 
     def execute_action(self, action_json):
         try:
-            # Permite receber dict diretamente ou texto JSON/string
-            if isinstance(action_json, dict):
-                action_data = action_json
-            else:
-                action_data = self._safe_json_loads(action_json)
-            if not isinstance(action_data, dict):
+            action_data = self._parse_action(action_json)
+            if action_data is None:
                 # Se não conseguimos interpretar como JSON, trate como resposta final ao usuário
                 return f"FINAL_ANSWER:{str(action_json).strip()}"
             
@@ -437,89 +1059,108 @@ class WarpClone:
             parameters = action_data.get("parameters", {})
             
             self.log_command(action_data, "")
-            self.learning_patterns["usage_count"] = self.learning_patterns.get("usage_count", 0) + 1
+            self.engine.record_usage()
 
             if action == "execute_command":
                 command = parameters.get("command")
-                # Confirmação para comandos sensíveis
-                sensitive_reason = self._is_command_sensitive(command)
-                if self.confirm_sensitive_commands and sensitive_reason:
-                    confirmed = False
-                    if self.confirmation_handler:
-                        try:
-                            confirmed = bool(self.confirmation_handler(command, sensitive_reason))
-                        except Exception:
-                            confirmed = False
-                    if not confirmed:
-                        self._update_action_pattern("execute_command", False)
-                        return f"Comando sensível detectado e NÃO confirmado pelo usuário. Motivo: {sensitive_reason}"
-                try:
-                    if self.use_powershell and os.name == "nt":
-                        result = subprocess.run([
-                            "powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command
-                        ], shell=False, capture_output=True, text=True, timeout=self.command_timeout, encoding='utf-8', errors='ignore')
-                    else:
-                        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=self.command_timeout, encoding='utf-8', errors='ignore')
-                    output = f"Stdout:\n{result.stdout}\nStderr:\n{result.stderr}"
-                    self.log_command(action_data, output)
-                    self._update_action_pattern("execute_command", True)
-                    return f"Comando executado com sucesso.\n{output}"
-                except Exception as e:
-                    self._update_action_pattern("execute_command", False)
-                    return f"Erro ao executar comando: {e}"
+                refusal = self._command_refusal(command)
+                if refusal:
+                    return refusal
+                return self._run_command(action_data, command)
+
+            elif action == "execute_batch":
+                # Comandos independentes (ex.: consultas somente leitura de um plano) em paralelo;
+                # as saídas voltam na ordem declarada
+                items = parameters.get("commands") or []
+                if not items:
+                    return "Erro: 'commands' vazio para execute_batch."
+                items = [it if isinstance(it, dict) else {"command": str(it)} for it in items]
+                # Confirmações antes de disparar: diálogos nunca abrem em paralelo
+                refusals = [self._command_refusal(it.get("command")) for it in items]
+                pending = [i for i, r in enumerate(refusals) if not r]
+                replies = list(refusals)
+                max_workers = max(1, min(int(parameters.get("max_workers", 4)), len(items)))
+                if pending:
+                    ctx = contextvars.copy_context()
+                    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                        futures = {
+                            i: pool.submit(ctx.copy().run, self._run_command,
+                                           {"action": "execute_command", "parameters": {"command": items[i].get("command")}},
+                                           items[i].get("command"), items[i].get("label"))
+                            for i in pending
+                        }
+                        for i, fut in futures.items():
+                            replies[i] = fut.result()
+                parts = []
+                for i, (it, reply) in enumerate(zip(items, replies)):
+                    label = it.get("label") or it.get("command")
+                    parts.append(f"[{i + 1}/{len(items)}] {label}\n{reply}")
+                self._update_action_pattern("execute_batch", all(not r for r in refusals))
+                return f"Lote de {len(items)} comandos executado.\n\n" + "\n\n".join(parts)
 
             elif action == "read_file":
                 path = Path(parameters.get("path"))
                 if path.exists() and path.is_file():
                     try:
-                        # Permite leitura de qualquer formato: texto com fallback de encoding, ou binário (base64)
-                        as_text = bool(parameters.get("as_text"))
+                        # Lê só o trecho pedido (linhas, fim do arquivo ou bytes), nunca o arquivo inteiro
                         encoding = parameters.get("encoding")
-                        max_bytes = int(parameters.get("max_bytes", 4096))
-                        full_binary = bool(parameters.get("full_binary"))
-
-                        # Se explicitamente solicitado texto ou fornecido encoding, tenta texto
-                        if as_text or encoding:
-                            try:
-                                enc = encoding or 'utf-8'
-                                content = path.read_text(encoding=enc, errors='ignore')
-                                self._update_action_pattern("read_file", True)
-                                return f"Conteúdo (texto, encoding {enc}) de '{path}':\n{content}"
-                            except Exception as e:
-                                # Fallback para binário se leitura de texto falhar
-                                pass
-
-                        # Tenta primeiro como texto UTF-8
-                        try:
-                            content = path.read_text(encoding='utf-8')
+                        enc = encoding or sniff_encoding(read_head(path))
+                        if enc is None and parameters.get("as_text"):
+                            enc = "utf-8"
+                        offset = parameters.get("offset")
+                        length = parameters.get("length")
+                        max_bytes = parameters.get("max_bytes")
+
+                        if enc is None:
+                            # Binário: base64 de um trecho (ou do arquivo inteiro, até o limite)
+                            total_size = path.stat().st_size
+                            if parameters.get("full_binary"):
+                                if total_size > self.read_full_binary_max:
+                                    self._update_action_pattern("read_file", False)
+                                    return (f"Erro: '{path}' tem {total_size} bytes, acima do limite de "
+                                            f"{self.read_full_binary_max} para full_binary. Use offset/length.")
+                                offset, length = 0, total_size
+                            chunk = read_range(path, int(offset or 0),
+                                               int(length or max_bytes or self.read_binary_preview))
+                            import base64
+                            b64 = base64.b64encode(chunk["data"]).decode('ascii')
                             self._update_action_pattern("read_file", True)
-                            return f"Conteúdo (texto, utf-8) de '{path}':\n{content}"
-                        except UnicodeDecodeError:
-                            # Não é texto UTF-8 — trata como binário
-                            pass
-                        except Exception:
-                            # Pode ser outro erro — tenta binário
-                            pass
-
-                        # Leitura binária, retorna base64 (trecho ou completo)
-                        total_size = path.stat().st_size
-                        with open(path, 'rb') as f:
-                            if full_binary:
-                                data = f.read()
-                                b64 = base64.b64encode(data).decode('ascii')
-                                self._update_action_pattern("read_file", True)
-                                return (
-                                    f"Conteúdo binário de '{path}' (tamanho total {total_size} bytes).\n"
-                                    f"Base64 ({len(data)} bytes):\n{b64}"
-                                )
-                            else:
-                                chunk = f.read(max_bytes)
-                                b64 = base64.b64encode(chunk).decode('ascii')
-                                self._update_action_pattern("read_file", True)
-                                return (
-                                    f"Conteúdo binário de '{path}' (tamanho total {total_size} bytes).\n"
-                                    f"Base64 dos primeiros {len(chunk)} bytes:\n{b64}"
-                                )
+                            result = (f"Conteúdo binário de '{path}' (tamanho total {total_size} bytes).\n"
+                                      f"Base64 dos bytes {chunk['offset']}-{chunk['end']} "
+                                      f"({len(chunk['data'])} bytes):\n{b64}")
+                            if chunk["end"] < total_size:
+                                result += f"\n[Continua: \"offset\": {chunk['end']}]"
+                            return result
+
+                        budget = int(max_bytes or self.read_max_bytes)
+                        tail = parameters.get("tail")
+                        if offset is not None or length or not line_oriented(enc):
+                            chunk = read_range(path, int(offset or 0), int(length or budget))
+                            content = chunk["data"].decode(enc, errors="replace")
+                            header = f"bytes {chunk['offset']}-{chunk['end']} de {chunk['size']}"
+                            more = (f"[Continua: \"offset\": {chunk['end']}]"
+                                    if chunk["end"] < chunk["size"] else "")
+                        elif tail:
+                            chunk = read_tail(path, 50 if tail is True else int(tail), budget, enc)
+                            content = chunk["text"]
+                            header = f"últimas {chunk['lines']} linhas (a partir do byte {chunk['offset']})"
+                            more = "[Linha cortada pelo limite de bytes]" if chunk["cut"] else ""
+                        else:
+                            chunk = read_lines(path, int(parameters.get("start_line") or 1),
+                                               int(parameters.get("max_lines") or self.read_max_lines),
+                                               budget, enc, self.line_index)
+                            content = chunk["text"]
+                            total = f" de {chunk['total_lines']}" if chunk["total_lines"] is not None else ""
+                            header = f"linhas {chunk['start_line']}-{chunk['end_line']}{total}"
+                            more = ""
+                            if chunk["next_line"] is not None:
+                                more = f"[Truncado. Próximo trecho: \"start_line\": {chunk['next_line']}"
+                                if chunk["cut"]:
+                                    more += f"; a última linha foi cortada, continue com \"offset\": {chunk['next_offset']}"
+                                more += "]"
+                        self._update_action_pattern("read_file", True)
+                        result = f"Conteúdo (texto, {enc}) de '{path}', {header}:\n{content}"
+                        return result + ("\n" + more if more else "")
                     except Exception as e:
                         self._update_action_pattern("read_file", False)
                         return f"Erro ao ler o arquivo: {e}"
@@ -527,6 +1168,77 @@ class WarpClone:
                     self._update_action_pattern("read_file", False)
                     return f"Erro: Arquivo '{path}' não encontrado."
 
+            elif action == "query_table":
+                try:
+                    path = Path(parameters.get("path"))
+                    if not path.is_file():
+                        self._update_action_pattern("query_table", False)
+                        return f"Erro: Arquivo '{path}' não encontrado."
+                    result = query_table(
+                        path,
+                        columns=parameters.get("columns"), where=parameters.get("where"),
+                        group_by=parameters.get("group_by"), aggregates=parameters.get("aggregates"),
+                        order_by=parameters.get("order_by"),
+                        limit=int(parameters.get("limit") or self.table_limit),
+                        cache=self.table_cache,
+                        use_cache=self.table_use_cache and not parameters.get("no_cache"),
+                        on_progress=self._progress_reporter("csv"),
+                    )
+                    self._update_action_pattern("query_table", True)
+                    engine = "colunar (cache)" if result["engine"] == "columnar" else "streaming"
+                    header = (f"Consulta em '{path}' ({engine}; {result['scanned']} linhas, "
+                              f"{result['matched']} atendem aos filtros; {result['elapsed_sec']}s")
+                    if result.get("prepare_sec", 0) >= 0.5:
+                        header += f"; conversão para colunas {result['prepare_sec']}s"
+                    header += "):"
+                    shown, total = len(result["rows"]), result["total"]
+                    if total is None:
+                        footer = f"\n(primeiras {shown} linhas; há mais)"
+                    elif total > shown:
+                        footer = f"\n(mostrando {shown} de {total})"
+                    else:
+                        footer = ""
+                    return header + "\n" + format_result(result) + footer
+                except QueryError as e:
+                    self._update_action_pattern("query_table", False)
+                    return f"Erro na consulta: {e}"
+                except Exception as e:
+                    self._update_action_pattern("query_table", False)
+                    return f"Erro ao consultar tabela: {e}"
+
+            elif action == "describe_dataset":
+                try:
+                    path = Path(parameters.get("path"))
+                    if not path.is_file():
+                        self._update_action_pattern("describe_dataset", False)
+                        return f"Erro: Arquivo '{path}' não encontrado."
+                    columnar = (self.table_use_cache and not parameters.get("no_cache")
+                                and path.stat().st_size >= self.table_cache.min_bytes)
+                    result = describe(
+                        path,
+                        columns=parameters.get("columns"),
+                        bins=int(parameters.get("bins") or self.describe_bins),
+                        quantiles=parameters.get("quantiles"),
+                        table_cache=self.table_cache,
+                        use_cache=columnar,
+                        stats_cache=None if parameters.get("no_cache") else self.stats_cache,
+                        chunk_rows=self.describe_chunk_rows,
+                        on_progress=self._progress_reporter("estatísticas"),
+                    )
+                    self._update_action_pattern("describe_dataset", True)
+                    origin = "resultado em cache" if result["cached"] else (
+                        "colunar" if result["engine"] == "columnar" else "streaming")
+                    header = (f"Resumo de '{path}' ({result['rows']} linhas, "
+                              f"{result['total_columns']} colunas; {origin}):")
+                    summary = format_summary(result, self.describe_max_columns, self.describe_max_chars)
+                    return header + "\n" + summary
+                except QueryError as e:
+                    self._update_action_pattern("describe_dataset", False)
+                    return f"Erro no resumo: {e}"
+                except Exception as e:
+                    self._update_action_pattern("describe_dataset", False)
+                    return f"Erro ao descrever dataset: {e}"
+
             elif action == "ingest_file":
                 # Lê o arquivo por completo e grava conhecimento em warpclone_knowledge/ingested/*.md
                 path = Path(parameters.get("path"))
@@ -564,6 +1276,7 @@ class WarpClone:
                     else:
                         # Binário: grava base64 completo
                         data = path.read_bytes()
+                        import base64
                         b64 = base64.b64encode(data).decode('ascii')
                         md = (
                             f"# Ingested: {path.name}\n\n"
@@ -636,18 +1349,33 @@ class WarpClone:
             elif action == "list_dir":
                 try:
                     base = Path(parameters.get("path", "."))
-                    recursive = bool(parameters.get("recursive", False))
                     if not base.exists() or not base.is_dir():
                         self._update_action_pattern("list_dir", False)
                         return f"Erro: Diretório '{base}' inválido."
-                    entries = []
-                    if recursive:
-                        for p in base.rglob("*"):
-                            entries.append(str(p))
+                    max_depth = parameters.get("max_depth")
+                    if max_depth:
+                        max_depth = int(max_depth)
+                    elif parameters.get("recursive", False):
+                        max_depth = self.list_max_depth
                     else:
-                        entries = [str(p) for p in base.iterdir()]
+                        max_depth = 1
+                    page_size = int(parameters.get("page_size") or self.list_page_size)
+                    cursor = parameters.get("cursor") or ""
+                    page = list_page(base, limit=page_size, cursor=cursor, max_depth=max_depth,
+                                     include=parameters.get("include"), exclude=parameters.get("exclude"),
+                                     details=parameters.get("details", True) is not False)
                     self._update_action_pattern("list_dir", True)
-                    return "Itens do diretório:\n" + "\n".join(entries)
+                    items = page["items"]
+                    if not items:
+                        return f"Nenhum item em '{base}'" + (" nesta página." if cursor else " com esses filtros.")
+                    header = f"Itens de '{base}' ({len(items)}" + (", continuação" if cursor else "") + "):"
+                    result = header + "\n" + format_items(items)
+                    if page["next_cursor"]:
+                        result += f"\n\nHá mais itens. Próxima página: repita a chamada com \"cursor\": \"{page['next_cursor']}\""
+                    return result
+                except CursorError as e:
+                    self._update_action_pattern("list_dir", False)
+                    return f"Erro: {e}. Refaça a listagem sem cursor."
                 except Exception as e:
                     self._update_action_pattern("list_dir", False)
                     return f"Erro ao listar diretório: {e}"
@@ -697,15 +1425,35 @@ class WarpClone:
                     dst = Path(parameters.get("dst"))
                     if not src.exists() or not src.is_file():
                         self._update_action_pattern("copy_file", False)
-                        return f"Erro: Origem '{src}' inválida."
-                    dst.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src, dst)
+                        hint = " Para pastas use `copy_tree`." if src.is_dir() else ""
+                        return f"Erro: Origem '{src}' inválida.{hint}"
+                    # Cópia explícita de um arquivo: só pula o destino igual se o modelo pedir
+                    stats = self._copy_tree(src, dst, parameters, skip_unchanged=False)
+                    if stats["errors"]:
+                        self._update_action_pattern("copy_file", False)
+                        return f"Erro ao copiar arquivo: {stats['error_list'][0]['error']}"
                     self._update_action_pattern("copy_file", True)
+                    if stats["skipped"]:
+                        return f"Destino '{dst}' já é idêntico a '{src}' (mesmo tamanho e data); nada copiado."
                     return f"Arquivo copiado: '{src}' -> '{dst}'."
                 except Exception as e:
                     self._update_action_pattern("copy_file", False)
                     return f"Erro ao copiar arquivo: {e}"
 
+            elif action == "copy_tree":
+                try:
+                    src = Path(parameters.get("src"))
+                    dst = Path(parameters.get("dst"))
+                    if not src.exists():
+                        self._update_action_pattern("copy_tree", False)
+                        return f"Erro: Origem '{src}' não existe."
+                    stats = self._copy_tree(src, dst, parameters)
+                    self._update_action_pattern("copy_tree", not stats["errors"])
+                    return f"Cópia '{src}' -> '{dst}': " + self._copy_summary(stats)
+                except Exception as e:
+                    self._update_action_pattern("copy_tree", False)
+                    return f"Erro ao copiar: {e}"
+
             elif action == "move_file":
                 try:
                     src = Path(parameters.get("src"))
@@ -713,10 +1461,19 @@ class WarpClone:
                     if not src.exists():
                         self._update_action_pattern("move_file", False)
                         return f"Erro: Origem '{src}' não existe."
-                    dst.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.move(str(src), str(dst))
-                    self._update_action_pattern("move_file", True)
-                    return f"Movido: '{src}' -> '{dst}'."
+                    stats = move_path(src, dst, **self._copy_options(parameters))
+                    if stats["renamed"]:
+                        self._update_action_pattern("move_file", True)
+                        return f"Movido: '{src}' -> '{stats['target']}'."
+                    self._update_action_pattern("move_file", stats["source_removed"])
+                    if stats["errors"]:
+                        return (f"Cópia entre volumes incompleta; a origem '{src}' foi mantida. "
+                                + self._copy_summary(stats))
+                    if not stats["source_removed"]:
+                        kept = ", ".join(stats["source_kept"][:10])
+                        return (f"Copiado para '{stats['target']}', mas itens não cobertos pela cópia (ou "
+                                f"alterados durante ela) ficaram em '{src}': {kept}. " + self._copy_summary(stats))
+                    return f"Movido entre volumes: '{src}' -> '{stats['target']}'. " + self._copy_summary(stats)
                 except Exception as e:
                     self._update_action_pattern("move_file", False)
                     return f"Erro ao mover: {e}"
@@ -751,17 +1508,70 @@ class WarpClone:
                     if not path.exists() or not path.is_file():
                         self._update_action_pattern("file_hash", False)
                         return f"Erro: Arquivo '{path}' inválido."
-                    h = hashlib.new(algorithm)
-                    with open(path, "rb") as f:
-                        for chunk in iter(lambda: f.read(8192), b""):
-                            h.update(chunk)
-                    digest = h.hexdigest()
+                    st = path.stat()
+                    key = os.path.abspath(path)
+                    digests = self.hash_cache.get(key, st, [algorithm])
+                    if digests is None:
+                        digests = hash_file(path, [algorithm], self.hash_buffer_bytes)
+                        self.hash_cache.put(key, st, digests)
+                        self.hash_cache.save()
+                    digest = digests[algorithm]
                     self._update_action_pattern("file_hash", True)
                     return f"Hash ({algorithm}) de '{path}': {digest}"
                 except Exception as e:
                     self._update_action_pattern("file_hash", False)
                     return f"Erro ao calcular hash: {e}"
 
+            elif action == "hash_tree":
+                try:
+                    root = Path(parameters.get("path") or ".")
+                    if not root.exists():
+                        self._update_action_pattern("hash_tree", False)
+                        return f"Erro: Caminho '{root}' não existe."
+                    algorithms = parameters.get("algorithms") or parameters.get("algorithm") or "sha256"
+                    expected = None
+                    if parameters.get("verify"):
+                        expected = read_manifest(parameters.get("verify"))
+                        # Garante que os algoritmos do manifesto sejam calculados na mesma passada
+                        extra = sorted({a for d in expected.values() for a in d})
+                        algorithms = ([algorithms] if isinstance(algorithms, str) else list(algorithms)) + extra
+                    use_cache = parameters.get("use_cache", True)
+                    result = hash_tree(
+                        root, algorithms,
+                        include=parameters.get("include"), exclude=parameters.get("exclude"),
+                        recursive=bool(parameters.get("recursive", True)),
+                        workers=int(parameters.get("workers") or self.hash_workers),
+                        buffer_size=self.hash_buffer_bytes,
+                        cache=self.hash_cache if use_cache else None,
+                    )
+                    stats = result["stats"]
+                    lines = [
+                        f"hash_tree '{root}' ({', '.join(result['algorithms'])}): {stats['files']} arquivos, "
+                        f"{stats['bytes']} bytes; {stats['hashed']} calculados, {stats['cached']} do cache, "
+                        f"{stats['errors']} erros em {stats['elapsed_sec']}s."
+                    ]
+                    if parameters.get("manifest"):
+                        lines.append(f"Manifesto gravado em '{write_manifest(result, parameters.get('manifest'))}'.")
+                    if expected is not None:
+                        diff = compare_manifest(result, expected)
+                        lines.append(f"Verificação: {diff['ok']} ok, {len(diff['changed'])} alterados, "
+                                     f"{len(diff['missing'])} ausentes, {len(diff['added'])} novos.")
+                        for label, key in (("ALTERADO", "changed"), ("AUSENTE", "missing"), ("NOVO", "added")):
+                            lines.extend(f"{label}: {p}" for p in diff[key][:50])
+                    elif not parameters.get("manifest"):
+                        max_items = int(parameters.get("max_items", 200))
+                        first = result["algorithms"][0]
+                        for f in result["files"][:max_items]:
+                            lines.append(f"{f['digests'][first]}  {f['path']}" if "digests" in f
+                                         else f"ERRO  {f['path']}: {f['error']}")
+                        if len(result["files"]) > max_items:
+                            lines.append(f"... (+{len(result['files']) - max_items} arquivos; use 'manifest' para a lista completa)")
+                    self._update_action_pattern("hash_tree", True)
+                    return "\n".join(lines)
+                except Exception as e:
+                    self._update_action_pattern("hash_tree", False)
+                    return f"Erro ao calcular hashes: {e}"
+
             elif action == "zip_create":
                 try:
                     source = Path(parameters.get("source"))
@@ -769,16 +1579,21 @@ class WarpClone:
                     if not source.exists():
                         self._update_action_pattern("zip_create", False)
                         return f"Erro: Caminho de origem '{source}' não existe."
-                    zip_path.parent.mkdir(parents=True, exist_ok=True)
-                    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                        if source.is_dir():
-                            for p in source.rglob("*"):
-                                if p.is_file():
-                                    zf.write(p, p.relative_to(source))
-                        else:
-                            zf.write(source, source.name)
+                    # Módulo do ZIP (zipfile, zlib, multiprocessing) carregado só aqui
+                    from warpclone_archive import create_zip
+                    # `workers` vem do modelo: nunca acima do configurado
+                    workers = min(int(parameters.get("workers") or self.archive_workers), self.archive_workers)
+                    stats = create_zip(
+                        source, zip_path,
+                        workers=workers,
+                        level=int(parameters.get("level", self.archive_level)),
+                        include=parameters.get("include"), exclude=parameters.get("exclude"),
+                        on_progress=self._progress_reporter("zip"),
+                    )
                     self._update_action_pattern("zip_create", True)
-                    return f"Arquivo ZIP criado em '{zip_path}'."
+                    return (f"Arquivo ZIP criado em '{zip_path}': {stats['members']} arquivos, "
+                            f"{stats['bytes']} -> {stats['compressed_bytes']} bytes "
+                            f"({stats['stored']} sem compressão) em {stats['elapsed_sec']}s.")
                 except Exception as e:
                     self._update_action_pattern("zip_create", False)
                     return f"Erro ao criar ZIP: {e}"
@@ -787,14 +1602,17 @@ class WarpClone:
                 try:
                     zip_path = Path(parameters.get("zip_path"))
                     dest = Path(parameters.get("dest"))
+                    import zipfile
+                    from warpclone_archive import extract_zip
                     if not zip_path.exists() or not zipfile.is_zipfile(zip_path):
                         self._update_action_pattern("zip_extract", False)
                         return f"Erro: '{zip_path}' não é um ZIP válido."
-                    dest.mkdir(parents=True, exist_ok=True)
-                    with zipfile.ZipFile(zip_path, 'r') as zf:
-                        zf.extractall(dest)
+                    stats = extract_zip(zip_path, dest, include=parameters.get("include"),
+                                        exclude=parameters.get("exclude"),
+                                        on_progress=self._progress_reporter("unzip"))
                     self._update_action_pattern("zip_extract", True)
-                    return f"ZIP extraído para '{dest}'."
+                    skipped = f" ({stats['skipped']} ignorados pelos filtros)" if stats["skipped"] else ""
+                    return f"ZIP extraído para '{dest}': {stats['members']} membros{skipped}."
                 except Exception as e:
                     self._update_action_pattern("zip_extract", False)
                     return f"Erro ao extrair ZIP: {e}"
@@ -803,21 +1621,27 @@ class WarpClone:
                 try:
                     url = parameters.get("url")
                     dest = Path(parameters.get("dest"))
-                    dest.parent.mkdir(parents=True, exist_ok=True)
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
-                    }
-                    r = requests.get(url, stream=True, timeout=30, headers=headers)
-                    r.raise_for_status()
-                    with open(dest, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
+                    dl_cfg = self.download_cfg
+                    report = self._progress_reporter("download")
+                    stats = download(
+                        url, dest,
+                        segments=int(parameters.get("segments") or dl_cfg.get("segments", 4)),
+                        min_segment_bytes=int(float(dl_cfg.get("min_segment_mb", 4)) * 1024 * 1024),
+                        max_bytes_per_sec=parameters.get("max_bytes_per_sec") or dl_cfg.get("max_bytes_per_sec", 0),
+                        chunk_size=int(dl_cfg.get("chunk_kb", 1024)) * 1024,
+                        timeout=float(dl_cfg.get("timeout_sec", 30)),
+                        retries=int(dl_cfg.get("retries", 3)),
+                        on_progress=(lambda done, total: report(done, total or 0, done, total or 0)) if report else None,
+                    )
                     self._update_action_pattern("download_file", True)
-                    return f"Download concluído: {url} -> '{dest}'."
+                    resumed = f", {stats['resumed_bytes']} bytes retomados" if stats["resumed_bytes"] else ""
+                    return (f"Download concluído: {url} -> '{dest}' ({stats['size']} bytes, "
+                            f"{stats['segments']} segmento(s){resumed}, {stats['elapsed_sec']}s).")
                 except Exception as e:
                     self._update_action_pattern("download_file", False)
-                    return f"Erro no download: {e}"
+                    partial = Path(str(parameters.get("dest") or "") + ".part.json")
+                    hint = " (progresso parcial salvo; repetir a ação retoma o download)" if partial.is_file() else ""
+                    return f"Erro no download: {e}{hint}"
 
             elif action == "list_processes":
                 try:
@@ -1149,7 +1973,7 @@ class WarpClone:
             elif action == "knowledge_search":
                 query = parameters.get("query", "")
                 top_k = int(parameters.get("top_k", 5))
-                results = self._knowledge_search(query, top_k=top_k)
+                results = self._knowledge_search(query, top_k=top_k, mode=parameters.get("mode") or "hybrid")
                 success = len(results) > 0
                 self._update_action_pattern("knowledge_search", success)
                 if success:
@@ -1305,12 +2129,20 @@ class WarpClone:
                     headers = {
                         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
                     }
-                    resp = requests.get(url, timeout=12, headers=headers)
-                    resp.raise_for_status()
-                    content = resp.text
-                    snippet = content[:2000]
+                    max_tokens = int(parameters.get("max_tokens") or self.fetch_max_tokens)
+                    resp, title, text = self._fetch_text(url, headers, max_tokens,
+                                                         bypass_cache=bool(parameters.get("no_cache")))
                     self._update_action_pattern("fetch_url", True)
-                    return f"Conteúdo obtido de {url}:\n{snippet}\n..."
+                    notes = []
+                    if getattr(resp, "stale", False):
+                        notes.append("cache desatualizado: rede indisponível")
+                    if getattr(resp, "truncated", False):
+                        notes.append(f"leitura parcial: {len(resp.content)} bytes")
+                    note = f" [{'; '.join(notes)}]" if notes else ""
+                    header = f"Conteúdo obtido de {url}{note}:\n"
+                    if title:
+                        header += f"Título: {title}\n"
+                    return f"{header}{text}\n..."
                 except Exception as e:
                     self._update_action_pattern("fetch_url", False)
                     return f"Erro ao buscar URL '{url}': {e}"
@@ -1328,76 +2160,209 @@ class WarpClone:
         except Exception as e:
             return f"Erro ao executar a ação: {e}"
 
-    def execute_task(self, task, max_iterations=5, max_runtime_sec=90):
+    def execute_task(self, task, max_iterations=5, max_runtime_sec=90, context=None, use_cache=True):
+        """Executa a tarefa no contexto de sessão ativo, ou em `context` se informado
+        (usado para rodar várias conversas em paralelo sobre a mesma instância).
+        Com `use_cache` falso, ignora respostas guardadas e roda o loop (a nova resposta é guardada)."""
+        if context is not None:
+            with self.use_context(context):
+                return self.profiler.run(task, self._execute_task, task, max_iterations, max_runtime_sec, use_cache)
+        return self.profiler.run(task, self._execute_task, task, max_iterations, max_runtime_sec, use_cache)
+
+    def set_profiling(self, enabled: bool):
+        """Liga/desliga o profiling de tarefas em tempo de execução."""
+        self.profiler.set_enabled(enabled)
+
+    def _execute_task(self, task, max_iterations, max_runtime_sec, use_cache=True):
+        scope = self._answer_scope()
+        cached = self._cached_answer(task, scope) if use_cache else None
+        if cached is not None:
+            return cached
         start_ts = time.time()
-        # Em modo offline, aumentamos o teto de iterações para permitir planos multi-etapas
-        try:
-            if not self.llm_enabled or getattr(self, "offline_mode", False):
-                max_iterations = max(max_iterations, 6)
-        except Exception:
-            pass
+        max_iterations = self._effective_max_iterations(max_iterations)
         current_task = task
         last_action_result = None
+        steps = []
         for i in range(max_iterations):
             print(f"--- Iteração {i+1} ---")
             
             action_json = self.call_ollama(current_task)
-            
-            try:
-                parsed = self._safe_json_loads(action_json)
-                thought = (parsed or {}).get("thought", "")
-                if thought:
-                    self.memory["short_term"].append(thought)
-            except Exception:
-                pass
+            self._remember_thought(action_json)
 
+            self._command_failed = False
             result = self.execute_action(action_json)
+            steps.append((self._parse_action(action_json), result, self._command_failed))
             
             if result.startswith("FINAL_ANSWER:"):
-                final_answer = result.replace("FINAL_ANSWER:", "").strip()
-                self.memory["short_term"].append(f"Tarefa concluída: {final_answer}")
-                self.learning_patterns["last_success"] = final_answer
-                self.save_memory()
-                # Persiste resposta final no histórico da sessão
-                try:
-                    self.conversation_history.append({"role": "assistant", "content": final_answer})
-                    self.save_session()
-                except Exception:
-                    pass
+                final_answer = self._complete_task(result)
+                self._store_answer(task, final_answer, last_action_result, steps, scope)
                 return final_answer, last_action_result
             
             last_action_result = result
-            # Se houver um plano offline ativo, acumula saída do passo
-            try:
-                if hasattr(self, "_offline_plan") and self._offline_plan is not None:
-                    self._offline_plan.setdefault("outputs", []).append(str(result))
-            except Exception:
-                pass
-            current_task = f"A ação anterior retornou o seguinte resultado:\n{result}\n\nCom base nisso, qual o próximo passo para completar a tarefa original: '{task}'?"
-            self.conversation_history.append({"role": "user", "content": current_task})
-            self.save_session()
+            current_task = self._next_step_prompt(task, result)
             # Guarda de tempo total para evitar travas prolongadas
             if time.time() - start_ts > max_runtime_sec:
-                final_answer = "Tempo limite excedido ao tentar concluir a tarefa."
-                self.conversation_history.append({"role": "assistant", "content": final_answer})
-                self.save_session()
-                self.memory["short_term"].append(final_answer)
-                self.save_memory()
-                return final_answer, last_action_result
+                return self._abort_task("Tempo limite excedido ao tentar concluir a tarefa."), last_action_result
+
+        return self._give_up_task(), last_action_result
+
+    # --- Etapas do loop do agente (compartilhadas com AsyncWarpClone) ---
+    def _effective_max_iterations(self, max_iterations):
+        # Em modo offline, aumentamos o teto de iterações para permitir planos multi-etapas
+        try:
+            if not self.llm_enabled or getattr(self, "offline_mode", False):
+                max_iterations = max(max_iterations, 6)
+        except Exception:
+            pass
+        return max_iterations
 
+    def _remember_thought(self, action_json):
+        try:
+            parsed = self._safe_json_loads(action_json)
+            thought = (parsed or {}).get("thought", "")
+            if thought:
+                self.engine.remember(thought)
+        except Exception:
+            pass
+
+    def _answer_scope(self) -> str:
+        """Escopo do cache de respostas para a próxima tarefa da sessão.
+
+        Vazio se a tarefa abre a conversa; senão, a sessão e as tarefas anteriores que o
+        modelo verá junto com ela (a resposta pode depender delas).
+        """
+        window = self.conversation_history[-4:]
+        earlier = [normalize_task(m.get("content", "")) for m in window
+                   if m.get("role") == "user" and not m.get("content", "").startswith(_NEXT_STEP_PREFIX)]
+        if not window:
+            return ""
+        return "|".join([self.session_id or "", *earlier])
+
+    def _cached_answer(self, task, scope=""):
+        """Resposta guardada ainda válida para `task`, registrada no histórico da sessão."""
+        if self.answer_cache is None:
+            return None
+        try:
+            hit = self.answer_cache.lookup(task, scope)
+        except Exception:
+            return None
+        if hit is None:
+            return None
+        print(f"--- Resposta reaproveitada do cache ({hit['age_sec']:.0f}s) ---")
+        self.conversation_history.append({"role": "user", "content": task})
+        self.conversation_history.append({"role": "assistant", "content": hit["answer"]})
+        self.save_session()
+        return hit["answer"], hit["last"]
+
+    def _store_answer(self, task, final_answer, last_action_result, steps, scope=""):
+        """Guarda a resposta final se nenhuma ação falhou nem houve comando sensível.
+
+        `steps` traz (ação, resultado, algum comando saiu com código != 0) de cada iteração.
+        """
+        if self.answer_cache is None:
+            return
+        try:
+            actions = []
+            for action_data, result, command_failed in steps:
+                result = str(result)
+                if action_data is None and result.startswith("FINAL_ANSWER:"):
+                    action_data = {"action": "answer"}  # texto livre tratado como resposta final
+                if (not action_data or command_failed or result.startswith("Erro")
+                        or "NÃO confirmado" in result):
+                    return
+                action = action_data.get("action")
+                params = action_data.get("parameters") or {}
+                if action == "execute_command":
+                    commands = [params.get("command")]
+                elif action == "execute_batch":
+                    commands = [it.get("command") if isinstance(it, dict) else it for it in params.get("commands") or []]
+                else:
+                    commands = []
+                if any(self.classify_command(c) for c in commands if c):
+                    return
+                actions.append(action_data)
+            self.answer_cache.store(task, final_answer, last_action_result, actions, scope)
+        except Exception:
+            pass
+
+    def _complete_task(self, result):
+        final_answer = result.replace("FINAL_ANSWER:", "").strip()
+        self.engine.remember(f"Tarefa concluída: {final_answer}")
+        self.engine.record_success(final_answer)
+        self.save_memory()
+        # Persiste resposta final no histórico da sessão
+        try:
+            self.conversation_history.append({"role": "assistant", "content": final_answer})
+            self.save_session()
+        except Exception:
+            pass
+        return final_answer
+
+    def _next_step_prompt(self, task, result):
+        # Se houver um plano offline ativo, acumula saída do passo
+        try:
+            if self._offline_plan is not None:
+                self._offline_plan.setdefault("outputs", []).append(str(result))
+        except Exception:
+            pass
+        current_task = f"{_NEXT_STEP_PREFIX}\n{result}\n\nCom base nisso, qual o próximo passo para completar a tarefa original: '{task}'?"
+        self.conversation_history.append({"role": "user", "content": current_task})
+        self.save_session()
+        return current_task
+
+    def _abort_task(self, final_answer):
+        self.conversation_history.append({"role": "assistant", "content": final_answer})
+        self.save_session()
+        self.engine.remember(final_answer)
+        self.save_memory()
+        return final_answer
+
+    def _give_up_task(self):
         final_answer = "Não foi possível concluir a tarefa após o número máximo de iterações."
-        self.memory["short_term"].append(final_answer)
+        self.engine.remember(final_answer)
         self.save_memory()
-        return final_answer, last_action_result
+        return final_answer
 
     def _update_action_pattern(self, action_name, success):
-        actions = self.learning_patterns.setdefault("actions", {})
-        action_stats = actions.setdefault(action_name, {"count": 0, "success": 0, "failure": 0})
-        action_stats["count"] += 1
-        if success:
-            action_stats["success"] += 1
+        self.engine.record_action(action_name, success)
+
+    def _http_get(self, url, headers=None, ttl=None, bypass_cache=False, timeout=12):
+        """GET pelo cache HTTP do engine (quando ativo), na sessão keep-alive da thread."""
+        cache = self.http_cache
+        if cache is None or bypass_cache:
+            return self.engine.http().get(url, headers=headers, timeout=timeout)
+        return cache.get(url, session=self.engine.http(), headers=headers, timeout=timeout, ttl=ttl)
+
+    def _fetch_text(self, url, headers, max_tokens, bypass_cache=False):
+        """Baixa `url` em streaming, parando no orçamento de bytes ou quando o texto extraído
+        já preenche `max_tokens`. Retorna ``(resposta, título, texto)``."""
+        state = {}
+
+        def stop_when(chunk, resp_headers):
+            extractor = state.get("extractor")
+            if extractor is None:
+                content_type = resp_headers.get("Content-Type", "")
+                m = re.search(r"charset=[\"']?([^;\"'\s]+)", content_type, re.I)
+                extractor = state["extractor"] = TextExtractor(content_type, m.group(1) if m else None, max_tokens)
+            return extractor.feed(chunk)
+
+        cache = self.http_cache
+        if cache is None or bypass_cache:
+            resp = fetch_limited(self.engine.http(), url, headers, 12, self.fetch_max_bytes, stop_when)
         else:
-            action_stats["failure"] += 1
+            resp = cache.get(url, session=self.engine.http(), headers=headers, max_bytes=self.fetch_max_bytes,
+                             stop_when=stop_when, partial_key=f"text:{self.fetch_max_bytes}:{max_tokens}")
+        resp.raise_for_status()
+        extractor = state.get("extractor")
+        if extractor is None or extractor.bytes_fed != len(resp.content):
+            # Servido do cache (ou revalidado com 304): extrai do corpo guardado
+            state.clear()
+            for i in range(0, len(resp.content), 65536):
+                if stop_when(resp.content[i:i + 65536], resp.headers):
+                    break
+            extractor = state.get("extractor") or TextExtractor(resp.headers.get("Content-Type", ""), None, max_tokens)
+        extractor.close()
+        return resp, extractor.title, extractor.text()
 
     def _web_search_duckduckgo(self, query, max_results=5):
         """Busca no DuckDuckGo via página HTML, com parsing robusto.
@@ -1409,9 +2374,9 @@ class WarpClone:
                 return []
             q = quote_plus(query)
             url = f"https://duckduckgo.com/html/?q={q}&kp=1"
-            resp = requests.get(url, timeout=12, headers={
+            resp = self._http_get(url, headers={
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
-            })
+            }, ttl=self.search_cache_ttl)
             resp.raise_for_status()
             html = resp.text
             results = []
@@ -1460,50 +2425,29 @@ class WarpClone:
         except Exception:
             return []
 
+    def classify_command(self, command: str):
+        """Veredito estruturado (SensitiveVerdict) sobre o comando: regras disparadas e severidade."""
+        return self.engine.sensitive_classifier().classify(command or "")
+
     def _is_command_sensitive(self, command: str):
         """Retorna uma razão se o comando for sensível, senão None."""
         if not command:
             return None
-        cmd_lower = command.lower()
-        patterns = [
-            # Windows perigosos
-            "shutdown", "format", "bcdedit", "reg add", "reg delete", "diskpart",
-            "del ", "erase ", "rmdir /s", "rd /s", "cipher /w", "sdelete",
-            "net user", "net localgroup", "netsh ", "sc stop", "sc delete", "taskkill",
-            "wmic shadowcopy", "wmic process delete", "takeown", "icacls",
-            "remove-appxpackage",
-            # PowerShell perigosos
-            "remove-item", "clear-content", "stop-service", "disable-windowsoptionalfeature",
-            # Unix-like (no Windows via subsistema/compatibilidade)
-            "rm -rf", "mkfs", "mount ", "umount ", "useradd ", "groupadd ", "chmod -R", "chown -R"
-        ]
-        for p in patterns:
-            if p in cmd_lower:
-                return f"Correspondência ao padrão '{p}'"
-        # Heurística: comandos que escrevem em diretórios críticos
-        critical_paths = ["c:/windows", "c:\\windows", "/windows", "c:/", "c:\\"]
-        for cp in critical_paths:
-            if cp in cmd_lower:
-                return f"Atinge caminho crítico '{cp}'"
-        return None
+        return self.classify_command(command).reason
+
+    def _retrieve_context(self, task: str):
+        """Trechos da base para injetar antes da 1ª chamada ao modelo (None se não houver)."""
+        try:
+            return self.engine.knowledge_context(task) or None
+        except Exception:
+            return None
 
-    def _knowledge_search(self, query: str, top_k: int = 5):
-        """Busca simples por termos na pasta de conhecimento local e retorna trechos relevantes."""
+    def _knowledge_search(self, query: str, top_k: int = 5, mode: str = "hybrid"):
+        """Trechos da base de conhecimento local mais relevantes (BM25 + embeddings, fundidos por RRF)."""
         if not self.knowledge_dir.exists():
             return []
-        results = []
         try:
-            for p in self.knowledge_dir.rglob("*.md"):
-                try:
-                    text = p.read_text(encoding="utf-8", errors="ignore")
-                except Exception:
-                    continue
-                score = text.lower().count(query.lower()) if query else 0
-                if score > 0:
-                    snippet = text[:500].replace("\n", " ")
-                    results.append({"file": str(p), "score": score, "snippet": snippet})
-            results.sort(key=lambda x: x["score"], reverse=True)
-            return results[:top_k]
+            return self.engine.knowledge_base().search(query, top_k=top_k, mode=mode)
         except Exception:
             return []
 
@@ -1555,16 +2499,22 @@ class WarpClone:
 
             text = (task or "")
             t = text.lower()
+            # Uma única passada identifica as intenções embutidas e os itens da biblioteca
+            matcher = self.engine.intent_matcher()
+            matches = matcher.match(t)
+            intents = {name for name, _ in matches}
 
             # Se existir correspondência na biblioteca de comandos e nenhum plano em andamento, cria um plano
-            lib_item = self._match_command_library(t)
+            lib_item = self._library_item_from(matcher, matches)
             if lib_item and not self._offline_plan:
                 steps = []
                 for st in lib_item.get("plan", []):
                     steps.append({
                         "label": st.get("label", lib_item.get("title", "cmd")),
                         "ps": bool(st.get("powershell", False)),
-                        "command": st.get("command", "")
+                        "command": st.get("command", ""),
+                        # Só passos marcados como independentes são agrupados em lote
+                        "independent": bool(st.get("independent", False)) and not st.get("dependent", False)
                     })
                 self._offline_plan = {
                     "name": lib_item.get("id", "custom_plan"),
@@ -1577,18 +2527,26 @@ class WarpClone:
                 if os.name == "nt" and any(s.get("ps") for s in steps):
                     self.use_powershell = True
 
+            # Se recebemos resultado da ação anterior, avança o plano
+            # (a saída do passo já foi registrada em "outputs" pelo loop do agente)
+            if "a ação anterior retornou o seguinte resultado:" in t:
+                if self._offline_plan:
+                    # "pending": passos emitidos na última ação (1, ou o tamanho do lote)
+                    self._offline_plan["index"] += self._offline_plan.pop("pending", 0)
+                else:
+                    # Se não há plano e recebemos resultado, assumimos conclusão para comandos simples
+                    return json.dumps({
+                        "thought": "Recebi o resultado da ação anterior e não há plano pendente. Finalizando.",
+                        "action": "answer",
+                        "parameters": {"answer": "Ação executada com sucesso. Verifique o resultado acima."}
+                    }, ensure_ascii=False)
+
             # Execução genérica de plano (não-hardware)
             if self._offline_plan and self._offline_plan.get("name") not in (None, "hardware_audit"):
                 idx = self._offline_plan["index"]
                 steps = self._offline_plan["steps"]
                 if idx < len(steps):
-                    step = steps[idx]
-                    thought = f"Modo offline: executando passo '{step['label']}'."
-                    return json.dumps({
-                        "thought": thought,
-                        "action": "execute_command",
-                        "parameters": {"command": step["command"]}
-                    }, ensure_ascii=False)
+                    return self._offline_plan_step("Modo offline: executando passo '{label}'.")
                 else:
                     summary = "Plano concluído com sucesso. Consulte as saídas acima para detalhes."
                     self._offline_plan = None
@@ -1598,40 +2556,14 @@ class WarpClone:
                         "parameters": {"answer": summary}
                     }, ensure_ascii=False)
 
-            # Se recebemos resultado da ação anterior, atualiza o plano
-            if "a ação anterior retornou o seguinte resultado:" in t:
-                if self._offline_plan:
-                    try:
-                        # Extrai bloco após o prefixo padrão
-                        prefix = "a ação anterior retornou o seguinte resultado:\n"
-                        idx = t.find(prefix)
-                        last_output = text[idx + len(prefix):] if idx != -1 else text
-                        # Registra saída do passo
-                        self._offline_plan.setdefault("outputs", []).append(last_output)
-                        # Avança para próximo passo
-                        self._offline_plan["index"] += 1
-                    except Exception:
-                        # Mesmo em falha, tenta avançar
-                        self._offline_plan["index"] += 1
-                else:
-                    # Se não há plano e recebemos resultado, assumimos conclusão para comandos simples
-                    return json.dumps({
-                        "thought": "Recebi o resultado da ação anterior e não há plano pendente. Finalizando.",
-                        "action": "answer",
-                        "parameters": {"answer": "Ação executada com sucesso. Verifique o resultado acima."}
-                    }, ensure_ascii=False)
-
             # Detecta intenção: auditoria de hardware e ano de fabricação
-            if any(k in t for k in [
-                "caracteristicas da maquina", "características da máquina", "detalhes da maquina",
-                "ano de fabricação", "ano de fabricacao", "especificações", "hardware"
-            ]):
+            if "hardware_audit" in intents:
                 if not self._offline_plan:
                     # Monta plano multi-etapas com PowerShell (mais robusto que WMIC)
                     steps = [
-                        {"label": "systeminfo+cpu+mem", "ps": True, "command": "(systeminfo | Out-String -Width 300); (Get-CimInstance Win32_Processor | Select-Object Name, Manufacturer, MaxClockSpeed, NumberOfCores, NumberOfLogicalProcessors | Out-String -Width 300); (Get-CimInstance Win32_PhysicalMemory | Select-Object Manufacturer, PartNumber, SerialNumber, Capacity, Speed | Out-String -Width 300)"},
-                        {"label": "disks+gpu", "ps": True, "command": "(Get-CimInstance Win32_DiskDrive | Select-Object Model, Size, InterfaceType, MediaType, SerialNumber | Out-String -Width 300); (Get-CimInstance Win32_VideoController | Select-Object Name, AdapterRAM, DriverVersion, VideoProcessor | Out-String -Width 300)"},
-                        {"label": "board+bios", "ps": True, "command": "(Get-CimInstance Win32_BaseBoard | Select-Object Manufacturer, Product, SerialNumber, Version | Out-String -Width 300); (Get-CimInstance Win32_BIOS | Select-Object Manufacturer, SMBIOSBIOSVersion, ReleaseDate | Out-String -Width 300)"}
+                        {"label": "systeminfo+cpu+mem", "ps": True, "independent": True, "command": "(systeminfo | Out-String -Width 300); (Get-CimInstance Win32_Processor | Select-Object Name, Manufacturer, MaxClockSpeed, NumberOfCores, NumberOfLogicalProcessors | Out-String -Width 300); (Get-CimInstance Win32_PhysicalMemory | Select-Object Manufacturer, PartNumber, SerialNumber, Capacity, Speed | Out-String -Width 300)"},
+                        {"label": "disks+gpu", "ps": True, "independent": True, "command": "(Get-CimInstance Win32_DiskDrive | Select-Object Model, Size, InterfaceType, MediaType, SerialNumber | Out-String -Width 300); (Get-CimInstance Win32_VideoController | Select-Object Name, AdapterRAM, DriverVersion, VideoProcessor | Out-String -Width 300)"},
+                        {"label": "board+bios", "ps": True, "independent": True, "command": "(Get-CimInstance Win32_BaseBoard | Select-Object Manufacturer, Product, SerialNumber, Version | Out-String -Width 300); (Get-CimInstance Win32_BIOS | Select-Object Manufacturer, SMBIOSBIOSVersion, ReleaseDate | Out-String -Width 300)"}
                     ]
                     self._offline_plan = {"name": "hardware_audit", "steps": steps, "index": 0, "outputs": []}
                     # Para robustez em Windows, ativa powershell para comandos PS
@@ -1641,13 +2573,7 @@ class WarpClone:
                 idx = self._offline_plan["index"]
                 steps = self._offline_plan["steps"]
                 if idx < len(steps):
-                    step = steps[idx]
-                    thought = f"Modo offline: coletando informações de {step['label']}."
-                    return json.dumps({
-                        "thought": thought,
-                        "action": "execute_command",
-                        "parameters": {"command": step["command"]}
-                    }, ensure_ascii=False)
+                    return self._offline_plan_step("Modo offline: coletando informações de {label}.")
                 else:
                     # Finaliza com um resumo e estimativa de ano baseada no BIOS ReleaseDate
                     year_hint = self._offline_estimate_year(self._offline_plan.get("outputs", []))
@@ -1661,7 +2587,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Criar arquivo
-            if any(k in t for k in ["criar arquivo", "create file", "novo arquivo"]):
+            if "create_file" in intents:
                 # Usa a primeira string entre aspas como caminho e a segunda (se houver) como conteúdo
                 quotes = re.findall(r"\"([^\"]+)\"", task or "")
                 if quotes:
@@ -1680,7 +2606,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Deletar arquivo
-            if any(k in t for k in ["deletar arquivo", "apagar arquivo", "remover arquivo", "delete file", "remove file"]):
+            if "delete_file" in intents:
                 m = re.search(r'\"([^\"]+)\"', task or "")
                 if m:
                     path = m.group(1)
@@ -1697,7 +2623,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Listar diretório com caminho
-            if any(k in t for k in ["listar diretório", "listar diretorio", "listar pasta", "list directory"]):
+            if "list_dir_path" in intents:
                 m = re.search(r'\"([^\"]+)\"', task or "")
                 recursive = bool("recurs" in t)
                 if m:
@@ -1714,7 +2640,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Criar diretório
-            if any(k in t for k in ["criar diretório", "criar diretorio", "create directory", "make dir", "mkdir"]):
+            if "create_dir" in intents:
                 m = re.findall(r'\"([^\"]+)\"', task or "")
                 if m:
                     return json.dumps({
@@ -1730,7 +2656,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Deletar diretório
-            if any(k in t for k in ["deletar diretório", "apagar diretório", "remover diretório", "delete directory", "remove directory"]):
+            if "delete_dir" in intents:
                 m = re.findall(r'\"([^\"]+)\"', task or "")
                 recursive = bool("recurs" in t or "tudo" in t or "conteúdo" in t)
                 if m:
@@ -1747,12 +2673,21 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Copiar arquivo
-            if any(k in t for k in ["copiar arquivo", "copy file"]):
+            if "describe_dataset" in intents:
+                quotes = re.findall(r'\"([^\"]+)\"', task or "")
+                if quotes and Path(quotes[0]).is_file():
+                    return json.dumps({
+                        "thought": "Modo offline: resumo estatístico do arquivo.",
+                        "action": "describe_dataset",
+                        "parameters": {"path": quotes[0]}
+                    }, ensure_ascii=False)
+
+            if "copy_file" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
                         "thought": "Modo offline: copiando arquivo de origem para destino.",
-                        "action": "copy_file",
+                        "action": "copy_tree" if Path(quotes[0]).is_dir() else "copy_file",
                         "parameters": {"src": quotes[0], "dst": quotes[1]}
                     }, ensure_ascii=False)
                 else:
@@ -1763,7 +2698,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Mover arquivo
-            if any(k in t for k in ["mover arquivo", "move file"]):
+            if "move_file" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
@@ -1779,7 +2714,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Renomear arquivo
-            if any(k in t for k in ["renomear arquivo", "rename file"]):
+            if "rename_file" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
@@ -1795,7 +2730,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Anexar conteúdo
-            if any(k in t for k in ["anexar", "append", "adicionar ao arquivo"]):
+            if "append_file" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
                     path = quotes[0]
@@ -1813,13 +2748,19 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Hash de arquivo
-            if any(k in t for k in ["hash", "checksum", "sha256"]):
+            if "file_hash" in intents:
                 m = re.search(r'\"([^\"]+)\"', task or "")
                 algo = "sha256"
                 if "md5" in t:
                     algo = "md5"
                 elif "sha1" in t:
                     algo = "sha1"
+                if m and Path(m.group(1)).is_dir():
+                    return json.dumps({
+                        "thought": "Modo offline: calculando hash dos arquivos da pasta.",
+                        "action": "hash_tree",
+                        "parameters": {"path": m.group(1), "algorithms": [algo]}
+                    }, ensure_ascii=False)
                 if m:
                     return json.dumps({
                         "thought": "Modo offline: calculando hash do arquivo.",
@@ -1834,7 +2775,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Criar ZIP
-            if any(k in t for k in ["zip", "zipar", "criar zip"]):
+            if "zip_create" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
@@ -1850,7 +2791,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Extrair ZIP
-            if any(k in t for k in ["extrair zip", "unzip", "descompactar"]):
+            if "zip_extract" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
@@ -1866,7 +2807,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Download de arquivo
-            if any(k in t for k in ["baixar", "download"]):
+            if "download_file" in intents:
                 url_match = re.search(r"https?://\S+", task or "")
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 dest = quotes[-1] if quotes else ""
@@ -1884,7 +2825,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Processos
-            if any(k in t for k in ["listar processos", "processos", "process list"]):
+            if "list_processes" in intents:
                 return json.dumps({
                     "thought": "Modo offline: listando processos em execução.",
                     "action": "list_processes",
@@ -1892,7 +2833,7 @@ class WarpClone:
                 }, ensure_ascii=False)
 
             # Encerrar processo
-            if any(k in t for k in ["encerrar processo", "matar processo", "kill process", "terminar processo"]):
+            if "kill_process" in intents:
                 pid_match = re.search(r"pid\s*(\d+)", t)
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if pid_match:
@@ -1915,7 +2856,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Serviços (Windows)
-            if any(k in t for k in ["listar serviços", "servicos", "list services"]):
+            if "list_services" in intents:
                 filt = ""
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
@@ -1926,7 +2867,7 @@ class WarpClone:
                     "parameters": {"filter": filt}
                 }, ensure_ascii=False)
 
-            if any(k in t for k in ["iniciar serviço", "start service"]):
+            if "start_service" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
                     return json.dumps({
@@ -1935,7 +2876,7 @@ class WarpClone:
                         "parameters": {"name": quotes[0]}
                     }, ensure_ascii=False)
 
-            if any(k in t for k in ["parar serviço", "stop service"]):
+            if "stop_service" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
                     return json.dumps({
@@ -1945,7 +2886,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Tarefas agendadas (Windows)
-            if any(k in t for k in ["tarefas agendadas", "scheduled tasks", "listar tarefas"]):
+            if "list_scheduled_tasks" in intents:
                 return json.dumps({
                     "thought": "Modo offline: listando tarefas agendadas.",
                     "action": "list_scheduled_tasks",
@@ -1953,28 +2894,28 @@ class WarpClone:
                 }, ensure_ascii=False)
 
             # Rede
-            if any(k in t for k in ["conexões de rede", "network connections", "listar conexões"]):
+            if "list_network_connections" in intents:
                 return json.dumps({
                     "thought": "Modo offline: listando conexões de rede.",
                     "action": "list_network_connections",
                     "parameters": {}
                 }, ensure_ascii=False)
 
-            if any(k in t for k in ["portas abertas", "open ports", "escuta"]):
+            if "open_ports" in intents:
                 return json.dumps({
                     "thought": "Modo offline: mostrando portas em escuta.",
                     "action": "open_ports",
                     "parameters": {}
                 }, ensure_ascii=False)
 
-            if any(k in t for k in ["firewall", "estado do firewall"]):
+            if "firewall_state" in intents:
                 return json.dumps({
                     "thought": "Modo offline: consultando estado do firewall.",
                     "action": "firewall_state",
                     "parameters": {}
                 }, ensure_ascii=False)
 
-            if any(k in t for k in ["ping", "teste de latência"]):
+            if "ping_host" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 host = quotes[0] if quotes else (re.search(r"\b([\w\.-]+\.[\w\.-]+|\d+\.\d+\.\d+\.\d+)\b", t) or [None])[0]
                 count_match = re.search(r"\b(\d+)\s*vezes|\b(\d+)\b", t)
@@ -1992,7 +2933,7 @@ class WarpClone:
                         "parameters": {"answer": "Informe um host/IP para ping (ex.: \"8.8.8.8\")."}
                     }, ensure_ascii=False)
 
-            if any(k in t for k in ["traceroute", "tracert", "rota"]):
+            if "traceroute_host" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 host = quotes[0] if quotes else (re.search(r"\b([\w\.-]+\.[\w\.-]+|\d+\.\d+\.\d+\.\d+)\b", t) or [None])[0]
                 if host:
@@ -2009,7 +2950,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Variáveis de ambiente
-            if any(k in t for k in ["obter variável", "get env", "ler variável de ambiente"]):
+            if "get_env" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
                     return json.dumps({
@@ -2018,7 +2959,7 @@ class WarpClone:
                         "parameters": {"name": quotes[0]}
                     }, ensure_ascii=False)
 
-            if any(k in t for k in ["definir variável", "set env", "exportar variável"]):
+            if "set_env" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 2:
                     return json.dumps({
@@ -2028,7 +2969,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Registro do Windows
-            if any(k in t for k in ["ler registro", "read registry", "consultar registro"]):
+            if "read_registry" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if quotes:
                     return json.dumps({
@@ -2037,7 +2978,7 @@ class WarpClone:
                         "parameters": {"path": quotes[0]}
                     }, ensure_ascii=False)
 
-            if any(k in t for k in ["escrever registro", "write registry", "definir chave"]):
+            if "write_registry" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 if len(quotes) >= 3:
                     return json.dumps({
@@ -2047,7 +2988,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Regex
-            if any(k in t for k in ["regex", "expressão regular", "expressao regular"]):
+            if "search_regex" in intents:
                 quotes = re.findall(r'\"([^\"]+)\"', task or "")
                 ext = ""
                 mext = re.search(r"\.\w+", t)
@@ -2061,7 +3002,7 @@ class WarpClone:
                     }, ensure_ascii=False)
 
             # Analisar sistema e telemetria
-            if any(k in t for k in ["analisar sistema", "auditoria", "telemetria", "analyze system", "system audit"]):
+            if "analyze_system" in intents:
                 return json.dumps({
                     "thought": "Modo offline: coletando análise detalhada do sistema.",
                     "action": "analyze_system",
@@ -2069,7 +3010,7 @@ class WarpClone:
                 }, ensure_ascii=False)
 
             # Listar arquivos
-            if any(k in t for k in ["listar", "arquivos", "dir", "ls", "listar arquivos"]):
+            if "list_files" in intents:
                 cmd = "dir" if os.name == "nt" else "ls -la"
                 return json.dumps({
                     "thought": "Modo offline: vou listar arquivos usando comando do sistema.",
@@ -2078,7 +3019,7 @@ class WarpClone:
                 }, ensure_ascii=False)
 
             # Buscar conhecimento local
-            if any(k in t for k in ["comando", "windows", "conhecimento", "ajuda", "manual"]):
+            if "knowledge_search" in intents:
                 return json.dumps({
                     "thought": "Modo offline: vou consultar base de conhecimento local.",
                     "action": "knowledge_search",
@@ -2087,7 +3028,7 @@ class WarpClone:
 
             # Buscar URL
             url_match = re.search(r"https?://\S+", task or "")
-            if any(k in t for k in ["web", "url", "http", "https"]) or url_match:
+            if "fetch_url" in intents or url_match:
                 url = url_match.group(0) if url_match else ""
                 if url:
                     return json.dumps({
@@ -2115,6 +3056,32 @@ class WarpClone:
                 "parameters": {"answer": "Ocorreu um erro ao decidir ação em modo offline."}
             }, ensure_ascii=False)
 
+    def _offline_plan_step(self, thought_template: str) -> str:
+        """Ação para o próximo trecho do plano offline: um passo isolado ou, se houver
+        passos independentes consecutivos, um lote `execute_batch` com todos eles."""
+        plan = self._offline_plan
+        steps = plan["steps"]
+        idx = plan["index"]
+        end = idx + 1
+        if steps[idx].get("independent"):
+            while end < len(steps) and steps[end].get("independent"):
+                end += 1
+        plan["pending"] = end - idx
+        if end - idx == 1:
+            step = steps[idx]
+            return json.dumps({
+                "thought": thought_template.format(label=step["label"]),
+                "action": "execute_command",
+                "parameters": {"command": step["command"]}
+            }, ensure_ascii=False)
+        batch = steps[idx:end]
+        labels = ", ".join(st["label"] for st in batch)
+        return json.dumps({
+            "thought": thought_template.format(label=labels) + " Passos independentes executados em paralelo.",
+            "action": "execute_batch",
+            "parameters": {"commands": [{"label": st["label"], "command": st["command"]} for st in batch]}
+        }, ensure_ascii=False)
+
     def _offline_estimate_year(self, outputs: list[str]) -> str:
         try:
             text = "\n".join(outputs)
@@ -2153,7 +3120,7 @@ class WarpClone:
     def _is_ollama_running(self):
         try:
             base = self._ollama_base_url()
-            r = requests.get(f"{base}/api/tags", timeout=3)
+            r = self.engine.http().get(f"{base}/api/tags", timeout=3)
             return r.status_code == 200
         except Exception:
             return False
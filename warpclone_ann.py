@@ -0,0 +1,233 @@
+"""
+Índice aproximado de vizinhos mais próximos (IVF) para os vetores da base de conhecimento.
+
+Com centenas de milhares de trechos, comparar a consulta com todos os vetores passa a
+dominar o ``knowledge_search``. O IVF (inverted file) divide os vetores em `nlist` grupos
+por k-means esférico. Cada busca compara a consulta só com os centróides e com os vetores
+dos `nprobe` grupos mais próximos. `nprobe` controla o compromisso: mais grupos, mais recall
+e mais latência. Com ``nprobe == nlist`` a busca é exata.
+
+Em disco (``directory``), ``meta.json`` aponta para a geração atual ``g<n>/``, com:
+- ``centroids.f32``: centróides (``nlist x dim``);
+- ``lists.f32``: vetores reordenados por grupo, cada grupo contíguo;
+- ``ids.i64``: linha original de cada vetor de ``lists.f32``;
+- ``offsets.i64``: início de cada grupo (``nlist + 1``).
+
+Tudo é aberto via memmap, então carregar o índice não lê os vetores. Cada reconstrução grava
+uma geração nova e só então troca o ``meta.json``: buscas em andamento continuam na anterior,
+e no Windows nenhum arquivo mapeado precisa ser sobrescrito.
+
+Inserção incremental: linhas novas da matriz de origem (sempre acrescentadas no fim) formam
+uma cauda buscada por força bruta. Quando a cauda passa de `merge_fraction` das linhas
+indexadas, ela é distribuída nos grupos existentes. Quando a base cresce `retrain_factor`
+vezes desde o treino, os centróides são recalculados.
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+
+np = lazy_import("numpy", optional=True)
+
+_BLOCK = 65536
+
+
+def default_nlist(rows: int) -> int:
+    """~4·√N grupos (entre 16 e 4096): grupos de algumas centenas de vetores."""
+    return int(min(4096, max(16, 4 * math.sqrt(max(rows, 1)))))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _assign(matrix, centroids) -> "np.ndarray":
+    """Grupo (centróide de maior cosseno) de cada linha, em blocos."""
+    labels = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], _BLOCK):
+        block = np.asarray(matrix[start:start + _BLOCK], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(matrix, nlist: int, iterations: int = 8, sample: int = 40, seed: int = 0):
+    """k-means esférico sobre uma amostra de até ``nlist * sample`` linhas."""
+    rng = np.random.default_rng(seed)
+    rows = matrix.shape[0]
+    take = min(rows, nlist * sample)
+    picks = np.sort(rng.choice(rows, size=take, replace=False)) if take < rows else np.arange(rows)
+    data = np.asarray(matrix[picks], dtype=np.float32)
+    nlist = min(nlist, len(data))
+    centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(data, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        # Soma por grupo: ordena por rótulo e soma cada faixa contígua
+        order = np.argsort(labels, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(data[order], starts[filled])
+        empty = counts == 0
+        if empty.any():
+            # Grupo vazio recebe um ponto aleatório e volta a competir na próxima iteração
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+class IvfIndex:
+    """IVF persistido em `directory` sobre uma matriz de vetores normalizados (``rows x dim``)."""
+
+    def __init__(self, directory, nlist: int = 0, nprobe: int = 8, merge_fraction: float = 0.1,
+                 retrain_factor: float = 4.0, min_tail_merge: int = 10000):
+        self.dir = Path(directory)
+        self.nlist = int(nlist)
+        self.nprobe = max(1, int(nprobe))
+        self.merge_fraction = float(merge_fraction)
+        self.retrain_factor = float(retrain_factor)
+        self.min_tail_merge = int(min_tail_merge)
+        self.lock = threading.Lock()
+        self.meta = None
+        self._arrays = None
+
+    # --- disco ---
+    def load(self) -> bool:
+        """Abre o índice gravado (memmap). Retorna False se não existir ou estiver incompleto."""
+        with self.lock:
+            try:
+                meta = json.loads((self.dir / "meta.json").read_text(encoding="utf-8"))
+                dim, nlist, rows = meta["dim"], meta["nlist"], meta["rows"]
+                gen = self.dir / f"g{meta['generation']}"
+                self._arrays = {
+                    "centroids": np.memmap(gen / "centroids.f32", dtype=np.float32, mode="r", shape=(nlist, dim)),
+                    "lists": np.memmap(gen / "lists.f32", dtype=np.float32, mode="r", shape=(rows, dim)),
+                    "ids": np.memmap(gen / "ids.i64", dtype=np.int64, mode="r", shape=(rows,)),
+                    "offsets": np.fromfile(gen / "offsets.i64", dtype=np.int64),
+                }
+                if len(self._arrays["offsets"]) != nlist + 1:
+                    raise ValueError("offsets")
+                self.meta = meta
+                return True
+            except (OSError, ValueError, KeyError):
+                self.meta = self._arrays = None
+                return False
+
+    def reset(self):
+        """Descarta o índice (por exemplo, depois que a matriz de origem foi compactada)."""
+        with self.lock:
+            self.meta = self._arrays = None
+            try:
+                (self.dir / "meta.json").unlink()
+            except OSError:
+                pass
+
+    def _write(self, centroids, labels, source, rows: int, trained_rows: int):
+        """Grava grupos ordenados a partir de `labels` (grupo de cada linha ``0..rows-1``)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        nlist, dim = centroids.shape
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        generations = [int(d.name[1:]) for d in self.dir.glob("g*") if d.name[1:].isdigit()]
+        generation = max(generations, default=0) + 1
+        gen = self.dir / f"g{generation}"
+        gen.mkdir()
+        centroids.astype(np.float32).tofile(gen / "centroids.f32")
+        order.astype(np.int64).tofile(gen / "ids.i64")
+        offsets.tofile(gen / "offsets.i64")
+        with open(gen / "lists.f32", "wb") as out:
+            for start in range(0, rows, _BLOCK):
+                out.write(np.ascontiguousarray(source[order[start:start + _BLOCK]], dtype=np.float32).tobytes())
+        meta = {"version": 1, "generation": generation, "dim": int(dim), "nlist": int(nlist),
+                "rows": int(rows), "trained_rows": int(trained_rows)}
+        tmp = self.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.dir / "meta.json")
+        for old in generations:
+            # Pode falhar no Windows se ainda mapeada; a próxima gravação tenta de novo
+            shutil.rmtree(self.dir / f"g{old}", ignore_errors=True)
+
+    # --- construção e atualização ---
+    def build(self, matrix):
+        """Treina os centróides e indexa todas as linhas de `matrix`."""
+        rows = matrix.shape[0]
+        centroids = train_centroids(matrix, self.nlist or default_nlist(rows))
+        with self.lock:
+            self._write(centroids, _assign(matrix, centroids), matrix, rows, rows)
+        self.load()
+
+    def update(self, matrix) -> str:
+        """Acompanha `matrix` (só cresce no fim). Retorna "build", "merge" ou "" (nada a fazer)."""
+        rows = matrix.shape[0]
+        if self.meta is None and not self.load():
+            self.build(matrix)
+            return "build"
+        indexed, trained = self.meta["rows"], self.meta["trained_rows"]
+        if rows < indexed or matrix.shape[1] != self.meta["dim"]:
+            self.build(matrix)
+            return "build"
+        if rows >= trained * self.retrain_factor:
+            self.build(matrix)
+            return "build"
+        tail = rows - indexed
+        if tail < max(self.min_tail_merge, indexed * self.merge_fraction):
+            return ""
+        with self.lock:
+            arrays = self._arrays
+            centroids = np.array(arrays["centroids"])
+            labels = np.empty(rows, dtype=np.int64)
+            # Grupos atuais das linhas indexadas saem dos offsets; a cauda é atribuída agora
+            labels[np.asarray(arrays["ids"])] = np.repeat(np.arange(len(arrays["offsets"]) - 1),
+                                                          np.diff(arrays["offsets"]))
+            labels[indexed:] = _assign(matrix[indexed:rows], centroids)
+            del arrays
+            self._write(centroids, labels, matrix, rows, trained)
+        self.load()
+        return "merge"
+
+    # --- busca ---
+    def search(self, query, matrix, k: int, nprobe: int = 0, valid=None) -> tuple:
+        """``(linhas, scores)`` dos `k` vetores mais próximos de `query`, melhor primeiro.
+
+        `matrix` é a matriz de origem (para a cauda ainda não indexada). `valid`, opcional,
+        é uma máscara booleana por linha; linhas falsas são ignoradas.
+        """
+        with self.lock:
+            arrays, meta = self._arrays, self.meta
+        if arrays is None:
+            raise RuntimeError("índice IVF não carregado")
+        nprobe = max(1, min(int(nprobe or self.nprobe), meta["nlist"]))
+        centroid_scores = arrays["centroids"] @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        offsets = arrays["offsets"]
+        ids, scores = [], []
+        for group in probes:
+            start, end = offsets[group], offsets[group + 1]
+            if end > start:
+                ids.append(np.asarray(arrays["ids"][start:end]))
+                scores.append(arrays["lists"][start:end] @ query)
+        indexed = meta["rows"]
+        for start in range(indexed, matrix.shape[0], _BLOCK):
+            block = matrix[start:min(start + _BLOCK, matrix.shape[0])]
+            ids.append(np.arange(start, start + len(block)))
+            scores.append(block @ query)
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if valid is not None:
+            keep = valid[ids]
+            ids, scores = ids[keep], scores[keep]
+        k = min(k, len(ids))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
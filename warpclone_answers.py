@@ -0,0 +1,288 @@
+"""
+Cache de respostas finais por tarefa (``execute_task``).
+
+Operadores repetem as mesmas perguntas ("analise o sistema", "liste processos"). Em vez de
+rodar o loop inteiro de novo, a resposta final é reaproveitada enquanto as evidências que a
+produziram continuam válidas:
+- cada ação usada na tarefa tem uma validade em segundos (`freshness`). A lista de
+  processos vale segundos, o inventário de hardware vale dias, e a entrada vale pelo menor
+  prazo entre as ações usadas;
+- ações com efeito colateral (gravar, apagar, encerrar processo...) têm validade 0. A
+  tarefa não é guardada, porque repetir a resposta pularia o efeito. Ações desconhecidas
+  também valem 0, assim como respostas diretas, sem nenhuma evidência (``answer``), que
+  costumam depender da conversa;
+- ``execute_command`` e ``execute_batch`` usam regras por expressão regular casadas a partir
+  do início do comando (`command_rules`). Só vale uma invocação isolada: comandos com ``;``,
+  ``&&``, ``||``, ``|``, redirecionamento ou subexpressão, e comandos sem regra, não são
+  guardados;
+- arquivos e pastas citados nos parâmetros (``path``, ``manifest``) têm tamanho e mtime
+  anotados. Se mudarem, a entrada é descartada.
+
+A chave é o texto da tarefa normalizado (minúsculas, sem acentos nem pontuação) dentro de
+um escopo (`scope`). O chamador usa escopo vazio para a tarefa que abre a conversa e, depois
+dela, a sessão mais as tarefas anteriores que o modelo vê: a resposta só é reaproveitada na
+mesma conversa, com o mesmo contexto. Com um embedder e `similarity` > 0, uma tarefa escrita
+de outro jeito também reaproveita a resposta se o cosseno com uma tarefa guardada no mesmo
+escopo passar do limiar.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from warpclone_knowledge import EmbeddingError, fold
+from warpclone_lazy import lazy_import
+
+np = lazy_import("numpy", optional=True)
+
+_MINUTE, _HOUR, _DAY = 60, 3600, 86400
+
+# Validade por ação, em segundos (0 = não guarda)
+DEFAULT_FRESHNESS = {
+    "answer": 0,  # resposta direta, sem evidência: depende do que foi dito antes
+    "list_processes": 10,
+    "list_network_connections": 10,
+    "open_ports": 30,
+    "ping_host": _MINUTE,
+    "list_services": _MINUTE,
+    "analyze_system": 5 * _MINUTE,
+    "traceroute_host": 5 * _MINUTE,
+    "search_files": 5 * _MINUTE,
+    "search_content": 5 * _MINUTE,
+    "search_regex": 5 * _MINUTE,
+    "list_scheduled_tasks": 10 * _MINUTE,
+    "firewall_state": 10 * _MINUTE,
+    "list_dir": _HOUR,
+    "read_file": _HOUR,
+    "query_table": _HOUR,
+    "describe_dataset": _HOUR,
+    "file_hash": _HOUR,
+    "hash_tree": _HOUR,
+    "knowledge_search": _HOUR,
+    "web_search": _HOUR,
+    "fetch_url": _HOUR,
+    "get_env": _HOUR,
+    "read_registry": _HOUR,
+}
+
+# (regex casada a partir do início do comando, validade): vale o menor prazo entre as regras
+# que casam. Termina em (?=\s|$) quando qualquer argumento é só leitura, e em $ quando algum
+# argumento altera o sistema (ipconfig /release, hostname novo-nome, ip addr add...)
+DEFAULT_COMMAND_RULES = [
+    (r"(tasklist|get-process|gps|ps|top|wmic\s+process\s+(list|get))(?=\s|$)", 10),
+    (r"(netstat|get-nettcpconnection|ss)(?=\s|$)", 10),
+    (r"arp(\s+-[an]+)*$", 10),
+    (r"(ipconfig(\s+/all)?|ifconfig(\s+-a)?|ip(\s+-\w+)*\s+(a|addr|address|r|route|l|link)(\s+(show|list))?"
+     r"|hostname|whoami(\s+/\w+)*)$", 10 * _MINUTE),
+    (r"get-netipaddress(?=\s|$)", 10 * _MINUTE),
+    (r"(systeminfo|get-computerinfo|uname|ver)(?=\s|$)", _DAY),
+    (r"((get-ciminstance|get-wmiobject|gcim|gwmi)(\s+-class(name)?)?\s+win32_(processor|physicalmemory|diskdrive"
+     r"|videocontroller|baseboard|bios|computersystemproduct)|lscpu|lshw|dmidecode)(?=\s|$)", 7 * _DAY),
+    (r"wmic\s+(cpu|bios|baseboard|memorychip|diskdrive)(\s+(get|list)(\s+[\w,]+)*)?$", 7 * _DAY),
+]
+# Mais de uma invocação, redirecionamento ou subexpressão: a regra do primeiro comando não
+# diz nada sobre os outros
+_COMPOUND_RE = re.compile(r"[;&|<>`\n\r()]|\$\(")
+
+_PATH_KEYS = ("path", "manifest")
+_MAX_LAST_CHARS = 8192  # resultado da última ação guardado junto da resposta
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_task(task: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços colapsados."""
+    return " ".join(_PUNCT_RE.sub(" ", fold(task or "")).split())
+
+
+def _entry_key(scope: str, text: str) -> str:
+    return f"{scope}\n{text}" if scope else text
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+
+class AnswerCache:
+    """Respostas finais por tarefa, em um JSON com LRU de `max_entries`."""
+
+    def __init__(self, path, max_entries: int = 200, freshness: dict | None = None,
+                 command_rules: list | None = None, embedder=None, similarity: float = 0.0):
+        self.path = Path(path)
+        self.max_entries = int(max_entries)
+        self.freshness = {**DEFAULT_FRESHNESS, **(freshness or {})}
+        rules = DEFAULT_COMMAND_RULES if command_rules is None else command_rules
+        self.command_rules = [(re.compile(pattern, re.IGNORECASE), float(sec)) for pattern, sec in rules]
+        self.embedder = embedder if np is not None else None
+        self.similarity = float(similarity)
+        self.lock = threading.Lock()
+        self._entries = None
+        self._vectors = OrderedDict()  # tarefa normalizada -> vetor (evita embutir duas vezes)
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "expired": 0, "stored": 0, "skipped": 0}
+
+    # --- validade ---
+    def command_ttl(self, command: str) -> float:
+        command = (command or "").strip()
+        if not command or _COMPOUND_RE.search(command):
+            return 0.0
+        ttls = [sec for pattern, sec in self.command_rules if pattern.match(command)]
+        return min(ttls) if ttls else 0.0
+
+    def ttl_for(self, steps: list) -> float:
+        """Validade de uma resposta obtida com `steps` (``[{"action", "parameters"}]``)."""
+        ttls = []
+        for step in steps:
+            action = step.get("action")
+            params = step.get("parameters") or {}
+            if action == "answer":
+                continue
+            if action == "execute_command":
+                ttls.append(self.command_ttl(params.get("command")))
+            elif action == "execute_batch":
+                for item in params.get("commands") or [None]:
+                    ttls.append(self.command_ttl(item.get("command") if isinstance(item, dict) else item))
+            else:
+                ttls.append(float(self.freshness.get(action, 0)))
+        return min(ttls) if ttls else float(self.freshness.get("answer", 0))
+
+    # --- persistência ---
+    def _load(self):
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8")) or {}
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def _save(self):
+        payload = json.dumps(self._entries, ensure_ascii=False)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    # --- similaridade ---
+    def _vector(self, key: str):
+        if self.embedder is None or self.similarity <= 0:
+            return None
+        vector = self._vectors.pop(key, None)
+        if vector is None:
+            try:
+                vector = self.embedder.embed([key])[0]
+            except (EmbeddingError, IndexError):
+                return None
+        self._vectors[key] = vector
+        while len(self._vectors) > 64:
+            self._vectors.popitem(last=False)
+        return vector
+
+    def _nearest(self, key: str, scope: str):
+        """Chave guardada no mesmo escopo mais parecida com `key` (cosseno >= `similarity`)."""
+        vector = self._vector(key)
+        if vector is None:
+            return None
+        best, best_score = None, self.similarity
+        with self.lock:
+            for other, entry in self._entries.items():
+                if entry.get("scope", "") != scope:
+                    continue
+                stored = entry.get("vector")
+                if stored is None or len(stored) != len(vector):
+                    continue
+                score = float(np.dot(vector, np.asarray(stored, dtype=np.float32)))
+                if score >= best_score:
+                    best, best_score = other, score
+        return best
+
+    # --- consulta e gravação ---
+    def _valid(self, entry: dict, now: float) -> bool:
+        if entry["expires"] <= now:
+            return False
+        return all(_stamp(p) == stamp for p, stamp in entry.get("files", {}).items())
+
+    def lookup(self, task: str, scope: str = ""):
+        """``{"answer", "last", "age_sec", "matched"}`` se houver resposta válida para `task`
+        no escopo `scope`."""
+        text = normalize_task(task)
+        if not text:
+            return None
+        key = _entry_key(scope, text)
+        now = time.time()
+        with self.lock:
+            self._load()
+            entry = self._entries.get(key)
+        semantic = False
+        if entry is None:
+            other = self._nearest(text, scope)
+            if other is not None:
+                with self.lock:
+                    entry = self._entries.get(other)
+                key, semantic = other, True
+        with self.lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if not self._valid(entry, now):
+                self._entries.pop(key, None)
+                self.stats["expired"] += 1
+                self._save()
+                return None
+            self._entries.pop(key, None)
+            self._entries[key] = entry  # mais recente no fim
+            self.stats["semantic_hits" if semantic else "hits"] += 1
+            return {"answer": entry["answer"], "last": entry.get("last"),
+                    "age_sec": round(now - entry["created"], 1), "matched": entry["task"]}
+
+    def store(self, task: str, answer: str, last, steps: list, scope: str = "") -> bool:
+        """Guarda a resposta no escopo `scope` se todas as ações usadas tiverem validade > 0."""
+        text = normalize_task(task)
+        key = _entry_key(scope, text)
+        ttl = self.ttl_for(steps)
+        if not text or ttl <= 0:
+            with self.lock:
+                self.stats["skipped"] += 1
+            return False
+        files = {}
+        for step in steps:
+            params = step.get("parameters") or {}
+            for name in _PATH_KEYS:
+                value = params.get(name)
+                if isinstance(value, str) and value:
+                    path = os.path.abspath(value)
+                    files[path] = _stamp(path)
+        now = time.time()
+        if isinstance(last, str):
+            last = last[:_MAX_LAST_CHARS]
+        entry = {"task": task, "answer": answer, "last": last, "created": now, "expires": now + ttl,
+                 "files": files, "scope": scope}
+        vector = self._vector(text)
+        if vector is not None:
+            entry["vector"] = [round(float(v), 4) for v in vector]
+        with self.lock:
+            self._load()
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self.stats["stored"] += 1
+            self._save()
+        return True
+
+    def invalidate(self, task: str | None = None, scope: str = ""):
+        """Descarta a resposta de `task` no escopo `scope`, ou todas."""
+        with self.lock:
+            self._load()
+            if task is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(_entry_key(scope, normalize_task(task)), None)
+            self._save()
@@ -0,0 +1,314 @@
+"""
+Criação de ZIP em vários núcleos e extração em streaming.
+
+``create_zip`` comprime os membros em um pool de processos (deflate "raw", o mesmo formato
+que o ``zipfile`` grava) e o processo principal monta o arquivo na ordem original,
+copiando os dados já comprimidos. Nenhum arquivo é mantido inteiro em memória: membros
+grandes são comprimidos para um arquivo temporário e copiados em blocos; membros pequenos
+são agrupados em uma única tarefa para diluir o custo de despacho. Formatos que já são
+comprimidos (jpg, zip, pdf, ...) são gravados sem compressão (``ZIP_STORED``).
+
+``extract_zip`` extrai membro a membro (com a sanitização de caminhos do ``zipfile``),
+com filtros por glob e callback de progresso.
+"""
+
+import fnmatch
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+_COPY_CHUNK = 1024 * 1024
+# Membros acima deste tamanho são comprimidos para arquivo temporário (não voltam via pickle)
+_INLINE_LIMIT = 4 * 1024 * 1024
+# Tamanho alvo de cada lote de membros pequenos enviado ao pool
+_BATCH_BYTES = 8 * 1024 * 1024
+# Acima disto tamanhos e deslocamentos vão para o campo extra ZIP64
+_ZIP32_MAX = 0xFFFFFFFF
+
+STORE_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".cab", ".jar", ".whl", ".apk",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".epub",
+    ".mp3", ".aac", ".ogg", ".opus", ".flac", ".m4a", ".mp4", ".mkv", ".avi", ".mov", ".webm",
+})
+
+
+def _matches(rel: str, patterns) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _as_list(value) -> list:
+    return [value] if isinstance(value, str) else list(value or [])
+
+
+def _compress_member(path: str, method: int, level: int, tmp_dir: str):
+    """Comprime (ou só calcula o CRC de) um arquivo.
+
+    Retorna ``(crc, tamanho, tamanho_comprimido, dados | caminho_temporário | None)``:
+    bytes para membros pequenos, caminho para membros grandes e None para ZIP_STORED
+    (os dados são copiados do próprio arquivo de origem).
+    """
+    crc = size = 0
+    if method == zipfile.ZIP_STORED:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+        return crc, size, size, None
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    parts, inline_len, out = [], 0, None
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                data = comp.compress(chunk)
+                if not data:
+                    continue
+                if out is None and inline_len + len(data) > _INLINE_LIMIT:
+                    fd, tmp_path = tempfile.mkstemp(prefix="zipmember-", dir=tmp_dir)
+                    out = os.fdopen(fd, "wb")
+                    out.writelines(parts)
+                    parts = []
+                if out is None:
+                    parts.append(data)
+                    inline_len += len(data)
+                else:
+                    out.write(data)
+        tail = comp.flush()
+        if out is None:
+            parts.append(tail)
+            data = b"".join(parts)
+            return crc, size, len(data), data
+        out.write(tail)
+        csize = out.tell()
+        out.close()
+        return crc, size, csize, tmp_path
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.unlink(tmp_path)
+        raise
+
+
+def _compress_batch(items, level: int, tmp_dir: str) -> list:
+    return [_compress_member(path, method, level, tmp_dir) for path, method in items]
+
+
+def _plan_members(source: Path, include, exclude, store_extensions):
+    """Lista ``(caminho, nome_no_zip, método, tamanho)`` na ordem do caminho relativo."""
+    include, exclude = _as_list(include), _as_list(exclude)
+    if source.is_file():
+        candidates = [(source, source.name)]
+    else:
+        candidates = []
+        for dirpath, dirnames, filenames in os.walk(source):
+            rel_dir = Path(dirpath).relative_to(source).as_posix()
+            prefix = "" if rel_dir == "." else rel_dir + "/"
+            dirnames[:] = sorted(d for d in dirnames if not (exclude and _matches(prefix + d, exclude)))
+            for name in sorted(filenames):
+                rel = prefix + name
+                if include and not _matches(rel, include):
+                    continue
+                if exclude and _matches(rel, exclude):
+                    continue
+                candidates.append((Path(dirpath) / name, rel))
+    members = []
+    for path, rel in candidates:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            continue
+        stored = path.suffix.lower() in store_extensions
+        members.append((path, rel, zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED, size))
+    return members
+
+
+def _batches(members):
+    """Agrupa membros pequenos consecutivos; membros grandes vão sozinhos."""
+    batch, batch_bytes = [], 0
+    for i, member in enumerate(members):
+        size = member[3]
+        if batch and (batch_bytes + size > _BATCH_BYTES or size >= _BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(i)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+class _ZipWriter:
+    """Gravador mínimo de ZIP para membros já comprimidos.
+
+    O ``zipfile`` só grava dados que ele mesmo comprime; aqui o cabeçalho local, o
+    diretório central e o fim de arquivo (com as extensões ZIP64 quando necessárias) são
+    escritos direto, no mesmo formato, e a leitura continua a cargo do ``zipfile``.
+    """
+
+    def __init__(self, path: Path):
+        self.fp = open(path, "wb")
+        self.entries = []
+
+    def add(self, path: Path, arcname: str, method: int, result):
+        crc, size, csize, payload = result
+        info = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+        name = info.filename.encode("utf-8")
+        flags = 0 if info.filename.isascii() else 0x800
+        year, month, day, hour, minute, second = info.date_time
+        dos_time = hour << 11 | minute << 5 | second // 2
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        zip64 = size >= _ZIP32_MAX or csize >= _ZIP32_MAX
+        version = 45 if zip64 else (20 if method == zipfile.ZIP_DEFLATED else 10)
+        offset = self.fp.tell()
+        extra = struct.pack("<HHQQ", 1, 16, size, csize) if zip64 else b""
+        self.fp.write(struct.pack(
+            "<4sHHHHHLLLHH", b"PK\x03\x04", version, flags, method, dos_time, dos_date, crc,
+            _ZIP32_MAX if zip64 else csize, _ZIP32_MAX if zip64 else size, len(name), len(extra)))
+        self.fp.write(name)
+        self.fp.write(extra)
+        if isinstance(payload, bytes):
+            self.fp.write(payload)
+        else:
+            # ZIP_STORED copia da origem; DEFLATED grande copia do temporário
+            with open(path if payload is None else payload, "rb") as f:
+                copied = 0
+                for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+                    self.fp.write(chunk)
+                    copied += len(chunk)
+            if copied != csize:
+                raise OSError(f"'{path}' mudou durante a compactação")
+        self.entries.append((name, flags, method, dos_time, dos_date, crc, size, csize, offset,
+                             info.create_system, info.external_attr))
+
+    def close(self):
+        """Grava o diretório central e fecha o arquivo."""
+        cd_offset = self.fp.tell()
+        for name, flags, method, dos_time, dos_date, crc, size, csize, offset, system, attr in self.entries:
+            big = [v for v in (size, csize, offset) if v >= _ZIP32_MAX]
+            extra = struct.pack(f"<HH{len(big)}Q", 1, 8 * len(big), *big) if big else b""
+            version = 45 if big else (20 if method == zipfile.ZIP_DEFLATED else 10)
+            self.fp.write(struct.pack(
+                "<4sHHHHHHLLLHHHHHLL", b"PK\x01\x02", system << 8 | version, version, flags, method,
+                dos_time, dos_date, crc, min(csize, _ZIP32_MAX), min(size, _ZIP32_MAX), len(name),
+                len(extra), 0, 0, 0, attr, min(offset, _ZIP32_MAX)))
+            self.fp.write(name)
+            self.fp.write(extra)
+        cd_end = self.fp.tell()
+        count, cd_size = len(self.entries), cd_end - cd_offset
+        if count >= 0xFFFF or cd_size >= _ZIP32_MAX or cd_offset >= _ZIP32_MAX:
+            self.fp.write(struct.pack("<4sQHHLLQQQQ", b"PK\x06\x06", 44, 45, 45, 0, 0,
+                                      count, count, cd_size, cd_offset))
+            self.fp.write(struct.pack("<4sLQL", b"PK\x06\x07", 0, cd_end, 1))
+        self.fp.write(struct.pack("<4sHHHHLLH", b"PK\x05\x06", 0, 0, min(count, 0xFFFF),
+                                  min(count, 0xFFFF), min(cd_size, _ZIP32_MAX),
+                                  min(cd_offset, _ZIP32_MAX), 0))
+        self.fp.close()
+
+
+def create_zip(source, zip_path, workers: int | None = None, level: int = 6, include=None, exclude=None,
+               store_extensions=STORE_EXTENSIONS, on_progress=None) -> dict:
+    """Cria `zip_path` a partir de `source` (arquivo ou pasta) comprimindo em `workers` processos.
+
+    `on_progress(arquivos_feitos, total_arquivos, bytes_feitos, total_bytes)` é chamado a
+    cada membro gravado. Retorna estatísticas (membros, bytes, comprimidos, armazenados).
+    """
+    source, zip_path = Path(source), Path(zip_path)
+    start = time.perf_counter()
+    members = _plan_members(source, include, exclude, store_extensions)
+    # O próprio arquivo de saída pode estar dentro da pasta de origem
+    out_abs = os.path.abspath(zip_path)
+    members = [m for m in members if os.path.abspath(m[0]) != out_abs]
+    total_bytes = sum(m[3] for m in members)
+    # Mais processos que núcleos (ou que lotes) só custa memória e despacho
+    batches = list(_batches(members))
+    workers = max(1, min(int(workers or os.cpu_count() or 1), os.cpu_count() or 1, len(batches)))
+    if len(batches) < 2 or total_bytes < _BATCH_BYTES:
+        workers = 1
+    stats = {"members": len(members), "bytes": total_bytes, "compressed_bytes": 0,
+             "deflated": 0, "stored": 0, "workers": workers}
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix="warpzip-", dir=str(zip_path.parent))
+    done_files = done_bytes = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def submit(batch):
+        items = [(str(members[i][0]), members[i][2]) for i in batch]
+        if pool is None:
+            return None, items
+        return pool.submit(_compress_batch, items, level, tmp_dir), items
+
+    zf = None
+    try:
+        zf = _ZipWriter(zip_path)
+        # Janela limitada de lotes em voo: memória proporcional a workers, não ao total
+        window = workers * 2
+        pending = [submit(b) for b in batches[:window]]
+        next_batch = len(pending)
+        for batch in batches:
+            future, items = pending.pop(0)
+            if next_batch < len(batches):
+                pending.append(submit(batches[next_batch]))
+                next_batch += 1
+            results = future.result() if future is not None else _compress_batch(items, level, tmp_dir)
+            for i, result in zip(batch, results):
+                path, arcname, method, _ = members[i]
+                try:
+                    zf.add(path, arcname, method, result)
+                finally:
+                    if isinstance(result[3], str):
+                        os.unlink(result[3])
+                stats["compressed_bytes"] += result[2]
+                stats["stored" if method == zipfile.ZIP_STORED else "deflated"] += 1
+                done_files += 1
+                done_bytes += result[1]
+                if on_progress is not None:
+                    on_progress(done_files, len(members), done_bytes, total_bytes)
+        zf.close()
+    except BaseException:
+        # ZIP incompleto não fica para trás
+        if zf is not None:
+            zf.fp.close()
+            zip_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    stats["elapsed_sec"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def extract_zip(zip_path, dest, include=None, exclude=None, on_progress=None) -> dict:
+    """Extrai os membros de `zip_path` que passam pelos filtros, um por vez.
+
+    `on_progress(membros_feitos, total_membros, bytes_feitos, total_bytes)` é chamado a
+    cada membro extraído. Caminhos absolutos e ``..`` são neutralizados pelo ``zipfile``.
+    """
+    include, exclude = _as_list(include), _as_list(exclude)
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        selected = [
+            info for info in zf.infolist()
+            if (not include or _matches(info.filename.rstrip("/"), include))
+            and not (exclude and _matches(info.filename.rstrip("/"), exclude))
+        ]
+        total_bytes = sum(info.file_size for info in selected)
+        done_bytes = 0
+        for n, info in enumerate(selected, 1):
+            zf.extract(info, dest)
+            done_bytes += info.file_size
+            if on_progress is not None:
+                on_progress(n, len(selected), done_bytes, total_bytes)
+        skipped = len(zf.infolist()) - len(selected)
+    return {"members": len(selected), "skipped": skipped, "bytes": total_bytes,
+            "elapsed_sec": round(time.perf_counter() - start, 3)}
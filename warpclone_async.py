@@ -0,0 +1,275 @@
+"""
+Variante asyncio do loop do agente.
+
+``AsyncWarpClone`` reaproveita todo o estado e as ações do ``WarpClone`` síncrono, mas
+espera o Ollama com um cliente HTTP assíncrono (aiohttp, se instalado) e executa
+``execute_command`` com ``asyncio.create_subprocess_*`` — ou, com ``shell_pool.enabled``,
+pelo mesmo pool de shells do loop síncrono, via executor. As demais ações (arquivos,
+pesquisas, rede) são bloqueantes e vão para um executor de threads limitado
+(``async.blocking_workers`` no config), de modo que centenas de sessões concorrentes
+compartilham poucas threads.
+
+Exemplo:
+    agent = AsyncWarpClone()
+    ctxs = [agent.new_context() for _ in range(100)]
+    results = await asyncio.gather(*(agent.aexecute_task(t, context=c) for t, c in zip(tarefas, ctxs)))
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from warpclone import WarpClone
+from warpclone_exec import BoundedCapture, kill_tree
+
+
+class AsyncWarpClone(WarpClone):
+    """WarpClone com API assíncrona (``aexecute_task``/``acall_ollama``/``aexecute_action``).
+
+    ``execute_task`` continua disponível como um invólucro fino sobre ``asyncio.run``.
+    Sem aiohttp, a chamada HTTP também passa pelo executor (sessão keep-alive do engine).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        acfg = self.engine.config.get("async") or {}
+        self._blocking_workers = max(1, int(acfg.get("blocking_workers", 8)))
+        self._executor = None
+        self._aio_session = None
+        self._aio_loop = None
+
+    # --- infraestrutura ---
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._blocking_workers,
+                                                thread_name_prefix="warpclone-blocking")
+        return self._executor
+
+    async def _run_blocking(self, func, *args):
+        """Executa `func` no executor limitado, preservando o contexto de sessão ativo."""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._get_executor(), ctx.run, func, *args)
+
+    def _http_session(self):
+        loop = asyncio.get_running_loop()
+        if self._aio_session is None or self._aio_session.closed or self._aio_loop is not loop:
+            # Sessões aiohttp ficam presas ao loop em que foram criadas
+            self._aio_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+            self._aio_loop = loop
+        return self._aio_session
+
+    async def aclose(self):
+        """Fecha a sessão HTTP do loop atual (o executor segue disponível)."""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+        self._aio_session = None
+        self._aio_loop = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # --- LLM ---
+    def _post_llm_sync(self, payload):
+        response = self.engine.http().post(self.ollama_url, json=payload, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post_llm(self, payload):
+        if aiohttp is None:
+            return await self._run_blocking(self._post_llm_sync, payload)
+        async with self._http_session().post(self.ollama_url, json=payload) as response:
+            response.raise_for_status()
+            return json.loads(await response.text())
+
+    async def acall_ollama(self, task):
+        # Histórico, biblioteca de comandos e checagem de saúde fazem E/S bloqueante
+        decision, payload = await self._run_blocking(self._prepare_llm_call, task)
+        if decision is not None:
+            return decision
+        try:
+            response_json = await self._post_llm(payload)
+        except json.JSONDecodeError:
+            return self._invalid_llm_json_reply()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Conexão recusada, timeout ou status HTTP de erro
+            return await self._run_blocking(self._handle_llm_failure, task)
+        return await self._run_blocking(self._handle_llm_response, response_json)
+
+    # --- ações ---
+    async def _aread_stream(self, stream, name, capture):
+        # Mesma captura limitada e callback de linhas do executor síncrono
+        while True:
+            try:
+                chunk = await stream.readline()
+            except ValueError:
+                # Linha maior que o limite do StreamReader: consome o que houver
+                chunk = await stream.read(64 * 1024)
+            if not chunk:
+                break
+            capture.feed(chunk)
+            if self.output_handler:
+                try:
+                    self._emit_output(name, chunk.decode("utf-8", errors="ignore").rstrip("\r\n"))
+                except Exception:
+                    pass
+
+    async def _arun_command(self, command):
+        """Retorna (stdout, stderr, expirou, código de saída); a saída é limitada a início + fim de cada fluxo."""
+        if self.shell_pool is not None:
+            # Mesmo caminho do loop síncrono (cwd/env da sessão com persist_session_state).
+            # O pool é bloqueante: cancelar a tarefa não interrompe o comando, que vai até o timeout.
+            run = functools.partial(self.shell_pool.run, command, timeout=self.command_timeout,
+                                    on_output=self._emit_output if self.output_handler else None,
+                                    powershell=self.use_powershell, session_key=self.session_id,
+                                    head_bytes=self.output_head_bytes, tail_bytes=self.output_tail_bytes)
+            result = await self._run_blocking(run)
+            return result.stdout, result.stderr, result.timed_out, result.returncode
+        if self.use_powershell and os.name == "nt":
+            proc = await asyncio.create_subprocess_exec(
+                "powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command,
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        else:
+            # Grupo de processos próprio: o kill alcança também os filhos do shell
+            proc = await asyncio.create_subprocess_shell(
+                command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE, start_new_session=(os.name != "nt"))
+        out_cap = BoundedCapture(self.output_head_bytes, self.output_tail_bytes)
+        err_cap = BoundedCapture(self.output_head_bytes, self.output_tail_bytes)
+        readers = asyncio.gather(self._aread_stream(proc.stdout, "stdout", out_cap),
+                                 self._aread_stream(proc.stderr, "stderr", err_cap))
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(proc.wait()), timeout=self.command_timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        except BaseException:
+            # Cancelamento: não deixa o processo órfão
+            self._akill(proc)
+            readers.cancel()
+            raise
+        if timed_out:
+            self._akill(proc)
+            await proc.wait()
+        try:
+            # Netos que herdaram os pipes podem mantê-los abertos; não espera indefinidamente
+            await asyncio.wait_for(readers, timeout=5)
+        except asyncio.TimeoutError:
+            pass
+        return out_cap.text(), err_cap.text(), timed_out, proc.returncode
+
+    def _akill(self, proc):
+        if proc.returncode is not None:
+            return
+        kill_tree(proc.pid)
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+    async def aexecute_action(self, action_json):
+        action_data = self._parse_action(action_json)
+        if action_data is None or action_data.get("action") != "execute_command":
+            return await self._run_blocking(self.execute_action, action_json)
+
+        command = (action_data.get("parameters") or {}).get("command")
+
+        def _prepare():
+            self.log_command(action_data, "")
+            self.engine.record_usage()
+            return self._command_refusal(command)
+
+        # Log em disco e handler de confirmação (pode abrir um diálogo) não bloqueiam o loop
+        refusal = await self._run_blocking(_prepare)
+        if refusal:
+            return refusal
+        try:
+            stdout, stderr, timed_out, returncode = await self._arun_command(command)
+        except asyncio.CancelledError:
+            self._update_action_pattern("execute_command", False)
+            raise
+        except Exception as e:
+            self._update_action_pattern("execute_command", False)
+            return f"Erro ao executar comando: {e}"
+        if timed_out:
+            return self._command_timeout_reply(command, stdout, stderr)
+        return await self._run_blocking(self._command_reply, action_data, stdout, stderr, returncode)
+
+    # --- loop do agente ---
+    async def aexecute_task(self, task, max_iterations=5, max_runtime_sec=90, context=None, use_cache=True):
+        """Versão assíncrona de ``execute_task``. `max_runtime_sec` também é um limite rígido:
+        a iteração em andamento é cancelada (subprocessos são encerrados) ao estourar.
+        """
+        if context is not None:
+            with self.use_context(context):
+                return await self._aexecute_task(task, max_iterations, max_runtime_sec, use_cache)
+        return await self._aexecute_task(task, max_iterations, max_runtime_sec, use_cache)
+
+    async def _aexecute_task(self, task, max_iterations, max_runtime_sec, use_cache=True):
+        scope = self._answer_scope()
+        if use_cache:
+            cached = await self._run_blocking(self._cached_answer, task, scope)
+            if cached is not None:
+                return cached
+        state = {"last": None, "scope": scope}
+        try:
+            return await asyncio.wait_for(self._aloop(task, max_iterations, max_runtime_sec, state),
+                                          timeout=max_runtime_sec)
+        except asyncio.TimeoutError:
+            final_answer = await self._run_blocking(
+                self._abort_task, "Tempo limite excedido ao tentar concluir a tarefa.")
+            return final_answer, state["last"]
+
+    async def _aloop(self, task, max_iterations, max_runtime_sec, state):
+        start_ts = time.time()
+        max_iterations = self._effective_max_iterations(max_iterations)
+        current_task = task
+        steps = []
+        for i in range(max_iterations):
+            print(f"--- Iteração {i+1} ---")
+
+            action_json = await self.acall_ollama(current_task)
+            self._remember_thought(action_json)
+
+            self._command_failed = False
+            result = await self.aexecute_action(action_json)
+            steps.append((self._parse_action(action_json), result, self._command_failed))
+
+            if result.startswith("FINAL_ANSWER:"):
+                final_answer = await self._run_blocking(self._complete_task, result)
+                await self._run_blocking(self._store_answer, task, final_answer, state["last"], steps,
+                                         state["scope"])
+                return final_answer, state["last"]
+
+            state["last"] = result
+            current_task = await self._run_blocking(self._next_step_prompt, task, result)
+            if time.time() - start_ts > max_runtime_sec:
+                final_answer = await self._run_blocking(
+                    self._abort_task, "Tempo limite excedido ao tentar concluir a tarefa.")
+                return final_answer, state["last"]
+
+        return await self._run_blocking(self._give_up_task), state["last"]
+
+    def execute_task(self, task, max_iterations=5, max_runtime_sec=90, context=None, use_cache=True):
+        """Invólucro síncrono: roda ``aexecute_task`` em um loop próprio (com profiling, se ativo)."""
+        async def _once():
+            try:
+                return await self.aexecute_task(task, max_iterations, max_runtime_sec, context=context,
+                                                use_cache=use_cache)
+            finally:
+                await self.aclose()
+
+        return self.profiler.run(task, asyncio.run, _once())
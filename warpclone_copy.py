@@ -0,0 +1,313 @@
+"""
+Cópia e movimentação de árvores de arquivos (``copy_tree`` / ``move_file``).
+
+Cada arquivo é copiado pelo caminho mais rápido disponível:
+1. ``os.copy_file_range``: cópia dentro do kernel, que pode virar reflink ou cópia no
+   servidor (btrfs, XFS, NFS 4.2, SMB3).
+2. ``os.sendfile``: também evita passar os dados pelo espaço do usuário.
+3. ``readinto`` com buffer de 1 MiB (Windows e sistemas sem as chamadas acima).
+
+Os arquivos são copiados por um pool de threads, e as chamadas de E/S liberam o GIL.
+Os maiores são despachados primeiro para não sobrarem no fim. Como no rsync, um arquivo
+de destino com o mesmo tamanho e a mesma data de modificação (dentro de `mtime_window`
+segundos) é considerado igual e não é copiado. A data da origem é copiada junto, então
+repetir a cópia só transfere o que mudou.
+
+``move_path`` tenta renomear. Entre volumes diferentes, copia a árvore inteira (sem filtros,
+sem pular arquivos e com links simbólicos como links) e depois apaga da origem só o que foi
+copiado. Se algum arquivo falhar, nada é apagado.
+"""
+
+import errno
+import fnmatch
+import os
+import shutil
+import stat as stat_mod
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_BUFFER = 1024 * 1024
+# Bytes por chamada de copy_file_range/sendfile
+_KERNEL_CHUNK = 64 * 1024 * 1024
+# Erros que indicam "chamada não suportada para esse par de arquivos" (cai no próximo método)
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.EPERM,
+                    getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+# ERROR_NOT_SAME_DEVICE no Windows
+_WIN_NOT_SAME_DEVICE = 17
+
+
+def _as_list(value) -> list:
+    return [value] if isinstance(value, str) else list(value or [])
+
+
+def _matches(rel: str, name: str, patterns) -> bool:
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _kernel_copy(infd: int, outfd: int, size: int):
+    """Copia `size` bytes no kernel. Retorna o método usado, ou None se nenhum se aplica."""
+    if hasattr(os, "copy_file_range"):
+        copied = 0
+        try:
+            while copied < size:
+                n = os.copy_file_range(infd, outfd, min(_KERNEL_CHUNK, size - copied))
+                if n == 0:
+                    break
+                copied += n
+            # 0 logo na primeira chamada: alguns kernels/sistemas de arquivos não copiam nada
+            if copied or not size:
+                return "copy_file_range"
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        copied = 0
+        try:
+            while copied < size:
+                n = os.sendfile(outfd, infd, copied, min(_KERNEL_CHUNK, size - copied))
+                if n == 0:
+                    break
+                copied += n
+            if copied or not size:
+                return "sendfile"
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    return None
+
+
+def copy_file(src, dst, buffer_size: int = DEFAULT_BUFFER) -> tuple:
+    """Copia conteúdo e metadados (como ``shutil.copy2``). Retorna ``(bytes, método)``."""
+    with open(src, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        with open(dst, "wb") as fdst:
+            method = _kernel_copy(fsrc.fileno(), fdst.fileno(), size) if size else "empty"
+            if method is None:
+                method = "buffer"
+                buf = bytearray(buffer_size)
+                view = memoryview(buf)
+                while True:
+                    n = fsrc.readinto(buf)
+                    if not n:
+                        break
+                    fdst.write(view[:n])
+    shutil.copystat(src, dst)
+    return size, method
+
+
+def _unchanged(size: int, mtime: float, dst: str, window: float) -> bool:
+    try:
+        st = os.stat(dst)
+    except OSError:
+        return False
+    return stat_mod.S_ISREG(st.st_mode) and st.st_size == size and abs(st.st_mtime - mtime) <= window
+
+
+def _scan(root: str, include, exclude, symlinks: bool = False):
+    """Pastas (relativas), arquivos ``(caminho, relativo, tamanho, mtime)``, links
+    ``(caminho, relativo)`` e erros ``{"path", "error"}`` sob `root`.
+
+    Sem `symlinks`, links para arquivos entram como arquivos (conteúdo) e links para pastas
+    são ignorados.
+    """
+    dirs, files, links, errors = [], [], [], []
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError as e:
+            # Uma pasta ilegível não interrompe o resto da cópia
+            errors.append({"path": prefix.rstrip("/") or ".", "error": str(e)})
+            continue
+        for entry in entries:
+            rel = prefix + entry.name
+            if exclude and _matches(rel, entry.name, exclude):
+                continue
+            try:
+                if symlinks and entry.is_symlink():
+                    if not include or _matches(rel, entry.name, include):
+                        links.append((entry.path, rel))
+                elif entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel)
+                    stack.append((entry.path, rel + "/"))
+                elif entry.is_file() and (not include or _matches(rel, entry.name, include)):
+                    st = entry.stat()
+                    files.append((entry.path, rel, st.st_size, st.st_mtime))
+            except OSError as e:
+                errors.append({"path": rel, "error": str(e)})
+    return dirs, files, links, errors
+
+
+def _copy_link(src: str, dst: str):
+    if os.path.lexists(dst):
+        if os.path.isdir(dst) and not os.path.islink(dst):
+            raise IsADirectoryError(errno.EISDIR, "destino é uma pasta", dst)
+        os.unlink(dst)
+    os.symlink(os.readlink(src), dst, target_is_directory=os.path.isdir(src))
+
+
+def copy_tree(src, dst, workers: int = 8, include=None, exclude=None, skip_unchanged: bool = True,
+              mtime_window: float = 2.0, buffer_size: int = DEFAULT_BUFFER, on_progress=None,
+              symlinks: bool = False, copied_paths=None) -> dict:
+    """Copia o conteúdo de `src` (pasta ou arquivo) para `dst`.
+
+    `include` filtra os arquivos copiados; `exclude` também poda pastas. Falhas em arquivos
+    ou pastas ilegíveis não interrompem a cópia: ficam em ``errors``. `on_progress(feitos,
+    total, bytes_feitos, total_bytes)` é chamado a cada arquivo (copiado ou pulado). Com
+    `symlinks`, links são recriados como links. Se `copied_paths` for uma lista, recebe os
+    caminhos de origem efetivamente copiados.
+    """
+    src, dst = Path(src), Path(dst)
+    include, exclude = _as_list(include), _as_list(exclude)
+    start = time.perf_counter()
+    if src.is_file() or (symlinks and src.is_symlink()):
+        single = dst / src.name if dst.is_dir() else dst
+        if single.exists() and os.path.samefile(src, single) and not (symlinks and src.is_symlink()):
+            raise ValueError(f"origem e destino são o mesmo arquivo: '{src}'")
+        single.parent.mkdir(parents=True, exist_ok=True)
+        dirs, files, links, errors = [], [], [], []
+        if symlinks and src.is_symlink():
+            links.append((str(src), src.name))
+        else:
+            st = src.stat()
+            files.append((str(src), src.name, st.st_size, st.st_mtime))
+    else:
+        if dst.resolve().is_relative_to(src.resolve()):
+            raise ValueError(f"o destino '{dst}' fica dentro da origem '{src}'")
+        dirs, files, links, errors = _scan(str(src), include, exclude, symlinks)
+        dst.mkdir(parents=True, exist_ok=True)
+        for rel in sorted(dirs):
+            (dst / rel).mkdir(exist_ok=True)
+        single = None
+
+    total_bytes = sum(f[2] for f in files)
+    stats = {"files": len(files) + len(links), "copied": 0, "skipped": 0, "errors": len(errors),
+             "dirs": len(dirs), "links": len(links), "bytes": total_bytes, "bytes_copied": 0, "methods": {}}
+    lock = threading.Lock()
+    progress = [0, 0]
+
+    def one(item):
+        path, rel, size, mtime = item
+        target = str(single if single is not None else dst / rel)
+        try:
+            if size is None:
+                _copy_link(path, target)
+                outcome, copied, method = "copied", 0, "symlink"
+            elif skip_unchanged and _unchanged(size, mtime, target, mtime_window):
+                outcome, copied, method = "skipped", 0, None
+            else:
+                copied, method = copy_file(path, target, buffer_size)
+                outcome = "copied"
+        except OSError as e:
+            outcome, copied, method = "errors", 0, None
+            with lock:
+                errors.append({"path": rel, "error": str(e)})
+        with lock:
+            stats[outcome] += 1
+            if outcome == "copied" and copied_paths is not None:
+                copied_paths.append(path)
+            stats["bytes_copied"] += copied
+            if method:
+                stats["methods"][method] = stats["methods"].get(method, 0) + 1
+            progress[0] += 1
+            progress[1] += size or 0
+            snapshot = (progress[0], stats["files"], progress[1], total_bytes)
+        if on_progress is not None:
+            try:
+                on_progress(*snapshot)
+            except Exception:
+                pass
+
+    # Maiores primeiro: um arquivo grande no fim deixaria as outras threads ociosas
+    ordered = sorted(files, key=lambda f: f[2], reverse=True) + [(path, rel, None, None) for path, rel in links]
+    workers = max(1, min(int(workers or 1), len(ordered) or 1))
+    if workers == 1:
+        for item in ordered:
+            one(item)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy") as pool:
+            list(pool.map(one, ordered))
+    # Datas das pastas por último (copiar arquivos para dentro as altera), das mais fundas às rasas
+    for rel in sorted(dirs, reverse=True):
+        try:
+            shutil.copystat(src / rel, dst / rel)
+        except OSError:
+            pass
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed_sec"] = round(elapsed, 3)
+    stats["mb_per_sec"] = round(stats["bytes_copied"] / 1e6 / elapsed, 1) if elapsed > 0 else None
+    stats["error_list"] = sorted(errors, key=lambda e: e["path"])
+    return stats
+
+
+def _cross_device(exc: OSError) -> bool:
+    return exc.errno == errno.EXDEV or getattr(exc, "winerror", None) == _WIN_NOT_SAME_DEVICE
+
+
+def _remove_copied(src: Path, target: Path, copied: list, window: float) -> list:
+    """Apaga da origem os arquivos copiados para `target` e as pastas que ficarem vazias.
+
+    Um arquivo alterado depois da cópia (tamanho ou data diferentes da do destino, além de
+    `window` segundos) fica.
+    Retorna o que sobrou na origem (relativo).
+    """
+    kept = []
+    for path in copied:
+        tree = src.is_dir() and not src.is_symlink()
+        rel = os.path.relpath(path, src) if tree else src.name
+        dest = target / rel if tree else target
+        try:
+            if not os.path.islink(path):
+                st, dt = os.stat(path), os.stat(dest)
+                if st.st_size != dt.st_size or abs(st.st_mtime - dt.st_mtime) > window:
+                    kept.append(rel)
+                    continue
+            os.unlink(path)
+        except OSError:
+            kept.append(rel)
+    if src.is_dir() and not src.is_symlink():
+        # rmdir só remove pastas vazias: o que a cópia não cobriu continua na origem
+        for directory, _subdirs, names in os.walk(src, topdown=False):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                rel = os.path.relpath(directory, src)
+                kept.extend(os.path.join(rel, n) if rel != "." else n for n in names)
+    return sorted(set(kept))
+
+
+def move_path(src, dst, **copy_kwargs) -> dict:
+    """Move `src` para `dst` (para dentro de `dst` se for uma pasta existente).
+
+    No mesmo volume é só um rename. Entre volumes, copia tudo com ``copy_tree`` (links como
+    links) e, se nenhum arquivo falhar, apaga da origem só o que foi copiado. Filtros
+    (`include`/`exclude`) não são aceitos: deixariam arquivos fora da cópia.
+    """
+    if _as_list(copy_kwargs.get("include")) or _as_list(copy_kwargs.get("exclude")):
+        raise ValueError("mover não aceita include/exclude; use copy_tree e apague o que quiser")
+    copy_kwargs.update(include=None, exclude=None, skip_unchanged=False, symlinks=True)
+    src, dst = Path(src), Path(dst)
+    target = dst / src.name if dst.is_dir() else dst
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if src.is_dir():
+            os.rename(src, target)
+        else:
+            os.replace(src, target)
+        return {"target": str(target), "renamed": True}
+    except OSError as e:
+        if not _cross_device(e):
+            raise
+    copied = []
+    stats = copy_tree(src, target, copied_paths=copied, **copy_kwargs)
+    kept = []
+    if not stats["errors"]:
+        kept = _remove_copied(src, target, copied, copy_kwargs.get("mtime_window", 2.0))
+    stats.update(target=str(target), renamed=False, source_removed=not stats["errors"] and not kept,
+                 source_kept=kept[:50])
+    return stats
@@ -0,0 +1,304 @@
+"""
+Downloads retomáveis com segmentos paralelos via HTTP Range.
+
+``download`` sonda a URL com ``Range: bytes=0-0``. Se o servidor responde 206, o arquivo é
+dividido em segmentos baixados em paralelo, cada um escrevendo na sua faixa de
+``<destino>.part``. Sem suporte a Range, um único fluxo é usado, aproveitando a própria
+resposta da sonda. O estado fica em ``<destino>.part.json``: URL, tamanho, ETag,
+Last-Modified e os bytes concluídos por segmento.
+
+Uma nova chamada retoma de onde parou somente se os validadores ainda conferem. As
+requisições de faixa levam ``If-Range``: se o arquivo mudou no servidor, a resposta vem
+inteira (200) e o download recomeça do zero. ``If-Range`` só aceita ETag forte (um ETag
+fraco, ``W/"..."``, nunca confere — RFC 9110), então com ETag fraco vale o Last-Modified;
+sem nenhum dos dois, o arquivo vem num fluxo único. Segmentos com falha de rede são tentados de
+novo a partir do último byte gravado. Um limitador compartilhado aplica o teto de banda
+somado de todas as conexões.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+
+requests = lazy_import("requests")
+
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
+# Intervalo mínimo entre gravações do estado (.part.json) durante o download
+_STATE_INTERVAL = 1.0
+
+
+class DownloadError(Exception):
+    pass
+
+
+class _RangeIgnored(DownloadError):
+    """O servidor respondeu 200 a uma faixa com If-Range: o arquivo mudou."""
+
+
+class RateLimiter:
+    """Token bucket compartilhado entre threads (bytes/s; 0 ou None = sem limite)."""
+
+    def __init__(self, bytes_per_sec):
+        self.rate = float(bytes_per_sec or 0)
+        self.lock = threading.Lock()
+        self._allowance = 0.0
+        self._last = time.monotonic()
+
+    def consume(self, nbytes: int):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= nbytes
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _content_range_total(value: str | None):
+    # "bytes 0-0/12345" (ou "bytes */12345")
+    if value and "/" in value:
+        total = value.rsplit("/", 1)[1].strip()
+        if total.isdigit():
+            return int(total)
+    return None
+
+
+def _validators(resp) -> dict:
+    return {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+
+
+def _split(size: int, segments: int, min_segment: int) -> list:
+    count = max(1, min(int(segments), size // max(1, min_segment) or 1))
+    step = -(-size // count)
+    return [[start, min(size, start + step) - 1, 0] for start in range(0, size, step)]
+
+
+class _State:
+    """Estado persistido em ``<destino>.part.json``."""
+
+    def __init__(self, path: Path, data: dict):
+        self.path = path
+        self.data = data
+        self.lock = threading.Lock()
+        self._saved = 0.0
+
+    @classmethod
+    def load(cls, path: Path):
+        try:
+            return cls(path, json.loads(path.read_text(encoding="utf-8")))
+        except Exception:
+            return None
+
+    def advance(self, index: int, nbytes: int):
+        with self.lock:
+            self.data["segments"][index][2] += nbytes
+
+    def done_bytes(self) -> int:
+        with self.lock:
+            return sum(seg[2] for seg in self.data["segments"])
+
+    def save(self, force: bool = False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self._saved < _STATE_INTERVAL:
+                return
+            self._saved = now
+            payload = json.dumps(self.data)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def _range_validator(validators: dict) -> tuple:
+    """(campo, valor) usado em If-Range: ETag forte, senão Last-Modified; (None, None) sem nenhum."""
+    etag = validators.get("etag")
+    if etag and not etag.startswith("W/"):
+        return "etag", etag
+    if validators.get("last_modified"):
+        return "last_modified", validators["last_modified"]
+    return None, None
+
+
+def _resume_matches(state: _State | None, url: str, size, validators: dict) -> bool:
+    """Retoma apenas se URL, tamanho e o validador de If-Range conferem."""
+    if state is None or state.data.get("url") != url or state.data.get("size") != size:
+        return False
+    field, value = _range_validator(validators)
+    return field is not None and state.data.get(field) == value
+
+
+def download(url: str, dest, segments: int = 4, min_segment_bytes: int = 4 * 1024 * 1024,
+             max_bytes_per_sec=None, chunk_size: int = 1024 * 1024, timeout: float = 30,
+             retries: int = 3, headers=None, on_progress=None) -> dict:
+    """Baixa `url` para `dest`. `on_progress(bytes_feitos, total_bytes | None)` é chamado a
+    cada bloco gravado. Retorna estatísticas (tamanho, segmentos, bytes retomados, ...)."""
+    try:
+        return _download_once(url, dest, segments, min_segment_bytes, max_bytes_per_sec, chunk_size,
+                              timeout, retries, headers, on_progress)
+    except _RangeIgnored:
+        # Arquivo mudou no servidor durante/entre tentativas: recomeça do zero uma vez
+        dest = Path(dest)
+        _discard_partial(dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json"))
+        return _download_once(url, dest, segments, min_segment_bytes, max_bytes_per_sec, chunk_size,
+                              timeout, retries, headers, on_progress)
+
+
+def _download_once(url, dest, segments, min_segment_bytes, max_bytes_per_sec, chunk_size, timeout,
+                   retries, headers, on_progress) -> dict:
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.json")
+    base_headers = {"User-Agent": _USER_AGENT, "Accept-Encoding": "identity"}
+    base_headers.update(headers or {})
+    limiter = RateLimiter(max_bytes_per_sec)
+    start = time.perf_counter()
+
+    session = requests.Session()
+    probe = session.get(url, headers=dict(base_headers, Range="bytes=0-0"), stream=True, timeout=timeout)
+    if probe.status_code == 416:
+        # Arquivo vazio não tem faixa 0-0: baixa sem Range
+        probe.close()
+        probe = session.get(url, headers=base_headers, stream=True, timeout=timeout)
+    try:
+        probe.raise_for_status()
+        validators = _validators(probe)
+        _, if_range = _range_validator(validators)
+        ranged = probe.status_code == 206
+        size = _content_range_total(probe.headers.get("Content-Range")) if ranged else None
+        if ranged and (size is None or if_range is None):
+            # Tamanho total desconhecido ("bytes 0-0/*") ou nada que o If-Range aceite (sem
+            # validador, ou só ETag fraco): segmentos poderiam misturar versões, fluxo único
+            probe.close()
+            probe = session.get(url, headers=base_headers, stream=True, timeout=timeout)
+            probe.raise_for_status()
+            ranged = False
+        if size is None and not ranged and probe.headers.get("Content-Length", "").isdigit():
+            size = int(probe.headers["Content-Length"])
+        if not ranged or size is None:
+            # Sem Range: fluxo único reaproveitando a resposta da sonda
+            _discard_partial(part, state_path)
+            written = _stream_single(probe, part, chunk_size, limiter, on_progress, size)
+            if size is not None and written != size:
+                raise DownloadError(f"download incompleto: {written} de {size} bytes")
+            os.replace(part, dest)
+            return {"size": written, "segments": 1, "resumed_bytes": 0, "ranged": False,
+                    "elapsed_sec": round(time.perf_counter() - start, 3)}
+    finally:
+        probe.close()
+        session.close()
+
+    state = _State.load(state_path)
+    resumed = 0
+    if _resume_matches(state, url, size, validators) and part.exists() and part.stat().st_size == size:
+        resumed = state.done_bytes()
+    else:
+        _discard_partial(part, state_path)
+        state = _State(state_path, dict(url=url, size=size, segments=_split(size, segments, min_segment_bytes),
+                                         **validators))
+        with open(part, "wb") as f:
+            f.truncate(size)
+        state.save(force=True)
+
+    progress_lock = threading.Lock()
+    stop = threading.Event()
+
+    def report():
+        if on_progress is not None:
+            with progress_lock:
+                on_progress(state.done_bytes(), size)
+
+    def fetch(index: int):
+        seg_start, seg_end, _ = state.data["segments"][index]
+        attempt = 0
+        with requests.Session() as sess, open(part, "r+b", buffering=0) as f:
+            while True:
+                offset = seg_start + state.data["segments"][index][2]
+                if offset > seg_end:
+                    return
+                req_headers = dict(base_headers, Range=f"bytes={offset}-{seg_end}")
+                req_headers["If-Range"] = if_range
+                try:
+                    with sess.get(url, headers=req_headers, stream=True, timeout=timeout) as resp:
+                        if resp.status_code != 206:
+                            raise _RangeIgnored(f"servidor ignorou a faixa (HTTP {resp.status_code}); "
+                                                "o arquivo mudou ou não aceita Range")
+                        f.seek(offset)
+                        for chunk in resp.iter_content(chunk_size=chunk_size):
+                            if stop.is_set():
+                                return
+                            if not chunk:
+                                continue
+                            chunk = chunk[: seg_end - offset + 1]
+                            limiter.consume(len(chunk))
+                            f.write(chunk)
+                            offset += len(chunk)
+                            state.advance(index, len(chunk))
+                            state.save()
+                            report()
+                            if offset > seg_end:
+                                break
+                    if offset <= seg_end:
+                        raise DownloadError("conexão encerrada antes do fim da faixa")
+                    return
+                except _RangeIgnored:
+                    raise
+                except (requests.RequestException, DownloadError):
+                    attempt += 1
+                    if attempt > retries or stop.is_set():
+                        raise
+                    time.sleep(min(8.0, 0.5 * 2 ** (attempt - 1)))
+
+    pending = [i for i, seg in enumerate(state.data["segments"]) if seg[0] + seg[2] <= seg[1]]
+    try:
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="download") as pool:
+                futures = [pool.submit(fetch, i) for i in pending]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # Interrompe os demais segmentos; o progresso fica salvo para retomar
+                    stop.set()
+                    raise
+    finally:
+        state.save(force=True)
+    if state.done_bytes() != size:
+        raise DownloadError(f"download incompleto: {state.done_bytes()} de {size} bytes")
+    os.replace(part, dest)
+    try:
+        state_path.unlink()
+    except OSError:
+        pass
+    return {"size": size, "segments": len(state.data["segments"]), "resumed_bytes": resumed, "ranged": True,
+            "elapsed_sec": round(time.perf_counter() - start, 3)}
+
+
+def _discard_partial(part: Path, state_path: Path):
+    for p in (part, state_path):
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+def _stream_single(resp, part: Path, chunk_size: int, limiter: RateLimiter, on_progress, size) -> int:
+    written = 0
+    with open(part, "wb", buffering=chunk_size) as f:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            limiter.consume(len(chunk))
+            f.write(chunk)
+            written += len(chunk)
+            if on_progress is not None:
+                on_progress(written, size)
+    return written
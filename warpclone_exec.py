@@ -0,0 +1,178 @@
+"""
+Execução de comandos com saída em streaming e captura limitada.
+
+``run_streaming`` lê stdout/stderr incrementalmente em threads leitoras, repassa cada
+linha a um callback (GUI/API) assim que chega e guarda apenas o início e o fim da saída
+(``BoundedCapture``), com a contagem total de bytes. No timeout, a árvore de processos
+inteira é encerrada (grupo de processos no POSIX, ``taskkill /T`` no Windows).
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+from warpclone_lazy import lazy_import
+
+psutil = lazy_import("psutil", optional=True)
+
+_READ_CHUNK = 64 * 1024
+
+
+class BoundedCapture:
+    """Guarda os primeiros `head_bytes` e os últimos `tail_bytes` de um fluxo de bytes."""
+
+    def __init__(self, head_bytes: int = 16384, tail_bytes: int = 16384):
+        self.head_bytes = max(0, int(head_bytes))
+        self.tail_bytes = max(0, int(tail_bytes))
+        self.head = bytearray()
+        self._tail = deque()
+        self._tail_len = 0
+        self.total_bytes = 0
+
+    def feed(self, data: bytes):
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data or self.tail_bytes == 0:
+            return
+        self._tail.append(data)
+        self._tail_len += len(data)
+        # Descarta blocos antigos que já não cabem na janela final
+        while self._tail and self._tail_len - len(self._tail[0]) >= self.tail_bytes:
+            self._tail_len -= len(self._tail.popleft())
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self.head) - min(self._tail_len, self.tail_bytes)
+
+    def text(self, encoding: str = "utf-8") -> str:
+        tail = b"".join(self._tail)[-self.tail_bytes:] if self.tail_bytes else b""
+        head_text = bytes(self.head).decode(encoding, errors="ignore")
+        tail_text = tail.decode(encoding, errors="ignore")
+        omitted = self.omitted_bytes
+        if omitted > 0:
+            marker = f"\n[... {omitted} bytes omitidos de {self.total_bytes} ...]\n"
+            text = head_text + marker + tail_text
+        else:
+            text = head_text + tail_text
+        return text.replace("\r\n", "\n")
+
+
+class CommandResult:
+    def __init__(self, returncode, stdout: BoundedCapture, stderr: BoundedCapture,
+                 timed_out: bool, duration: float, encoding: str = "utf-8"):
+        self.returncode = returncode
+        self.stdout = stdout.text(encoding)
+        self.stderr = stderr.text(encoding)
+        self.stdout_bytes = stdout.total_bytes
+        self.stderr_bytes = stderr.total_bytes
+        self.truncated = stdout.omitted_bytes > 0 or stderr.omitted_bytes > 0
+        self.timed_out = timed_out
+        self.duration = duration
+
+
+def kill_tree(pid: int):
+    """Encerra o processo `pid` e todos os seus descendentes.
+
+    No POSIX o processo deve ter sido iniciado em sessão própria (pgid == pid).
+    """
+    try:
+        if os.name != "nt":
+            os.killpg(pid, signal.SIGKILL)
+        elif psutil:
+            parent = psutil.Process(pid)
+            for child in parent.children(recursive=True):
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+            parent.kill()
+        else:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True, timeout=10)
+    except Exception:
+        pass
+
+
+def kill_process_tree(proc: subprocess.Popen):
+    if proc.poll() is not None:
+        return
+    kill_tree(proc.pid)
+    try:
+        proc.kill()
+    except Exception:
+        pass
+
+
+def _reader(stream, name: str, capture: BoundedCapture, on_output, encoding: str):
+    pending = b""
+    try:
+        while True:
+            chunk = stream.readline(_READ_CHUNK)
+            if not chunk:
+                break
+            capture.feed(chunk)
+            if on_output is None:
+                continue
+            pending += chunk
+            if pending.endswith(b"\n") or len(pending) >= _READ_CHUNK:
+                line, pending = pending, b""
+                try:
+                    on_output(name, line.decode(encoding, errors="ignore").rstrip("\r\n"))
+                except Exception:
+                    pass
+        if pending and on_output is not None:
+            try:
+                on_output(name, pending.decode(encoding, errors="ignore").rstrip("\r\n"))
+            except Exception:
+                pass
+    finally:
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+
+def run_streaming(args, shell: bool = False, timeout: float | None = None, on_output=None,
+                  head_bytes: int = 16384, tail_bytes: int = 16384, encoding: str = "utf-8",
+                  cwd=None, env=None) -> CommandResult:
+    """Executa `args` repassando a saída linha a linha para `on_output(stream, linha)`.
+
+    `stream` é ``"stdout"`` ou ``"stderr"``. A memória usada pela captura é limitada a
+    ``head_bytes + tail_bytes`` por fluxo, independentemente do volume produzido.
+    """
+    popen_kwargs = {}
+    if os.name != "nt":
+        popen_kwargs["start_new_session"] = True
+    else:
+        popen_kwargs["creationflags"] = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+    start = time.time()
+    proc = subprocess.Popen(args, shell=shell, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, cwd=cwd, env=env, **popen_kwargs)
+    out_cap = BoundedCapture(head_bytes, tail_bytes)
+    err_cap = BoundedCapture(head_bytes, tail_bytes)
+    readers = [
+        threading.Thread(target=_reader, args=(proc.stdout, "stdout", out_cap, on_output, encoding), daemon=True),
+        threading.Thread(target=_reader, args=(proc.stderr, "stderr", err_cap, on_output, encoding), daemon=True),
+    ]
+    for t in readers:
+        t.start()
+    timed_out = False
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        kill_process_tree(proc)
+        proc.wait()
+    except BaseException:
+        kill_process_tree(proc)
+        raise
+    finally:
+        for t in readers:
+            # Netos que herdaram os pipes podem mantê-los abertos; não espera indefinidamente
+            t.join(timeout=5)
+    return CommandResult(proc.returncode, out_cap, err_cap, timed_out, time.time() - start, encoding)
@@ -2,11 +2,10 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 import threading
-import requests
+import multiprocessing
 import json
 import sys
 from pathlib import Path
-from PIL import Image
 from warpclone import WarpClone
 import subprocess
 import time
@@ -45,6 +44,7 @@ class App(ctk.CTk):
         img_path = Path("assets/icon.png")
         if img_path.exists():
             try:
+                from PIL import Image  # só com a imagem da marca presente
                 brand_img = ctk.CTkImage(light_image=Image.open(img_path), dark_image=Image.open(img_path), size=(80, 80))
             except Exception:
                 brand_img = None
@@ -114,6 +114,22 @@ class App(ctk.CTk):
         # Instancia o WarpClone e conecta o handler de confirmação
         self.warp = WarpClone()
         self.warp.set_confirmation_handler(self.confirm_command_gui)
+        # Saída de comandos em tempo real (agrupada para não sobrecarregar o loop do Tk)
+        self._cmd_output_lines = []
+        self._cmd_output_dropped = 0
+        self._cmd_output_lock = threading.Lock()
+        self._cmd_output_scheduled = False
+        self.warp.set_output_handler(self.on_command_output)
+
+        # Menu de ferramentas (profiling em tempo de execução)
+        self.profiling_var = tk.BooleanVar(value=self.warp.profiler.enabled)
+        menubar = tk.Menu(self)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_checkbutton(label="Profiling de tarefas", variable=self.profiling_var,
+                                   command=self.toggle_profiling)
+        tools_menu.add_command(label="Último relatório de profiling", command=self.show_last_profile)
+        menubar.add_cascade(label="Ferramentas", menu=tools_menu)
+        self.configure(menu=menubar)
 
         # Prepara lista de sessões
         self._session_display_to_id = {}
@@ -144,6 +160,22 @@ class App(ctk.CTk):
             except Exception:
                 pass
     
+    def toggle_profiling(self):
+        """Liga/desliga o profiling de tarefas sem reiniciar a aplicação."""
+        enabled = bool(self.profiling_var.get())
+        self.warp.set_profiling(enabled)
+        if enabled:
+            self.add_to_output(f"Profiling ativado. Relatórios em: {self.warp.profiler.out_dir}")
+        else:
+            self.add_to_output("Profiling desativado.")
+
+    def show_last_profile(self):
+        report = self.warp.profiler.last_report
+        if report:
+            messagebox.showinfo("Profiling", f"Último relatório:\n{report}")
+        else:
+            messagebox.showinfo("Profiling", "Nenhum relatório gerado nesta sessão.")
+
     def add_to_output(self, message, tag=None):
         """Adiciona uma mensagem à caixa de saída com formatação opcional."""
         self.output_textbox.configure(state="normal")
@@ -152,6 +184,29 @@ class App(ctk.CTk):
         self.output_textbox.see(tk.END)
         self.update_idletasks()
 
+    def on_command_output(self, stream, line):
+        """Recebe linhas do comando em execução (thread leitora) e agenda a exibição."""
+        with self._cmd_output_lock:
+            if len(self._cmd_output_lines) < 500:
+                prefix = "  ! " if stream == "stderr" else "  | "
+                self._cmd_output_lines.append(prefix + line)
+            else:
+                self._cmd_output_dropped += 1
+            schedule = not self._cmd_output_scheduled
+            self._cmd_output_scheduled = True
+        if schedule:
+            self.after(100, self.flush_command_output)
+
+    def flush_command_output(self):
+        with self._cmd_output_lock:
+            lines, self._cmd_output_lines = self._cmd_output_lines, []
+            dropped, self._cmd_output_dropped = self._cmd_output_dropped, 0
+            self._cmd_output_scheduled = False
+        if dropped:
+            lines.append(f"  [... {dropped} linhas omitidas ...]")
+        if lines:
+            self.add_to_output("\n".join(lines))
+
     def clear_output(self):
         self.output_textbox.configure(state="normal")
         self.output_textbox.delete("1.0", tk.END)
@@ -235,7 +290,8 @@ class App(ctk.CTk):
         try:
             def watchdog_fire():
                 try:
-                    self.task_completed("Tempo limite excedido ao processar a tarefa.")
+                    # Timer roda fora da thread da GUI: agenda no loop do Tk
+                    self.after(0, self.task_completed, "Tempo limite excedido ao processar a tarefa.")
                 except Exception:
                     pass
             self._pending_watchdog = threading.Timer(95.0, watchdog_fire)
@@ -301,13 +357,17 @@ class App(ctk.CTk):
 
 
 def check_ollama_running():
+    # urllib da biblioteca padrão: requests só é carregado na primeira chamada ao modelo
+    import urllib.request
     try:
-        r = requests.get("http://localhost:11434/api/tags", timeout=2)
-        return r.status_code == 200
+        with urllib.request.urlopen("http://localhost:11434/api/tags", timeout=2) as r:
+            return r.status == 200
     except Exception:
         return False
 
 if __name__ == "__main__":
+    # Executável congelado (PyInstaller): processos do pool de compressão ZIP reentram aqui
+    multiprocessing.freeze_support()
 
     # Respeita modo offline definido em warpclone_config.json
     offline_mode = False
@@ -0,0 +1,293 @@
+"""
+Hash de arquivos em lote: vários algoritmos em uma passada, leitura com buffer grande,
+threads paralelas e cache persistente.
+
+O cache (``warpclone_memory/hash_cache.json``) é indexado pelo caminho absoluto e só é
+reutilizado quando (tamanho, mtime_ns, inode) continuam iguais — arquivos intactos não
+são relidos em execuções seguintes. Configurado pela seção ``hashing`` do config:
+
+    "hashing": {
+        "workers": 4,                   # threads de hash (hashlib libera o GIL)
+        "buffer_bytes": 1048576,        # tamanho de cada leitura
+        "cache_max_entries": 200000     # entradas mais antigas são descartadas
+    }
+
+Manifestos: ``.json`` (todos os algoritmos e metadados) ou texto no formato BSD
+(``SHA256 (caminho) = hex``); com um só algoritmo, o texto é aceito por ``sha256sum -c``.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_BUFFER = 1024 * 1024
+_BSD_LINE_RE = re.compile(r"^(?P<algo>[A-Za-z0-9_-]+) \((?P<path>.*)\) = (?P<digest>[0-9a-fA-F]+)$")
+_GNU_LINE_RE = re.compile(r"^(?P<digest>[0-9a-fA-F]+) [ *](?P<path>.+)$")
+# Intervalo mínimo entre gravações do cache fora de hash_tree (file_hash avulso)
+_CACHE_SAVE_INTERVAL = 5.0
+
+
+def normalize_algorithms(algorithms) -> list:
+    """Lista de algoritmos (str com vírgulas ou lista), validada contra o hashlib."""
+    if not algorithms:
+        return ["sha256"]
+    if isinstance(algorithms, str):
+        algorithms = algorithms.split(",")
+    result = []
+    for algo in algorithms:
+        algo = str(algo).strip().lower().replace("-", "")
+        if not algo or algo in result:
+            continue
+        hashlib.new(algo)  # ValueError para algoritmo desconhecido
+        result.append(algo)
+    return result or ["sha256"]
+
+
+def hash_file(path, algorithms=("sha256",), buffer_size: int = DEFAULT_BUFFER) -> dict:
+    """Calcula todos os `algorithms` lendo o arquivo uma única vez. Retorna {algo: hex}."""
+    hashers = [(algo, hashlib.new(algo)) for algo in algorithms]
+    buf = bytearray(max(4096, int(buffer_size)))
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            for _, h in hashers:
+                h.update(chunk)
+    return {algo: h.hexdigest() for algo, h in hashers}
+
+
+def _stat_key(st) -> list:
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class HashCache:
+    """Cache persistente de digests por (caminho, tamanho, mtime, inode)."""
+
+    def __init__(self, path: Path, max_entries: int = 200000):
+        self.path = Path(path)
+        self.max_entries = max(0, int(max_entries))
+        self.lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = {}
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8")) or {}
+                entries = data.get("entries", {}) if isinstance(data, dict) else {}
+        except Exception:
+            entries = {}
+        self._entries = entries
+
+    def get(self, key: str, st, algorithms) -> dict | None:
+        """Digests em cache se o arquivo não mudou e todos os algoritmos estão presentes."""
+        with self.lock:
+            self._load()
+            entry = self._entries.get(key)
+            if not entry or entry.get("stat") != _stat_key(st):
+                return None
+            digests = entry.get("digests", {})
+            if not all(a in digests for a in algorithms):
+                return None
+            # Acerto vai para o fim: a ordem do dict é a ordem de uso para o descarte
+            self._entries[key] = self._entries.pop(key)
+            return {a: digests[a] for a in algorithms}
+
+    def put(self, key: str, st, digests: dict):
+        with self.lock:
+            self._load()
+            entry = self._entries.pop(key, None)
+            merged = dict(entry["digests"]) if entry and entry.get("stat") == _stat_key(st) else {}
+            merged.update(digests)
+            # Reinserção no fim: a ordem do dict serve de ordem de uso para o descarte
+            self._entries[key] = {"stat": _stat_key(st), "digests": merged}
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._dirty = True
+
+    def save(self, force: bool = False):
+        """Grava o cache se houver mudanças; sem `force`, no máximo uma vez a cada 5 s."""
+        now = time.monotonic()
+        with self.lock:
+            if not self._dirty or self._entries is None:
+                return
+            if not force and now - self._saved_at < _CACHE_SAVE_INTERVAL:
+                return
+            self._saved_at = now
+            payload = json.dumps({"version": 1, "entries": self._entries}, ensure_ascii=False)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    def __len__(self):
+        with self.lock:
+            self._load()
+            return len(self._entries)
+
+
+def iter_files(root: Path, include=None, exclude=None, recursive: bool = True):
+    """Arquivos regulares sob `root` (os.scandir), filtrados por globs no caminho relativo."""
+    include = [include] if isinstance(include, str) else list(include or [])
+    exclude = [exclude] if isinstance(exclude, str) else list(exclude or [])
+
+    def wanted(rel: str, name: str) -> bool:
+        if include and not any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in include):
+            return False
+        return not any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in exclude)
+
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            rel = prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(entry.name, p) for p in exclude):
+                        stack.append((entry.path, rel + "/"))
+                elif entry.is_file(follow_symlinks=False) and wanted(rel, entry.name):
+                    yield entry.path, rel
+            except OSError:
+                continue
+
+
+def hash_tree(root, algorithms=("sha256",), include=None, exclude=None, recursive: bool = True,
+              workers: int = 4, buffer_size: int = DEFAULT_BUFFER, cache: HashCache | None = None,
+              on_progress=None) -> dict:
+    """Hash de todos os arquivos de `root` (arquivo ou diretório) em paralelo.
+
+    Retorna ``{"root", "algorithms", "files": [{"path", "size", "digests"} | {"path", "error"}],
+    "stats": {...}}`` com os arquivos na ordem do caminho relativo. `on_progress(done, total,
+    bytes_hashed)` é chamado a cada arquivo concluído.
+    """
+    root = Path(root)
+    algorithms = normalize_algorithms(algorithms)
+    if root.is_file():
+        files = [(str(root), root.name)]
+    else:
+        files = sorted(iter_files(root, include, exclude, recursive), key=lambda x: x[1])
+    stats = {"files": len(files), "hashed": 0, "cached": 0, "errors": 0, "bytes": 0, "bytes_read": 0}
+    lock = threading.Lock()
+    done = [0]
+
+    def one(item):
+        path, rel = item
+        try:
+            st = os.stat(path)
+            key = os.path.abspath(path)
+            digests = cache.get(key, st, algorithms) if cache is not None else None
+            from_cache = digests is not None
+            if digests is None:
+                digests = hash_file(path, algorithms, buffer_size)
+                if cache is not None:
+                    cache.put(key, st, digests)
+            result = {"path": rel, "size": st.st_size, "digests": digests}
+            with lock:
+                stats["cached" if from_cache else "hashed"] += 1
+                stats["bytes"] += st.st_size
+                if not from_cache:
+                    stats["bytes_read"] += st.st_size
+        except OSError as e:
+            result = {"path": rel, "error": str(e)}
+            with lock:
+                stats["errors"] += 1
+        if on_progress is not None:
+            with lock:
+                done[0] += 1
+                progress = (done[0], len(files), stats["bytes"])
+            try:
+                on_progress(*progress)
+            except Exception:
+                pass
+        return result
+
+    start = time.perf_counter()
+    workers = max(1, min(int(workers or 1), len(files) or 1))
+    if workers == 1:
+        results = [one(item) for item in files]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as pool:
+            results = list(pool.map(one, files))
+    if cache is not None:
+        cache.save(force=True)
+    stats["elapsed_sec"] = round(time.perf_counter() - start, 3)
+    return {"root": str(root), "algorithms": algorithms, "files": results, "stats": stats}
+
+
+def write_manifest(result: dict, path) -> Path:
+    """Grava o manifesto: JSON se a extensão for ``.json``, senão linhas no formato BSD."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ok = [f for f in result["files"] if "digests" in f]
+    if path.suffix.lower() == ".json":
+        payload = {"root": result["root"], "algorithms": result["algorithms"], "files": ok}
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    else:
+        lines = [f"{algo.upper()} ({f['path']}) = {f['digests'][algo]}" for f in ok for algo in result["algorithms"]]
+        path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+    return path
+
+
+def read_manifest(path) -> dict:
+    """Lê um manifesto (JSON, BSD ou ``sha256sum``). Retorna {caminho: {algo: hex}}."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    if path.suffix.lower() == ".json":
+        data = json.loads(text) or {}
+        return {f["path"]: dict(f.get("digests", {})) for f in data.get("files", []) if "path" in f}
+    # Formato GNU não informa o algoritmo: deduz pelo tamanho do digest
+    by_len = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+    manifest = {}
+    for line in text.splitlines():
+        line = line.strip()
+        m = _BSD_LINE_RE.match(line)
+        if m:
+            algo = m.group("algo").lower().replace("-", "")
+        else:
+            m = _GNU_LINE_RE.match(line)
+            if not m:
+                continue
+            algo = by_len.get(len(m.group("digest")))
+            if not algo:
+                continue
+        manifest.setdefault(m.group("path"), {})[algo] = m.group("digest").lower()
+    return manifest
+
+
+def compare_manifest(result: dict, manifest: dict) -> dict:
+    """Compara o resultado de `hash_tree` com um manifesto: alterados, ausentes e novos."""
+    current = {f["path"]: f.get("digests") for f in result["files"] if "digests" in f}
+    changed, missing = [], []
+    for rel, expected in manifest.items():
+        digests = current.get(rel)
+        if digests is None:
+            missing.append(rel)
+            continue
+        common = [a for a in expected if a in digests]
+        if not common or any(expected[a] != digests[a] for a in common):
+            changed.append(rel)
+    added = sorted(set(current) - set(manifest))
+    return {"changed": sorted(changed), "missing": sorted(missing), "added": added,
+            "ok": len(manifest) - len(changed) - len(missing)}
@@ -0,0 +1,255 @@
+"""
+Extração incremental de texto de HTML para observações do agente.
+
+``HtmlToText`` é um ``HTMLParser`` alimentado bloco a bloco. Ele descarta
+script/style/noscript/svg/template e o ``<head>`` (guardando apenas o ``<title>``). Como
+``</head>`` é opcional, o cabeçalho também termina em ``<body>``, na primeira tag de
+conteúdo ou no primeiro texto fora dele, como no HTML5.
+Converte elementos de bloco em quebras de linha e junta espaços repetidos. O texto
+dentro de ``<main>``/``<article>`` é guardado à parte e preferido quando existe. Assim
+que o orçamento de tokens (≈ 4 caracteres por token) é preenchido, ``full`` fica
+verdadeiro e quem lê a rede pode parar de baixar.
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+
+_SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "object", "canvas"}
+# Tags que podem ficar no <head>; qualquer outra abre o corpo mesmo sem </head>
+_HEAD_TAGS = {"head", "title", "meta", "link", "style", "script", "noscript", "base", "template"}
+_MAIN_TAGS = {"main", "article"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "footer", "nav", "aside", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table",
+    "pre", "blockquote", "figure", "figcaption", "form", "address", "details", "summary",
+}
+_VOID_TAGS = {"br", "hr", "img", "meta", "link", "input", "area", "base", "col", "embed", "source", "track", "wbr"}
+_CHARS_PER_TOKEN = 4
+_WS_RE = re.compile("[ \\t\\r\\f\\v\\u00a0]+")
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9_\-:.]+)""", re.I)
+# Com <main>/<article>, o texto geral pode crescer até N vezes o orçamento antes de parar
+_PAGE_SLACK = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // _CHARS_PER_TOKEN)
+
+
+def _clip(text: str, limit: int) -> str:
+    """Corta em `limit` caracteres, de preferência no último espaço (sem partir palavras)."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = max(cut.rfind(" "), cut.rfind("\n"))
+    return cut[:space] if space >= limit * 0.8 else cut
+
+
+def sniff_encoding(head: bytes, declared: str | None = None) -> str:
+    """Charset do cabeçalho HTTP, senão BOM ou ``<meta charset>``, senão utf-8."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if declared:
+        return declared
+    m = _META_CHARSET_RE.search(head[:4096])
+    if m:
+        name = m.group(1).decode("ascii", "ignore")
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class _Buffer:
+    def __init__(self, limit: int):
+        self.parts = []
+        self.length = 0
+        self.limit = limit
+        self.pending_break = False
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.limit
+
+    def add(self, text: str):
+        if self.full:
+            return
+        if self.pending_break and self.parts:
+            self.parts.append("\n")
+            self.length += 1
+        self.pending_break = False
+        if self.parts and not self.parts[-1].endswith(("\n", " ")) and not text.startswith(" "):
+            text = " " + text
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self) -> str:
+        lines = (line.strip() for line in "".join(self.parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+class HtmlToText(HTMLParser):
+    """Conversor incremental HTML -> texto com orçamento de tokens."""
+
+    def __init__(self, max_tokens: int = 1000):
+        super().__init__(convert_charrefs=True)
+        limit = max(1, int(max_tokens)) * _CHARS_PER_TOKEN
+        self._page = _Buffer(limit * _PAGE_SLACK)
+        self._main = _Buffer(limit)
+        self.limit = limit
+        self._skip = 0
+        self._in_head = False
+        self._main_depth = 0
+        self._in_title = False
+        self.title = ""
+        self.saw_main = False
+
+    @property
+    def full(self) -> bool:
+        return self._main.full or self._page.full
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if tag == "head":
+            self._in_head = True
+        elif tag not in _HEAD_TAGS:
+            self._in_head = False
+        if tag in _SKIP_TAGS and tag not in _VOID_TAGS:
+            self._skip += 1
+            return
+        if tag in _MAIN_TAGS:
+            self._main_depth += 1
+            self.saw_main = True
+        if tag in _BLOCK_TAGS:
+            self._break()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in _HEAD_TAGS:
+            self._in_head = False
+        if tag in _BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag == "head":
+            self._in_head = False
+        if tag in _SKIP_TAGS and tag not in _VOID_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        if tag in _MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+        if tag in _BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._in_title and not self.title:
+            self.title = _WS_RE.sub(" ", data).strip()
+        if self._skip or self._in_title:
+            return
+        text = _WS_RE.sub(" ", data.replace("\n", " ")).strip()
+        if not text:
+            return
+        # Texto solto no <head> também abre o corpo
+        self._in_head = False
+        self._page.add(text)
+        if self._main_depth:
+            self._main.add(text)
+
+    def _break(self):
+        self._page.pending_break = True
+        if self._main_depth:
+            self._main.pending_break = True
+
+    def text(self) -> str:
+        main = self._main.text()
+        # <main> quase vazio (ex.: só um título) não representa a página
+        if main and len(main) >= min(self.limit, 200):
+            return _clip(main, self.limit)
+        return _clip(self._page.text(), self.limit)
+
+
+class TextExtractor:
+    """Recebe bytes da resposta aos poucos e produz o texto (HTML ou texto puro)."""
+
+    def __init__(self, content_type: str = "", encoding: str | None = None, max_tokens: int = 1000):
+        content_type = (content_type or "").lower()
+        self.is_html = "html" in content_type or "xml" in content_type or not content_type
+        self.declared = encoding
+        self.max_tokens = max_tokens
+        self._decoder = None
+        self._head = b""
+        self._parser = HtmlToText(max_tokens) if self.is_html else None
+        self._plain = []
+        self._plain_len = 0
+        self.bytes_fed = 0
+
+    @property
+    def full(self) -> bool:
+        if self._parser is not None:
+            return self._parser.full
+        return self._plain_len >= self.max_tokens * _CHARS_PER_TOKEN
+
+    def feed(self, chunk: bytes) -> bool:
+        """Processa um bloco; retorna True quando o orçamento já foi preenchido."""
+        self.bytes_fed += len(chunk)
+        if self._decoder is None:
+            # Espera alguns KiB para achar o <meta charset> antes de decodificar
+            self._head += chunk
+            if len(self._head) < 2048:
+                return False
+            chunk, self._head = self._head, b""
+            self._start_decoder(chunk)
+        self._consume(self._decoder.decode(chunk))
+        return self.full
+
+    def _start_decoder(self, head: bytes):
+        enc = sniff_encoding(head, self.declared)
+        try:
+            self._decoder = codecs.getincrementaldecoder(enc)(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _consume(self, text: str):
+        if not text:
+            return
+        if self._parser is not None:
+            self._parser.feed(text)
+        elif not self.full:
+            self._plain.append(text)
+            self._plain_len += len(text)
+
+    def close(self):
+        if self._decoder is None:
+            self._start_decoder(self._head)
+            self._consume(self._decoder.decode(self._head, final=True))
+            self._head = b""
+        else:
+            self._consume(self._decoder.decode(b"", final=True))
+        if self._parser is not None:
+            try:
+                self._parser.close()
+            except Exception:
+                pass
+
+    @property
+    def title(self) -> str:
+        return self._parser.title if self._parser is not None else ""
+
+    def text(self) -> str:
+        if self._parser is not None:
+            return self._parser.text()
+        return _clip("".join(self._plain), self.max_tokens * _CHARS_PER_TOKEN)
+
+
+def html_to_text(data: bytes, content_type: str = "text/html", encoding: str | None = None,
+                 max_tokens: int = 1000) -> tuple:
+    """Atalho para conteúdo já em memória. Retorna ``(título, texto)``."""
+    extractor = TextExtractor(content_type, encoding, max_tokens)
+    for i in range(0, len(data), 65536):
+        if extractor.feed(data[i:i + 65536]):
+            break
+    extractor.close()
+    return extractor.title, extractor.text()
@@ -0,0 +1,334 @@
+"""
+Cache HTTP em disco para ``fetch_url`` e a busca web.
+
+Cada resposta 200 é gravada em ``<dir>/<sha1>.body``. Os metadados (URL, validadores,
+validade, tamanho e último acesso) ficam em ``<dir>/index.json``. A validade segue o
+``Cache-Control``:
+
+- ``no-store`` não grava.
+- ``no-cache`` grava, mas revalida a cada uso.
+- ``max-age`` define a validade; sem ele, vale o ``Expires``.
+- Sem nenhum dos dois, usa 10% da idade indicada pelo ``Last-Modified``, até 1 dia.
+
+Respostas vencidas com ETag/Last-Modified são revalidadas com ``If-None-Match`` /
+``If-Modified-Since``, e um 304 renova a entrada sem baixar o corpo de novo. O parâmetro
+``ttl`` sobrepõe a validade calculada; a busca web o usa, pois as páginas de resultado vêm
+sem cache. O total em disco é limitado a ``max_bytes``, descartando as entradas usadas há
+mais tempo (LRU).
+
+Se a rede falhar, uma entrada vencida é servida com ``stale=True``. No modo ``offline``, a
+rede nunca é consultada.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+
+requests = lazy_import("requests")
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*\"?(\d+)")
+_HEURISTIC_MAX = 24 * 3600
+# Intervalo mínimo entre gravações do índice quando só mudou o último acesso
+_INDEX_SAVE_INTERVAL = 5.0
+
+
+class CachedResponse:
+    """Resposta servida pelo cache (interface mínima compatível com ``requests.Response``)."""
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes, encoding,
+                 from_cache: bool, stale: bool = False, truncated: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+        self.stale = stale
+        # Corpo cortado pelo orçamento de leitura (fetch_limited)
+        self.truncated = truncated
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} para a URL: {self.url}")
+
+
+def fetch_limited(http, url: str, headers=None, timeout: float = 12, max_bytes=None, stop_when=None,
+                  chunk_size: int = 64 * 1024) -> CachedResponse:
+    """GET em streaming que para após `max_bytes` ou quando `stop_when(bloco, cabeçalhos)`
+    retorna True.
+
+    A conexão é fechada sem ler o resto do corpo; ``truncated`` indica se sobrou conteúdo.
+    """
+    with http.get(url, headers=headers or {}, timeout=timeout, stream=True) as resp:
+        parts, total, truncated = [], 0, False
+        if resp.status_code == 200:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                if max_bytes is not None and total + len(chunk) >= max_bytes:
+                    chunk = chunk[: max_bytes - total]
+                    truncated = True
+                parts.append(chunk)
+                total += len(chunk)
+                if truncated or (stop_when is not None and stop_when(chunk, resp.headers)):
+                    truncated = True
+                    break
+        else:
+            parts.append(resp.content)
+        # Chegou exatamente ao fim do corpo: não há o que cortar
+        if truncated and resp.raw is not None and getattr(resp.raw, "length_remaining", None) == 0:
+            truncated = False
+        return CachedResponse(resp.url or url, resp.status_code, dict(resp.headers), b"".join(parts),
+                              resp.encoding, from_cache=False, truncated=truncated)
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    import email.utils  # só para respostas com data; o pacote email é pesado na abertura
+
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness_lifetime(headers, now: float):
+    """Validade em segundos segundo os cabeçalhos; None = não armazenar."""
+    cc = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cc:
+        return None
+    if "no-cache" in cc:
+        return 0
+    m = _MAX_AGE_RE.search(cc)
+    if m:
+        return int(m.group(1))
+    date = _parse_date(headers.get("Date")) or now
+    expires = headers.get("Expires")
+    if expires is not None:
+        exp = _parse_date(expires)
+        return max(0, int(exp - date)) if exp else 0
+    last_modified = _parse_date(headers.get("Last-Modified"))
+    if last_modified:
+        return int(min(_HEURISTIC_MAX, max(0.0, (date - last_modified) * 0.1)))
+    return 0
+
+
+class HttpCache:
+    def __init__(self, directory, max_bytes: int = 200 * 1024 * 1024, max_entry_bytes: int = 10 * 1024 * 1024,
+                 offline: bool = False, serve_stale_on_error: bool = True):
+        self.dir = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.max_entry_bytes = int(max_entry_bytes)
+        self.offline = bool(offline)
+        self.serve_stale_on_error = bool(serve_stale_on_error)
+        self.lock = threading.Lock()
+        self._index = None
+        self._index_saved = 0.0
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stale": 0, "stores": 0, "evictions": 0}
+
+    # --- índice ---
+    def _load(self):
+        if self._index is not None:
+            return
+        index = {}
+        try:
+            path = self.dir / "index.json"
+            if path.exists():
+                data = json.loads(path.read_text(encoding="utf-8")) or {}
+                index = data.get("entries", {}) if isinstance(data, dict) else {}
+        except Exception:
+            index = {}
+        self._index = index
+
+    def _save_index(self, force: bool = False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self._index_saved < _INDEX_SAVE_INTERVAL:
+                return
+            self._index_saved = now
+            payload = json.dumps({"version": 1, "entries": self._index}, ensure_ascii=False)
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.dir / f"index.json.{os.getpid()}.{threading.get_ident()}.tmp"
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.dir / "index.json")
+        except Exception:
+            pass
+
+    @staticmethod
+    def key(url: str, method: str = "GET") -> str:
+        return hashlib.sha1(f"{method} {url}".encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.dir / f"{key}.body"
+
+    def _lookup(self, key: str):
+        with self.lock:
+            self._load()
+            entry = self._index.get(key)
+            return dict(entry) if entry else None
+
+    def _serve(self, key: str, entry: dict, stale: bool = False, counter: str = "hits"):
+        try:
+            content = self._body_path(key).read_bytes()
+        except OSError:
+            with self.lock:
+                self._index.pop(key, None)
+            return None
+        with self.lock:
+            if key in self._index:
+                self._index[key]["last_access"] = time.time()
+            self.stats["stale" if stale else counter] += 1
+        self._save_index()
+        return CachedResponse(entry["url"], entry.get("status", 200), entry.get("headers", {}), content,
+                              entry.get("encoding"), from_cache=True, stale=stale,
+                              truncated="partial" in entry)
+
+    def _store(self, key: str, resp, ttl, now: float, partial_key=None):
+        lifetime = freshness_lifetime(resp.headers, now)
+        if lifetime is None and ttl is None:
+            return
+        content = resp.content
+        if len(content) > self.max_entry_bytes:
+            return
+        headers = {k: v for k, v in resp.headers.items()
+                   if k.lower() in ("content-type", "etag", "last-modified", "cache-control", "date", "expires")}
+        entry = {
+            "url": resp.url or "",
+            "status": resp.status_code,
+            "headers": headers,
+            "encoding": resp.encoding,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "stored_at": now,
+            "expires_at": now + (ttl if ttl is not None else lifetime),
+            "size": len(content),
+            "last_access": now,
+        }
+        if getattr(resp, "truncated", False):
+            entry["partial"] = partial_key or ""
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._body_path(key).with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(content)
+            os.replace(tmp, self._body_path(key))
+        except OSError:
+            return
+        with self.lock:
+            self._load()
+            self._index[key] = entry
+            self.stats["stores"] += 1
+            evicted = self._evict_locked()
+        for old in evicted:
+            try:
+                self._body_path(old).unlink()
+            except OSError:
+                pass
+        self._save_index(force=True)
+
+    def _evict_locked(self) -> list:
+        total = sum(e.get("size", 0) for e in self._index.values())
+        if total <= self.max_bytes:
+            return []
+        evicted = []
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("last_access", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entry.get("size", 0)
+            evicted.append(key)
+        for key in evicted:
+            del self._index[key]
+        self.stats["evictions"] += len(evicted)
+        return evicted
+
+    # --- API ---
+    def get(self, url: str, session=None, headers=None, timeout: float = 12, ttl=None, offline=None,
+            max_bytes=None, stop_when=None, partial_key=None):
+        """GET com cache. Retorna ``requests.Response`` (rede) ou ``CachedResponse``.
+
+        `ttl` (segundos) sobrepõe a validade dos cabeçalhos. Com `max_bytes`/`stop_when` a
+        leitura é em streaming (``fetch_limited``). O corpo cortado só é reaproveitado por
+        chamadas com o mesmo `partial_key`, ou seja, com o mesmo orçamento. Exceções de rede
+        só propagam quando não há entrada para servir desatualizada.
+        """
+        key = self.key(url)
+        entry = self._lookup(key)
+        if entry is not None and "partial" in entry and entry["partial"] != (partial_key or ""):
+            entry = None
+        now = time.time()
+        offline = self.offline if offline is None else offline
+        if entry is not None and (offline or now < entry.get("expires_at", 0)):
+            served = self._serve(key, entry, stale=now >= entry.get("expires_at", 0))
+            if served is not None:
+                return served
+            entry = None
+        if offline:
+            raise requests.ConnectionError(f"modo offline: '{url}' não está no cache")
+
+        http = session or requests
+        streaming = max_bytes is not None or stop_when is not None
+
+        def fetch(req_headers):
+            if streaming:
+                return fetch_limited(http, url, req_headers, timeout, max_bytes, stop_when)
+            return http.get(url, headers=req_headers, timeout=timeout)
+
+        req_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get("etag"):
+                req_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                req_headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            resp = fetch(req_headers)
+        except requests.RequestException:
+            if entry is not None and self.serve_stale_on_error:
+                served = self._serve(key, entry, stale=True)
+                if served is not None:
+                    return served
+            raise
+
+        if resp.status_code == 304 and entry is not None:
+            lifetime = freshness_lifetime(resp.headers, now)
+            with self.lock:
+                current = self._index.get(key)
+                if current is not None:
+                    current["expires_at"] = now + (ttl if ttl is not None else (lifetime or 0))
+            served = self._serve(key, entry, counter="revalidated")
+            if served is not None:
+                return served
+            # Corpo sumiu do disco: busca de novo sem condicionais
+            resp = fetch(dict(headers or {}))
+
+        with self.lock:
+            self.stats["misses"] += 1
+        if resp.status_code == 200:
+            self._store(key, resp, ttl, now, partial_key)
+        elif resp.status_code >= 500 and entry is not None and self.serve_stale_on_error:
+            served = self._serve(key, entry, stale=True)
+            if served is not None:
+                return served
+        return resp
+
+    def clear(self):
+        with self.lock:
+            self._load()
+            keys = list(self._index)
+            self._index = {}
+        for key in keys:
+            try:
+                self._body_path(key).unlink()
+            except OSError:
+                pass
+        self._save_index(force=True)
@@ -0,0 +1,75 @@
+"""
+Casamento de intenções por palavras-chave em uma única passada.
+
+``IntentMatcher`` compila todas as palavras-chave (heurísticas offline e aliases da
+biblioteca de comandos) em uma regex de trie, avaliada em todas as posições do texto
+com lookahead. Como duas palavras que casam na mesma posição são prefixos uma da outra,
+cada palavra carrega também as intenções das palavras-chave que são seus prefixos: o
+resultado equivale a ``any(k in texto for k in palavras)`` para cada intenção, mas custa
+uma varredura do texto em vez de uma por palavra-chave.
+"""
+
+import re
+
+
+def _trie_pattern(words) -> str:
+    """Regex equivalente à alternância de `words`, fatorada por prefixos comuns (greedy)."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _build(node) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + _build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Palavra completa aqui, mas tenta antes estender (casamento mais longo)
+            return "(?:" + body + ")?"
+        return body
+
+    return _build(trie)
+
+
+class IntentMatcher:
+    """Conjunto compilado de intenções ``(nome, prioridade, palavras-chave)``.
+
+    Menor prioridade = avaliada primeiro. Palavras-chave são comparadas em minúsculas
+    (o texto deve ser passado já em minúsculas, como nas heurísticas originais).
+    """
+
+    def __init__(self, intents):
+        self.priorities = {}
+        by_keyword = {}
+        for name, priority, keywords in intents:
+            self.priorities[name] = min(priority, self.priorities.get(name, priority))
+            for kw in keywords:
+                kw = (kw or "").lower()
+                if kw:
+                    by_keyword.setdefault(kw, set()).add(name)
+        # Fecho por prefixo: quem casa "listar processos" também casa "listar"
+        self._intents_for = {}
+        for kw in by_keyword:
+            names = set()
+            for i in range(1, len(kw) + 1):
+                names |= by_keyword.get(kw[:i], set())
+            self._intents_for[kw] = frozenset(names)
+        if by_keyword:
+            self._regex = re.compile("(?=(" + _trie_pattern(by_keyword) + "))")
+        else:
+            self._regex = None
+
+    def match(self, text: str) -> list:
+        """Retorna ``[(intenção, prioridade), ...]`` ordenado por prioridade."""
+        found = set()
+        if self._regex is not None and text:
+            for m in self._regex.finditer(text):
+                found |= self._intents_for[m.group(1)]
+        return sorted(((name, self.priorities[name]) for name in found), key=lambda x: (x[1], x[0]))
+
+    def matched(self, text: str) -> set:
+        return {name for name, _ in self.match(text)}
@@ -0,0 +1,524 @@
+"""
+Busca na base de conhecimento local (``warpclone_knowledge/*.md``): lexical + semântica.
+
+Os arquivos são divididos em trechos de até `chunk_chars` caracteres, cortados em
+parágrafos. Cada busca combina duas listas:
+- **Lexical:** BM25 sobre termos sem acento, com um stemming leve de plurais.
+  "Configuração de rede" encontra "configurações de redes".
+- **Semântica:** com NumPy e um modelo de embeddings no Ollama, cada trecho vira um vetor
+  (``/api/embed``, em lotes). Os vetores normalizados ficam numa matriz float32 em
+  ``vectors.f32``, lida via memmap. A consulta é um produto matricial em blocos seguido de
+  ``argpartition``.
+
+As duas listas são fundidas por Reciprocal Rank Fusion (RRF): cada trecho soma
+``1 / (k + posição)`` em cada lista. Se o Ollama estiver fora do ar, ou o modelo de
+embeddings não existir, a busca continua só lexical. A parte semântica é retentada depois
+de `retry_sec`.
+
+O índice é incremental. ``manifest.json`` guarda, por arquivo, tamanho/mtime e os trechos
+com o hash do texto e a linha do vetor. Só arquivos alterados são relidos, e um trecho
+cujo texto já tem vetor (mesmo movido de arquivo) não é enviado de novo ao modelo. Cada
+atualização envia no máximo `max_embed_per_refresh` trechos, para uma busca não ficar
+presa indexando uma base grande; o restante entra nas buscas seguintes. Com ``embed=False``
+(contexto antecipado antes da primeira chamada ao modelo), a atualização só relê os arquivos
+e a busca usa o BM25 e os vetores já gravados; os trechos novos ficam para a próxima busca
+que embute.
+
+A partir de `ann_min_rows` vetores, a parte semântica usa o índice IVF de ``warpclone_ann``
+(gravado em ``index_dir/ivf``) em vez de comparar a consulta com todos os vetores.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from warpclone_ann import IvfIndex
+from warpclone_lazy import lazy_import
+
+np = lazy_import("numpy", optional=True)
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a o e as os um uma uns umas de do da dos das em no na nos nas por para pra com sem que se "
+    "ao aos como mais mas ou seu sua seus suas ser esta este isso isto eh the of to and in is for on".split()
+)
+_SEARCH_BLOCK = 65536
+_CANDIDATES = 50
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+def fold(text: str) -> str:
+    """Minúsculas sem acentos ("Configuração" -> "configuracao")."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("oes"):
+        return token[:-3] + "ao"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    return [_stem(t) for t in _TOKEN_RE.findall(fold(text)) if t not in _STOPWORDS and len(t) > 1]
+
+
+def split_chunks(text: str, chunk_chars: int = 800) -> list:
+    """Trechos ``(início, fim)`` de até `chunk_chars`, cortados em parágrafos quando possível."""
+    spans, start, pos = [], 0, 0
+    for match in re.finditer(r"\n\s*\n|\Z", text):
+        end = match.start()
+        if end - start > chunk_chars and pos > start:
+            spans.append((start, pos))
+            start = pos
+        while end - start > chunk_chars:
+            # Parágrafo maior que o trecho: corta no último espaço antes do limite
+            cut = text.rfind(" ", start, start + chunk_chars)
+            cut = cut if cut > start else start + chunk_chars
+            spans.append((start, cut))
+            start = cut
+        pos = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return [(s, e) for s, e in spans if text[s:e].strip()]
+
+
+class OllamaEmbedder:
+    """Embeddings via Ollama: ``/api/embed`` em lotes, com fallback para ``/api/embeddings``."""
+
+    def __init__(self, base_url: str, model: str, session_factory, batch_size: int = 32, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.session_factory = session_factory
+        self.batch_size = max(1, int(batch_size))
+        self.timeout = float(timeout)
+        self._legacy = False
+        self.requests = 0
+
+    def _post(self, endpoint: str, payload: dict) -> dict:
+        self.requests += 1
+        try:
+            response = self.session_factory().post(f"{self.base_url}{endpoint}", json=payload, timeout=self.timeout)
+        except Exception as e:
+            raise EmbeddingError(f"Ollama indisponível: {e}") from e
+        if response.status_code == 404 and endpoint == "/api/embed" and "model" not in response.text:
+            # Ollama antigo, sem o endpoint em lote
+            self._legacy = True
+            return {}
+        if response.status_code >= 400:
+            raise EmbeddingError(f"HTTP {response.status_code} em {endpoint}: {response.text[:200]}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise EmbeddingError(f"resposta inválida de {endpoint}") from e
+
+    def embed(self, texts: list):
+        """Matriz float32 ``(len(texts), dim)`` com linhas de norma 1."""
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            if not self._legacy:
+                data = self._post("/api/embed", {"model": self.model, "input": batch, "truncate": True})
+                if not self._legacy:
+                    embeddings = data.get("embeddings") or []
+                    if len(embeddings) != len(batch):
+                        raise EmbeddingError("número de embeddings diferente do número de textos")
+                    vectors.extend(embeddings)
+                    continue
+            for text in batch:
+                embedding = self._post("/api/embeddings", {"model": self.model, "prompt": text}).get("embedding")
+                if not embedding:
+                    raise EmbeddingError("resposta sem embedding")
+                vectors.append(embedding)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class _Bm25:
+    """Índice invertido em memória; documentos = trechos."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.postings = {}
+        self.lengths = []
+
+    def add(self, tokens: list):
+        doc = len(self.lengths)
+        self.lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((doc, tf))
+
+    def search(self, tokens: list, limit: int) -> list:
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg = sum(self.lengths) / n
+        scores = {}
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc, tf in posting:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[doc] / avg)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def pack_passages(results: list, max_tokens: int, chars_per_token: int = 4) -> str:
+    """Junta trechos de ``KnowledgeBase.search`` (melhor primeiro) em até `max_tokens` tokens
+    estimados. O último trecho que não cabe inteiro é cortado se sobrar espaço útil."""
+    budget = max(0, int(max_tokens)) * chars_per_token
+    parts = []
+    for r in results:
+        header = f"[{r['file']}]\n"
+        room = budget - len(header)
+        if room < 200:
+            break
+        snippet = r["snippet"] if len(r["snippet"]) <= room else r["snippet"][:room - 3].rstrip() + "..."
+        parts.append(header + snippet)
+        budget -= len(parts[-1]) + 2
+    return "\n\n".join(parts)
+
+
+class KnowledgeBase:
+    """Índice incremental de `knowledge_dir`, persistido em `index_dir`."""
+
+    def __init__(self, knowledge_dir, index_dir, embedder: OllamaEmbedder | None = None, chunk_chars: int = 800,
+                 fusion_k: int = 60, refresh_sec: float = 5.0, retry_sec: float = 300.0,
+                 max_embed_per_refresh: int = 512, ann: IvfIndex | None = None, ann_min_rows: int = 20000):
+        self.knowledge_dir = Path(knowledge_dir)
+        self.index_dir = Path(index_dir)
+        self.embedder = embedder if np is not None else None
+        self.chunk_chars = int(chunk_chars)
+        self.fusion_k = int(fusion_k)
+        self.refresh_sec = float(refresh_sec)
+        self.retry_sec = float(retry_sec)
+        self.max_embed = int(max_embed_per_refresh)
+        self.ann = ann if self.embedder is not None else None
+        self.ann_min_rows = int(ann_min_rows)
+        self.lock = threading.RLock()
+        self._manifest = None
+        self._texts = {}  # arquivo -> texto (para BM25 e trechos)
+        self._chunks = []  # [(arquivo, início, fim, linha do vetor)]
+        self._bm25 = None
+        self._matrix = None
+        self._row_of = None
+        self._valid_rows = None
+        self._docs_by_row = None
+        self._last_refresh = 0.0
+        self._semantic_down_until = 0.0
+        self._query_vectors = OrderedDict()
+        self.last_error = None
+        self.generation = 0  # muda a cada atualização que altera trechos ou vetores
+        self._embed_due = False  # houve atualização sem embutir: a próxima que embute não é pulada
+
+    # --- persistência ---
+    @property
+    def _vectors_path(self) -> Path:
+        return self.index_dir / "vectors.f32"
+
+    def _load_manifest(self) -> dict:
+        model = self.embedder.model if self.embedder else None
+        try:
+            manifest = json.loads((self.index_dir / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = None
+        if not manifest or manifest.get("version") != 1 or manifest.get("chunk_chars") != self.chunk_chars:
+            manifest = {"version": 1, "chunk_chars": self.chunk_chars, "model": model, "dim": 0, "rows": 0, "files": {}}
+        try:
+            size = self._vectors_path.stat().st_size
+        except OSError:
+            size = 0
+        # Outro modelo, ou arquivo de vetores que não bate com o manifesto: recomeça os vetores
+        if (model and manifest.get("model") != model) or size != manifest["rows"] * manifest["dim"] * 4:
+            manifest.update(model=model, dim=0, rows=0)
+            for entry in manifest["files"].values():
+                for chunk in entry["chunks"]:
+                    chunk[3] = -1
+            try:
+                self._vectors_path.unlink()
+            except OSError:
+                pass
+            if self.ann is not None:
+                self.ann.reset()
+        return manifest
+
+    def _save_manifest(self):
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            target = self.index_dir / "manifest.json"
+            tmp = target.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(self._manifest), encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError:
+            pass
+
+    def _open_matrix(self):
+        self._row_of = self._valid_rows = self._docs_by_row = None
+        rows, dim = self._manifest["rows"], self._manifest["dim"]
+        if rows and dim:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            self._matrix = None
+
+    # --- atualização ---
+    def refresh(self, force: bool = False, on_progress=None, embed: bool = True) -> dict:
+        """Relê arquivos alterados e, com `embed`, embute trechos novos. Retorna contadores da
+        atualização."""
+        stats = {"files": 0, "changed": 0, "chunks": 0, "embedded": 0, "pending": 0}
+        with self.lock:
+            now = time.monotonic()
+            recent = self._manifest is not None and now - self._last_refresh < self.refresh_sec
+            if not force and recent and not (embed and self._embed_due):
+                return stats
+            self._last_refresh = now
+            if self._manifest is None:
+                self._manifest = self._load_manifest()
+                if self.embedder:
+                    self._open_matrix()
+            files = self._manifest["files"]
+            seen = {}
+            paths = sorted(self.knowledge_dir.rglob("*.md")) if self.knowledge_dir.exists() else []
+            changed = False
+            for p in paths:
+                key = str(p)
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                stamp = [st.st_size, st.st_mtime_ns]
+                entry = files.get(key)
+                if entry is None or entry["stamp"] != stamp or key not in self._texts:
+                    try:
+                        text = p.read_text(encoding="utf-8", errors="ignore")
+                    except OSError:
+                        continue
+                    self._texts[key] = text
+                    if entry is None or entry["stamp"] != stamp:
+                        stats["changed"] += 1
+                        changed = True
+                        entry = {"stamp": stamp, "chunks": [
+                            [s, e, hashlib.sha1(text[s:e].encode("utf-8")).hexdigest()[:16], -1]
+                            for s, e in split_chunks(text, self.chunk_chars)]}
+                    elif self._bm25 is not None:
+                        changed = True
+                seen[key] = entry
+            if set(seen) != set(files):
+                changed = True
+            for key in set(self._texts) - set(seen):
+                del self._texts[key]
+            self._manifest["files"] = seen
+            stats["files"] = len(seen)
+            if changed or self._bm25 is None:
+                self._rebuild_lexical()
+            stats["chunks"] = len(self._chunks)
+            if self.embedder is not None:
+                if embed:
+                    self._embed_pending(stats, on_progress)
+                    self._embed_due = False
+                else:
+                    self._embed_due = True
+            if changed or stats["embedded"]:
+                self.generation += 1
+                self._compact_if_needed()
+                self._save_manifest()
+            if self.ann is not None and self._matrix is not None and len(self._matrix) >= self.ann_min_rows:
+                stats["ann"] = self.ann.update(self._matrix)
+            return stats
+
+    def _rebuild_lexical(self):
+        bm25, chunks = _Bm25(), []
+        for key, entry in self._manifest["files"].items():
+            text = self._texts.get(key, "")
+            for s, e, _, _ in entry["chunks"]:
+                chunks.append((key, s, e))
+                bm25.add(tokenize(text[s:e]))
+        self._bm25, self._chunks = bm25, chunks
+        self._row_of = self._valid_rows = self._docs_by_row = None
+
+    def _embed_pending(self, stats: dict, on_progress):
+        manifest = self._manifest
+        known = {}
+        pending = []
+        for entry in manifest["files"].values():
+            for chunk in entry["chunks"]:
+                if chunk[3] >= 0:
+                    known[chunk[2]] = chunk[3]
+        for key, entry in manifest["files"].items():
+            for chunk in entry["chunks"]:
+                if chunk[3] < 0:
+                    row = known.get(chunk[2])
+                    if row is not None:
+                        chunk[3] = row
+                    else:
+                        pending.append((key, chunk))
+        stats["pending"] = len(pending)
+        if not pending or time.monotonic() < self._semantic_down_until:
+            return
+        # Textos repetidos (mesmo hash) são embutidos uma vez só
+        unique = OrderedDict()
+        for key, chunk in pending:
+            unique.setdefault(chunk[2], []).append((key, chunk))
+        batch = list(unique.items())[: self.max_embed]
+        step = self.embedder.batch_size * 4
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._vectors_path, "ab") as out:
+                for i in range(0, len(batch), step):
+                    part = batch[i:i + step]
+                    texts = [self._texts[refs[0][0]][refs[0][1][0]:refs[0][1][1]] for _, refs in part]
+                    matrix = self.embedder.embed(texts)
+                    if not manifest["dim"]:
+                        manifest["dim"] = int(matrix.shape[1])
+                    elif matrix.shape[1] != manifest["dim"]:
+                        raise EmbeddingError("dimensão do embedding mudou; apague o índice")
+                    out.write(matrix.astype(np.float32).tobytes())
+                    for n, (_, refs) in enumerate(part):
+                        for _, chunk in refs:
+                            chunk[3] = manifest["rows"] + n
+                    manifest["rows"] += len(part)
+                    stats["embedded"] += sum(len(refs) for _, refs in part)
+                    if on_progress is not None:
+                        on_progress(i + len(part), len(batch), 0, 0)
+            self.last_error = None
+        except (EmbeddingError, OSError) as e:
+            self.last_error = str(e)
+            self._semantic_down_until = time.monotonic() + self.retry_sec
+        stats["pending"] -= stats["embedded"]
+        self._open_matrix()
+
+    def _compact_if_needed(self):
+        """Reescreve ``vectors.f32`` só com as linhas em uso quando as órfãs passam das vivas."""
+        manifest = self._manifest
+        if self._matrix is None:
+            return
+        live = sorted({c[3] for e in manifest["files"].values() for c in e["chunks"] if c[3] >= 0})
+        if manifest["rows"] - len(live) <= max(1000, len(live)):
+            return
+        remap = {old: new for new, old in enumerate(live)}
+        tmp = self._vectors_path.with_suffix(".compact.tmp")
+        with open(tmp, "wb") as out:
+            for i in range(0, len(live), _SEARCH_BLOCK):
+                out.write(np.ascontiguousarray(self._matrix[live[i:i + _SEARCH_BLOCK]]).tobytes())
+        self._matrix = None
+        os.replace(tmp, self._vectors_path)
+        for entry in manifest["files"].values():
+            for chunk in entry["chunks"]:
+                if chunk[3] >= 0:
+                    chunk[3] = remap[chunk[3]]
+        manifest["rows"] = len(live)
+        self._open_matrix()
+        if self.ann is not None:
+            # As linhas mudaram de posição: o IVF é refeito na próxima atualização
+            self.ann.reset()
+
+    # --- busca ---
+    def _query_vector(self, query: str):
+        vector = self._query_vectors.pop(query, None)
+        if vector is None:
+            vector = self.embedder.embed([query])[0]
+        self._query_vectors[query] = vector
+        while len(self._query_vectors) > 256:
+            self._query_vectors.popitem(last=False)
+        return vector
+
+    def _semantic(self, query: str, limit: int) -> list:
+        """``[(trecho, cosseno)]`` (índices em ``self._chunks``), melhor primeiro."""
+        if self.embedder is None or self._matrix is None or time.monotonic() < self._semantic_down_until:
+            return []
+        try:
+            q = self._query_vector(query)
+        except EmbeddingError as e:
+            self.last_error = str(e)
+            self._semantic_down_until = time.monotonic() + self.retry_sec
+            return []
+        row_of = self._row_of
+        if row_of is None:
+            # Trecho -> linha do vetor (o mesmo texto em vários arquivos aponta para a mesma linha)
+            row_of = np.fromiter((c[3] for e in self._manifest["files"].values() for c in e["chunks"]),
+                                 dtype=np.int64, count=len(self._chunks))
+            self._row_of = row_of
+        valid = row_of >= 0
+        if self.ann is not None and self.ann.meta is not None:
+            return self._semantic_ann(q, limit, row_of, valid)
+        rows = self._matrix.shape[0]
+        sims = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, _SEARCH_BLOCK):
+            sims[start:start + _SEARCH_BLOCK] = self._matrix[start:start + _SEARCH_BLOCK] @ q
+        scores = np.full(len(self._chunks), -np.inf, dtype=np.float32)
+        scores[valid] = sims[row_of[valid]]
+        k = min(limit, int(valid.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return list(zip(top.tolist(), scores[top].tolist()))
+
+    def _semantic_ann(self, q, limit: int, row_of, valid) -> list:
+        """Como ``_semantic``, mas só com os vetores dos grupos IVF mais próximos da consulta."""
+        if self._docs_by_row is None:
+            self._valid_rows = np.zeros(self._matrix.shape[0], dtype=bool)
+            self._valid_rows[row_of[valid]] = True
+            order = np.argsort(row_of, kind="stable")
+            self._docs_by_row = (order, row_of[order])
+        order, sorted_rows = self._docs_by_row
+        rows, scores = self.ann.search(q, self._matrix, limit, valid=self._valid_rows)
+        docs = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            lo, hi = np.searchsorted(sorted_rows, [row, row + 1])
+            docs.extend((doc, score) for doc in order[lo:hi].tolist())
+        return docs[:limit]
+
+    def search(self, query: str, top_k: int = 5, mode: str = "hybrid", snippet_chars: int = 500,
+               embed: bool = True) -> list:
+        """Trechos fundidos por RRF: ``[{"file", "score", "snippet", "lexical_rank",
+        "semantic_rank", "lexical_score", "semantic_score"}]`` (BM25 e cosseno; None se o
+        trecho não veio daquela lista). Sem `embed`, não embute trechos novos antes de buscar."""
+        query = (query or "").strip()
+        if not query:
+            return []
+        self.refresh(embed=embed)
+        with self.lock:
+            limit = max(_CANDIDATES, top_k * 4)
+            lexical = self._bm25.search(tokenize(query), limit) if mode != "semantic" else []
+            semantic = self._semantic(query, limit) if mode != "lexical" else []
+            fused = {}
+            for ranking in (lexical, semantic):
+                for rank, (doc, _) in enumerate(ranking, 1):
+                    fused[doc] = fused.get(doc, 0.0) + 1.0 / (self.fusion_k + rank)
+            lex = {doc: (r, score) for r, (doc, score) in enumerate(lexical, 1)}
+            sem = {doc: (r, score) for r, (doc, score) in enumerate(semantic, 1)}
+            results = []
+            for doc, score in sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:top_k]:
+                key, s, e = self._chunks[doc]
+                snippet = " ".join(self._texts.get(key, "")[s:e].split())[:snippet_chars]
+                lex_rank, lex_score = lex.get(doc, (None, None))
+                sem_rank, sem_score = sem.get(doc, (None, None))
+                results.append({"file": key, "score": round(score, 5), "snippet": snippet,
+                                "lexical_rank": lex_rank, "semantic_rank": sem_rank,
+                                "lexical_score": None if lex_score is None else round(lex_score, 3),
+                                "semantic_score": None if sem_score is None else round(sem_score, 4)})
+            return results
+
+    def status(self) -> dict:
+        with self.lock:
+            manifest = self._manifest or {}
+            embedded = sum(1 for e in manifest.get("files", {}).values() for c in e["chunks"] if c[3] >= 0)
+            return {"files": len(manifest.get("files", {})), "chunks": len(self._chunks), "embedded": embedded,
+                    "model": self.embedder.model if self.embedder else None, "last_error": self.last_error}
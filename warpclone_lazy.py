@@ -0,0 +1,61 @@
+"""
+Importação adiada de módulos pesados (requests, numpy, psutil).
+
+Importar ``warpclone`` carregava requests (com urllib3 e certifi), numpy e psutil antes de
+qualquer ação, o que pesava na abertura do executável. ``lazy_import`` devolve um objeto no
+lugar do módulo; o import de verdade acontece no primeiro acesso a um atributo
+(``np.zeros``, ``requests.Session``), sob uma trava, então threads que chegam juntas veem o
+módulo já completo. Depois disso, cada atributo fica guardado no próprio objeto e os acessos
+seguintes não passam mais por ``__getattr__``.
+
+Com ``optional=True`` e o módulo não instalado, devolve None, como o
+``try: import ... except ImportError: x = None`` usado no projeto.
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+
+_lock = threading.Lock()
+
+
+class _LazyModule:
+    """Representante de um módulo ainda não importado."""
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_lazy_name"])
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = "carregado" if self.__dict__["_lazy_module"] is not None else "adiado"
+        return f"<módulo {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_import(name: str, optional: bool = False):
+    """Módulo `name` importado só no primeiro uso (ou o próprio módulo, se já carregado)."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if optional:
+        try:
+            if importlib.util.find_spec(name) is None:
+                return None
+        except (ImportError, ValueError):
+            return None
+    return _LazyModule(name)
@@ -0,0 +1,153 @@
+"""
+Listagem de diretórios em streaming e paginada (``list_dir``).
+
+O percurso usa ``os.scandir`` em pré-ordem, com os nomes ordenados em cada pasta, o que
+torna a ordem estável entre chamadas. O tipo de cada item vem do próprio dirent, sem
+chamada extra. Tamanho e mtime vêm de ``DirEntry.stat``: no Windows já estão no
+resultado da listagem; no POSIX custam um ``lstat`` por item e podem ser desligados com
+``details=False``.
+
+A paginação usa cursor: o token guarda o caminho relativo do último item devolvido. A
+próxima página desce direto até ele, pulando pastas inteiras sem listá-las, em vez de
+refazer o percurso desde o início.
+"""
+
+import base64
+import fnmatch
+import hashlib
+import json
+import os
+import stat as stat_mod
+import time
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _matches(rel: str, name: str, patterns) -> bool:
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _as_list(value) -> list:
+    return [value] if isinstance(value, str) else list(value or [])
+
+
+def _query_key(root, max_depth, include, exclude) -> str:
+    raw = json.dumps([os.path.abspath(root), max_depth, include, exclude])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10]
+
+
+def encode_cursor(rel: str, key: str) -> str:
+    raw = json.dumps({"after": rel, "q": key}, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, key: str) -> str:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise CursorError("cursor inválido")
+    if data.get("q") != key:
+        raise CursorError("o cursor pertence a outra listagem (caminho, profundidade ou filtros diferentes)")
+    return data.get("after") or ""
+
+
+def iter_entries(root, max_depth=None, include=None, exclude=None, details: bool = True, after: str = ""):
+    """Gera dicts ``{"path", "type", "size", "mtime"}`` em pré-ordem ordenada por nome.
+
+    `max_depth`: 1 = só o nível de `root` (None = sem limite). `include` filtra os itens
+    devolvidos (as pastas continuam sendo percorridas); `exclude` também poda pastas.
+    `after` retoma logo depois desse caminho relativo (separador ``/``).
+    """
+    include, exclude = _as_list(include), _as_list(exclude)
+    after_parts = [p for p in after.split("/") if p] if after else []
+    yield from _walk(str(root), "", 1, max_depth, include, exclude, details, after_parts)
+
+
+def _walk(directory, prefix, depth, max_depth, include, exclude, details, after_parts):
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    first = after_parts[0] if after_parts else None
+    for entry in entries:
+        name = entry.name
+        if first is not None and name < first:
+            continue
+        rel = prefix + name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if exclude and _matches(rel, name, exclude):
+            continue
+        descend = is_dir and (max_depth is None or depth < max_depth)
+        if first is not None and name == first:
+            # Item do cursor: já devolvido na página anterior; retoma dentro dele
+            if descend:
+                yield from _walk(entry.path, rel + "/", depth + 1, max_depth, include, exclude, details,
+                                 after_parts[1:])
+            continue
+        if not include or _matches(rel, name, include):
+            yield _describe(entry, rel, is_dir, details)
+        if descend:
+            yield from _walk(entry.path, rel + "/", depth + 1, max_depth, include, exclude, details, [])
+    return
+
+
+def _describe(entry, rel, is_dir, details) -> dict:
+    kind = "dir" if is_dir else ("link" if entry.is_symlink() else "file")
+    item = {"path": rel, "type": kind}
+    if details:
+        try:
+            st = entry.stat(follow_symlinks=False)
+            item["size"] = st.st_size if stat_mod.S_ISREG(st.st_mode) else None
+            item["mtime"] = st.st_mtime
+        except OSError:
+            item["size"] = item["mtime"] = None
+    return item
+
+
+def list_page(root, limit: int = 200, cursor: str = "", max_depth=1, include=None, exclude=None,
+              details: bool = True) -> dict:
+    """Uma página da listagem: ``{"items", "next_cursor"}`` (None na última página)."""
+    include, exclude = _as_list(include), _as_list(exclude)
+    key = _query_key(root, max_depth, include, exclude)
+    after = decode_cursor(cursor, key) if cursor else ""
+    limit = max(1, int(limit))
+    items = []
+    more = False
+    for item in iter_entries(root, max_depth, include, exclude, details, after):
+        if len(items) >= limit:
+            more = True
+            break
+        items.append(item)
+    next_cursor = encode_cursor(items[-1]["path"], key) if more and items else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _human_size(size) -> str:
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_items(items) -> str:
+    """Uma linha por item: tipo, tamanho, data de modificação e caminho (pastas com ``/``)."""
+    lines = []
+    for item in items:
+        path = item["path"] + ("/" if item["type"] == "dir" else "")
+        if "mtime" in item:
+            mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["mtime"])) if item["mtime"] else "-"
+            size = "" if item["type"] == "dir" else _human_size(item["size"])
+            lines.append(f"{item['type'][0]} {size:>9} {mtime} {path}")
+        else:
+            lines.append(f"{item['type'][0]} {path}")
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""
+Profiling opcional de tarefas do WarpClone (cProfile e/ou tracemalloc).
+
+Configurado pela seção ``profiling`` de ``warpclone_config.json``:
+
+    "profiling": {
+        "enabled": false,          # pode ser alternado em tempo de execução pela GUI
+        "mode": "per_task",        # "per_task" (toda tarefa) ou "sampling"
+        "sample_rate": 0.1,        # fração de tarefas perfiladas no modo "sampling"
+        "cprofile": true,          # grava .prof (abrir com snakeviz / pstats)
+        "tracemalloc": false,      # grava top de alocações e pico de memória
+        "top_n": 30,               # linhas nos relatórios de texto
+        "max_files": 50,           # retenção: número máximo de arquivos
+        "max_total_mb": 200        # retenção: tamanho total máximo da pasta
+    }
+
+Os relatórios vão para ``warpclone_logs/profiles/``.
+"""
+
+import io
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+
+# Só carregados quando uma tarefa é de fato perfilada
+cProfile = lazy_import("cProfile")
+pstats = lazy_import("pstats")
+tracemalloc = lazy_import("tracemalloc")
+
+
+class TaskProfiler:
+    def __init__(self, cfg: dict | None = None, out_dir: Path | str = Path("warpclone_logs") / "profiles"):
+        cfg = cfg or {}
+        self.enabled = bool(cfg.get("enabled", False))
+        self.mode = str(cfg.get("mode", "per_task"))
+        self.sample_rate = float(cfg.get("sample_rate", 0.1))
+        self.use_cprofile = bool(cfg.get("cprofile", True))
+        self.use_tracemalloc = bool(cfg.get("tracemalloc", False))
+        self.top_n = int(cfg.get("top_n", 30))
+        self.max_files = int(cfg.get("max_files", 50))
+        self.max_total_bytes = int(float(cfg.get("max_total_mb", 200)) * 1024 * 1024)
+        self.out_dir = Path(out_dir)
+        # cProfile não admite dois perfis ativos ao mesmo tempo no processo
+        self._busy = threading.Lock()
+        self.last_report = None
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = bool(enabled)
+
+    def should_profile(self) -> bool:
+        if not self.enabled or not (self.use_cprofile or self.use_tracemalloc):
+            return False
+        if self.mode == "sampling":
+            return random.random() < self.sample_rate
+        return True
+
+    def run(self, label: str, func, *args, **kwargs):
+        """Executa ``func`` e, se aplicável, grava os relatórios de profiling."""
+        if not self.should_profile() or not self._busy.acquire(blocking=False):
+            return func(*args, **kwargs)
+        prof = cProfile.Profile() if self.use_cprofile else None
+        started_tracemalloc = False
+        try:
+            if self.use_tracemalloc and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracemalloc = True
+            t0 = time.perf_counter()
+            if prof:
+                prof.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if prof:
+                    prof.disable()
+                elapsed = time.perf_counter() - t0
+                snapshot = peak = None
+                if self.use_tracemalloc and tracemalloc.is_tracing():
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                try:
+                    self.last_report = self._dump(label, prof, snapshot, peak, elapsed)
+                    self._enforce_retention()
+                except Exception:
+                    # Falha ao gravar relatório não pode derrubar a tarefa
+                    self.last_report = None
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._busy.release()
+
+    def _dump(self, label, prof, snapshot, peak, elapsed) -> Path:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^a-zA-Z0-9]+", "_", (label or "tarefa"))[:40].strip("_") or "tarefa"
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}"
+        report = self.out_dir / f"{stem}.txt"
+        lines = [f"Tarefa: {label}", f"Duração: {elapsed:.3f} s", ""]
+        if prof:
+            prof_path = self.out_dir / f"{stem}.prof"
+            prof.dump_stats(str(prof_path))
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(self.top_n)
+            lines += [f"cProfile: {prof_path.name}", buf.getvalue()]
+        if snapshot is not None:
+            lines.append(f"tracemalloc: pico {peak or 0} bytes")
+            lines.append(f"Top {self.top_n} alocações (por linha):")
+            for stat in snapshot.statistics("lineno")[:self.top_n]:
+                lines.append(f"  {stat}")
+        report.write_text("\n".join(lines), encoding="utf-8")
+        return report
+
+    def _enforce_retention(self):
+        files = sorted((p for p in self.out_dir.glob("*") if p.is_file()), key=lambda p: p.stat().st_mtime, reverse=True)
+        total = 0
+        for idx, p in enumerate(files):
+            try:
+                size = p.stat().st_size
+            except OSError:
+                continue
+            total += size
+            if idx >= self.max_files or total > self.max_total_bytes:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,288 @@
+"""
+Leitura de arquivos grandes em trechos, com memória limitada (``read_file``).
+
+Nada é carregado inteiro: cada modo faz ``seek`` até o ponto pedido e lê só o orçamento
+de bytes.
+- Janela de linhas: ``start_line``/``max_lines``.
+- Fim do arquivo: ``tail``, lendo de trás para frente em blocos.
+- Intervalo de bytes: ``offset``/``length``.
+
+O encoding é detectado no primeiro bloco: BOM, UTF-8 válido, ou cp1252. Bytes nulos ou
+excesso de caracteres de controle indicam binário.
+
+Para arquivos grandes, ``LineIndex`` grava em disco o offset de uma a cada `step` linhas,
+junto com tamanho e mtime do arquivo. Assim, ir para a linha N custa um ``seek`` mais a
+leitura de no máximo `step` linhas, em vez de ler o arquivo desde o início. Se o arquivo
+só cresceu, como um log, o índice é estendido a partir de onde parou. As janelas de linha
+assumem encodings compatíveis com ASCII; em UTF-16/32 use intervalos de bytes.
+"""
+
+import codecs
+import hashlib
+import json
+import os
+import threading
+from array import array
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+
+np = lazy_import("numpy", optional=True)
+
+_SNIFF_BYTES = 64 * 1024
+_SCAN_BLOCK = 8 * 1024 * 1024
+_TAIL_BLOCK = 64 * 1024
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Bytes de controle que aparecem em texto comum (tab, LF, FF, CR, ESC)
+_TEXT_CONTROLS = bytes([9, 10, 12, 13, 27])
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in _TEXT_CONTROLS)
+
+
+def sniff_encoding(head: bytes):
+    """Encoding provável a partir do primeiro bloco; None indica arquivo binário."""
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+    if b"\x00" in head:
+        return None
+    controls = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    if head and controls > len(head) * 0.05:
+        return None
+    try:
+        # final=False: um caractere multibyte cortado no fim do bloco não conta como erro
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def line_oriented(encoding: str) -> bool:
+    return not codecs.lookup(encoding).name.startswith(("utf-16", "utf-32"))
+
+
+def _checkpoints(block: bytes, base: int, newlines_before: int, step: int) -> list:
+    """Offsets (absolutos) do início das linhas de número ``k*step + 1`` que caem no bloco."""
+    # Índice (0-based, dentro do bloco) da primeira quebra que completa um múltiplo de step
+    first = (step - newlines_before % step) - 1
+    if np is not None:
+        positions = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+        return (positions[first::step] + (base + 1)).tolist()
+    if block.count(b"\n") <= first:
+        return []
+    result, pos, seen = [], -1, 0
+    target = first
+    while True:
+        pos = block.find(b"\n", pos + 1)
+        if pos < 0:
+            return result
+        if seen == target:
+            result.append(base + pos + 1)
+            target += step
+        seen += 1
+
+
+def _seek_line(f, start_offset: int, lines: int) -> int:
+    """A partir de `start_offset`, pula `lines` quebras de linha. Retorna o offset (ou o EOF)."""
+    f.seek(start_offset)
+    pos = start_offset
+    while lines > 0:
+        block = f.read(1024 * 1024)
+        if not block:
+            return pos
+        count = block.count(b"\n")
+        if count < lines:
+            lines -= count
+            pos += len(block)
+            continue
+        i = -1
+        for _ in range(lines):
+            i = block.find(b"\n", i + 1)
+        return pos + i + 1
+    return pos
+
+
+class LineIndex:
+    """Índice esparso de linhas, persistido em `directory` (um arquivo por arquivo indexado)."""
+
+    def __init__(self, directory, step: int = 1024, min_bytes: int = 16 * 1024 * 1024, max_files: int = 200):
+        self.dir = Path(directory)
+        self.step = max(1, int(step))
+        self.min_bytes = int(min_bytes)
+        self.max_files = int(max_files)
+        self.lock = threading.Lock()
+        self._memo = {}
+
+    def _index_path(self, path: str) -> Path:
+        return self.dir / (hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest() + ".lidx")
+
+    @staticmethod
+    def _tail_digest(f, size: int) -> str:
+        f.seek(max(0, size - 4096))
+        return hashlib.sha1(f.read(min(size, 4096))).hexdigest()
+
+    def _load(self, path: str):
+        memo = self._memo.get(path)
+        if memo is not None:
+            return memo
+        try:
+            with open(self._index_path(path), "rb") as f:
+                header = json.loads(f.readline().decode("utf-8"))
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        if header.get("step") != self.step or header.get("path") != os.path.abspath(path):
+            return None
+        return header, offsets
+
+    def _save(self, path: str, header: dict, offsets: array):
+        self._memo[path] = (header, offsets)
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            target = self._index_path(path)
+            tmp = target.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(offsets.tobytes())
+            os.replace(tmp, target)
+            files = sorted(self.dir.glob("*.lidx"), key=lambda p: p.stat().st_mtime)
+            for old in files[: max(0, len(files) - self.max_files)]:
+                old.unlink()
+        except OSError:
+            pass
+
+    def get(self, path: str, f, st):
+        """``(header, offsets)`` atualizados para o arquivo aberto `f`; None se pequeno demais."""
+        if st.st_size < self.min_bytes:
+            return None
+        with self.lock:
+            loaded = self._load(path)
+            if loaded is not None:
+                header, offsets = loaded
+                if header["size"] == st.st_size and header["mtime_ns"] == st.st_mtime_ns:
+                    self._memo[path] = loaded
+                    return loaded
+                # Só cresceu (log)? O final antigo precisa continuar igual
+                if not (st.st_size > header["size"] and self._tail_digest(f, header["size"]) == header["tail"]):
+                    loaded = None
+            if loaded is None:
+                header = {"path": os.path.abspath(path), "step": self.step, "size": 0, "newlines": 0}
+                offsets = array("Q", [0])
+            pos, newlines = header["size"], header["newlines"]
+            f.seek(pos)
+            while True:
+                block = f.read(_SCAN_BLOCK)
+                if not block:
+                    break
+                offsets.extend(_checkpoints(block, pos, newlines, self.step))
+                newlines += block.count(b"\n")
+                pos += len(block)
+            f.seek(max(0, pos - 1))
+            ends_with_newline = f.read(1) == b"\n"
+            header.update(size=pos, mtime_ns=st.st_mtime_ns, newlines=newlines,
+                          lines=newlines + (0 if ends_with_newline or not pos else 1),
+                          tail=self._tail_digest(f, pos))
+            self._save(path, header, offsets)
+            return header, offsets
+
+
+def read_lines(path, start_line: int = 1, max_lines: int = 2000, max_bytes: int = 64 * 1024,
+               encoding: str = "utf-8", index: LineIndex | None = None) -> dict:
+    """Lê até `max_lines` linhas (e até `max_bytes`) a partir de `start_line` (1 = primeira).
+
+    Retorna ``{"text", "start_line", "end_line", "next_line", "total_lines", "offset",
+    "next_offset"}``. ``next_line`` é None no fim do arquivo. Uma linha maior que o orçamento
+    sai cortada, e ``next_offset`` indica onde continuar em bytes.
+    """
+    start_line = max(1, int(start_line))
+    path = str(path)
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        indexed = index.get(path, f, st) if index is not None else None
+        total = None
+        if indexed is not None:
+            header, offsets = indexed
+            total = header["lines"]
+            k = min((start_line - 1) // index.step, len(offsets) - 1)
+            offset = _seek_line(f, offsets[k], start_line - 1 - k * index.step)
+        else:
+            offset = _seek_line(f, 0, start_line - 1)
+        f.seek(offset)
+        lines, used, cut = [], 0, False
+        while len(lines) < max_lines and used < max_bytes:
+            line = f.readline(max_bytes - used)
+            if not line:
+                break
+            used += len(line)
+            lines.append(line)
+            if not line.endswith(b"\n"):
+                cut = offset + used < st.st_size
+                if cut and len(lines) > 1:
+                    # Não devolve meia linha: ela abre a próxima janela
+                    used -= len(lines.pop())
+                    cut = False
+                break
+        end_offset = offset + used
+        at_eof = end_offset >= st.st_size
+    end_line = start_line + len(lines) - 1
+    return {
+        "text": b"".join(lines).decode(encoding, errors="replace"),
+        "start_line": start_line,
+        "end_line": end_line,
+        # Linha cortada: next_line pula o resto dela; next_offset continua do corte
+        "next_line": None if at_eof else end_line + 1,
+        "next_offset": None if at_eof else end_offset,
+        "cut": cut,
+        "total_lines": total,
+        "offset": offset,
+        "size": st.st_size,
+    }
+
+
+def read_tail(path, lines: int = 50, max_bytes: int = 64 * 1024, encoding: str = "utf-8") -> dict:
+    """Últimas `lines` linhas (até `max_bytes`), lendo blocos a partir do fim."""
+    lines = max(1, int(lines))
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        pos, data = size, b""
+        # +1: a quebra que termina o arquivo não abre uma linha nova
+        while pos > 0 and len(data) < max_bytes and data.count(b"\n") <= lines:
+            step = min(_TAIL_BLOCK, pos, max_bytes - len(data))
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+        starts_at_line = pos == 0
+        if not starts_at_line:
+            f.seek(pos - 1)
+            starts_at_line = f.read(1) == b"\n"
+    trailing = 1 if data.endswith(b"\n") else 0
+    parts = data[: len(data) - trailing].split(b"\n")
+    cut = False
+    if not starts_at_line:
+        # O primeiro pedaço é o fim de uma linha que começou antes do trecho lido
+        if len(parts) > 1:
+            parts = parts[1:]
+        else:
+            cut = True
+    kept = b"\n".join(parts[-lines:])
+    return {"text": kept.decode(encoding, errors="replace"), "lines": min(lines, len(parts)),
+            "offset": size - trailing - len(kept), "cut": cut, "size": size}
+
+
+def read_range(path, offset: int = 0, length: int = 4096) -> dict:
+    """Bytes ``[offset, offset+length)``; `offset` negativo conta a partir do fim."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = max(0, size + offset) if offset < 0 else min(offset, size)
+        f.seek(start)
+        data = f.read(max(0, int(length)))
+    return {"data": data, "offset": start, "end": start + len(data), "size": size}
+
+
+def read_head(path, nbytes: int = _SNIFF_BYTES) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(nbytes)
@@ -0,0 +1,421 @@
+"""
+Classificador de comandos sensíveis.
+
+O comando é quebrado em segmentos (``;``, ``&&``, ``||``, ``|``, ``&``, quebras de linha,
+parênteses de subexpressão e chaves de bloco/script block), respeitando aspas, e cada
+segmento em palavras. As regras olham a *palavra de comando* (sem caminho/``.exe``, após
+atribuições ``VAR=x`` e palavras-chave como ``then``/``do``/``!``) e, opcionalmente, os
+argumentos — por isso ``Format-Table`` não é confundido com ``format`` e ``model `` não é
+confundido com ``del``. Aspas sem fechamento ou parênteses/chaves desbalanceados não têm
+leitura única: o comando é tratado como sensível.
+
+Lançadores (``sudo``, ``env``, ``nice``, ``timeout``, ``xargs``, ``watch``...) têm opções e
+operandos próprios (``sudo -u root``, ``timeout 5``). Em vez de conhecer cada sintaxe, toda
+palavra após o lançador que não seja opção é tratada como possível comando: na dúvida, o
+comando é considerado sensível; o mesmo vale para ``find -exec``/``-ok``. Wrappers como
+``cmd /c``, ``powershell -Command`` (ou posicional), ``sh -c``/``bash -lc``, ``iex`` e
+``Start-Process ... -ArgumentList`` são analisados recursivamente.
+
+As regras padrão podem ser estendidas (ou substituídas) em
+``warpclone_config/sensitive_rules.json``:
+
+    {
+      "replace_defaults": false,
+      "commands": [{"id": "git-push-force", "command": "git", "args_all": ["push", "--force"],
+                    "severity": "medium", "reason": "Reescreve histórico remoto"}],
+      "paths": [{"id": "etc", "prefix": "/etc/", "reason": "Atinge configuração do sistema"}]
+    }
+
+Campos de regra de comando: ``command`` (nome ou lista; ``*`` no fim casa prefixo, ex.
+``mkfs*``), ``args_any`` (algum argumento igual), ``args_all`` (todos presentes),
+``flags_all`` (letras exigidas em flags curtas combinadas, ex. ``"rf"`` para ``rm -fr``),
+``severity`` (``high``/``medium``/``low``; ``low`` não pede confirmação) e ``reason``.
+"""
+
+import json
+import re
+from pathlib import Path
+
+# Executam o comando que vem depois das próprias opções e operandos
+_LAUNCHERS = {
+    "sudo", "doas", "env", "nice", "ionice", "timeout", "xargs", "nohup", "stdbuf", "chroot", "runas",
+    "call", "start", "exec", "time", "command", "builtin", "&", ".", "busybox", "watch", "parallel",
+}
+# Palavras-chave após as quais vem um comando (if/while: a condição também é um comando)
+_SHELL_KEYWORDS = {"if", "then", "elif", "else", "while", "until", "do", "!"}
+# Ações do find que executam o comando seguinte
+_FIND_EXEC = {"-exec", "-execdir", "-ok", "-okdir"}
+_START_PROCESS = {"start-process", "saps", "start"}
+_ENV_ASSIGN_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+# Shells POSIX: "-c" sozinho ou combinado com outras flags curtas ("-lc", "-xc")
+_POSIX_SHELLS = {"sh", "bash", "zsh", "dash", "ksh", "su"}
+_POSIX_C_RE = re.compile(r"^-([a-z]*)c(.*)$")
+_POWERSHELLS = {"powershell", "pwsh"}
+# Parâmetros do powershell.exe que recebem valor (o valor não é o comando)
+_PS_VALUE_PARAMS = {
+    "-executionpolicy", "-ex", "-ep", "-windowstyle", "-w", "-version", "-v", "-inputformat", "-if",
+    "-outputformat", "-of", "-o", "-configurationname", "-workingdirectory", "-wd", "-settingsfile",
+    "-psconsolefile",
+}
+# Avaliam o texto recebido como comando
+_EVAL_COMMANDS = {"iex", "invoke-expression", "eval"}
+# Profundidade máxima de wrappers aninhados; além dela o comando é tratado como sensível
+_MAX_DEPTH = 4
+
+DEFAULT_COMMAND_RULES = [
+    # Windows perigosos
+    {"id": "shutdown", "command": ["shutdown", "stop-computer", "restart-computer"], "severity": "high"},
+    {"id": "format", "command": ["format", "format-volume"], "severity": "high"},
+    {"id": "bcdedit", "command": "bcdedit", "severity": "high"},
+    {"id": "reg-write", "command": "reg", "args_any": ["add", "delete", "import", "restore"], "severity": "high"},
+    {"id": "diskpart", "command": "diskpart", "severity": "high"},
+    {"id": "del", "command": ["del", "erase"], "severity": "high"},
+    {"id": "rmdir-s", "command": ["rmdir", "rd"], "args_any": ["/s"], "severity": "high"},
+    {"id": "cipher-w", "command": "cipher", "args_any": ["/w"], "severity": "high"},
+    {"id": "sdelete", "command": "sdelete", "severity": "high"},
+    {"id": "net-accounts", "command": "net", "args_any": ["user", "localgroup"], "severity": "high"},
+    {"id": "netsh", "command": "netsh", "severity": "medium"},
+    {"id": "sc-write", "command": "sc", "args_any": ["stop", "delete", "config", "create"], "severity": "high"},
+    {"id": "taskkill", "command": ["taskkill", "tskill"], "severity": "medium"},
+    {"id": "kill", "command": ["kill", "pkill", "killall", "stop-process", "spps"], "severity": "medium"},
+    {"id": "wmic-shadowcopy", "command": "wmic", "args_any": ["shadowcopy"], "severity": "high"},
+    {"id": "wmic-delete", "command": "wmic", "args_any": ["delete"], "severity": "high"},
+    {"id": "takeown", "command": "takeown", "severity": "high"},
+    {"id": "icacls", "command": ["icacls", "cacls"], "severity": "high"},
+    {"id": "remove-appx", "command": ["remove-appxpackage", "remove-appxprovisionedpackage"], "severity": "high"},
+    # PowerShell perigosos
+    {"id": "remove-item", "command": ["remove-item", "ri"], "severity": "high"},
+    {"id": "clear-content", "command": ["clear-content", "clc"], "severity": "high"},
+    {"id": "stop-service", "command": ["stop-service", "set-service", "remove-service"], "severity": "high"},
+    {"id": "optional-feature", "command": "disable-windowsoptionalfeature", "severity": "high"},
+    {"id": "encoded-command", "command": ["powershell", "pwsh"], "args_any": ["-encodedcommand", "-enc", "-e", "-ec"],
+     "severity": "high", "reason": "Comando PowerShell codificado (conteúdo não inspecionável)"},
+    # Unix-like
+    {"id": "rm-rf", "command": "rm", "flags_all": "rf", "severity": "high"},
+    {"id": "rm-rf-long", "command": "rm", "args_all": ["--recursive", "--force"], "severity": "high"},
+    {"id": "mkfs", "command": ["mkfs*", "mke2fs", "wipefs"], "severity": "high"},
+    {"id": "dd", "command": "dd", "severity": "medium"},
+    {"id": "mount", "command": ["mount", "umount"], "severity": "medium"},
+    {"id": "accounts", "command": ["useradd", "userdel", "usermod", "groupadd", "groupdel", "passwd"], "severity": "high"},
+    {"id": "chmod-r", "command": ["chmod", "chown", "chgrp"], "flags_all": "r", "severity": "high"},
+    {"id": "chmod-r-long", "command": ["chmod", "chown", "chgrp"], "args_any": ["--recursive"], "severity": "high"},
+    {"id": "power", "command": ["reboot", "poweroff", "halt"], "severity": "high"},
+]
+
+DEFAULT_PATH_RULES = [
+    {"id": "windows-dir", "prefix": "c:/windows", "reason": "Atinge caminho crítico 'c:/windows'"},
+    {"id": "drive-root", "exact": ["c:/", "c:", "c:/*", "c:/*.*"], "reason": "Atinge caminho crítico 'c:/'",
+     "write_only": True},
+    {"id": "unix-root", "exact": ["/", "/*"], "reason": "Atinge caminho crítico '/'", "write_only": True},
+    {"id": "unix-system", "prefix": ["/etc/", "/boot/", "/bin/", "/sbin/", "/usr/bin/", "/usr/sbin/", "/dev/sd", "/dev/nvme"],
+     "reason": "Atinge diretório de sistema", "write_only": True},
+]
+
+_SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+# Comandos que escrevem nos caminhos recebidos (ativam regras de caminho "write_only")
+_WRITE_COMMANDS = {
+    "cp", "mv", "tee", "install", "ln", "sed", "truncate", "touch", "rsync", "copy", "move", "xcopy",
+    "robocopy", "ren", "rename", "mklink", "set-content", "add-content", "out-file", "copy-item",
+    "move-item", "new-item", "rename-item", "sc", "set-acl",
+}
+_REDIRECT_RE = re.compile(r"^\d?>>?|^<")
+
+
+class SensitiveVerdict:
+    """Resultado estruturado da classificação.
+
+    ``sensitive`` indica se a execução deve ser confirmada; ``matches`` lista as regras
+    disparadas (id, severidade, motivo e o segmento do comando).
+    """
+
+    def __init__(self, matches=None):
+        self.matches = list(matches or [])
+        confirm = [m for m in self.matches if m["severity"] != "low"]
+        self.sensitive = bool(confirm)
+        self.severity = max((m["severity"] for m in self.matches), key=_SEVERITY_RANK.get, default=None)
+        self.reason = confirm[0]["reason"] if confirm else None
+
+    def __bool__(self):
+        return self.sensitive
+
+    def to_dict(self) -> dict:
+        return {"sensitive": self.sensitive, "severity": self.severity, "reason": self.reason,
+                "matches": self.matches}
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<sq>'[^']*'?)                      # aspas simples (sem escapes)
+  | (?P<dq>"(?:`.|[^"`])*"?)             # aspas duplas (escape ` do PowerShell)
+  | (?P<op>&&|\|\||\$\(|`\(|[;|&(){}\n\r])  # separadores de comando e blocos
+  | (?P<ws>[ \t\f\v]+)
+  | (?P<word>(?:\$\{[^}\s]*\}|[^\s'";|&(){}])+|\$)
+""", re.X)
+_OPENERS = {"(": ")", "$(": ")", "`(": ")", "{": "}"}
+
+
+def _scan(command: str):
+    """(segmentos, leitura_unica): False com aspas sem fechamento ou blocos desbalanceados."""
+    segments, words, buf = [], [], None
+    stack, ok = [], True
+    for m in _TOKEN_RE.finditer(command):
+        kind = m.lastgroup
+        text = m.group(kind)
+        if kind == "ws" or kind == "op":
+            if buf is not None:
+                words.append(buf)
+                buf = None
+            if kind == "op" and words:
+                segments.append(words)
+                words = []
+            if text in _OPENERS:
+                stack.append(_OPENERS[text])
+            elif text in (")", "}"):
+                ok = ok and bool(stack) and stack.pop() == text
+            continue
+        if kind == "sq":
+            ok = ok and len(text) > 1 and text.endswith("'")
+            text = text[1:-1] if len(text) > 1 and text.endswith("'") else text[1:]
+        elif kind == "dq":
+            ok = ok and len(text) > 1 and text.endswith('"')
+            text = text[1:-1] if len(text) > 1 and text.endswith('"') else text[1:]
+            text = re.sub(r"`(.)", r"\1", text)
+        # Partes adjacentes (ex.: --opt="a b") formam uma só palavra
+        buf = text if buf is None else buf + text
+    if buf is not None:
+        words.append(buf)
+    if words:
+        segments.append(words)
+    return segments, ok and not stack
+
+
+def split_segments(command: str) -> list:
+    """Quebra o comando em segmentos de palavras, respeitando aspas simples e duplas."""
+    return _scan(command)[0]
+
+
+def _command_name(word: str) -> str:
+    name = word.replace("\\", "/").rsplit("/", 1)[-1].lower()
+    for ext in (".exe", ".com", ".cmd", ".bat"):
+        if name.endswith(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def _normalize_path(word: str) -> str:
+    return word.replace("\\", "/").lower().strip("'\"")
+
+
+class SensitiveClassifier:
+    def __init__(self, command_rules=None, path_rules=None):
+        command_rules = DEFAULT_COMMAND_RULES if command_rules is None else command_rules
+        path_rules = DEFAULT_PATH_RULES if path_rules is None else path_rules
+        self._by_name = {}
+        prefix_rules = []
+        for rule in command_rules:
+            names = rule.get("command") or []
+            names = [names] if isinstance(names, str) else names
+            for name in names:
+                name = name.lower()
+                if name.endswith("*"):
+                    prefix_rules.append((name[:-1], rule))
+                else:
+                    self._by_name.setdefault(name, []).append(rule)
+        self._prefix_rules = prefix_rules
+        self._prefix_re = (re.compile("|".join(re.escape(p) for p, _ in prefix_rules))
+                           if prefix_rules else None)
+        # Regras de caminho compiladas em uma única regex (prefixos) + conjunto (exatos)
+        self._path_exact = {}
+        prefixes = []
+        for rule in path_rules:
+            exact = rule.get("exact") or []
+            for e in ([exact] if isinstance(exact, str) else exact):
+                self._path_exact[_normalize_path(e)] = rule
+            prefix = rule.get("prefix") or []
+            for p in ([prefix] if isinstance(prefix, str) else prefix):
+                prefixes.append((_normalize_path(p), rule))
+        self._path_prefixes = dict(prefixes)
+        self._path_re = (re.compile("^(?:" + "|".join(re.escape(p) for p, _ in sorted(prefixes, key=lambda x: -len(x[0]))) + ")")
+                         if prefixes else None)
+
+    @classmethod
+    def from_file(cls, path: Path):
+        """Regras padrão + as do arquivo JSON (se existir e for válido)."""
+        command_rules, path_rules = list(DEFAULT_COMMAND_RULES), list(DEFAULT_PATH_RULES)
+        try:
+            if path.exists():
+                data = json.loads(path.read_text(encoding="utf-8")) or {}
+                if data.get("replace_defaults"):
+                    command_rules, path_rules = [], []
+                command_rules += [r for r in data.get("commands", []) if isinstance(r, dict)]
+                path_rules += [r for r in data.get("paths", []) if isinstance(r, dict)]
+        except Exception:
+            pass
+        return cls(command_rules, path_rules)
+
+    # --- classificação ---
+    def classify(self, command: str) -> SensitiveVerdict:
+        matches = []
+        if command:
+            self._classify_into(command, matches, depth=0)
+        # Um mesmo trecho pode ser visto por mais de um caminho (lançador, wrapper)
+        unique = {(m["rule"], m["segment"]): m for m in matches}
+        return SensitiveVerdict(unique.values())
+
+    def _classify_into(self, command, matches, depth):
+        if depth > _MAX_DEPTH:
+            matches.append(self._match({"id": "nesting"}, command,
+                                       "Comando aninhado demais para ser analisado"))
+            return
+        segments, unambiguous = _scan(command)
+        if not unambiguous:
+            matches.append(self._match({"id": "unparsed"}, command,
+                                       "Aspas ou blocos sem fechamento: o comando não tem leitura única"))
+        for words in segments:
+            self._classify_segment(words, matches, depth)
+
+    def _classify_segment(self, words, matches, depth):
+        segment = " ".join(words)
+        idx = 0
+        while idx < len(words) and (_ENV_ASSIGN_RE.match(words[idx]) or words[idx].lower() in _SHELL_KEYWORDS):
+            idx += 1
+        has_redirect = any(_REDIRECT_RE.match(w) and not w.startswith("<") for w in words)
+        writes = has_redirect
+        if idx < len(words):
+            # Após um lançador, qualquer palavra que não seja opção pode ser o comando;
+            # após -exec/-ok do find, a palavra seguinte é
+            starts = [idx]
+            if _command_name(words[idx]) in _LAUNCHERS:
+                starts += [k for k in range(idx + 1, len(words))
+                           if not words[k].startswith("-") and not _ENV_ASSIGN_RE.match(words[k])]
+            starts += [k + 1 for k in range(idx + 1, len(words) - 1)
+                       if words[k].lower() in _FIND_EXEC and k + 1 not in starts]
+            for start in starts:
+                name = _command_name(words[start])
+                if " " in words[start] and start > idx:
+                    # Comando inteiro entre aspas (runas "cmd", start "" "...")
+                    self._classify_into(words[start], matches, depth + 1)
+                    continue
+                args = words[start + 1:]
+                args_lower = [a.lower() for a in args]
+                rules = self._rules_for(name)
+                for rule in rules:
+                    if self._rule_applies(rule, args_lower):
+                        matches.append(self._match(rule, segment, f"Correspondência à regra '{rule.get('id')}' ({name})"))
+                for inner in self._wrapped_commands(name, args):
+                    self._classify_into(inner, matches, depth + 1)
+                writes = writes or name in _WRITE_COMMANDS or bool(rules)
+        for word in words[idx:]:
+            self._match_path(word, segment, writes, matches)
+            # Substituição de comando dentro de aspas ("$(...)" / `...`) também é analisada
+            if "$(" in word or "`" in word:
+                self._classify_into(word.replace("`", " ; "), matches, depth + 1)
+
+    @staticmethod
+    def _wrapped_commands(name, args) -> list:
+        """Comandos internos de um wrapper de shell (vazio se `name` não for wrapper).
+
+        Nos casos ambíguos devolve mais de um candidato: analisar a mais só pode pedir
+        confirmação a mais.
+        """
+        if name in _EVAL_COMMANDS:
+            return [" ".join(args)] if args else []
+        if name in _START_PROCESS:
+            # Start-Process <arquivo> -ArgumentList <args>: o comando é arquivo + argumentos
+            files, arg_list, j = [], [], 0
+            while j < len(args):
+                low = args[j].lower()
+                key = low.split(":", 1)[0]
+                value = args[j][len(key) + 1:] if ":" in low and key.startswith("-") else None
+                if key in ("-argumentlist", "-args") or (len(key) > 2 and "-argumentlist".startswith(key)):
+                    if value is None and j + 1 < len(args):
+                        value, j = args[j + 1], j + 1
+                    arg_list.append((value or "").replace(",", " "))
+                elif len(key) > 2 and "-filepath".startswith(key):
+                    if value is None and j + 1 < len(args):
+                        value, j = args[j + 1], j + 1
+                    files.append(value or "")
+                elif not low.startswith("-") and not low.startswith("/"):
+                    files.append(args[j])
+                j += 1
+            return [" ".join([f, *arg_list]) for f in files if f] if arg_list else []
+        if name == "cmd":
+            for j, a in enumerate(args):
+                low = a.lower()
+                if low in ("/c", "/k", "/r"):
+                    return [" ".join(args[j + 1:])]
+                if low[:2] in ("/c", "/k", "/r") and len(low) > 2:
+                    # Opção colada ao comando: cmd /c"del x"
+                    return [" ".join([a[2:], *args[j + 1:]])]
+            return []
+        if name in _POSIX_SHELLS:
+            for j, a in enumerate(args):
+                m = _POSIX_C_RE.match(a)
+                if not m:
+                    continue
+                rest = [" ".join(args[j + 1:])]
+                # "-crm -rf /" (comando colado) ou "-cx" (mais flags): analisa as duas leituras
+                return rest + [m.group(2)] if m.group(2) else rest
+            return []
+        if name in _POWERSHELLS:
+            j = 0
+            while j < len(args):
+                low = args[j].lower()
+                if low.startswith("-") and len(low) > 1:
+                    key = low.split(":", 1)[0]
+                    if "-command".startswith(key) and len(key) > 1:
+                        value = args[j][len(key) + 1:] if ":" in low else ""
+                        return [" ".join(filter(None, [value, *args[j + 1:]]))]
+                    if "-file".startswith(key) and len(key) > 1:
+                        return []  # script em arquivo: conteúdo não inspecionável daqui
+                    j += 2 if key in _PS_VALUE_PARAMS and ":" not in low else 1
+                    continue
+                # Forma posicional: o restante é o comando
+                return [" ".join(args[j:])]
+            return []
+        return []
+
+    def _rules_for(self, name):
+        rules = list(self._by_name.get(name, ()))
+        if self._prefix_re is not None and self._prefix_re.match(name):
+            rules += [r for p, r in self._prefix_rules if name.startswith(p)]
+        return rules
+
+    @staticmethod
+    def _rule_applies(rule, args_lower) -> bool:
+        any_of = [a.lower() for a in rule.get("args_any") or []]
+        if any_of and not any(a in args_lower for a in any_of):
+            return False
+        all_of = [a.lower() for a in rule.get("args_all") or []]
+        if all_of and not all(a in args_lower for a in all_of):
+            return False
+        letters = (rule.get("flags_all") or "").lower()
+        if letters:
+            short = "".join(a[1:] for a in args_lower if a.startswith("-") and not a.startswith("--"))
+            if not all(ch in short for ch in letters):
+                return False
+        return True
+
+    def _match_path(self, word, segment, writes, matches):
+        norm = _normalize_path(_REDIRECT_RE.sub("", word))
+        if not norm:
+            return
+        # Também considera valores de opções no formato --opcao=caminho / -Path:caminho
+        for candidate in (norm, norm.split("=", 1)[-1]):
+            rule = self._path_exact.get(candidate)
+            if rule is None and self._path_re is not None:
+                m = self._path_re.match(candidate)
+                if m:
+                    rule = self._path_prefixes.get(m.group(0))
+            if rule is None or (rule.get("write_only") and not writes):
+                continue
+            matches.append(self._match(rule, segment, rule.get("reason") or f"Atinge caminho crítico '{candidate}'"))
+            return
+
+    @staticmethod
+    def _match(rule, segment, default_reason, default_severity="high") -> dict:
+        return {
+            "rule": rule.get("id"),
+            "severity": rule.get("severity", default_severity),
+            "reason": rule.get("reason") or default_reason,
+            "segment": segment,
+        }
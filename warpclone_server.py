@@ -0,0 +1,415 @@
+"""
+Modo servidor (headless) do By-CRR AI: API HTTP/JSON sobre um pool de workers WarpClone.
+
+Endpoints:
+    GET  /health                  -> estado do pool, filas e Ollama
+    POST /tasks                   -> {"task": "...", "session_id"?: "...", "max_iterations"?: N,
+                                      "no_cache"?: true (ignora respostas guardadas)}
+                                     202 {task_id, session_id, ...} | 429 quando a fila está cheia
+                                     | 413 com corpo acima de 1 MiB
+    GET  /tasks/<id>              -> estado/resultado da tarefa (polling)
+    GET  /tasks/<id>/stream       -> eventos NDJSON até a conclusão (inclui "output" com as
+                                     linhas dos comandos à medida que são produzidas)
+    GET  /sessions                -> sessões persistidas
+    GET  /sessions/<id>           -> mensagens de uma sessão
+
+Cada worker possui sua própria instância de WarpClone e atende sempre as mesmas sessões
+(o worker é escolhido pelo crc32 do session_id), de modo que o histórico de uma conversa
+nunca é disputado por duas threads. O número de workers deve acompanhar a capacidade do
+host Ollama: ``--workers``, senão OLLAMA_NUM_PARALLEL, senão ``server.workers`` do config.
+Pedidos além de ``max_queue`` tarefas em espera (somando todos os workers) recebem 429 com
+Retry-After.
+
+Uso:
+    python warpclone_server.py --host 127.0.0.1 --port 8765 --workers 2
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from warpclone import WarpClone
+
+_SESSION_ID_RE = re.compile(r"^session-[A-Za-z0-9_-]{1,80}$")
+# Eventos "output" (linhas de execute_command) guardados por tarefa
+_MAX_OUTPUT_EVENTS = 2000
+# Corpo máximo de POST /tasks
+_MAX_BODY_BYTES = 1024 * 1024
+_TERMINAL_EVENTS = ("done", "error")
+
+
+def _load_server_config() -> dict:
+    cfg_path = Path("warpclone_config.json")
+    if cfg_path.exists():
+        try:
+            with open(cfg_path, "r", encoding="utf-8") as f:
+                return (json.load(f) or {}).get("server", {}) or {}
+        except Exception:
+            return {}
+    return {}
+
+
+class Job:
+    """Tarefa submetida ao servidor, com eventos para polling/streaming."""
+
+    def __init__(self, task: str, session_id: str, max_iterations: int, use_cache: bool = True):
+        self.id = uuid.uuid4().hex
+        self.task = task
+        self.session_id = session_id
+        self.max_iterations = max_iterations
+        self.use_cache = use_cache
+        self.status = "queued"
+        self.answer = None
+        self.last_action_result = None
+        self.error = None
+        self.worker = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._cond = threading.Condition()
+        self.emit("queued")
+
+    @property
+    def done(self) -> bool:
+        return self.status in _TERMINAL_EVENTS
+
+    def emit(self, kind: str, **data):
+        with self._cond:
+            self.events.append({"seq": len(self.events), "event": kind, "ts": time.time(), **data})
+            self._cond.notify_all()
+
+    def finish(self, status: str, **data):
+        """Conclui a tarefa: estado e evento final mudam juntos, sob o mesmo lock.
+
+        Quem vê ``done`` já encontra o evento final em ``events``.
+        """
+        with self._cond:
+            self.finished_at = time.time()
+            self.status = status
+            self.events.append({"seq": len(self.events), "event": status, "ts": time.time(), **data})
+            self._cond.notify_all()
+
+    def wait_events(self, since: int, timeout: float = 15.0):
+        """Bloqueia até existirem eventos após `since` (ou timeout)."""
+        with self._cond:
+            if len(self.events) <= since and not self.done:
+                self._cond.wait(timeout)
+            return self.events[since:]
+
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.id,
+            "session_id": self.session_id,
+            "task": self.task,
+            "status": self.status,
+            "answer": self.answer,
+            "last_action_result": self.last_action_result,
+            "error": self.error,
+            "worker": self.worker,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Worker(threading.Thread):
+    def __init__(self, index: int, queue_size: int, warp: WarpClone):
+        super().__init__(name=f"warpclone-worker-{index}", daemon=True)
+        self.index = index
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.warp = warp
+        self.busy = False
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            self.busy = True
+            try:
+                self._run_job(job)
+            finally:
+                self.busy = False
+                self.queue.task_done()
+
+    def _run_job(self, job: Job):
+        job.status = "running"
+        job.worker = self.index
+        job.started_at = time.time()
+        job.emit("started", worker=self.index)
+        counter = itertools.count(1)
+
+        def on_output(stream, line):
+            # Limita os eventos de saída por tarefa; o resultado final já traz início + fim
+            n = next(counter)
+            if n <= _MAX_OUTPUT_EVENTS:
+                job.emit("output", stream=stream, line=line)
+            elif n == _MAX_OUTPUT_EVENTS + 1:
+                job.emit("output_truncated")
+
+        self.warp.set_output_handler(on_output)
+        try:
+            if self.warp.session_id != job.session_id and not self.warp.load_session(job.session_id):
+                self.warp.start_new_session(session_id=job.session_id)
+            answer, last = self.warp.execute_task(job.task, max_iterations=job.max_iterations,
+                                                  use_cache=job.use_cache)
+            job.answer = answer
+            job.last_action_result = last
+            status = "done"
+        except Exception as e:
+            job.error = str(e)
+            status = "error"
+        finally:
+            self.warp.set_output_handler(None)
+        job.finish(status, answer=job.answer, error=job.error)
+
+
+class WorkerPool:
+    """Pool de workers; cada sessão é sempre atendida pelo mesmo worker.
+
+    O worker sai do crc32 do session_id (nada é guardado por sessão). Cada worker tem seu
+    próprio WarpClone (contexto de sessão isolado), mas todos compartilham o mesmo
+    WarpCloneEngine: configuração, caches e estatísticas. ``max_queue`` limita o total de
+    tarefas em espera, somando as filas de todos os workers.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, max_jobs_kept: int = 1000, warp_factory=None):
+        self.max_queue = max(1, int(max_queue))
+        n_workers = max(1, int(workers))
+        first = (warp_factory or WarpClone)()
+        warps = [first] + [WarpClone(engine=first.engine) for _ in range(n_workers - 1)]
+        # Filas sem limite próprio: `max_queue` vale para o total, não por worker
+        self.workers = [Worker(i, 0, w) for i, w in enumerate(warps)]
+        self.jobs = OrderedDict()
+        self.max_jobs_kept = int(max_jobs_kept)
+        self._lock = threading.Lock()
+        for w in self.workers:
+            w.start()
+
+    def _worker_for(self, session_id: str) -> Worker:
+        # crc32 é estável: a mesma sessão sempre cai no mesmo worker, sem tabela
+        return self.workers[zlib.crc32(session_id.encode("utf-8")) % len(self.workers)]
+
+    def queued(self) -> int:
+        return sum(w.queue.qsize() for w in self.workers)
+
+    def running(self) -> int:
+        return sum(1 for w in self.workers if w.busy)
+
+    def submit(self, task: str, session_id: str | None = None, max_iterations: int = 5,
+               use_cache: bool = True) -> Job | None:
+        """Enfileira a tarefa; retorna None se a fila estiver cheia (backpressure)."""
+        if session_id is None:
+            session_id = f"session-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        job = Job(task, session_id, max_iterations, use_cache)
+        worker = self._worker_for(session_id)
+        with self._lock:
+            # Checagem e inserção sob o lock: envios simultâneos não passam do limite
+            if self.queued() >= self.max_queue:
+                return None
+            worker.queue.put_nowait(job)
+            self.jobs[job.id] = job
+            # Mantém apenas as tarefas mais recentes concluídas
+            while len(self.jobs) > self.max_jobs_kept:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if not oldest.done:
+                    break
+                self.jobs.pop(oldest_id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self):
+        for w in self.workers:
+            w.queue.put(None)
+
+
+def make_handler(pool: WorkerPool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Sem Nagle: respostas pequenas em conexões keep-alive não esperam o ACK atrasado
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, payload, status=200, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self, length: int):
+            if length <= 0:
+                return {}
+            return json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts == ["health"]:
+                warp = pool.workers[0].warp
+                self._send_json({
+                    "status": "ok",
+                    "workers": len(pool.workers),
+                    "running": pool.running(),
+                    "queued": pool.queued(),
+                    "max_queue": pool.max_queue,
+                    "ollama_available": bool(warp.ollama_available),
+                    "model": warp.model,
+                })
+            elif len(parts) == 2 and parts[0] == "tasks":
+                job = pool.get(parts[1])
+                if not job:
+                    self._send_json({"error": "tarefa não encontrada"}, status=404)
+                else:
+                    self._send_json(job.to_dict())
+            elif len(parts) == 3 and parts[0] == "tasks" and parts[2] == "stream":
+                job = pool.get(parts[1])
+                if not job:
+                    self._send_json({"error": "tarefa não encontrada"}, status=404)
+                else:
+                    self._stream(job)
+            elif parts == ["sessions"]:
+                self._send_json({"sessions": pool.workers[0].warp.list_sessions()})
+            elif len(parts) == 2 and parts[0] == "sessions":
+                self._send_session(parts[1])
+            else:
+                self._send_json({"error": "rota não encontrada"}, status=404)
+
+        def do_POST(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts != ["tasks"]:
+                self._send_json({"error": "rota não encontrada"}, status=404)
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0 or length > _MAX_BODY_BYTES:
+                # O corpo não é lido: a conexão não pode ser reaproveitada
+                self.close_connection = True
+                status = 400 if length < 0 else 413
+                self._send_json({"error": "Content-Length inválido" if length < 0 else "corpo grande demais"},
+                                status=status, headers={"Connection": "close"})
+                return
+            try:
+                data = self._read_json(length)
+            except Exception:
+                self._send_json({"error": "JSON inválido"}, status=400)
+                return
+            task = (data.get("task") or "").strip()
+            session_id = data.get("session_id")
+            if not task:
+                self._send_json({"error": "campo 'task' obrigatório"}, status=400)
+                return
+            if session_id is not None and not _SESSION_ID_RE.match(str(session_id)):
+                self._send_json({"error": "session_id inválido"}, status=400)
+                return
+            try:
+                max_iterations = max(1, min(int(data.get("max_iterations", 5)), 20))
+            except Exception:
+                max_iterations = 5
+            job = pool.submit(task, session_id=session_id, max_iterations=max_iterations,
+                              use_cache=not data.get("no_cache", False))
+            if job is None:
+                self._send_json({"error": "fila cheia, tente novamente"}, status=429, headers={"Retry-After": "2"})
+                return
+            self._send_json({
+                "task_id": job.id,
+                "session_id": job.session_id,
+                "status": job.status,
+                "status_url": f"/tasks/{job.id}",
+                "stream_url": f"/tasks/{job.id}/stream",
+            }, status=202)
+
+        def _stream(self, job: Job):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            seq = 0
+            finished = False
+            try:
+                # Termina ao enviar o evento final (done/error), que sempre traz a resposta
+                while not finished:
+                    events = job.wait_events(seq)
+                    for ev in events:
+                        line = (json.dumps(ev, ensure_ascii=False) + "\n").encode("utf-8")
+                        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                        finished = finished or ev["event"] in _TERMINAL_EVENTS
+                    seq += len(events)
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _send_session(self, session_id: str):
+            if not _SESSION_ID_RE.match(session_id):
+                self._send_json({"error": "session_id inválido"}, status=400)
+                return
+            fp = pool.workers[0].warp.chat_sessions_dir / f"{session_id}.json"
+            if not fp.exists():
+                self._send_json({"error": "sessão não encontrada"}, status=404)
+                return
+            try:
+                self._send_json(json.loads(fp.read_text(encoding="utf-8")))
+            except Exception as e:
+                self._send_json({"error": f"falha ao ler sessão: {e}"}, status=500)
+
+    return Handler
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8765, workers: int = 2, max_queue: int = 32,
+                  max_jobs_kept: int = 1000, warp_factory=None):
+    """Cria (sem iniciar) o servidor HTTP e o pool. Retorna (httpd, pool)."""
+    pool = WorkerPool(workers=workers, max_queue=max_queue, max_jobs_kept=max_jobs_kept, warp_factory=warp_factory)
+    httpd = ThreadingHTTPServer((host, port), make_handler(pool))
+    httpd.daemon_threads = True
+    return httpd, pool
+
+
+def main(argv=None):
+    cfg = _load_server_config()
+    # OLLAMA_NUM_PARALLEL descreve o host Ollama em uso: vale mais que o config
+    default_workers = int(os.environ.get("OLLAMA_NUM_PARALLEL") or cfg.get("workers") or 2)
+    parser = argparse.ArgumentParser(description="By-CRR AI - servidor HTTP headless")
+    parser.add_argument("--host", default=cfg.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(cfg.get("port", 8765)))
+    parser.add_argument("--workers", type=int, default=default_workers,
+                        help="workers concorrentes (alinhar com OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--max-queue", type=int, default=int(cfg.get("max_queue", 32)),
+                        help="tarefas enfileiradas antes de responder 429")
+    args = parser.parse_args(argv)
+
+    httpd, pool = create_server(args.host, args.port, args.workers, args.max_queue,
+                                int(cfg.get("max_jobs_kept", 1000)))
+    print(f"By-CRR AI servidor em http://{args.host}:{args.port} ({args.workers} workers, fila {args.max_queue})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
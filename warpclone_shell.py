@@ -0,0 +1,385 @@
+"""
+Pool de shells persistentes para ``execute_command``.
+
+Iniciar um ``/bin/sh`` (ou, pior, um ``powershell -NoProfile``) a cada comando custa de
+milissegundos a segundos. O ``ShellPool`` mantém shells vivos e envia cada comando pelo
+stdin, delimitando o fim da saída com um sentinela único por comando:
+
+    <comando>
+    \\n<SENTINELA> <código de saída>      (stdout)
+    \\n<SENTINELA>                        (stderr)
+
+- Timeout por comando: o shell (e toda a árvore de processos) é encerrado e recriado
+  sob demanda no próximo uso.
+- Shell morto (``exit`` no comando, crash): detectado pelo EOF e recriado.
+- Modo compartilhado (padrão): cada comando roda em um subshell/escopo próprio no diretório
+  atual do processo, sem vazar ``cd``/variáveis entre comandos — mesma semântica do spawn.
+- Modo por sessão (``persist_session_state``): cada sessão tem um shell dedicado e
+  ``cd``/``export`` persistem entre comandos.
+
+Mudanças em ``os.environ`` (ex.: ação ``set_env``) são repassadas ao shell antes do comando.
+Sem shell compatível (``cmd`` no Windows) ou com o pool ocupado, usa ``run_streaming``.
+"""
+
+import base64
+import os
+import queue
+import re
+import shlex
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from warpclone_exec import BoundedCapture, CommandResult, kill_tree, run_streaming
+
+_READ_CHUNK = 64 * 1024
+_POSIX = "posix"
+_POWERSHELL = "powershell"
+# Nomes que podem ser exportados pelo shell (ignora entradas como BASH_FUNC_x%%)
+_ENV_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ps_quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class ShellSession:
+    """Um processo de shell vivo, com threads leitoras para stdout/stderr."""
+
+    def __init__(self, kind: str, posix_shell: str = "/bin/sh"):
+        self.kind = kind
+        self.lock = threading.Lock()
+        # Comandos em curso ou a caminho (protegido pelo lock do ShellPool): só shells
+        # com zero usuários podem ser descartados pelo limite de sessões
+        self.users = 0
+        self._events = queue.Queue()
+        if kind == _POWERSHELL:
+            args = ["powershell", "-NoProfile", "-NoLogo", "-NonInteractive",
+                    "-ExecutionPolicy", "Bypass", "-Command", "-"]
+            popen_kwargs = {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+        else:
+            args = [posix_shell]
+            # Sessão própria: kill_tree alcança o shell e tudo que ele iniciou
+            popen_kwargs = {"start_new_session": True}
+        self.proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, **popen_kwargs)
+        self.env = {k: v for k, v in os.environ.items() if _ENV_NAME_RE.match(k)}
+        for name, stream in (("stdout", self.proc.stdout), ("stderr", self.proc.stderr)):
+            threading.Thread(target=self._pump, args=(name, stream), daemon=True).start()
+        if kind == _POWERSHELL:
+            self._write("[Console]::OutputEncoding = [Text.Encoding]::UTF8; "
+                        "$OutputEncoding = [Text.Encoding]::UTF8\n")
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _pump(self, name, stream):
+        try:
+            while True:
+                chunk = stream.readline(_READ_CHUNK)
+                if not chunk:
+                    break
+                self._events.put((name, chunk))
+        except Exception:
+            pass
+        self._events.put((name, None))
+
+    def _write(self, text: str):
+        self.proc.stdin.write(text.encode("utf-8"))
+        self.proc.stdin.flush()
+
+    def kill(self):
+        if self.alive:
+            kill_tree(self.proc.pid)
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+        try:
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+
+    # --- montagem do comando ---
+    def _env_prelude(self) -> str:
+        current = {k: v for k, v in os.environ.items() if _ENV_NAME_RE.match(k)}
+        parts = []
+        for key, value in current.items():
+            if self.env.get(key) != value:
+                if self.kind == _POWERSHELL:
+                    parts.append(f"$env:{key} = {_ps_quote(value)}")
+                else:
+                    parts.append(f"export {key}={shlex.quote(value)}")
+        for key in self.env:
+            if key not in current:
+                parts.append(f"Remove-Item Env:{key} -ErrorAction SilentlyContinue"
+                             if self.kind == _POWERSHELL else f"unset {key}")
+        self.env = current
+        return "; ".join(parts)
+
+    def _payload(self, command: str, token: str, isolated: bool) -> str:
+        prelude = self._env_prelude()
+        if self.kind == _POWERSHELL:
+            b64 = base64.b64encode(command.encode("utf-8")).decode("ascii")
+            run = "Invoke-Expression $__wc_cmd"
+            if isolated:
+                # Escopo filho para variáveis; o diretório é reposicionado a cada comando
+                run = "& { Invoke-Expression $args[0] } $__wc_cmd"
+            cwd = f"Set-Location -LiteralPath {_ps_quote(os.getcwd())}; " if isolated else ""
+            line = (
+                f"{prelude + '; ' if prelude else ''}{cwd}"
+                f"$global:LASTEXITCODE = 0; $__wc_rc = 0; "
+                f"$__wc_cmd = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{b64}')); "
+                f"try {{ {run} 2>&1 | ForEach-Object {{ if ($_ -is [System.Management.Automation.ErrorRecord]) "
+                f"{{ [Console]::Error.WriteLine($_.ToString()) }} else {{ $_ }} }} | Out-String -Stream -Width 4096; "
+                f"if ($LASTEXITCODE) {{ $__wc_rc = $LASTEXITCODE }} }} "
+                f"catch {{ [Console]::Error.WriteLine($_.ToString()); $__wc_rc = 1 }}; "
+                f"[Console]::Out.WriteLine(); [Console]::Out.WriteLine('{token} ' + $__wc_rc); "
+                f"[Console]::Error.WriteLine(); [Console]::Error.WriteLine('{token}')\n"
+            )
+            return line
+        quoted = shlex.quote(command)
+        lines = []
+        if prelude:
+            lines.append(prelude)
+        if isolated:
+            lines.append(f"cd -- {shlex.quote(os.getcwd())} 2>/dev/null")
+            # eval de uma string entre aspas: erros de sintaxe não deixam o shell esperando entrada
+            lines.append(f"( eval {quoted} ) </dev/null")
+        else:
+            lines.append(f"eval {quoted} </dev/null")
+        lines.append(f"printf '\\n%s %d\\n' '{token}' \"$?\"")
+        lines.append(f"printf '\\n%s\\n' '{token}' >&2")
+        return "\n".join(lines) + "\n"
+
+    # --- execução ---
+    def run(self, command: str, timeout: float | None, on_output=None, isolated: bool = True,
+            head_bytes: int = 16384, tail_bytes: int = 16384) -> CommandResult:
+        token = f"__WARPCLONE_{os.urandom(16).hex()}__"
+        token_b = token.encode("ascii")
+        caps = {"stdout": BoundedCapture(head_bytes, tail_bytes), "stderr": BoundedCapture(head_bytes, tail_bytes)}
+        held = {"stdout": None, "stderr": None}
+        # Quebra de linha final ainda não gravada: se vier o sentinela, ela é dele
+        trailing = {"stdout": b"", "stderr": b""}
+        newline = b"\r\n" if self.kind == _POWERSHELL else b"\n"
+        done = {"stdout": False, "stderr": False}
+        returncode = None
+        timed_out = False
+        start = time.time()
+        deadline = start + timeout if timeout else None
+
+        def _notify(name, chunk):
+            if on_output is not None:
+                try:
+                    on_output(name, chunk.decode("utf-8", errors="ignore").rstrip("\r\n"))
+                except Exception:
+                    pass
+
+        self._write(self._payload(command, token, isolated))
+        while not all(done.values()):
+            remaining = None if deadline is None else deadline - time.time()
+            if done["stdout"]:
+                # O comando já terminou; o sentinela do stderr chega logo em seguida
+                remaining = 5.0 if remaining is None else min(max(remaining, 0), 5.0)
+            if remaining is not None and remaining <= 0:
+                timed_out = not done["stdout"]
+                break
+            try:
+                name, chunk = self._events.get(timeout=remaining)
+            except queue.Empty:
+                timed_out = not done["stdout"]
+                break
+            if chunk is None:
+                # EOF: o shell morreu (exit no comando ou falha)
+                done[name] = True
+                continue
+            if chunk.startswith(token_b):
+                done[name] = True
+                held[name] = None
+                trailing[name] = b""
+                if name == "stdout":
+                    try:
+                        returncode = int(chunk[len(token_b):].strip() or 0)
+                    except ValueError:
+                        returncode = None
+                continue
+            caps[name].feed(trailing[name])
+            trailing[name] = newline if chunk.endswith(newline) else b""
+            caps[name].feed(chunk[:len(chunk) - len(trailing[name])])
+            # Uma linha vazia pode ser a quebra que precede o sentinela: segura até a próxima
+            if held[name] is not None:
+                _notify(name, held[name])
+                held[name] = None
+            if chunk in (b"\n", b"\r\n"):
+                held[name] = chunk
+            else:
+                _notify(name, chunk)
+        for name, rest in trailing.items():
+            caps[name].feed(rest)
+
+        if timed_out or not all(done.values()) or not self.alive:
+            # Sem os dois sentinelas o fluxo fica dessincronizado: descarta o shell
+            self.kill()
+            if returncode is None and not timed_out:
+                returncode = self.proc.returncode
+        return CommandResult(returncode, caps["stdout"], caps["stderr"], timed_out, time.time() - start)
+
+
+class ShellPool:
+    """Conjunto de ``ShellSession`` reaproveitáveis (compartilhadas e por sessão)."""
+
+    def __init__(self, size: int = 2, posix_shell: str = "/bin/sh", persist_session_state: bool = False,
+                 max_sessions: int = 16):
+        self.size = max(1, int(size))
+        self.posix_shell = posix_shell
+        self.persist_session_state = bool(persist_session_state)
+        self.max_sessions = max(1, int(max_sessions))
+        self._lock = threading.Lock()
+        self._idle = {_POSIX: [], _POWERSHELL: []}
+        self._count = {_POSIX: 0, _POWERSHELL: 0}
+        self._sessions = OrderedDict()
+        self.stats = {"pooled": 0, "spawned": 0, "respawns": 0}
+
+    @classmethod
+    def from_config(cls, cfg: dict):
+        return cls(size=cfg.get("size", 2), posix_shell=cfg.get("posix_shell", "/bin/sh"),
+                   persist_session_state=cfg.get("persist_session_state", False),
+                   max_sessions=cfg.get("max_sessions", 16))
+
+    @staticmethod
+    def kind_for(powershell: bool) -> str | None:
+        if os.name == "nt":
+            return _POWERSHELL if powershell else None
+        return _POSIX
+
+    def _new_shell(self, kind):
+        return ShellSession(kind, self.posix_shell)
+
+    def _acquire_shared(self, kind):
+        with self._lock:
+            while self._idle[kind]:
+                shell = self._idle[kind].pop()
+                if shell.alive:
+                    return shell
+                self._count[kind] -= 1
+                self.stats["respawns"] += 1
+            if self._count[kind] >= self.size:
+                return None
+            self._count[kind] += 1
+        try:
+            return self._new_shell(kind)
+        except Exception:
+            with self._lock:
+                self._count[kind] -= 1
+            raise
+
+    def _release_shared(self, kind, shell):
+        with self._lock:
+            if shell.alive:
+                self._idle[kind].append(shell)
+            else:
+                self._count[kind] -= 1
+                self.stats["respawns"] += 1
+
+    def _evict_idle(self) -> list:
+        """Retira (sob o lock) as sessões ociosas mais antigas acima de `max_sessions`."""
+        evicted = []
+        for skey in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._sessions[skey].users == 0:
+                evicted.append(self._sessions.pop(skey))
+        return evicted
+
+    def _session_shell(self, key, kind):
+        with self._lock:
+            shell = self._sessions.get((key, kind))
+            if shell is not None and shell.alive:
+                self._sessions.move_to_end((key, kind))
+                shell.users += 1
+                return shell
+        # O processo é criado fora do lock: outras sessões não esperam o shell subir
+        fresh = self._new_shell(kind)
+        discard = []
+        with self._lock:
+            shell = self._sessions.get((key, kind))
+            if shell is not None and shell.alive:
+                # Outra thread criou o shell desta sessão enquanto este subia
+                discard.append(fresh)
+            else:
+                if shell is not None:
+                    self.stats["respawns"] += 1
+                    discard.append(shell)
+                shell = self._sessions[(key, kind)] = fresh
+            self._sessions.move_to_end((key, kind))
+            shell.users += 1
+            discard += self._evict_idle()
+        for old in discard:
+            old.kill()
+        return shell
+
+    def _release_session(self, shell):
+        with self._lock:
+            shell.users -= 1
+            evicted = self._evict_idle()
+        for old in evicted:
+            old.kill()
+
+    def run(self, command: str, timeout: float | None = None, on_output=None, powershell: bool = False,
+            session_key: str | None = None, head_bytes: int = 16384, tail_bytes: int = 16384) -> CommandResult:
+        kind = self.kind_for(powershell)
+        if kind is None:
+            return self._spawn(command, timeout, on_output, powershell, head_bytes, tail_bytes)
+        if self.persist_session_state and session_key:
+            shell = self._session_shell(session_key, kind)
+            try:
+                with shell.lock:
+                    with self._lock:
+                        self.stats["pooled"] += 1
+                    try:
+                        return shell.run(command, timeout, on_output, isolated=False,
+                                         head_bytes=head_bytes, tail_bytes=tail_bytes)
+                    except OSError:
+                        # Pipe quebrado: o shell morreu entre comandos; o próximo uso recria
+                        shell.kill()
+            finally:
+                self._release_session(shell)
+            return self._spawn(command, timeout, on_output, powershell, head_bytes, tail_bytes)
+        shell = self._acquire_shared(kind)
+        if shell is None:
+            # Todos os shells ocupados: não bloqueia, recorre ao spawn
+            return self._spawn(command, timeout, on_output, powershell, head_bytes, tail_bytes)
+        try:
+            with self._lock:
+                self.stats["pooled"] += 1
+            return shell.run(command, timeout, on_output, isolated=True,
+                             head_bytes=head_bytes, tail_bytes=tail_bytes)
+        except OSError:
+            shell.kill()
+            return self._spawn(command, timeout, on_output, powershell, head_bytes, tail_bytes)
+        except BaseException:
+            shell.kill()
+            raise
+        finally:
+            self._release_shared(kind, shell)
+
+    def _spawn(self, command, timeout, on_output, powershell, head_bytes, tail_bytes):
+        with self._lock:
+            self.stats["spawned"] += 1
+        if powershell and os.name == "nt":
+            args, shell = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command], False
+        else:
+            args, shell = command, True
+        return run_streaming(args, shell=shell, timeout=timeout, on_output=on_output,
+                             head_bytes=head_bytes, tail_bytes=tail_bytes)
+
+    def close(self):
+        with self._lock:
+            shells = [s for idle in self._idle.values() for s in idle] + list(self._sessions.values())
+            self._idle = {_POSIX: [], _POWERSHELL: []}
+            self._count = {_POSIX: 0, _POWERSHELL: 0}
+            self._sessions.clear()
+        for shell in shells:
+            shell.kill()
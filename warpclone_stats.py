@@ -0,0 +1,435 @@
+"""
+Resumo estatístico de datasets CSV (``describe_dataset``).
+
+Para cada coluna:
+- numéricas: contagem, nulos, mínimo, máximo, média, desvio-padrão, quantis e histograma;
+- texto: contagem, nulos, valores distintos e os mais frequentes.
+
+Com NumPy, os dados vêm das colunas em memmap do cache do ``query_table``
+(``warpclone_table.TableCache``) e são processados em blocos de `chunk_rows`, então a
+memória não depende do tamanho do arquivo. Média e variância são combinadas bloco a bloco
+(fórmula de Chan). Os quantis saem de um histograma fino (``_FINE_BINS`` faixas entre
+mínimo e máximo), com erro máximo de uma faixa, e o histograma exibido é a soma dessas
+faixas.
+
+Sem NumPy (ou com ``use_cache=False``), o CSV é lido em streaming. Contagens, extremos,
+média e desvio continuam exatos; quantis e histograma são estimados por uma amostra
+reservatório.
+
+Os resultados ficam em ``StatsCache``, indexados pela impressão digital do conteúdo
+(tamanho + SHA-1 de início, meio e fim do arquivo) e pelos parâmetros. Uma cópia do mesmo
+arquivo, ou a mesma pergunta repetida, é respondida sem reler nada.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from collections import Counter
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+from warpclone_table import iter_rows, resolve_column, sniff_format, to_number
+
+np = lazy_import("numpy", optional=True)
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+_FINE_BINS = 4096
+_RESERVOIR = 20000
+# Sobe quando o formato do resultado muda: resumos antigos em StatsCache deixam de valer
+_RESULT_VERSION = 2
+_TOP_VALUES = 5
+# Distintos acompanhados no modo streaming (acima disso a contagem vira limite inferior)
+_MAX_TRACKED = 100000
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+def fingerprint(path, sample: int = 64 * 1024) -> str:
+    """Tamanho, mtime e SHA-1 de três trechos (início, meio, fim): barato e independente do
+    caminho. O mtime pega edições do mesmo tamanho fora dos trechos amostrados, como no
+    ``TableCache``."""
+    st = os.stat(path)
+    size = st.st_size
+    h = hashlib.sha1(f"{size}:{st.st_mtime_ns}".encode("ascii"))
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - sample // 2), max(0, size - sample)):
+            f.seek(offset)
+            h.update(f.read(sample))
+    return h.hexdigest()
+
+
+class StatsCache:
+    """Resumos já calculados, em um JSON com LRU de `max_entries`."""
+
+    def __init__(self, path, max_entries: int = 100):
+        self.path = Path(path)
+        self.max_entries = int(max_entries)
+        self.lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8")) or {}
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, key: str):
+        with self.lock:
+            self._load()
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._entries[key] = value  # mais recente no fim
+            return value
+
+    def put(self, key: str, value: dict):
+        with self.lock:
+            self._load()
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            payload = json.dumps(self._entries, ensure_ascii=False)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+# --- acumuladores ---
+class _Moments:
+    """Contagem, extremos, média e M2 combináveis por blocos (Chan et al.)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def merge(self, n: int, mean: float, m2: float, lo: float, hi: float):
+        if not n:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    def add(self, value: float):
+        self.merge(1, value, 0.0, value, value)
+
+    def result(self) -> dict:
+        if not self.n:
+            return {"min": None, "max": None, "mean": None, "std": None}
+        std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+        return {"min": self.min, "max": self.max, "mean": self.mean, "std": std}
+
+
+def _quantiles_from_hist(counts, lo: float, hi: float, quantiles) -> dict:
+    """Quantis por interpolação linear dentro da faixa do histograma fino."""
+    total = sum(counts)
+    width = (hi - lo) / len(counts)
+    result, cum, i = {}, 0, 0
+    for q in sorted(quantiles):
+        target = q * total
+        while i < len(counts) - 1 and cum + counts[i] < target:
+            cum += counts[i]
+            i += 1
+        inside = (target - cum) / counts[i] if counts[i] else 0.0
+        result[_q_label(q)] = lo + (i + min(max(inside, 0.0), 1.0)) * width
+    return result
+
+
+def _q_label(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def _sample_quantiles(values: list, quantiles) -> dict:
+    data = sorted(values)
+    result = {}
+    for q in quantiles:
+        pos = q * (len(data) - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, len(data) - 1)
+        result[_q_label(q)] = data[lo] + (data[hi] - data[lo]) * (pos - lo)
+    return result
+
+
+def _coarse(counts: list, bins: int) -> list:
+    step = len(counts) // bins
+    return [sum(counts[i * step:(i + 1) * step]) for i in range(bins)]
+
+
+def _blocks(arr, rows: int, chunk_rows: int):
+    """Valores não nulos de `arr` em blocos; só um bloco fica na memória por vez."""
+    for start in range(0, rows, chunk_rows):
+        block = np.asarray(arr[start:start + chunk_rows])
+        yield block.size, block[~np.isnan(block)]
+
+
+def _exact_quantiles(counts, lo: float, quantiles) -> dict:
+    """Quantis exatos (interpolação linear, como ``np.quantile``) a partir da contagem por valor."""
+    cum = np.cumsum(counts)
+    n = int(cum[-1])
+    result = {}
+    for q in quantiles:
+        pos = q * (n - 1)
+        below, above = np.searchsorted(cum, [math.floor(pos), math.ceil(pos)], side="right")
+        result[_q_label(q)] = float(lo + below + (above - below) * (pos - math.floor(pos)))
+    return result
+
+
+def _numeric_columnar(name, arr, rows, bins, quantiles, chunk_rows, fine_bins, invalid: int = 0) -> dict:
+    moments, nulls, integer = _Moments(), -invalid, True
+    for size, values in _blocks(arr, rows, chunk_rows):
+        nulls += size - values.size
+        if values.size:
+            mean = float(values.mean())
+            moments.merge(int(values.size), mean, float(((values - mean) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+            integer = integer and bool(np.all(values == np.floor(values)))
+    entry = {"column": name, "type": "numeric", "count": moments.n, "nulls": nulls}
+    if invalid:
+        # NaN no cache é vazio ou texto fora do padrão numérico; o cache conta os segundos
+        entry["invalid"] = invalid
+    entry.update(moments.result())
+    if not moments.n:
+        return entry
+    lo, hi = moments.min, moments.max
+    entry["integer"] = integer
+    if hi == lo:
+        entry["quantiles"] = {_q_label(q): lo for q in quantiles}
+        entry["histogram"] = [moments.n]
+    elif integer and hi - lo < _FINE_BINS * 16:
+        # Inteiros em faixa curta (anos, quantidades, códigos): contagem por valor, quantis exatos
+        counts = np.zeros(int(hi - lo) + 1, dtype=np.int64)
+        for _, values in _blocks(arr, rows, chunk_rows):
+            counts += np.bincount((values - lo).astype(np.int64), minlength=counts.size)
+        entry["quantiles"] = _exact_quantiles(counts, lo, quantiles)
+        entry["histogram"] = np.histogram(np.arange(counts.size) + lo, bins=bins, range=(lo, hi),
+                                          weights=counts)[0].astype(np.int64).tolist()
+    else:
+        fine = np.zeros(fine_bins, dtype=np.int64)
+        for _, values in _blocks(arr, rows, chunk_rows):
+            fine += np.histogram(values, bins=fine_bins, range=(lo, hi))[0]
+        fine = fine.tolist()
+        entry["quantiles"] = _quantiles_from_hist(fine, lo, hi, quantiles)
+        entry["histogram"] = _coarse(fine, bins)
+    return entry
+
+
+# --- motor colunar (NumPy + memmap) ---
+def _describe_columnar(store, indices, bins, quantiles, chunk_rows, on_progress) -> list:
+    rows = store.rows
+    names = store.meta["format"]["columns"]
+    fine_bins = max(bins, _FINE_BINS // bins * bins)
+    out = []
+    for done, idx in enumerate(indices, 1):
+        arr = store.array(idx)
+        if store.is_text(idx):
+            dictionary = store.dictionary(idx)
+            counts = np.zeros(len(dictionary) + 1, dtype=np.int64)
+            for start in range(0, rows, chunk_rows):
+                counts += np.bincount(np.asarray(arr[start:start + chunk_rows]) + 1, minlength=counts.size)
+            present = counts[1:]
+            top = np.argsort(present, kind="stable")[::-1][:_TOP_VALUES]
+            out.append({"column": names[idx], "type": "text", "count": int(present.sum()),
+                        "nulls": int(counts[0]), "distinct": int((present > 0).sum()),
+                        "top": [[dictionary[i], int(present[i])] for i in top if present[i]]})
+        else:
+            invalid = store.meta["store"][idx].get("invalid", 0)
+            out.append(_numeric_columnar(names[idx], arr, rows, bins, quantiles, chunk_rows, fine_bins, invalid))
+        if on_progress is not None:
+            on_progress(done, len(indices), done, len(indices))
+    return out
+
+
+# --- motor streaming (sem NumPy) ---
+def _describe_stream(path, fmt, indices, bins, quantiles, on_progress, chunk_rows: int = 50000) -> tuple:
+    decimal_comma = fmt["decimal_comma"]
+    numeric = {i: fmt["types"][i] == "num" for i in indices}
+    moments = {i: _Moments() for i in indices if numeric[i]}
+    samples = {i: [] for i in indices if numeric[i]}
+    counters = {i: Counter() for i in indices if not numeric[i]}
+    saturated = set()
+    nulls = dict.fromkeys(indices, 0)
+    invalid = dict.fromkeys(indices, 0)
+    rng = random.Random(0)
+    rows = 0
+    chunk = []
+    reader = iter_rows(path, fmt)
+    while True:
+        chunk.clear()
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                break
+        if not chunk:
+            break
+        rows += len(chunk)
+        # Coluna a coluna, um bloco por vez: as estatísticas do bloco são combinadas de uma vez
+        for i in indices:
+            cells = [row[i].strip() for row in chunk]
+            present = [c for c in cells if c]
+            nulls[i] += len(cells) - len(present)
+            if numeric[i]:
+                values = [v for v in (to_number(c, decimal_comma) for c in present) if v is not None]
+                invalid[i] += len(present) - len(values)
+                if values:
+                    mean = math.fsum(values) / len(values)
+                    moments[i].merge(len(values), mean, math.fsum((v - mean) ** 2 for v in values),
+                                     min(values), max(values))
+                    _reservoir(samples[i], values, moments[i].n, rng)
+            else:
+                counter = counters[i]
+                if i in saturated:
+                    counter.update(c for c in present if c in counter)
+                else:
+                    counter.update(present)
+                    if len(counter) > _MAX_TRACKED:
+                        # Mantém só os mais frequentes; novos valores deixam de ser contados
+                        saturated.add(i)
+                        for value, _ in counter.most_common()[_MAX_TRACKED:]:
+                            del counter[value]
+        if on_progress is not None:
+            on_progress(rows, 0, rows, 0)
+    out = []
+    for i in indices:
+        name = fmt["columns"][i]
+        if numeric[i]:
+            m = moments[i]
+            entry = {"column": name, "type": "numeric", "count": m.n, "nulls": nulls[i], "approximate": True}
+            if invalid[i]:
+                # Texto fora do padrão numérico, contado à parte dos nulos nos dois motores
+                entry["invalid"] = invalid[i]
+            entry.update(m.result())
+            if m.n:
+                entry["integer"] = all(float(v).is_integer() for v in samples[i])
+                entry["quantiles"] = _sample_quantiles(samples[i], quantiles)
+                if m.max > m.min:
+                    # Histograma da amostra reescalado para a contagem total
+                    width = (m.max - m.min) / bins
+                    hist = [0] * bins
+                    for v in samples[i]:
+                        hist[min(int((v - m.min) / width), bins - 1)] += 1
+                    scale = m.n / len(samples[i])
+                    entry["histogram"] = [round(h * scale) for h in hist]
+                else:
+                    entry["histogram"] = [m.n]
+            out.append(entry)
+        else:
+            counter = counters[i]
+            out.append({"column": name, "type": "text", "count": rows - nulls[i],
+                        "nulls": nulls[i], "distinct": len(counter), "distinct_at_least": i in saturated,
+                        "top": [[v, c] for v, c in counter.most_common(_TOP_VALUES)]})
+    return rows, out
+
+
+def _reservoir(sample: list, values: list, seen: int, rng: random.Random):
+    """Amostra uniforme de até ``_RESERVOIR`` valores (algoritmo R); `seen` já inclui `values`."""
+    first = seen - len(values)
+    for n, value in enumerate(values, first):
+        if len(sample) < _RESERVOIR:
+            sample.append(value)
+        else:
+            j = rng.randrange(n + 1)
+            if j < _RESERVOIR:
+                sample[j] = value
+
+
+def describe(path, columns=None, bins: int = 10, quantiles=DEFAULT_QUANTILES, table_cache=None,
+             use_cache: bool = True, stats_cache: StatsCache | None = None, chunk_rows: int = 1_000_000,
+             on_progress=None) -> dict:
+    """Resumo por coluna de `path`. Retorna ``{"rows", "columns": [...], "engine", "cached"}``."""
+    bins = max(1, min(int(bins or 10), 50))
+    quantiles = tuple(sorted(float(q) for q in (quantiles or DEFAULT_QUANTILES) if 0 <= float(q) <= 1))
+    key = None
+    if stats_cache is not None:
+        spec = json.dumps([_RESULT_VERSION, columns, bins, quantiles, bool(use_cache and np is not None)])
+        key = fingerprint(path) + ":" + hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+        hit = stats_cache.get(key)
+        if hit is not None:
+            return dict(hit, cached=True)
+    if use_cache and table_cache is not None and np is not None:
+        store = table_cache.open(path, lambda: sniff_format(path))
+        fmt = store.meta["format"]
+        indices = _select(fmt, columns)
+        result = {"rows": store.rows, "engine": "columnar",
+                  "columns": _describe_columnar(store, indices, bins, quantiles, int(chunk_rows), on_progress)}
+    else:
+        fmt = sniff_format(path)
+        indices = _select(fmt, columns)
+        rows, stats = _describe_stream(path, fmt, indices, bins, quantiles, on_progress)
+        result = {"rows": rows, "engine": "stream", "columns": stats}
+    result["total_columns"] = len(fmt["columns"])
+    if stats_cache is not None:
+        stats_cache.put(key, result)
+    return dict(result, cached=False)
+
+
+def _select(fmt, columns) -> list:
+    if not columns:
+        return list(range(len(fmt["columns"])))
+    columns = [columns] if isinstance(columns, str) else columns
+    return [resolve_column(c, fmt["columns"]) for c in columns]
+
+
+# --- formatação compacta ---
+def _num(value, integer: bool = False) -> str:
+    if value is None:
+        return "-"
+    if integer and float(value).is_integer():
+        return f"{int(value)}"
+    magnitude = abs(value)
+    if magnitude and (magnitude >= 1e9 or magnitude < 1e-3):
+        return f"{value:.3g}"
+    return f"{value:.4f}".rstrip("0").rstrip(".") if magnitude < 1000 else f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _sparkline(hist: list) -> str:
+    top = max(hist) or 1
+    return "".join(_SPARK[min(len(_SPARK) - 1, int(h / top * (len(_SPARK) - 1) + 0.5))] if h else " " for h in hist)
+
+
+def format_summary(result: dict, max_columns: int = 30, max_chars: int = 6000) -> str:
+    """Uma linha por coluna, cortada em `max_columns` colunas e `max_chars` caracteres."""
+    lines = []
+    for entry in result["columns"][:max_columns]:
+        total = entry["count"] + entry["nulls"] + entry.get("invalid", 0)
+        null_rate = f"{100 * entry['nulls'] / total:.1f}%" if total else "-"
+        if entry["type"] == "numeric":
+            integer = entry.get("integer", False)
+            q = entry.get("quantiles", {})
+            quant = ", ".join(f"{k} {_num(v, integer)}" for k, v in q.items())
+            approx = " (aprox.)" if entry.get("approximate") else ""
+            line = (f"- {entry['column']} [num] n={entry['count']}, nulos {null_rate}; "
+                    f"min {_num(entry['min'], integer)}, max {_num(entry['max'], integer)}, "
+                    f"média {_num(entry['mean'])}, dp {_num(entry['std'])}")
+            if entry.get("invalid"):
+                line += f"; inválidos {entry['invalid']}"
+            if quant:
+                line += f"; {quant}{approx}"
+            if entry.get("histogram") and len(entry["histogram"]) > 1:
+                line += f"; hist [{_sparkline(entry['histogram'])}]"
+        else:
+            distinct = f"{entry['distinct']}{'+' if entry.get('distinct_at_least') else ''}"
+            top = ", ".join(f"{v} ({c})" for v, c in entry["top"])
+            line = f"- {entry['column']} [texto] n={entry['count']}, nulos {null_rate}, distintos {distinct}"
+            if top:
+                line += f"; mais comuns: {top}"
+        lines.append(line)
+    hidden = len(result["columns"]) - len(lines)
+    if hidden > 0:
+        lines.append(f"... e mais {hidden} colunas (use `columns` para escolher).")
+    text = "\n".join(lines)
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit("\n", 1)[0] + "\n... (resumo cortado; use `columns` para escolher)"
+    return text
@@ -0,0 +1,811 @@
+"""
+Consultas sobre CSVs grandes (``query_table``): projeção, filtros, agrupamento e top-N.
+
+Dois motores respondem à mesma consulta:
+- streaming: lê o CSV linha a linha com ``csv.reader``, usando memória proporcional ao
+  número de grupos. Sem agregação nem ordenação, para assim que junta `limit` linhas.
+- colunar (com NumPy): na primeira consulta a um arquivo grande, converte o CSV para
+  ``warpclone_memory/table_cache/<hash>/``. Cada coluna vira um arquivo binário lido com
+  ``np.memmap``: números em float64 (NaN = vazio) e textos codificados por dicionário em
+  int32 (-1 = vazio). A partir daí as consultas são vetorizadas e levam milissegundos. O
+  cache é refeito quando o tamanho ou o mtime do CSV mudam.
+
+O formato é detectado no início do arquivo:
+- encoding: UTF-8 ou cp1252, comum nos dados do SUS;
+- delimitador: ``,`` ``;`` tab ou ``|``;
+- decimal com vírgula (``1.234,56``);
+- tipo de cada coluna. Códigos com zero à esquerda (CEP, IBGE) continuam texto.
+Comparações de texto ignoram maiúsculas/minúsculas.
+
+Células vazias só casam com ``is_null``: nenhuma comparação (``==``, ``!=``, ``<``...), nem
+``in``/``not in``/``contains``/``startswith``, seleciona vazios, nos dois motores. Comparar
+coluna numérica com valor não numérico é erro (``QueryError``).
+
+Os tipos vêm da amostra do início do arquivo e valem para o arquivo inteiro, nos dois
+motores. Numa coluna numérica, uma célula que não é número (``N/A`` depois da amostra) é
+tratada como vazia — em filtros, agregações, ``count`` e ``is_null`` — e o cache colunar
+guarda quantas foram (``invalid``) em ``meta.json``.
+"""
+
+import csv
+import hashlib
+import heapq
+import io
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from warpclone_lazy import lazy_import
+from warpclone_reader import sniff_encoding
+
+np = lazy_import("numpy", optional=True)
+
+_SAMPLE_BYTES = 256 * 1024
+_SAMPLE_ROWS = 2000
+_CHUNK_ROWS = 100_000
+_DELIMITERS = (",", ";", "\t", "|")
+_AGG_RE = re.compile(r"^\s*(count|sum|avg|mean|min|max|count_distinct)\s*\(\s*([^)]*?)\s*\)\s*$", re.I)
+_FILTER_RE = re.compile(r"^\s*(.+?)\s*(==|!=|>=|<=|=|>|<)\s*(.*)$")
+_FILTER_WORD_RE = re.compile(r"^\s*(.+?)\s+(not in|in|contains|startswith|is_null|not_null)(?:\s+(.*))?$", re.I)
+_NUM_DOT_RE = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+_NUM_COMMA_RE = re.compile(r"^[+-]?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$")
+_OPS = {"==", "!=", ">", ">=", "<", "<=", "in", "not in", "contains", "startswith", "is_null", "not_null"}
+
+csv.field_size_limit(2 ** 31 - 1)
+
+
+class QueryError(ValueError):
+    pass
+
+
+# --- formato e tipos ---
+def to_number(text: str, decimal_comma: bool):
+    """Converte o texto da célula em float; None se vazio ou não numérico."""
+    text = text.strip()
+    if not text:
+        return None
+    if decimal_comma:
+        if not _NUM_COMMA_RE.match(text):
+            return None
+        text = text.replace(".", "").replace(",", ".")
+    elif not _NUM_DOT_RE.match(text):
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _looks_code(text: str) -> bool:
+    return len(text) > 1 and text[0] == "0" and text.isdigit()
+
+
+def sniff_format(path) -> dict:
+    """``{"encoding", "delimiter", "decimal_comma", "columns", "types"}``."""
+    with open(path, "rb") as f:
+        head = f.read(_SAMPLE_BYTES)
+    encoding = sniff_encoding(head)
+    if encoding is None:
+        raise QueryError(f"'{path}' não parece um arquivo de texto/CSV")
+    text = head.decode(encoding, errors="replace")
+    lines = text.splitlines()
+    if len(head) == _SAMPLE_BYTES and lines:
+        lines = lines[:-1]  # a última pode estar cortada
+    if not lines:
+        raise QueryError(f"'{path}' está vazio")
+    sample = lines[:50]
+    best, best_score = ",", -1
+    for delim in _DELIMITERS:
+        counts = [line.count(delim) for line in sample]
+        if not counts[0]:
+            continue
+        consistent = sum(1 for c in counts if c == counts[0])
+        score = consistent * 1000 + counts[0]
+        if score > best_score:
+            best, best_score = delim, score
+    rows = list(csv.reader(io.StringIO("\n".join(lines[: _SAMPLE_ROWS + 1])), delimiter=best))
+    header = [h.strip() or f"col{i + 1}" for i, h in enumerate(rows[0])]
+    body = rows[1:]
+    comma = dot = 0
+    for row in body:
+        for value in row:
+            value = value.strip()
+            if re.match(r"^[+-]?\d[\d.]*,\d+$", value):
+                comma += 1
+            elif re.match(r"^[+-]?\d+\.\d+$", value) and not re.match(r"^[+-]?\d{1,3}(\.\d{3})+$", value):
+                dot += 1
+    decimal_comma = comma > dot
+    types = []
+    for i in range(len(header)):
+        values = [row[i].strip() for row in body if i < len(row) and row[i].strip()]
+        numeric = bool(values) and all(
+            not _looks_code(v) and to_number(v, decimal_comma) is not None for v in values
+        )
+        types.append("num" if numeric else "str")
+    return {"encoding": encoding, "delimiter": best, "decimal_comma": decimal_comma,
+            "columns": header, "types": types}
+
+
+def iter_rows(path, fmt: dict):
+    """Linhas de dados (listas de strings com o tamanho do cabeçalho)."""
+    width = len(fmt["columns"])
+    with open(path, "r", encoding=fmt["encoding"], errors="replace", newline="") as f:
+        reader = csv.reader(f, delimiter=fmt["delimiter"])
+        next(reader, None)
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                row = (row + [""] * width)[:width]
+            yield row
+
+
+# --- especificação da consulta ---
+def _as_list(value) -> list:
+    if value is None or value == "":
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def resolve_column(name: str, columns: list) -> int:
+    if name in columns:
+        return columns.index(name)
+    folded = [c.casefold() for c in columns]
+    if name.casefold() in folded:
+        return folded.index(name.casefold())
+    raise QueryError(f"coluna '{name}' não existe. Colunas: {', '.join(columns)}")
+
+
+def parse_filter(item) -> tuple:
+    if isinstance(item, dict):
+        column, op, value = item.get("column"), item.get("op", "=="), item.get("value")
+    elif isinstance(item, (list, tuple)) and len(item) in (2, 3):
+        column, op, value = item[0], item[1], item[2] if len(item) == 3 else None
+    elif isinstance(item, str):
+        m = _FILTER_WORD_RE.match(item) or _FILTER_RE.match(item)
+        if not m:
+            raise QueryError(f"filtro inválido: '{item}' (use 'coluna op valor')")
+        column, op, value = m.group(1), m.group(2), (m.group(3) or "").strip().strip("'\"")
+        if op.lower() in ("in", "not in"):
+            value = [v.strip().strip("'\"") for v in value.strip("[]()").split(",") if v.strip()]
+    else:
+        raise QueryError(f"filtro inválido: {item!r}")
+    op = "==" if op == "=" else str(op).lower()
+    if op not in _OPS:
+        raise QueryError(f"operador '{op}' não suportado ({', '.join(sorted(_OPS))})")
+    if op in ("in", "not in"):
+        value = _as_list(value)
+    return str(column), op, value
+
+
+def parse_aggregate(text: str) -> tuple:
+    m = _AGG_RE.match(str(text))
+    if not m:
+        raise QueryError(f"agregação inválida: '{text}' (ex.: count(*), sum(coluna), avg(coluna))")
+    func = m.group(1).lower()
+    func = "avg" if func == "mean" else func
+    column = m.group(2).strip().strip("'\"")
+    if column in ("", "*"):
+        if func != "count":
+            raise QueryError(f"'{func}' precisa de uma coluna")
+        column = None
+    return func, column, f"{func}({column or '*'})"
+
+
+class Query:
+    """Consulta normalizada e validada contra o cabeçalho do arquivo."""
+
+    def __init__(self, fmt: dict, columns=None, where=None, group_by=None, aggregates=None,
+                 order_by=None, limit: int = 20):
+        names = fmt["columns"]
+        self.fmt = fmt
+        self.group_by = [resolve_column(c, names) for c in _as_list(group_by)]
+        self.aggregates = []
+        for text in _as_list(aggregates) or (["count(*)"] if self.group_by else []):
+            func, column, label = parse_aggregate(text)
+            idx = resolve_column(column, names) if column is not None else None
+            if func in ("sum", "avg", "min", "max") and fmt["types"][idx] != "num":
+                raise QueryError(f"{func} exige coluna numérica; '{names[idx]}' é texto")
+            self.aggregates.append((func, idx, label))
+        self.filters = []
+        for item in _as_list(where) if not isinstance(where, dict) else [where]:
+            column, op, value = parse_filter(item)
+            idx = resolve_column(column, names)
+            if fmt["types"][idx] == "num":
+                if op in ("contains", "startswith"):
+                    raise QueryError(f"'{op}' só vale para colunas de texto")
+                if op in _COMPARE and _target_number(value, fmt["decimal_comma"]) is None:
+                    raise QueryError(f"'{value}' não é número (coluna '{names[idx]}')")
+            self.filters.append((idx, op, value))
+        self.grouped = bool(self.group_by or self.aggregates)
+        if self.grouped:
+            self.output = [names[i] for i in self.group_by] + [a[2] for a in self.aggregates]
+            self.columns = []
+        else:
+            self.columns = [resolve_column(c, names) for c in _as_list(columns)] or list(range(len(names)))
+            self.output = [names[i] for i in self.columns]
+        self.limit = max(1, int(limit or 20))
+        self.order = None
+        if order_by:
+            text = str(order_by).strip()
+            desc = text.startswith("-") or text.lower().endswith(" desc")
+            key = re.sub(r"\s+(desc|asc)$", "", text.lstrip("-+"), flags=re.I).strip()
+            if self.grouped:
+                labels = [o.casefold() for o in self.output]
+                norm = parse_aggregate(key)[2] if _AGG_RE.match(key) else key
+                if norm.casefold() not in labels:
+                    raise QueryError(f"order_by '{key}' precisa ser uma das colunas do resultado: {', '.join(self.output)}")
+                self.order = (labels.index(norm.casefold()), desc)
+            else:
+                self.order = (resolve_column(key, names), desc)
+        elif self.grouped and self.aggregates:
+            # Top-N: sem ordem explícita, a primeira agregação em ordem decrescente
+            self.order = (len(self.group_by), True)
+
+    def is_numeric(self, idx: int) -> bool:
+        return self.fmt["types"][idx] == "num"
+
+
+def _target_number(value, decimal_comma: bool):
+    """Valor do filtro como número: ponto decimal primeiro, depois o formato do arquivo."""
+    target = to_number(str(value), False)
+    return to_number(str(value), decimal_comma) if target is None else target
+
+
+def _sort_key(value):
+    # None/NaN sempre no fim, números antes de textos
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return (2, 0)
+    return (0, value) if isinstance(value, (int, float)) else (1, str(value).casefold())
+
+
+def _finish(query: Query, rows: list, matched: int, scanned: int, engine: str, start: float,
+            sort: bool = True) -> dict:
+    if sort and query.order is not None:
+        idx, desc = query.order
+        # Empates saem na ordem das chaves de grupo, igual nos dois motores
+        keys = len(query.group_by)
+        rows.sort(key=lambda r: [_sort_key(v) for v in r[:keys]])
+        present = [r for r in rows if _sort_key(r[idx])[0] < 2]
+        missing = [r for r in rows if _sort_key(r[idx])[0] == 2]
+        present.sort(key=lambda r: _sort_key(r[idx]), reverse=desc)
+        rows = present + missing
+    total = len(rows) if query.grouped else matched
+    return {"columns": query.output, "rows": rows[: query.limit], "total": total, "matched": matched,
+            "scanned": scanned, "engine": engine, "elapsed_sec": round(time.perf_counter() - start, 4)}
+
+
+# --- motor streaming ---
+def _row_predicate(query: Query):
+    decimal_comma = query.fmt["decimal_comma"]
+    tests = []
+    for idx, op, value in query.filters:
+        numeric = query.is_numeric(idx)
+        if op in ("is_null", "not_null"):
+            want = op == "is_null"
+            if numeric:
+                tests.append(lambda row, i=idx, w=want: (to_number(row[i], decimal_comma) is None) == w)
+            else:
+                tests.append(lambda row, i=idx, w=want: (not row[i].strip()) == w)
+            continue
+        # Os demais testes recebem a célula já convertida e nunca casam com vazio
+        if numeric:
+            cell = (lambda row, i=idx: to_number(row[i], decimal_comma))
+        else:
+            cell = (lambda row, i=idx: row[i].strip().casefold() or None)
+        if op in ("in", "not in"):
+            if numeric:
+                wanted = {to_number(str(v), False) for v in value} | {to_number(str(v), decimal_comma) for v in value}
+                wanted.discard(None)
+            else:
+                wanted = {str(v).strip().casefold() for v in value}
+            check = (lambda v, s=wanted, neg=op == "not in": (v in s) != neg)
+        elif op == "contains":
+            check = (lambda v, n=str(value).casefold(): n in v)
+        elif op == "startswith":
+            check = (lambda v, n=str(value).strip().casefold(): v.startswith(n))
+        else:
+            target = _target_number(value, decimal_comma) if numeric else str(value).strip().casefold()
+            check = (lambda v, t=target, c=_COMPARE[op]: c(v, t))
+        tests.append(lambda row, get=cell, c=check: (lambda v: v is not None and c(v))(get(row)))
+    return lambda row: all(t(row) for t in tests)
+
+
+_COMPARE = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+}
+
+
+def _display(value: str, numeric: bool, decimal_comma: bool):
+    if numeric:
+        num = to_number(value, decimal_comma)
+        if num is not None:
+            return int(num) if num.is_integer() and abs(num) < 2 ** 53 else num
+        return None
+    return value.strip() or None
+
+
+def query_stream(path, query: Query) -> dict:
+    start = time.perf_counter()
+    fmt = query.fmt
+    decimal_comma = fmt["decimal_comma"]
+    accept = _row_predicate(query)
+    scanned = matched = 0
+    if not query.grouped:
+        counter = [0, 0]
+
+        def matches():
+            for row in iter_rows(path, fmt):
+                counter[0] += 1
+                if accept(row):
+                    counter[1] += 1
+                    yield row
+
+        def project(row):
+            return [_display(row[i], query.is_numeric(i), decimal_comma) for i in query.columns]
+
+        truncated = False
+        if query.order is None:
+            rows = []
+            for row in matches():
+                if len(rows) >= query.limit:
+                    # Sem ordenação, basta a primeira página
+                    truncated = True
+                    break
+                rows.append(project(row))
+        else:
+            idx, desc = query.order
+            numeric = query.is_numeric(idx)
+
+            def key(row):
+                rank = _sort_key(_display(row[idx], numeric, decimal_comma))
+                missing = rank[0] == 2
+                return ((0 if missing else 1), rank) if desc else ((1 if missing else 0), rank)
+
+            # Top-N em streaming: heap de tamanho `limit`
+            pick = heapq.nlargest if desc else heapq.nsmallest
+            rows = [project(row) for row in pick(query.limit, matches(), key=key)]
+        result = _finish(query, rows, counter[1], counter[0], "stream", start, sort=False)
+        if truncated:
+            result["total"] = None  # parou cedo: total desconhecido
+        return result
+
+    groups = {}
+    aggs = query.aggregates
+    for row in iter_rows(path, fmt):
+        scanned += 1
+        if not accept(row):
+            continue
+        matched += 1
+        key = tuple(_display(row[i], query.is_numeric(i), decimal_comma) for i in query.group_by)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = [_new_state(func) for func, _, _ in aggs]
+        for (func, idx, _), acc in zip(aggs, state):
+            if func == "count" and idx is None:
+                acc[0] += 1
+                continue
+            raw = row[idx]
+            if not query.is_numeric(idx):
+                if func == "count_distinct":
+                    if raw.strip():
+                        acc.add(raw.strip().casefold())
+                else:
+                    acc[0] += 1 if raw.strip() else 0
+                continue
+            # Coluna numérica: célula não numérica conta como vazia, como no cache colunar
+            num = to_number(raw, decimal_comma)
+            if num is None:
+                continue
+            if func == "count_distinct":
+                acc.add(num)
+            elif func == "count":
+                acc[0] += 1
+            elif func in ("sum", "avg"):
+                acc[0] += num
+                acc[1] += 1
+            elif func == "min":
+                acc[0] = num if acc[0] is None else min(acc[0], num)
+            else:
+                acc[0] = num if acc[0] is None else max(acc[0], num)
+    rows = []
+    for key, state in groups.items():
+        values = []
+        for (func, _, _), acc in zip(aggs, state):
+            if func == "count":
+                values.append(acc[0])
+            elif func == "count_distinct":
+                values.append(len(acc))
+            elif func == "sum":
+                values.append(acc[0] if acc[1] else None)
+            elif func == "avg":
+                values.append(acc[0] / acc[1] if acc[1] else None)
+            else:
+                values.append(acc[0])
+        rows.append(list(key) + values)
+    if not query.group_by and not rows:
+        rows = [[0 if f in ("count", "count_distinct") else None for f, _, _ in aggs]]
+    return _finish(query, rows, matched, scanned, "stream", start)
+
+
+def _new_state(func):
+    if func == "count_distinct":
+        return set()
+    if func in ("sum", "avg"):
+        return [0.0, 0]
+    if func == "count":
+        return [0]
+    return [None]
+
+
+# --- cache colunar ---
+class ColumnStore:
+    """Colunas de um CSV convertidas para arquivos binários lidos via ``np.memmap``."""
+
+    def __init__(self, directory: Path, meta: dict):
+        self.dir = directory
+        self.meta = meta
+        self.rows = meta["rows"]
+        self._arrays = {}
+        self._dicts = {}
+
+    def array(self, idx: int):
+        arr = self._arrays.get(idx)
+        if arr is None:
+            col = self.meta["store"][idx]
+            if self.rows == 0:
+                arr = np.zeros(0, dtype=col["dtype"])
+            else:
+                arr = np.memmap(self.dir / f"c{idx}.bin", dtype=col["dtype"], mode="r", shape=(self.rows,))
+            self._arrays[idx] = arr
+        return arr
+
+    def dictionary(self, idx: int) -> list:
+        values = self._dicts.get(idx)
+        if values is None:
+            with open(self.dir / f"c{idx}.dict.json", "r", encoding="utf-8") as f:
+                values = json.load(f)
+            self._dicts[idx] = values
+        return values
+
+    def is_text(self, idx: int) -> bool:
+        return self.meta["store"][idx]["kind"] == "str"
+
+
+class TableCache:
+    """Conversões CSV -> colunar em `directory`, uma pasta por arquivo, com LRU de `max_tables`."""
+
+    def __init__(self, directory, max_tables: int = 20, min_bytes: int = 1024 * 1024):
+        self.dir = Path(directory)
+        self.max_tables = int(max_tables)
+        self.min_bytes = int(min_bytes)
+        self.lock = threading.Lock()
+        self._open = {}
+
+    def _table_dir(self, path: str) -> Path:
+        return self.dir / hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:20]
+
+    def open(self, path, fmt, on_progress=None):
+        """``ColumnStore`` atualizado para `path` (converte na primeira vez).
+
+        `fmt` pode ser uma função: só é chamada quando há conversão a fazer.
+        """
+        path = str(path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        directory = self._table_dir(path)
+        with self.lock:
+            store = self._open.get(directory)
+            if store is not None and store.meta["stamp"] == stamp:
+                return store
+            meta = None
+            try:
+                meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+            if meta is None or meta.get("stamp") != stamp or meta.get("version") != 2:
+                meta = self._build(path, fmt() if callable(fmt) else fmt, directory, stamp, on_progress)
+                self._evict()
+            else:
+                os.utime(directory / "meta.json")
+            store = ColumnStore(directory, meta)
+            self._open[directory] = store
+            return store
+
+    def _evict(self):
+        tables = [d for d in self.dir.iterdir() if (d / "meta.json").exists()]
+        tables.sort(key=lambda d: (d / "meta.json").stat().st_mtime)
+        for old in tables[: max(0, len(tables) - self.max_tables)]:
+            self._open.pop(old, None)
+            shutil.rmtree(old, ignore_errors=True)
+
+    def _build(self, path: str, fmt: dict, directory: Path, stamp, on_progress) -> dict:
+        tmp = directory.with_name(directory.name + f".{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        decimal_comma = fmt["decimal_comma"]
+        kinds = list(fmt["types"])
+        width = len(kinds)
+        outputs = [open(tmp / f"c{i}.bin", "wb") for i in range(width)]
+        dicts = [{} for _ in range(width)]
+        invalid = [0] * width
+        rows = 0
+        total_bytes = stamp[0]
+        try:
+            with open(path, "rb") as raw:
+                text = io.TextIOWrapper(raw, encoding=fmt["encoding"], errors="replace", newline="")
+                reader = csv.reader(text, delimiter=fmt["delimiter"])
+                next(reader, None)
+                while True:
+                    chunk = []
+                    for row in reader:
+                        if not row:
+                            continue
+                        if len(row) != width:
+                            row = (row + [""] * width)[:width]
+                        chunk.append(row)
+                        if len(chunk) >= _CHUNK_ROWS:
+                            break
+                    if not chunk:
+                        break
+                    rows += len(chunk)
+                    for i, column in enumerate(zip(*chunk)):
+                        if kinds[i] == "num":
+                            values = [to_number(v, decimal_comma) for v in column]
+                            # Não numérico depois da amostra: NaN (vazio), como no streaming
+                            invalid[i] += sum(1 for v, s in zip(values, column) if v is None and s.strip())
+                            arr = np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+                        else:
+                            arr = self._encode(column, dicts[i])
+                        outputs[i].write(arr.tobytes())
+                    if on_progress is not None:
+                        on_progress(rows, 0, raw.tell(), total_bytes)
+        finally:
+            for out in outputs:
+                out.close()
+        store = []
+        for i, kind in enumerate(kinds):
+            if kind == "str":
+                values = [None] * len(dicts[i])
+                for value, code in dicts[i].items():
+                    values[code] = value
+                with open(tmp / f"c{i}.dict.json", "w", encoding="utf-8") as f:
+                    json.dump(values, f, ensure_ascii=False)
+            entry = {"kind": kind, "dtype": "int32" if kind == "str" else "float64"}
+            if kind == "num":
+                entry["invalid"] = invalid[i]
+            store.append(entry)
+        meta = {"version": 2, "source": os.path.abspath(path), "stamp": stamp, "rows": rows,
+                "format": dict(fmt, types=kinds), "store": store, "built_at": time.time()}
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        return meta
+
+    @staticmethod
+    def _encode(column, mapping: dict):
+        codes = np.empty(len(column), dtype=np.int32)
+        for n, value in enumerate(column):
+            value = value.strip()
+            if not value:
+                codes[n] = -1
+                continue
+            code = mapping.get(value)
+            if code is None:
+                code = mapping[value] = len(mapping)
+            codes[n] = code
+        return codes
+
+
+def _text_codes(store: ColumnStore, idx: int, match) -> "np.ndarray":
+    """Códigos do dicionário cujos valores satisfazem `match(valor_casefold)`."""
+    return np.array([code for code, value in enumerate(store.dictionary(idx)) if match(value.casefold())],
+                    dtype=np.int32)
+
+
+def _filter_mask(store: ColumnStore, query: Query):
+    mask = np.ones(store.rows, dtype=bool)
+    decimal_comma = query.fmt["decimal_comma"]
+    for idx, op, value in query.filters:
+        arr = store.array(idx)
+        if store.is_text(idx):
+            if op in ("is_null", "not_null"):
+                part = arr < 0
+                mask &= part if op == "is_null" else ~part
+                continue
+            # Os códigos do dicionário não incluem vazio (-1): vazios nunca casam
+            needle = str(value).strip().casefold()
+            if op in ("in", "not in"):
+                wanted = {str(v).strip().casefold() for v in value}
+                match = lambda v, s=wanted, neg=op == "not in": (v in s) != neg
+            elif op == "contains":
+                match = lambda v, n=str(value).casefold(): n in v
+            elif op == "startswith":
+                match = lambda v, n=needle: v.startswith(n)
+            else:
+                cmp = _COMPARE[op]
+                match = lambda v, n=needle, c=cmp: c(v, n)
+            mask &= np.isin(arr, _text_codes(store, idx, match))
+            continue
+        if op in ("is_null", "not_null"):
+            part = np.isnan(arr)
+            mask &= part if op == "is_null" else ~part
+            continue
+        present = ~np.isnan(arr)
+        if op in ("in", "not in"):
+            nums = [to_number(str(v), False) for v in value] + [to_number(str(v), decimal_comma) for v in value]
+            part = np.isin(arr, [n for n in nums if n is not None])
+            mask &= part if op == "in" else ~part & present
+            continue
+        # Query já recusou valor não numérico e contains/startswith em coluna numérica
+        with np.errstate(invalid="ignore"):
+            mask &= _COMPARE[op](arr, _target_number(value, decimal_comma)) & present
+    return mask
+
+
+def _py(value, numeric: bool):
+    if numeric:
+        value = float(value)
+        if math.isnan(value):
+            return None
+        return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+    return value
+
+
+def _column_values(store: ColumnStore, idx: int, positions):
+    arr = np.asarray(store.array(idx)[positions])
+    if store.is_text(idx):
+        dictionary = store.dictionary(idx)
+        return [dictionary[c] if c >= 0 else None for c in arr.tolist()]
+    return [_py(v, True) for v in arr.tolist()]
+
+
+def _group_codes(store: ColumnStore, idx: int, arr) -> tuple:
+    """Códigos inteiros densos (0..card-1) para os valores de uma coluna."""
+    if store.is_text(idx):
+        return arr.astype(np.int64) + 1, len(store.dictionary(idx)) + 1
+    _, codes = np.unique(arr, return_inverse=True)
+    codes = codes.astype(np.int64).reshape(-1)
+    return codes, (int(codes.max()) + 1 if codes.size else 1)
+
+
+def _compact(keys, card: int) -> tuple:
+    """Renumera `keys` (0..card-1) para 0..grupos-1, em O(n) quando `card` é pequeno."""
+    if card <= 1 << 24:
+        used = np.bincount(keys, minlength=card) > 0
+        remap = np.cumsum(used) - 1
+        return remap[keys], int(used.sum())
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return inverse.astype(np.int64).reshape(-1), int(uniq.size)
+
+
+def query_columnar(store: ColumnStore, query: Query) -> dict:
+    start = time.perf_counter()
+    mask = _filter_mask(store, query)
+    positions = np.flatnonzero(mask)
+    matched = int(positions.size)
+    if not query.grouped:
+        if query.order is not None:
+            idx, desc = query.order
+            arr = np.asarray(store.array(idx)[positions])
+            if store.is_text(idx):
+                # Ordem alfabética: posição de cada código no dicionário ordenado
+                dictionary = store.dictionary(idx)
+                rank = np.empty(len(dictionary) + 1, dtype=np.int64)
+                order = sorted(range(len(dictionary)), key=lambda c: dictionary[c].casefold())
+                rank[np.array(order, dtype=np.int64) + 1] = np.arange(1, len(dictionary) + 1)
+                rank[0] = np.iinfo(np.int64).max
+                keys = rank[arr.astype(np.int64) + 1].astype(np.float64)
+                keys[arr < 0] = np.nan
+            else:
+                keys = arr
+            keys = np.where(np.isnan(keys), np.inf if not desc else -np.inf, keys)
+            keys = -keys if desc else keys
+            take = min(query.limit, keys.size)
+            if take and take < keys.size:
+                # Empates na fronteira saem na ordem do arquivo, como no heap do streaming:
+                # argpartition só acha o limiar, e todos os empatados com ele entram na ordenação
+                threshold = keys[np.argpartition(keys, take - 1)[take - 1]]
+                candidates = np.flatnonzero(keys <= threshold)
+                chosen = candidates[np.argsort(keys[candidates], kind="stable")[:take]]
+            else:
+                chosen = np.argsort(keys, kind="stable")[:take]
+            positions = positions[chosen]
+        else:
+            positions = positions[: query.limit]
+        cols = [_column_values(store, i, positions) for i in query.columns]
+        rows = [list(r) for r in zip(*cols)] if cols else []
+        return _finish(query, rows, matched, store.rows, "columnar", start, sort=False)
+
+    # Chave de grupo compacta: códigos de cada coluna combinados e renumerados a cada passo
+    n = positions.size
+    inverse, card_so_far = np.zeros(n, dtype=np.int64), 1
+    for idx in query.group_by:
+        codes, card = _group_codes(store, idx, np.asarray(store.array(idx)[positions]))
+        inverse, card_so_far = _compact(inverse * card + codes, card_so_far * card)
+    groups = card_so_far
+    first = np.full(groups, n, dtype=np.int64)
+    if n:
+        np.minimum.at(first, inverse, np.arange(n))
+    key_columns = [_column_values(store, idx, positions[first]) if n else [] for idx in query.group_by]
+
+    agg_columns = []
+    for func, idx, _ in query.aggregates:
+        if func == "count" and idx is None:
+            agg_columns.append(np.bincount(inverse, minlength=groups).tolist())
+            continue
+        arr = np.asarray(store.array(idx)[positions])
+        if store.is_text(idx):
+            present = arr >= 0
+        else:
+            present = ~np.isnan(arr)
+        if func == "count":
+            agg_columns.append(np.bincount(inverse[present], minlength=groups).tolist())
+        elif func == "count_distinct":
+            codes, card = _group_codes(store, idx, arr[present])
+            pairs = np.unique(inverse[present] * card + codes)
+            agg_columns.append(np.bincount(pairs // card, minlength=groups).tolist())
+        elif func in ("sum", "avg"):
+            sums = np.bincount(inverse[present], weights=arr[present], minlength=groups)
+            counts = np.bincount(inverse[present], minlength=groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = np.where(counts > 0, sums if func == "sum" else sums / counts, np.nan)
+            agg_columns.append([_py(v, True) for v in values.tolist()])
+        else:
+            inv, vals = inverse[present], arr[present]
+            out = np.full(groups, np.nan)
+            if vals.size:
+                order = np.lexsort((vals, inv))
+                inv_s, vals_s = inv[order], vals[order]
+                starts = np.flatnonzero(np.r_[True, inv_s[1:] != inv_s[:-1]])
+                if func == "min":
+                    out[inv_s[starts]] = vals_s[starts]
+                else:
+                    ends = np.r_[starts[1:], inv_s.size] - 1
+                    out[inv_s[ends]] = vals_s[ends]
+            agg_columns.append([_py(v, True) for v in out.tolist()])
+    rows = [list(r) for r in zip(*(key_columns + agg_columns))]
+    return _finish(query, rows, matched, store.rows, "columnar", start)
+
+
+def query_table(path, columns=None, where=None, group_by=None, aggregates=None, order_by=None,
+                limit: int = 20, cache: TableCache | None = None, use_cache: bool = True, on_progress=None) -> dict:
+    """Executa a consulta em `path`, no cache colunar quando disponível, senão em streaming."""
+    cached = (use_cache and cache is not None and np is not None
+              and os.path.getsize(path) >= cache.min_bytes)
+    store = None
+    if cached:
+        start = time.perf_counter()
+        store = cache.open(path, lambda: sniff_format(path), on_progress)
+        prepare = time.perf_counter() - start
+        fmt = store.meta["format"]
+    if store is None:
+        return query_stream(path, Query(sniff_format(path), columns, where, group_by, aggregates, order_by, limit))
+    query = Query(fmt, columns, where, group_by, aggregates, order_by, limit)
+    result = query_columnar(store, query)
+    result["prepare_sec"] = round(prepare, 4)
+    return result
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4f}".rstrip("0").rstrip(".") if abs(value) < 1e15 else f"{value:.6g}"
+    return str(value)
+
+
+def format_result(result: dict) -> str:
+    """Tabela em texto (``|``) com cabeçalho."""
+    lines = [" | ".join(result["columns"])]
+    lines.append(" | ".join("---" for _ in result["columns"]))
+    for row in result["rows"]:
+        lines.append(" | ".join(_format_value(v) for v in row))
+    return "\n".join(lines)